@@ -11,6 +11,7 @@ from flipjump.flipjump_quickstart import (
     run,
     debug,
     run_test_output,
+    preinit,
     assemble_and_run,
     assemble_and_debug,
     assemble_and_run_test_output,
@@ -31,6 +32,7 @@ __all__ = [
     'run',
     'debug',
     'run_test_output',
+    'preinit',
     'assemble_and_run',
     'assemble_and_debug',
     'assemble_and_run_test_output',
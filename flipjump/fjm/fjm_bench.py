@@ -0,0 +1,118 @@
+"""
+the .fjm codec benchmark.
+rewrites a program as the indexed version, once per chunk codec, and measures every file's size, its writing
+time and its loading time - the read and decompression of its data (the native engine's loader input) -
+so the codec can be chosen by its load time against its size (`fj fjm-bench FJM`).
+"""
+
+import dataclasses
+import gc
+import lzma
+from pathlib import Path
+from time import time
+from typing import List, Optional, Tuple
+
+from flipjump.fjm.fjm_consts import _default_chunk_words, ChunkCodec, FJMVersion
+from flipjump.fjm.fjm_reader import Reader
+from flipjump.fjm.fjm_writer import Writer
+
+
+@dataclasses.dataclass(frozen=True)
+class FjmProgram:
+    """
+    a program's memory-width, flags and segments - (segment_start, segment_length, data words) each.
+    """
+
+    memory_width: int
+    flags: int
+    segments: List[Tuple[int, int, List[int]]]
+
+    @property
+    def data_size(self) -> int:
+        """
+        the size of the segments' data words, in bytes
+        """
+        return sum(len(words) for _, _, words in self.segments) * (self.memory_width // 8)
+
+
+@dataclasses.dataclass(frozen=True)
+class CodecBenchmark:
+    """
+    a program's indexed-version file, written with a codec.
+    """
+
+    codec: ChunkCodec
+    file_size: int  # in bytes
+    write_seconds: float
+    load_seconds: float  # the best of the runs
+
+
+def read_program(fjm_path: Path) -> FjmProgram:
+    """
+    @param fjm_path: the .fjm file (any version)
+    @return: the program's segments and data words
+    """
+    reader = Reader(fjm_path, keep_raw_data=True)
+    raw_segments = reader.raw_segments or []
+    segments = [
+        (segment_start, segment_length, reader.segment_data_words(segment_index))
+        for segment_index, (segment_start, segment_length, _, _) in enumerate(raw_segments)
+    ]
+    reader.release_raw_data()
+    return FjmProgram(reader.memory_width, reader.flags, segments)
+
+
+def write_program(
+    program: FjmProgram,
+    fjm_path: Path,
+    codec: ChunkCodec,
+    *,
+    chunk_words: int = _default_chunk_words,
+    lzma_preset: int = lzma.PRESET_DEFAULT,
+    workers: Optional[int] = None,
+) -> float:
+    """
+    write the program as the indexed version, with the codec.
+    @return: the writing time, in seconds
+    """
+    writer = Writer(
+        fjm_path,
+        program.memory_width,
+        FJMVersion.IndexedVersion,
+        flags=program.flags,
+        lzma_preset=lzma_preset,
+        chunk_words=chunk_words,
+        codec=codec,
+        workers=workers,
+    )
+    for segment_start, segment_length, words in program.segments:
+        writer.add_segment(segment_start, segment_length, writer.add_data(words), len(words))
+    start_time = time()
+    writer.write_to_file()
+    return time() - start_time
+
+
+def benchmark_codec(
+    program: FjmProgram,
+    fjm_path: Path,
+    codec: ChunkCodec,
+    *,
+    runs: int = 3,
+    chunk_words: int = _default_chunk_words,
+    lzma_preset: int = lzma.PRESET_DEFAULT,
+    workers: Optional[int] = None,
+) -> CodecBenchmark:
+    """
+    write the program to fjm_path with the codec, and load it runs times.
+    @return: the file's size, its writing time, and its best loading time
+    """
+    write_seconds = write_program(
+        program, fjm_path, codec, chunk_words=chunk_words, lzma_preset=lzma_preset, workers=workers
+    )
+    load_durations = []
+    for _ in range(runs):
+        gc.collect()
+        start_time = time()
+        Reader(fjm_path, keep_raw_data=True, workers=workers)
+        load_durations.append(time() - start_time)
+    return CodecBenchmark(codec, fjm_path.stat().st_size, write_seconds, min(load_durations))
@@ -0,0 +1,161 @@
+"""
+the indexed version's chunk codecs.
+compresses and decompresses an .fjm chunk's data by its ChunkCodec: raw, lzma, zlib, bz2, or the built-in
+run-length encoding (rle) - which replaces every run of identical ops with a single op. the chunks hold
+relative jumps, so a run is a repeated op that flips the same bit and jumps the same distance ahead (e.g.
+the tables of ops that just jump to the next op); an absolute zeroed table isn't a run in this form.
+
+the rle stream is a list of records, each a u32 (little-endian) header - (count << 1) | is_run - then:
+- a run (is_run=1): a single op, repeated count times;
+- a literal (is_run=0): count ops, as is.
+the op is 2 words (2*w/8 bytes); the data's last word, if it's not a full op, follows the records as is.
+"""
+
+import bz2
+import lzma
+import struct
+import zlib
+from itertools import groupby
+from typing import List
+
+from flipjump.fjm.fjm_consts import _LZMA_FORMAT, _LZMA_DECOMPRESSION_FILTERS, _lzma_compression_filters, ChunkCodec
+from flipjump.utils.exceptions import FlipJumpReadFjmException, FlipJumpWriteFjmException
+
+_rle_header_format = '<L'
+_rle_header_size = 4
+_rle_max_count = (1 << 31) - 1
+# a shorter run is cheaper as a part of a literal (a run record costs a header and an op)
+_rle_min_run = 3
+
+
+def _rle_record(count: int, is_run: bool) -> bytes:
+    return struct.pack(_rle_header_format, (count << 1) | is_run)
+
+
+def rle_encode(data: bytes, op_size: int) -> bytes:
+    """
+    @param data: the words' bytes
+    @param op_size: the size of an op (2 words), in bytes
+    @return: the run-length encoded data (see the module's docstring)
+    """
+    ops_end = len(data) - len(data) % op_size
+    encoded = bytearray()
+    literal: List[bytes] = []
+
+    def flush_literal() -> None:
+        for literal_start in range(0, len(literal), _rle_max_count):
+            literal_end = literal_start + _rle_max_count
+            literal_part = literal[literal_start:literal_end]
+            encoded.extend(_rle_record(len(literal_part), False))
+            encoded.extend(b''.join(literal_part))
+        literal.clear()
+
+    for op, same_ops in groupby(op for (op,) in struct.iter_unpack(f'{op_size}s', data[:ops_end])):
+        count = sum(1 for _ in same_ops)
+        if count < _rle_min_run:
+            literal.extend([op] * count)
+            continue
+        flush_literal()
+        for run_start in range(0, count, _rle_max_count):
+            encoded.extend(_rle_record(min(_rle_max_count, count - run_start), True))
+            encoded.extend(op)
+    flush_literal()
+
+    encoded.extend(data[ops_end:])
+    return bytes(encoded)
+
+
+def rle_decode(data: bytes, op_size: int, data_size: int) -> bytes:
+    """
+    @param data: the run-length encoded data
+    @param op_size: the size of an op (2 words), in bytes
+    @param data_size: the size of the decoded data, in bytes
+    @return: the decoded data
+    """
+    ops_end = data_size - data_size % op_size
+    parts: List[bytes] = []
+    decoded_size = offset = 0
+    try:
+        while decoded_size < ops_end:
+            (header,) = struct.unpack_from(_rle_header_format, data, offset)
+            offset += _rle_header_size
+            count, is_run = header >> 1, header & 1
+            part_size = count * op_size
+            if count == 0 or decoded_size + part_size > ops_end:
+                raise FlipJumpReadFjmException(f'Error: a damaged rle record (of {count} ops).')
+            record_end = offset + (op_size if is_run else part_size)
+            if record_end > len(data):
+                raise FlipJumpReadFjmException('Error: the rle data ends in the middle of a record.')
+            record_data = data[offset:record_end]
+            parts.append(record_data * count if is_run else record_data)
+            offset = record_end
+            decoded_size += part_size
+    except struct.error as e:
+        raise FlipJumpReadFjmException('Error: the rle data ends in the middle of a record.') from e
+
+    if len(data) - offset != data_size - ops_end:
+        raise FlipJumpReadFjmException(
+            f'Error: the rle data has {len(data) - offset} bytes after its records, expected {data_size - ops_end}.'
+        )
+    parts.append(data[offset:])
+    return b''.join(parts)
+
+
+def compress_chunk(codec: ChunkCodec, data: bytes, memory_width: int, lzma_preset: int) -> bytes:
+    """
+    @param codec: the codec to compress with
+    @param data: the chunk's words' bytes
+    @param memory_width: the memory-width
+    @param lzma_preset: the lzma preset (0-9; used by the lzma codec)
+    @return: the compressed data
+    """
+    try:
+        if ChunkCodec.Lzma == codec:
+            return lzma.compress(
+                data, format=_LZMA_FORMAT, filters=_lzma_compression_filters(2 * memory_width, lzma_preset)
+            )
+        if ChunkCodec.Zlib == codec:
+            return zlib.compress(data)
+        if ChunkCodec.Bz2 == codec:
+            return bz2.compress(data)
+        if ChunkCodec.Rle == codec:
+            return rle_encode(data, 2 * memory_width // 8)
+        if ChunkCodec.Raw == codec:
+            return data
+    except (lzma.LZMAError, zlib.error, ValueError) as e:
+        raise FlipJumpWriteFjmException('Error: Unable to compress the data.') from e
+    raise FlipJumpWriteFjmException(f'Error: unsupported chunk codec ({codec}).')
+
+
+def lzma_decompress(compressed_data: bytes) -> bytes:
+    """
+    @return: the decompressed data of the compressed version (and of the lzma chunks)
+    """
+    try:
+        return lzma.decompress(compressed_data, format=_LZMA_FORMAT, filters=_LZMA_DECOMPRESSION_FILTERS)
+    except lzma.LZMAError as e:
+        raise FlipJumpReadFjmException('Error: The compressed data is damaged; Unable to decompress.') from e
+
+
+def decompress_chunk(codec: int, data: bytes, memory_width: int, data_size: int) -> bytes:
+    """
+    @param codec: the chunk's ChunkCodec
+    @param data: the chunk's data, as stored
+    @param memory_width: the memory-width
+    @param data_size: the size of the decompressed data, in bytes (the rle decoder stops there)
+    @return: the chunk's words' bytes
+    """
+    if ChunkCodec.Raw == codec:
+        return data
+    if ChunkCodec.Lzma == codec:
+        return lzma_decompress(data)
+    if ChunkCodec.Rle == codec:
+        return rle_decode(data, 2 * memory_width // 8, data_size)
+    try:
+        if ChunkCodec.Zlib == codec:
+            return zlib.decompress(data)
+        if ChunkCodec.Bz2 == codec:
+            return bz2.decompress(data)
+    except (zlib.error, OSError, ValueError, EOFError) as e:
+        raise FlipJumpReadFjmException('Error: The compressed data is damaged; Unable to decompress.') from e
+    raise FlipJumpReadFjmException(f'Error: unsupported chunk codec ({codec}).')
@@ -1,13 +1,16 @@
 """
 the .fjm format constants.
 the constants and definitions for the .fjm (FlipJump Memory) binary file format: the magic
-number, the supported FJMVersion enum, the binary header/segment struct layouts, and the
-LZMA compression settings used by the compressed version.
+number, the supported FJMVersion enum, the binary header/segment struct layouts, the
+LZMA compression settings used by the compressed versions, the mapped version's page alignment,
+the indexed version's chunk layout and codecs, and the thread pool that (de)compresses its chunks.
 """
 
 import lzma
-from enum import Enum
-from typing import List, Dict
+import os
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum, IntEnum
+from typing import Any, Callable, Iterable, List, Dict, Optional, TypeVar
 
 """
 struct {
@@ -19,14 +22,35 @@ struct {
         u64 flags;
         u32 reserved;   // 0
     }
+    { // for version 5
+        u64 chunk_words;    // the data words of a (full) chunk; even
+        u64 chunk_count;
+    }
     struct segment {
         u64 segment_start;  // in memory words (w-bits)
         u64 segment_length; // in memory words (w-bits)
-        u64 data_start;     // in the outer-struct.data words (w-bits)
+        u64 data_start;     // in the outer-struct.data words (w-bits). version 4: the file offset, in bytes.
+                            //  version 5: the index of the segment's first chunk
         u64 data_length;    // in the outer-struct.data words (w-bits)
     } *segments;        // segments[segment_num]
+    struct chunk {      // for version 5
+        u64 data_offset;    // the file offset of the chunk's data, in bytes
+        u32 data_size;      // in bytes
+        u32 codec;          // a ChunkCodec
+    } *chunks;          // chunks[chunk_count]
     u8* data;       // the data (might be compressed in some versions)
 } fjm_file;     // FlipJump Memory file
+
+version 4 (mapped) has no data pool: every segment's data is stored on its own, as absolute
+little-endian words, at a file offset congruent to the segment's byte address (segment_start * w/8)
+modulo _mapped_page_size - the zero padding before it is skipped by the readers. so the file's pages
+of a 64-bit program are its memory's pages, and the native engine maps them in place.
+
+version 5 (indexed) splits every segment's data (relative jumps, like version 2) into chunks of
+chunk_words words (its last chunk may be shorter), each compressed on its own - so a reader can
+decompress any chunk without the ones before it. a segment's chunks are consecutive in the chunk index,
+and are compressed by the segment's codec (the writer's codec by default; a chunk that doesn't get
+smaller is stored raw).
 """
 
 
@@ -35,6 +59,10 @@ FJ_MAGIC = ord('F') + (ord('J') << 8)
 
 _reserved_dict_threshold = 1000
 
+# the python fast loop's list-backed memory (fjm_reader.DenseMemory) covers the contiguous
+# segments from address 0 up to this many words; the programs reaching beyond it use a dictionary
+_dense_memory_max_words = 1 << 22
+
 _header_base_format = '<HHQQ'
 _header_base_size = 2 + 2 + 8 + 8
 
@@ -44,12 +72,40 @@ _header_extension_size = 8 + 4
 _segment_format = '<QQQQ'
 _segment_size = 8 + 8 + 8 + 8
 
+# the IndexedVersion's header extension, and its chunk index entries
+_indexed_header_format = '<QQ'
+_indexed_header_size = 8 + 8
+
+_chunk_format = '<QLL'
+_chunk_size = 8 + 4 + 4
+
+# the IndexedVersion's default chunk length, in words (2MB at w=64: at lzma.PRESET_DEFAULT the chunks
+# compress within ~3% of the whole data; 64K-word chunks lose ~6%)
+_default_chunk_words = 1 << 18
+
+# the lazy Reader decodes the data of the versions without chunks in blocks of this many words
+_lazy_block_words = 1 << 12
+
+# the MappedVersion's data alignment (the smallest common page size; on bigger pages the native
+# engine maps the segments that happen to be aligned to them, and copies the rest)
+_mapped_page_size = 4096
+
 
 class FJMVersion(Enum):
     BaseVersion = 0  # initial version, minimal structure
     NormalVersion = 1  # added flags and reserved
     RelativeJumpVersion = 2  # compress-friendly: jumps in data are saved relative to their address
     CompressedVersion = 3  # version 2 but data is lzma2-compressed
+    MappedVersion = 4  # version 1 but every segment's data is page-aligned in the file (memory-mappable)
+    IndexedVersion = 5  # version 3 but the data is compressed in independent chunks (indexed in the header)
+
+
+class ChunkCodec(IntEnum):
+    Raw = 0  # the chunk's words as is (the chunks that don't compress)
+    Lzma = 1  # lzma2-compressed, like the compressed version's data
+    Zlib = 2  # deflate-compressed (a zlib stream) - faster to decompress than lzma
+    Bz2 = 3  # bzip2-compressed
+    Rle = 4  # run-length encoded ops (see fjm_codecs) - the cheapest to decode; for the repeated-op tables
 
 
 SUPPORTED_VERSIONS_NAMES = {
@@ -57,6 +113,16 @@ SUPPORTED_VERSIONS_NAMES = {
     FJMVersion.NormalVersion: 'Normal',
     FJMVersion.RelativeJumpVersion: 'RelativeJump',
     FJMVersion.CompressedVersion: 'Compressed',
+    FJMVersion.MappedVersion: 'Mapped',
+    FJMVersion.IndexedVersion: 'Indexed',
+}
+
+CHUNK_CODEC_NAMES = {
+    ChunkCodec.Raw: 'raw',
+    ChunkCodec.Lzma: 'lzma',
+    ChunkCodec.Zlib: 'zlib',
+    ChunkCodec.Bz2: 'bz2',
+    ChunkCodec.Rle: 'rle',
 }
 
 SUPPORTED_MEMORY_WIDTHS: frozenset[int] = frozenset({8, 16, 32, 64})
@@ -70,5 +136,22 @@ def _lzma_compression_filters(dw: int, preset: int) -> List[Dict[str, int]]:
     return [{"id": lzma.FILTER_LZMA2, "preset": preset, "nice_len": dw}]
 
 
+_T = TypeVar('_T')
+
+
+def _map_chunks(function: Callable[..., _T], *iterables: Iterable[Any], workers: Optional[int] = None) -> List[_T]:
+    """
+    map the function over the IndexedVersion's chunks on a thread pool
+    (lzma, zlib and bz2 release the GIL while they work).
+    @param workers: the number of threads (default: the number of CPUs); 1 - in this thread
+    @return: the results, in order
+    """
+    thread_count = workers if workers is not None else os.cpu_count() or 1
+    if thread_count <= 1:
+        return list(map(function, *iterables))
+    with ThreadPoolExecutor(max_workers=thread_count, thread_name_prefix='fjm_chunks') as executor:
+        return list(executor.map(function, *iterables))
+
+
 def _new_garbage_val() -> int:
     return 0  # The value read when reading a word outside any segment.
@@ -2,34 +2,72 @@
 the .fjm file reader.
 parses an .fjm binary's header and segments, decompresses the data when needed, and
 exposes the program as a word-addressable memory dictionary for the interpreter.
+the native engine loads the raw segment table and data bytes instead (keep_raw_data);
+the python fast loop loads a list-backed memory (DenseMemory) for the compact programs.
+the mapped version's file is memory-mapped (copy-on-write), not read: its words are decoded
+straight from the mapping, and the native engine maps the file itself.
+the words are decoded a segment at a time, in bulk (numpy, if installed; else memoryview.cast).
+a lazy reader (lazy=True) reads and decodes the data a block at a time, on its first access (LazyMemory) -
+the indexed version's blocks are its independently-compressed chunks (each decompressed by its codec).
 """
 
+import array
 import dataclasses
-import lzma
+import mmap
+import os
 import struct
+import sys
+from bisect import bisect_right
 from collections import defaultdict
 from enum import IntEnum
+from operator import itemgetter
 from pathlib import Path
 from struct import unpack
 from time import sleep
-from typing import BinaryIO, List, Tuple, Dict
+from itertools import chain
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    MutableMapping,
+    Optional,
+    Tuple,
+    Union,
+)
+
+try:
+    import numpy  # type: ignore[import-not-found,unused-ignore]
+except ImportError:  # numpy is optional - the relative jumps are then rebuilt in a list comprehension
+    numpy = None
 
 from flipjump.fjm.fjm_consts import (
     FJ_MAGIC,
     _reserved_dict_threshold,
+    _dense_memory_max_words,
     _header_base_format,
     _header_extension_format,
     _header_base_size,
     _header_extension_size,
     _segment_format,
     _segment_size,
+    _indexed_header_format,
+    _indexed_header_size,
+    _chunk_format,
+    _chunk_size,
+    _lazy_block_words,
+    _map_chunks,
     SUPPORTED_VERSIONS_NAMES,
     SUPPORTED_MEMORY_WIDTHS,
-    _LZMA_FORMAT,
-    _LZMA_DECOMPRESSION_FILTERS,
     _new_garbage_val,
+    ChunkCodec,
     FJMVersion,
 )
+from flipjump.fjm.fjm_codecs import decompress_chunk, lzma_decompress
 from flipjump.utils.exceptions import FlipJumpReadFjmException, FlipJumpRuntimeMemoryException
 
 
@@ -44,6 +82,181 @@ class GarbageHandling(IntEnum):
     Continue = 3  # Continue normally
 
 
+def report_garbage_read(garbage_handling: GarbageHandling, memory_address: int, garbage_val: int) -> None:
+    """
+    act on the program's first read of a garbage word (memory outside any segment).
+    shared by the python Reader and the native engine's garbage callback.
+    @param garbage_handling: the run's garbage-handling mode
+    @param memory_address: the bit-address of the garbage word
+    @param garbage_val: the value the word reads as from now on
+    """
+    garbage_message = f'Reading garbage word at mem[{hex(memory_address)[2:]}] = {hex(garbage_val)[2:]}'
+
+    if GarbageHandling.Stop == garbage_handling:
+        raise FlipJumpRuntimeMemoryException(garbage_message, memory_address)
+    elif GarbageHandling.OnlyWarning == garbage_handling:
+        print(f'\nWarning:  {garbage_message}')
+    elif GarbageHandling.SlowRead == garbage_handling:
+        print(f'\nWarning:  {garbage_message}')
+        sleep(0.1)
+
+
+class DenseMemory(MutableMapping[int, int]):
+    """
+    the memory of a program whose segments from address 0 are contiguous (the common layout - the
+    code, maybe with a reserve above it): their words are a list, which the python fast loop indexes
+    directly (no hashing). the data of the other segments are lists too (blocks, found by bisection),
+    and every other word (the lazily-zeroed reserves, the garbage words) is kept in a dictionary.
+    a mapping {word_address: value}, like the plain dictionary memory.
+    """
+
+    def __init__(
+        self, words: List[int], blocks: Iterable[Tuple[int, List[int]]] = (), far: Optional[Dict[int, int]] = None
+    ):
+        """
+        @param words: the words from address 0
+        @param blocks: the other words in segments, as (start word-address, words) - not overlapping
+        @param far: every other word
+        """
+        self.words = words
+        self.blocks = sorted(blocks, key=itemgetter(0))
+        self._block_starts = [block_start for block_start, _ in self.blocks]
+        self.far: Dict[int, int] = {} if far is None else far
+
+    def _locate(self, word_address: int) -> Optional[Tuple[List[int], int]]:
+        """
+        @return: the list holding the word (the words, or a block) and its index there; None for a far word
+        """
+        if 0 <= word_address < len(self.words):
+            return self.words, word_address
+        block_index = bisect_right(self._block_starts, word_address) - 1
+        if block_index >= 0:
+            block_start, block_words = self.blocks[block_index]
+            if word_address - block_start < len(block_words):
+                return block_words, word_address - block_start
+        return None
+
+    def __getitem__(self, word_address: int) -> int:
+        location = self._locate(word_address)
+        if location is None:
+            return self.far[word_address]
+        words, index = location
+        return words[index]
+
+    def __setitem__(self, word_address: int, value: int) -> None:
+        location = self._locate(word_address)
+        if location is None:
+            self.far[word_address] = value
+        else:
+            words, index = location
+            words[index] = value
+
+    def __delitem__(self, word_address: int) -> None:
+        if self._locate(word_address) is not None:
+            raise KeyError(f"the word {word_address} is in a segment, it can't be removed")
+        del self.far[word_address]
+
+    def __contains__(self, word_address: object) -> bool:
+        if isinstance(word_address, int) and self._locate(word_address) is not None:
+            return True
+        return word_address in self.far
+
+    def __iter__(self) -> Iterator[int]:
+        block_ranges = (range(block_start, block_start + len(block_words)) for block_start, block_words in self.blocks)
+        return chain(range(len(self.words)), chain.from_iterable(block_ranges), self.far)
+
+    def __len__(self) -> int:
+        return len(self.words) + sum(len(block_words) for _, block_words in self.blocks) + len(self.far)
+
+
+class LazyMemory(Dict[int, int]):
+    """
+    the memory of a lazily-read program (Reader(lazy=True)): a dictionary whose segments' data words are
+    loaded a block at a time - on the first access to a word of the block (a missing key, a membership test
+    or a get). the python loops and the io-devices use it like the plain dictionary memory; the words that
+    were written before their block was loaded keep their written values.
+    its iteration and length cover the loaded words only (load_all() loads the rest).
+    """
+
+    def __init__(self, blocks: List[Tuple[int, int]], load_block: Callable[[int], List[int]]):
+        """
+        @param blocks: the data blocks, as (start word-address, number of words) - sorted, not overlapping
+        @param load_block: returns the words of the block at this index (of blocks)
+        """
+        super().__init__()
+        self._block_starts = [block_start for block_start, _ in blocks]
+        self._block_ends = [block_start + block_length for block_start, block_length in blocks]
+        self._unloaded_blocks = set(range(len(blocks)))
+        self._load_block = load_block
+
+    def _load(self, block_index: int) -> None:
+        self._unloaded_blocks.discard(block_index)
+        block_range = range(self._block_starts[block_index], self._block_ends[block_index])
+        written_words = {
+            word_address: dict.__getitem__(self, word_address) for word_address in self.keys() & block_range
+        }
+        self.update(zip(block_range, self._load_block(block_index)))
+        self.update(written_words)
+
+    def _fault(self, word_address: object) -> bool:
+        """
+        load the block of the word, if it's in a block that isn't loaded yet.
+        @return: true if the block was loaded now
+        """
+        if not isinstance(word_address, int):
+            return False
+        block_index = bisect_right(self._block_starts, word_address) - 1
+        if block_index < 0 or word_address >= self._block_ends[block_index]:
+            return False
+        if block_index not in self._unloaded_blocks:
+            return False
+        self._load(block_index)
+        return True
+
+    def __missing__(self, word_address: int) -> int:
+        if self._fault(word_address):
+            return dict.__getitem__(self, word_address)
+        raise KeyError(word_address)
+
+    def __contains__(self, word_address: object) -> bool:
+        return dict.__contains__(self, word_address) or self._fault(word_address)
+
+    def get(self, word_address: int, default: Any = None) -> Any:
+        return self[word_address] if word_address in self else default
+
+    def load_all(self) -> None:
+        """
+        load every block that isn't loaded yet.
+        """
+        for block_index in sorted(self._unloaded_blocks):
+            self._load(block_index)
+
+
+def _dense_span_end(segments: List[Tuple[int, int, int, int]]) -> int:
+    """
+    @param segments: the segment table (segment_start, segment_length, data_start, data_length)
+    @return: the end (word-address) of the contiguous segments from address 0, if they fit in
+    _dense_memory_max_words. if the segment at 0 alone doesn't fit, the end of its data (its reserve
+    isn't in the list); 0 if there's no segment at 0 (the memory is a dictionary)
+    """
+    end = 0
+    for segment_start, segment_length, _, data_length in sorted(segments):
+        if segment_start != end:
+            break
+        if end + segment_length > _dense_memory_max_words:
+            return end if end else data_length
+        end += segment_length
+    return end
+
+
+_WordTypecode = Literal['Q', 'L', 'I', 'H', 'B']
+_WORD_TYPECODES: Tuple[_WordTypecode, ...] = ('Q', 'L', 'I', 'H', 'B')
+# the array typecode of each memory width's words
+_ARRAY_TYPECODES: Dict[int, _WordTypecode] = {
+    array.array(typecode).itemsize * 8: typecode for typecode in _WORD_TYPECODES
+}
+
+
 @dataclasses.dataclass
 class MemorySegment:
     """
@@ -64,28 +277,130 @@ class Reader:
     memory_width: int
     version: FJMVersion
     segment_num: int
-    memory: Dict[int, int]
+    memory: MutableMapping[int, int]
     zeros_boundaries: List[Tuple[int, int]]
-
-    def __init__(self, input_file: Path, *, garbage_handling: GarbageHandling = GarbageHandling.Stop):
+    chunk_words: int
+    chunk_count: int
+    raw_segments: Optional[List[Tuple[int, int, int, int]]]
+    raw_data: Optional[bytes]
+    mapped_data: Optional[mmap.mmap]
+
+    def __init__(
+        self,
+        input_file: Path,
+        *,
+        garbage_handling: GarbageHandling = GarbageHandling.Stop,
+        keep_raw_data: bool = False,
+        lazy: bool = False,
+        workers: Optional[int] = None,
+    ):
         """
         The .fjm-file reader
         @param input_file: the path to the .fjm file
         @param garbage_handling: how to handle access to memory not in any segment
+        @param keep_raw_data: if true, don't build the memory dictionary - keep the segment table and the
+        (decompressed) data bytes in raw_segments / raw_data, for the native engine's loader (the mapped
+        version keeps its file's mapping in mapped_data instead of raw_data).
+        the memory accessors need load_memory() first.
+        @param lazy: if true, the memory is a LazyMemory - the data is read (and decompressed) from the file a
+        block at a time, on its first access (the file mustn't change meanwhile). not with keep_raw_data.
+        @param workers: the threads decompressing the indexed version's chunks (default: the number of CPUs)
         """
+        if lazy and keep_raw_data:
+            raise ValueError("a lazy reader reads its data on demand, it can't keep the raw data")
+        self.input_file = input_file
         self.garbage_handling = garbage_handling
+        self.workers = workers
+        self.raw_segments = None
+        self.raw_data = None
+        self.mapped_data = None
 
         try:
             with open(input_file, 'rb') as fjm_file:
                 self._init_header_fields(fjm_file)
                 self._validate_header()
                 segments = self._init_segments(fjm_file)
-                data = self._read_decompressed_data(fjm_file)
-                self._init_memory(segments, data)
+                chunks = self._init_chunks(fjm_file)
+                if lazy:
+                    self._init_lazy_memory(fjm_file, segments, chunks)
+                    return
+                if FJMVersion.MappedVersion == self.version:
+                    self.mapped_data = mmap.mmap(fjm_file.fileno(), 0, access=mmap.ACCESS_COPY)
+                elif FJMVersion.IndexedVersion == self.version:
+                    segments, file_data = self._read_indexed_data(fjm_file, segments, chunks)
+                else:
+                    file_data = self._read_decompressed_bytes(fjm_file)
         except struct.error as se:
             exception_message = f"Bad file {input_file}, can't unpack. Maybe it's not a .fjm file?"
             raise FlipJumpReadFjmException(exception_message) from se
 
+        if self.mapped_data is not None:
+            self._init_memory_segments(segments, len(self.mapped_data), data_unit=self.memory_width // 8)
+            self.raw_segments = segments
+            if not keep_raw_data:
+                self.load_memory()
+            return
+
+        if len(file_data) % (self.memory_width // 8) != 0:
+            raise FlipJumpReadFjmException(f"Bad file {input_file}, can't unpack. Maybe it's not a .fjm file?")
+        self._init_memory_segments(segments, len(file_data) // (self.memory_width // 8))
+        if keep_raw_data:
+            self.raw_segments, self.raw_data = segments, file_data
+        else:
+            self._init_memory(segments, file_data)
+
+    def load_memory(self, *, dense: bool = False) -> None:
+        """
+        build the memory dictionary of a reader created with keep_raw_data (and drop the raw data).
+        @param dense: if true, and the program has a segment at address 0, build a DenseMemory instead -
+        for the python fast loop
+        """
+        data = self.raw_data if self.mapped_data is None else self.mapped_data
+        if self.raw_segments is None or data is None:
+            return
+        self._init_memory(self.raw_segments, data, dense=dense)
+        self.release_raw_data()
+
+    def unmap_raw_data(self) -> None:
+        """
+        turn the mapped version's raw data (raw_segments and the file's mapping) into the other versions'
+        raw data - a data pool of the segments' data (raw_data), and their data_start-s in it. closes the mapping.
+        """
+        if self.raw_segments is None or self.mapped_data is None:
+            return
+        word_bytes = self.memory_width // 8
+        pool_segments, pool_parts, pool_words = [], [], 0
+        for segment_start, segment_length, data_offset, data_length in self.raw_segments:
+            pool_segments.append((segment_start, segment_length, pool_words, data_length))
+            data_end = data_offset + data_length * word_bytes
+            pool_parts.append(self.mapped_data[data_offset:data_end])
+            pool_words += data_length
+        self.raw_segments, self.raw_data = pool_segments, b''.join(pool_parts)
+        self.mapped_data.close()
+        self.mapped_data = None
+
+    def segment_data_words(self, segment_index: int) -> List[int]:
+        """
+        decode a segment's data words, from the raw data of a reader created with keep_raw_data.
+        @param segment_index: the segment's index in raw_segments
+        @return: the segment's data words (its jumps absolute, in every version)
+        """
+        data = self.raw_data if self.mapped_data is None else self.mapped_data
+        if self.raw_segments is None or data is None:
+            raise ValueError("the data words are decoded from the raw data (keep_raw_data, before load_memory)")
+        segment_start, _, data_start, data_length = self.raw_segments[segment_index]
+        data_unit = 1 if self.mapped_data is not None else self.memory_width // 8  # the mapped data_start: bytes
+        return self._decode_segment(data, data_start * data_unit, segment_start, data_length)
+
+    def release_raw_data(self) -> None:
+        """
+        drop the raw data (once loaded), and close the mapped version's file mapping.
+        """
+        self.raw_segments, self.raw_data = None, None
+        if self.mapped_data is not None:
+            self.mapped_data.close()
+            self.mapped_data = None
+
     def _init_header_fields(self, fjm_file: BinaryIO) -> None:
         self.magic, self.memory_width, version, self.segment_num = unpack(
             _header_base_format, fjm_file.read(_header_base_size)
@@ -100,10 +415,20 @@ class Reader:
             self.flags, self.reserved = 0, 0
         else:
             self.flags, self.reserved = unpack(_header_extension_format, fjm_file.read(_header_extension_size))
+        if FJMVersion.IndexedVersion == self.version:
+            self.chunk_words, self.chunk_count = unpack(_indexed_header_format, fjm_file.read(_indexed_header_size))
+        else:
+            self.chunk_words, self.chunk_count = 0, 0
 
     def _init_segments(self, fjm_file: BinaryIO) -> List[Tuple[int, int, int, int]]:
         return [unpack(_segment_format, fjm_file.read(_segment_size)) for _ in range(self.segment_num)]
 
+    def _init_chunks(self, fjm_file: BinaryIO) -> List[Tuple[int, int, int]]:
+        """
+        @return: the indexed version's chunk index - (data_offset, data_size, codec) per chunk (empty otherwise)
+        """
+        return [unpack(_chunk_format, fjm_file.read(_chunk_size)) for _ in range(self.chunk_count)]
+
     def _validate_header(self) -> None:
         if self.magic != FJ_MAGIC:
             raise FlipJumpReadFjmException(f'Error: bad magic code ({hex(self.magic)}, should be {hex(FJ_MAGIC)}).')
@@ -118,66 +443,270 @@ class Reader:
             )
         if self.reserved != 0:
             raise FlipJumpReadFjmException(f'Error: bad reserved value ({self.reserved}, should be 0).')
+        if FJMVersion.IndexedVersion == self.version and (self.chunk_words <= 0 or self.chunk_words % 2 != 0):
+            raise FlipJumpReadFjmException(
+                f'Error: bad chunk length ({self.chunk_words}, should be a positive even number of words).'
+            )
 
-    @staticmethod
-    def _decompress_data(compressed_data: bytes) -> bytes:
-        try:
-            return lzma.decompress(compressed_data, format=_LZMA_FORMAT, filters=_LZMA_DECOMPRESSION_FILTERS)
-        except lzma.LZMAError as e:
-            raise FlipJumpReadFjmException('Error: The compressed data is damaged; Unable to decompress.') from e
-
-    def _read_decompressed_data(self, fjm_file: BinaryIO) -> List[int]:
+    def _read_decompressed_bytes(self, fjm_file: BinaryIO) -> bytes:
         """
         @param fjm_file: [in]: read from this file the data words.
-        @return: list of the data words (decompressed if it was compressed).
+        @return: the data words' bytes, little-endian (decompressed if it was compressed).
         """
-        read_tag = '<' + {8: 'B', 16: 'H', 32: 'L', 64: 'Q'}[self.memory_width]
-        word_bytes_size = self.memory_width // 8
-
         file_data = fjm_file.read()
         if FJMVersion.CompressedVersion == self.version:
-            file_data = self._decompress_data(file_data)
+            file_data = lzma_decompress(file_data)
+        return file_data
+
+    def _decode_chunk(self, chunk_data: bytes, codec: int, data_length: int) -> bytes:
+        """
+        @param chunk_data: an indexed-version chunk's data, as stored
+        @param codec: its ChunkCodec
+        @param data_length: its number of data words
+        @return: the chunk's data words' bytes (decompressed)
+        """
+        chunk_data = decompress_chunk(codec, chunk_data, self.memory_width, data_length * (self.memory_width // 8))
+        if len(chunk_data) != data_length * (self.memory_width // 8):
+            raise FlipJumpReadFjmException(
+                f'Bad .fjm file: a chunk holds {len(chunk_data)} bytes, expected {data_length} words.'
+            )
+        return chunk_data
+
+    def _validate_chunks(
+        self, segments: List[Tuple[int, int, int, int]], chunks: List[Tuple[int, int, int]], file_size: int
+    ) -> None:
+        """
+        check that the indexed version's segments have their chunks, and that the chunks are in the file.
+        """
+        chunk_segments = [
+            (segment_start, segment_length, first_chunk * self.chunk_words, data_length)
+            for segment_start, segment_length, first_chunk, data_length in segments
+        ]
+        self._init_memory_segments(chunk_segments, len(chunks) * self.chunk_words)
+        for chunk_offset, chunk_size, _ in chunks:
+            if chunk_offset + chunk_size > file_size:
+                raise FlipJumpReadFjmException(
+                    f"Bad .fjm file: chunk data range [{chunk_offset}, {chunk_offset + chunk_size})"
+                    f" exceeds the file's length {file_size}."
+                )
 
-        data = [
-            unpack(read_tag, file_data[i : i + word_bytes_size])[0]  # noqa: E203
-            for i in range(0, len(file_data), word_bytes_size)
+    def _segment_chunks(self, first_chunk: int, data_length: int) -> Iterator[Tuple[int, int, int]]:
+        """
+        @return: the indexed version's segment's chunks, as (chunk index, offset in the segment, number of words)
+        """
+        for chunk_index, chunk_start in enumerate(range(0, data_length, self.chunk_words), first_chunk):
+            yield chunk_index, chunk_start, min(self.chunk_words, data_length - chunk_start)
+
+    def _read_indexed_data(
+        self, fjm_file: BinaryIO, segments: List[Tuple[int, int, int, int]], chunks: List[Tuple[int, int, int]]
+    ) -> Tuple[List[Tuple[int, int, int, int]], bytes]:
+        """
+        @param fjm_file: [in]: read from this file the chunks.
+        @return: the indexed version's data as a data pool - the segment table (each data_start in the pool),
+        and the pool's bytes (the chunks, decompressed on a thread pool)
+        """
+        self._validate_chunks(segments, chunks, os.fstat(fjm_file.fileno()).st_size)
+        pool_segments, pool_words = [], 0
+        chunk_data_list, chunk_codecs, chunk_lengths = [], [], []
+        for segment_start, segment_length, first_chunk, data_length in segments:
+            pool_segments.append((segment_start, segment_length, pool_words, data_length))
+            for chunk_index, _, chunk_length in self._segment_chunks(first_chunk, data_length):
+                chunk_offset, chunk_size, codec = chunks[chunk_index]
+                fjm_file.seek(chunk_offset)
+                chunk_data_list.append(fjm_file.read(chunk_size))
+                chunk_codecs.append(codec)
+                chunk_lengths.append(chunk_length)
+            pool_words += data_length
+        pool_parts = _map_chunks(self._decode_chunk, chunk_data_list, chunk_codecs, chunk_lengths, workers=self.workers)
+        return pool_segments, b''.join(pool_parts)
+
+    def _init_lazy_memory(
+        self, fjm_file: BinaryIO, segments: List[Tuple[int, int, int, int]], chunks: List[Tuple[int, int, int]]
+    ) -> None:
+        """
+        build the LazyMemory: split the segments' data to blocks - the indexed version's chunks, or
+        _lazy_block_words words of the other versions' data - that are read and decoded on their first access.
+        the compressed version's data (a single lzma stream) is decompressed here, and decoded lazily.
+        all the reserves are zeroed lazily.
+        @param fjm_file: [in]: the file, after its chunk index
+        """
+        word_bytes = self.memory_width // 8
+        file_stat = os.fstat(fjm_file.fileno())
+        self._lazy_file_version = (file_stat.st_mtime_ns, file_stat.st_size)
+        self._lazy_data: Optional[bytes] = None
+        # (start word-address, number of words, the data's offset (in the file, or in _lazy_data), its size, codec)
+        blocks: List[Tuple[int, int, int, int, int]] = []
+
+        if FJMVersion.IndexedVersion == self.version:
+            self._validate_chunks(segments, chunks, file_stat.st_size)
+            for segment_start, _, first_chunk, data_length in segments:
+                for chunk_index, chunk_start, chunk_length in self._segment_chunks(first_chunk, data_length):
+                    chunk_offset, chunk_size, codec = chunks[chunk_index]
+                    blocks.append((segment_start + chunk_start, chunk_length, chunk_offset, chunk_size, codec))
+        else:
+            if FJMVersion.MappedVersion == self.version:
+                pool_offset, data_unit = 0, 1
+                self._init_memory_segments(segments, file_stat.st_size, data_unit=word_bytes)
+            else:
+                pool_offset, data_unit = fjm_file.tell(), word_bytes
+                if FJMVersion.CompressedVersion == self.version:
+                    self._lazy_data = self._read_decompressed_bytes(fjm_file)
+                    pool_offset = 0
+                pool_length = file_stat.st_size - pool_offset if self._lazy_data is None else len(self._lazy_data)
+                if pool_length % word_bytes != 0:
+                    raise FlipJumpReadFjmException(
+                        f"Bad file {self.input_file}, can't unpack. Maybe it's not a .fjm file?"
+                    )
+                self._init_memory_segments(segments, pool_length // word_bytes)
+            for segment_start, _, data_start, data_length in segments:
+                data_offset = pool_offset + data_start * data_unit
+                for block_start in range(0, data_length, _lazy_block_words):
+                    block_length = min(_lazy_block_words, data_length - block_start)
+                    block_offset = data_offset + block_start * word_bytes
+                    blocks.append(
+                        (
+                            segment_start + block_start,
+                            block_length,
+                            block_offset,
+                            block_length * word_bytes,
+                            ChunkCodec.Raw,
+                        )
+                    )
+
+        self._lazy_blocks = sorted(blocks)
+        self.memory = LazyMemory([block[:2] for block in self._lazy_blocks], self._load_lazy_block)
+        self.zeros_boundaries = [
+            (segment_start + data_length, segment_start + segment_length)
+            for segment_start, segment_length, _, data_length in segments
+            if segment_length > data_length
         ]
-        return data
 
-    def _init_memory(self, segments: List[Tuple[int, int, int, int]], data: List[int]) -> None:
-        self.memory = {}
-        self.zeros_boundaries = []
+    def _load_lazy_block(self, block_index: int) -> List[int]:
+        """
+        read and decode a LazyMemory block (see _init_lazy_memory).
+        @return: the block's words
+        """
+        block_start, block_length, data_offset, data_size, codec = self._lazy_blocks[block_index]
+        if self._lazy_data is not None:
+            return self._decode_segment(self._lazy_data, data_offset, block_start, block_length)
+
+        with open(self.input_file, 'rb') as fjm_file:
+            file_stat = os.fstat(fjm_file.fileno())
+            if (file_stat.st_mtime_ns, file_stat.st_size) != self._lazy_file_version:
+                raise FlipJumpReadFjmException(f'Error: the file {self.input_file} changed since it was (lazily) read.')
+            fjm_file.seek(data_offset)
+            block_data = self._decode_chunk(fjm_file.read(data_size), codec, block_length)
+        return self._decode_segment(block_data, 0, block_start, block_length)
+
+    def _decode_segment(
+        self, data: Union[bytes, mmap.mmap], data_offset: int, segment_start: int, data_length: int
+    ) -> List[int]:
+        """
+        decode a segment's data words at once: a bulk conversion of their bytes, and a vectorized
+        reconstruction of the relative jumps (numpy, if installed; else a list comprehension).
+        @param data: the data bytes (the data pool, or the mapped version's file)
+        @param data_offset: the byte offset of the segment's data
+        @param segment_start: the word-address of the segment
+        @param data_length: the number of data words
+        @return: the segment's data words
+        """
+        word_bytes = self.memory_width // 8
+        word_mask = (1 << self.memory_width) - 1
+        first_jump = segment_start + 1
+        segment_data_end = segment_start + data_length
+
+        if numpy is not None:
+            numpy_words = numpy.frombuffer(data, dtype=f'<u{word_bytes}', count=data_length, offset=data_offset)
+            if self.has_relative_jumps:
+                numpy_words = numpy_words.astype(numpy.uint64)
+                jump_addresses = numpy.arange(first_jump, segment_data_end, 2, dtype=numpy.uint64)
+                numpy_words[1::2] += jump_addresses * numpy.uint64(self.memory_width)  # wraps modulo 2^64
+                numpy_words &= numpy.uint64(word_mask)
+            words: List[int] = numpy_words.tolist()
+            return words
+
+        data_end = data_offset + data_length * word_bytes
+        typecode = _ARRAY_TYPECODES[self.memory_width]
+        if sys.byteorder == 'little':
+            with memoryview(data) as data_view:
+                words = data_view[data_offset:data_end].cast(typecode).tolist()
+        else:
+            swapped_words = array.array(typecode, data[data_offset:data_end])
+            swapped_words.byteswap()
+            words = swapped_words.tolist()
+        if self.has_relative_jumps:
+            jump_bit_addresses = range(
+                first_jump * self.memory_width, segment_data_end * self.memory_width, 2 * self.memory_width
+            )
+            words[1::2] = [
+                (jump + jump_bit_address) & word_mask for jump, jump_bit_address in zip(words[1::2], jump_bit_addresses)
+            ]
+        return words
+
+    @property
+    def has_relative_jumps(self) -> bool:
+        """
+        are the jump words stored relative to their own bit-address (RelativeJump / Compressed / Indexed versions)?
+        """
+        return self.version in (FJMVersion.RelativeJumpVersion, FJMVersion.CompressedVersion, FJMVersion.IndexedVersion)
 
+    def _init_memory_segments(
+        self, segments: List[Tuple[int, int, int, int]], data_pool_length: int, *, data_unit: int = 1
+    ) -> None:
+        """
+        @param data_pool_length: the length of the data pool (in data_unit-s: the data's words, or the mapped
+        version's file bytes)
+        @param data_unit: the length of a data word, in the units of data_start
+        """
         self.memory_segments: List[MemorySegment] = []
         for segment_start, segment_length, data_start, data_length in segments:
             # data is laid out as (flip-word, jump-word) op-pairs, so its length must be even
-            #  (the relative-jump reconstruction below relies on this).
+            #  (the relative-jump reconstruction relies on this).
             if data_length % 2 != 0:
                 raise FlipJumpReadFjmException(
                     f"Bad .fjm file: segment data-length must be even (an integer number of ops), got {data_length}."
                 )
-            if data_start + data_length > len(data):
+            data_end = data_start + data_length * data_unit
+            if data_end > data_pool_length:
                 raise FlipJumpReadFjmException(
-                    f"Bad .fjm file: segment data range [{data_start}, {data_start + data_length})"
-                    f" exceeds data pool length {len(data)}."
+                    f"Bad .fjm file: segment data range [{data_start}, {data_end})"
+                    f" exceeds data pool length {data_pool_length}."
                 )
             self.memory_segments.append(MemorySegment(segment_start, segment_length))
-            if self.version in (FJMVersion.RelativeJumpVersion, FJMVersion.CompressedVersion):
-                word = (1 << self.memory_width) - 1
-                for i in range(0, data_length, 2):
-                    self.memory[segment_start + i] = data[data_start + i]
-                    self.memory[segment_start + i + 1] = (
-                        data[data_start + i + 1] + (segment_start + i + 1) * self.memory_width
-                    ) & word
+
+    def _init_memory(
+        self, segments: List[Tuple[int, int, int, int]], data: Union[bytes, mmap.mmap], dense: bool = False
+    ) -> None:
+        """
+        build the memory: the dictionary, or (dense) a DenseMemory - the list from address 0, and a block per
+        other segment's data. the reserves (the segments' zeros after their data) are zeroed lazily.
+        @param data: the data bytes (the data pool, or the mapped version's file)
+        """
+        dense_end = _dense_span_end(segments) if dense else 0
+        data_unit = 1 if FJMVersion.MappedVersion == self.version else self.memory_width // 8
+        words = [0] * dense_end
+        blocks = []
+        word_entries: Dict[int, int] = {}
+        self.zeros_boundaries = []
+
+        for segment_start, segment_length, data_start, data_length in segments:
+            segment_words = self._decode_segment(data, data_start * data_unit, segment_start, data_length)
+            reserve_start = segment_start + data_length
+            if segment_start < dense_end:
+                words[segment_start:reserve_start] = segment_words
+                reserve_start = max(reserve_start, dense_end)
+            elif dense_end:
+                blocks.append((segment_start, segment_words))
             else:
-                for i in range(data_length):
-                    self.memory[segment_start + i] = data[data_start + i]
-            if segment_length > data_length:
-                if segment_length - data_length < _reserved_dict_threshold:
-                    for i in range(data_length, segment_length):
-                        self.memory[segment_start + i] = 0
-                else:
-                    self.zeros_boundaries.append((segment_start + data_length, segment_start + segment_length))
+                word_entries.update(zip(range(segment_start, reserve_start), segment_words))
+
+            segment_end = segment_start + segment_length
+            if segment_end - reserve_start >= _reserved_dict_threshold:
+                self.zeros_boundaries.append((reserve_start, segment_end))
+            elif segment_end > reserve_start:
+                word_entries.update(dict.fromkeys(range(reserve_start, segment_end), 0))
+
+        self.memory = DenseMemory(words, blocks, word_entries) if dense_end else word_entries
 
     def _get_memory_word(self, word_address: int) -> int:
         word_address &= (1 << self.memory_width) - 1
@@ -189,16 +718,7 @@ class Reader:
 
             garbage_val = _new_garbage_val()
             memory_address = word_address << (self.memory_width.bit_length() - 1)
-            garbage_message = f'Reading garbage word at mem[{hex(memory_address)[2:]}] = {hex(garbage_val)[2:]}'
-
-            if GarbageHandling.Stop == self.garbage_handling:
-                raise FlipJumpRuntimeMemoryException(garbage_message, memory_address)
-            elif GarbageHandling.OnlyWarning == self.garbage_handling:
-                print(f'\nWarning:  {garbage_message}')
-            elif GarbageHandling.SlowRead == self.garbage_handling:
-                print(f'\nWarning:  {garbage_message}')
-                sleep(0.1)
-
+            report_garbage_read(self.garbage_handling, memory_address, garbage_val)
             self.memory[word_address] = garbage_val
 
         return self.memory[word_address]
@@ -262,6 +782,8 @@ class Reader:
         Note that it ignores "garbage handling", and it's ment to be used to just read the memory.
         Uninitialized addresses will return zero.
         """
+        if isinstance(self.memory, LazyMemory):
+            self.memory.load_all()
         return defaultdict(lambda: 0, self.memory)
 
     def assert_runnable(self) -> None:
@@ -275,3 +797,24 @@ class Reader:
                 "the program has no first op at address 0: no segment holds bits 0..2w-1 "
                 "(words 0 and 1), but execution starts at address 0."
             )
+
+
+def read_memory_width(input_file: Path) -> int:
+    """
+    read just the .fjm file's base header (not its segments or data).
+    @param input_file: the path to the .fjm file
+    @return: the file's memory-width
+    """
+    with open(input_file, 'rb') as fjm_file:
+        try:
+            magic, memory_width, _, _ = unpack(_header_base_format, fjm_file.read(_header_base_size))
+        except struct.error as se:
+            raise FlipJumpReadFjmException(f"Bad file {input_file}, can't unpack. Maybe it's not a .fjm file?") from se
+    if magic != FJ_MAGIC:
+        raise FlipJumpReadFjmException(f'Error: bad magic code ({hex(magic)}, should be {hex(FJ_MAGIC)}).')
+    if memory_width not in SUPPORTED_MEMORY_WIDTHS:
+        raise FlipJumpReadFjmException(
+            f'Error: unsupported memory width ({memory_width},'
+            f' this program supports {sorted(SUPPORTED_MEMORY_WIDTHS)}).'
+        )
+    return int(memory_width)
@@ -2,27 +2,42 @@
 the .fjm file writer.
 writes a compiled flipjump program to an .fjm binary - emitting the header, the data
 and segments, and the metadata (flags) - with support for the different fjm versions
-and optional LZMA compression.
+and optional LZMA compression (of the whole data), or a per-segment codec (of independent chunks of it).
 """
 
 import lzma
+import os
+from functools import partial
 from pathlib import Path
 from struct import pack
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 from flipjump.fjm.fjm_consts import (
     FJ_MAGIC,
     _header_base_format,
+    _header_base_size,
     _header_extension_format,
+    _header_extension_size,
     _segment_format,
+    _segment_size,
+    _indexed_header_format,
+    _chunk_format,
+    _chunk_size,
+    _default_chunk_words,
+    _mapped_page_size,
+    CHUNK_CODEC_NAMES,
     SUPPORTED_VERSIONS_NAMES,
     SUPPORTED_MEMORY_WIDTHS,
-    _LZMA_FORMAT,
-    _lzma_compression_filters,
+    _map_chunks,
+    ChunkCodec,
     FJMVersion,
 )
+from flipjump.fjm.fjm_codecs import compress_chunk
 from flipjump.utils.exceptions import FlipJumpWriteFjmException
 
+# the versions whose jump words are saved relative to their address (their segments can't share data)
+_RELATIVE_JUMP_VERSIONS = (FJMVersion.RelativeJumpVersion, FJMVersion.CompressedVersion, FJMVersion.IndexedVersion)
+
 
 class Writer:
     """
@@ -42,6 +57,9 @@ class Writer:
         *,
         flags: int = 0,
         lzma_preset: int = lzma.PRESET_DEFAULT,
+        chunk_words: int = _default_chunk_words,
+        codec: ChunkCodec = ChunkCodec.Lzma,
+        workers: Optional[int] = None,
     ):
         """
         the .fjm-file writer
@@ -50,6 +68,9 @@ class Writer:
         @param version: the file's version
         @param flags: the file's flags
         @param lzma_preset: the preset to be used when compressing the .fjm data
+        @param chunk_words: the indexed version's chunk length, in words (positive, even)
+        @param codec: the indexed version's default codec of the segments' chunks
+        @param workers: the threads compressing the indexed version's chunks (default: the number of CPUs)
         """
         if memory_width not in SUPPORTED_MEMORY_WIDTHS:
             raise FlipJumpWriteFjmException(f"Word size {memory_width} is not in {sorted(SUPPORTED_MEMORY_WIDTHS)}.")
@@ -61,28 +82,123 @@ class Writer:
             raise FlipJumpWriteFjmException(f"flags must be a 64bit positive number, not {flags}")
         if FJMVersion.BaseVersion == version and flags != 0:
             raise FlipJumpWriteFjmException("version 0 does not support the flags option")
-        if FJMVersion.CompressedVersion == version:
+        if version in (FJMVersion.CompressedVersion, FJMVersion.IndexedVersion):
             if lzma_preset not in range(10):
-                raise FlipJumpWriteFjmException("version 3 requires an LZMA preset (0-9, faster->smaller).")
+                raise FlipJumpWriteFjmException(
+                    f"version {version.value} requires an LZMA preset (0-9, faster->smaller)."
+                )
             else:
                 self.lzma_preset = lzma_preset
+        if FJMVersion.IndexedVersion == version and (chunk_words <= 0 or chunk_words % 2 != 0):
+            raise FlipJumpWriteFjmException(
+                f"the chunk length must be a positive even number of words, not {chunk_words}"
+            )
+
+        if codec not in CHUNK_CODEC_NAMES:
+            raise FlipJumpWriteFjmException(f"unsupported chunk codec ({codec}).")
 
         self.output_file = output_file
         self.word_size = memory_width
         self.version = version
         self.flags = flags
         self.reserved: int = 0
+        self.chunk_words = chunk_words
+        self.codec = codec
+        self.workers = workers
 
         self.segments: List[Tuple[int, int, int, int]] = []
+        self.segment_codecs: List[ChunkCodec] = []  # the indexed version's codec of every segment's chunks
         self.data: List[int] = []  # words array
 
     def _compress_data(self, data: bytes) -> bytes:
+        return compress_chunk(ChunkCodec.Lzma, data, self.word_size, self.lzma_preset)
+
+    def _mapped_segments(self) -> List[Tuple[int, int, int, int]]:
+        """
+        @return: the MappedVersion's segment table - the segments, with each data_start replaced by the file
+        offset of its data: the first offset after the previous segment's data that is congruent to the
+        segment's byte address modulo the page size (see fjm_consts).
+        """
+        word_bytes = self.word_size // 8
+        offset = _header_base_size + _header_extension_size + len(self.segments) * _segment_size
+        mapped_segments = []
+        for segment_start, segment_length, _, data_length in self.segments:
+            if data_length:
+                offset += (segment_start * word_bytes - offset) % _mapped_page_size
+            mapped_segments.append((segment_start, segment_length, offset, data_length))
+            offset += data_length * word_bytes
+        return mapped_segments
+
+    def _write_mapped_file(self, word_format: str) -> None:
+        """
+        writes the MappedVersion file: a new file, which then replaces the output_file - so the programs
+        running on a mapping of the old file (e.g. cached by the native engine) keep their memory.
+        """
+        temporary_file = self.output_file.with_name(f'.{self.output_file.name}.{os.getpid()}.tmp')
         try:
-            return lzma.compress(
-                data, format=_LZMA_FORMAT, filters=_lzma_compression_filters(2 * self.word_size, self.lzma_preset)
-            )
-        except lzma.LZMAError as e:
-            raise FlipJumpWriteFjmException('Error: Unable to compress the data.') from e
+            with open(temporary_file, 'wb') as f:
+                mapped_segments = self._mapped_segments()
+                f.write(pack(_header_base_format, FJ_MAGIC, self.word_size, self.version.value, len(self.segments)))
+                f.write(pack(_header_extension_format, self.flags, self.reserved))
+                for segment in mapped_segments:
+                    f.write(pack(_segment_format, *segment))
+
+                for (_, _, data_start, data_length), (_, _, data_offset, _) in zip(self.segments, mapped_segments):
+                    f.write(bytes(data_offset - f.tell()))
+                    data_end = data_start + data_length
+                    f.write(pack(f'<{data_length}{word_format}', *self.data[data_start:data_end]))
+            os.replace(temporary_file, self.output_file)
+        finally:
+            if temporary_file.exists():
+                temporary_file.unlink()
+
+    def _compressed_chunks(self, word_format: str) -> Tuple[List[Tuple[int, int, int, int]], List[Tuple[int, bytes]]]:
+        """
+        @return: the IndexedVersion's segment table (each data_start replaced by the index of the segment's first
+        chunk), and its chunks - (codec, data) - in order. every chunk is compressed by its segment's codec,
+        and a chunk that doesn't get smaller is stored raw. the chunks are compressed on a thread pool.
+        """
+        indexed_segments = []
+        chunk_data_list: List[bytes] = []
+        chunk_codecs: List[ChunkCodec] = []
+        for (segment_start, segment_length, data_start, data_length), codec in zip(self.segments, self.segment_codecs):
+            indexed_segments.append((segment_start, segment_length, len(chunk_data_list), data_length))
+            data_end = data_start + data_length
+            for chunk_start in range(data_start, data_end, self.chunk_words):
+                chunk_end = min(chunk_start + self.chunk_words, data_end)
+                chunk_data_list.append(
+                    pack(f'<{chunk_end - chunk_start}{word_format}', *self.data[chunk_start:chunk_end])
+                )
+                chunk_codecs.append(codec)
+
+        chunks: List[Tuple[int, bytes]] = []
+        compress = partial(compress_chunk, memory_width=self.word_size, lzma_preset=self.lzma_preset)
+        compressed_chunk_data_list = _map_chunks(compress, chunk_codecs, chunk_data_list, workers=self.workers)
+        for codec, chunk_data, compressed_chunk_data in zip(chunk_codecs, chunk_data_list, compressed_chunk_data_list):
+            if len(compressed_chunk_data) < len(chunk_data):
+                chunks.append((codec, compressed_chunk_data))
+            else:
+                chunks.append((ChunkCodec.Raw, chunk_data))
+        return indexed_segments, chunks
+
+    def _write_indexed_file(self, word_format: str) -> None:
+        """
+        writes the IndexedVersion file: the header, the segment table, the chunk index, and the chunks.
+        """
+        indexed_segments, chunks = self._compressed_chunks(word_format)
+        with open(self.output_file, 'wb') as f:
+            f.write(pack(_header_base_format, FJ_MAGIC, self.word_size, self.version.value, len(self.segments)))
+            f.write(pack(_header_extension_format, self.flags, self.reserved))
+            f.write(pack(_indexed_header_format, self.chunk_words, len(chunks)))
+            for segment in indexed_segments:
+                f.write(pack(_segment_format, *segment))
+
+            chunk_offset = f.tell() + len(chunks) * _chunk_size
+            for codec, chunk_data in chunks:
+                f.write(pack(_chunk_format, chunk_offset, len(chunk_data), codec))
+                chunk_offset += len(chunk_data)
+            for _, chunk_data in chunks:
+                f.write(chunk_data)
 
     def write_to_file(self) -> None:
         """
@@ -90,6 +206,12 @@ class Writer:
         @note call this after finished adding data and segments and editing the Writer.
         """
         word_format = {8: 'B', 16: 'H', 32: 'L', 64: 'Q'}[self.word_size]
+        if FJMVersion.MappedVersion == self.version:
+            self._write_mapped_file(word_format)
+            return
+        if FJMVersion.IndexedVersion == self.version:
+            self._write_indexed_file(word_format)
+            return
 
         with open(self.output_file, 'wb') as f:
             f.write(pack(_header_base_format, FJ_MAGIC, self.word_size, self.version.value, len(self.segments)))
@@ -161,7 +283,7 @@ class Writer:
     ) -> None:
         self._validate_segment_addresses_not_overlapping(segment_start, segment_length)
 
-        if self.version in (FJMVersion.RelativeJumpVersion, FJMVersion.CompressedVersion):
+        if self.version in _RELATIVE_JUMP_VERSIONS:
             self._validate_segment_data_not_overlapping(data_start, data_length)
 
     def _update_to_relative_jumps(self, segment_start: int, data_start: int, data_length: int) -> None:
@@ -169,7 +291,15 @@ class Writer:
         for i in range(1, data_length, 2):
             self.data[data_start + i] = (self.data[data_start + i] - (segment_start + i) * self.word_size) & word_mask
 
-    def add_segment(self, segment_start: int, segment_length: int, data_start: int, data_length: int) -> None:
+    def add_segment(
+        self,
+        segment_start: int,
+        segment_length: int,
+        data_start: int,
+        data_length: int,
+        *,
+        codec: Optional[ChunkCodec] = None,
+    ) -> None:
         """
         inserts a new segment to the fjm file. checks that it doesn't overlap with any previously inserted segments.
         @param segment_start: the start address of the segment in memory (in words)
@@ -177,6 +307,7 @@ class Writer:
          the segment is padded with zeros after the end of the data).
         @param data_start: the index of the data's start in the inner data array
         @param data_length: the number of words in the segment's data
+        @param codec: the indexed version's codec of the segment's chunks (default: the writer's codec)
         """
         segment_addresses_str = (
             f'seg[{len(self.segments)}]={self.get_segment_addresses_repr(segment_start, segment_length)}'
@@ -198,10 +329,14 @@ class Writer:
 
         self._validate_segment_not_overlapping(segment_start, segment_length, data_start, data_length)
 
-        if self.version in (FJMVersion.RelativeJumpVersion, FJMVersion.CompressedVersion):
+        if self.version in _RELATIVE_JUMP_VERSIONS:
             self._update_to_relative_jumps(segment_start, data_start, data_length)
 
+        if codec is not None and codec not in CHUNK_CODEC_NAMES:
+            raise FlipJumpWriteFjmException(f"unsupported chunk codec ({codec}) (in {segment_addresses_str}).")
+
         self.segments.append((segment_start, segment_length, data_start, data_length))
+        self.segment_codecs.append(self.codec if codec is None else codec)
 
     def add_data(self, data: List[int]) -> int:
         """
@@ -213,11 +348,14 @@ class Writer:
         self.data += data
         return data_start
 
-    def add_simple_segment_with_data(self, segment_start: int, data: List[int]) -> None:
+    def add_simple_segment_with_data(
+        self, segment_start: int, data: List[int], *, codec: Optional[ChunkCodec] = None
+    ) -> None:
         """
         adds the data and a segment that contains exactly the data, to the fjm
         @param segment_start: the start address of the segment in memory (in words)
         @param data: [in]: a list of words
+        @param codec: the indexed version's codec of the segment's chunks (default: the writer's codec)
         """
         data_start = self.add_data(data)
-        self.add_segment(segment_start, len(data), data_start, len(data))
+        self.add_segment(segment_start, len(data), data_start, len(data), codec=codec)
@@ -2,26 +2,51 @@
 the command-line interface (the `fj` command).
 parses the command-line arguments, prepares temporary files, and drives the
 assemble and/or run flows according to the chosen --asm / --run options.
+`fj trace TRACE_FILE` decodes an execution-trace file instead (saved by a run with --trace-file).
+`fj batch JOBS_CSV -j N` runs a table of programs on a process pool, streaming a JSON result per job.
+`fj fjm-bench FJM` rewrites a program as the indexed .fjm version with every chunk codec, and reports
+each file's size and load time.
 """
 
 import argparse
+import dataclasses
+import itertools
+import json
 import lzma
 import os
+import sys
+from contextlib import nullcontext
 from pathlib import Path
 from tempfile import TemporaryDirectory
-from typing import Tuple, List, Callable, Optional
+from typing import Tuple, List, Callable, Dict, Optional
 
 from flipjump import flipjump_quickstart
 from flipjump.assembler import assembler
-from flipjump.fjm.fjm_consts import FJMVersion, SUPPORTED_VERSIONS_NAMES
+from flipjump.fjm.fjm_bench import benchmark_codec, read_program
+from flipjump.fjm.fjm_consts import (
+    CHUNK_CODEC_NAMES,
+    ChunkCodec,
+    FJMVersion,
+    SUPPORTED_VERSIONS_NAMES,
+    _default_chunk_words,
+)
 from flipjump.fjm.fjm_writer import Writer
+from flipjump.interpreter.batch_run import PASSED, read_jobs, run_batch
+from flipjump.interpreter.debugging.breakpoints import load_labels_dictionary
+from flipjump.interpreter.debugging.execution_trace import read_trace, trace_lines
 from flipjump.interpreter.io_devices.cli_devices import IO_MODES, make_io_device, split_io_mode
 from flipjump.utils.constants import LAST_OPS_DEBUGGING_LIST_DEFAULT_LENGTH, DEFAULT_MAX_MACRO_RECURSION_DEPTH
-from flipjump.utils.exceptions import IODeviceException
+from flipjump.utils.exceptions import FlipJumpRuntimeException, IODeviceException
 from flipjump.utils.functions import get_file_tuples, get_temp_directory_suffix
 
 ErrorFunc = Callable[[str], None]
 
+TRACE_COMMAND = 'trace'
+BATCH_COMMAND = 'batch'
+FJM_BENCH_COMMAND = 'fjm-bench'
+
+CHUNK_CODECS_BY_NAME = {name: codec for codec, name in CHUNK_CODEC_NAMES.items()}
+
 
 def verify_file_exists(error_func: ErrorFunc, path: Path) -> None:
     """
@@ -75,7 +100,7 @@ def get_files_paths(
 
 def run(in_fjm_path: Path, debug_file: Optional[Path], args: argparse.Namespace, error_func: ErrorFunc) -> None:
     """
-    prepare and verify arguments and io_device, and run the .fjm program.
+    prepare and verify arguments and io_device, and run the .fjm program (or pre-initialize it, with --preinit).
     @param in_fjm_path: the input .fjm-file path
     @param debug_file: the debug-file path
     @param args: the parsed arguments
@@ -91,6 +116,22 @@ def run(in_fjm_path: Path, debug_file: Optional[Path], args: argparse.Namespace,
         error_func(str(io_device_error))
         raise  # error_func exits; re-raise in case a custom error_func returns
 
+    if args.preinit is not None:
+        flipjump_quickstart.preinit(
+            in_fjm_path,
+            Path(args.preinit),
+            debugging_file=debug_file,
+            stop_label=args.preinit_label,
+            print_time=not args.silent,
+            flat_max_words=args.flat_max_words,
+        )
+        return
+
+    if args.sample_stacks is not None and args.sample_every is None:
+        error_func('--sample-stacks is used without --sample-every.')
+    if args.watch_break and not args.watch:
+        error_func('--watch-break is used without --watch.')
+
     flipjump_quickstart.debug(
         in_fjm_path,
         debug_file,
@@ -101,9 +142,17 @@ def run(in_fjm_path: Path, debug_file: Optional[Path], args: argparse.Namespace,
         show_trace=args.trace,
         print_time=not args.silent,
         print_termination=not args.silent,
-        last_ops_debugging_list_length=args.debug_ops_list,
+        last_ops_debugging_list_length=None if args.predecode else args.debug_ops_list,
         profile=args.profile,
         flat_max_words=args.flat_max_words,
+        sample_every_ops=args.sample_every or 0,
+        sample_stacks_path=Path(args.sample_stacks) if args.sample_stacks is not None else None,
+        coverage_path=Path(args.coverage) if args.coverage is not None else None,
+        watchpoints=set(args.watch),
+        watch_break=args.watch_break,
+        trace_path=Path(args.trace_file) if args.trace_file is not None else None,
+        predecode=args.predecode,
+        show_progress=args.progress,
     )
 
 
@@ -136,6 +185,8 @@ def assemble(out_fjm_file: Path, debug_file: Optional[Path], args: argparse.Name
     """
     file_tuples = get_file_tuples(args.files, no_stl=args.no_stl)
     verify_fj_files(error_func, file_tuples)
+    if args.chunk_words <= 0 or args.chunk_words % 2 != 0:
+        error_func(f'the chunk length must be a positive even number of words, not {args.chunk_words}.')
 
     fjm_writer = Writer(
         out_fjm_file,
@@ -143,6 +194,8 @@ def assemble(out_fjm_file: Path, debug_file: Optional[Path], args: argparse.Name
         get_version(args.version, args.outfile is not None, error_func),
         flags=args.flags,
         lzma_preset=args.lzma_preset,
+        chunk_words=args.chunk_words,
+        codec=CHUNK_CODECS_BY_NAME[args.codec],
     )
     assembler.assemble(
         file_tuples,
@@ -185,11 +238,20 @@ def get_debug_file_path(args: argparse.Namespace, error_func: ErrorFunc, temp_di
     @return: the debug-file path. If debug flag isn't set, and it's unneeded, return None
     """
     debug_file: Optional[str] = args.debug  # can be None, '' (should be temp), or path_string
-    debug_file_needed = not args.asm and any((args.breakpoint, args.breakpoint_contains))
+    debug_file_needed = not args.asm and any(
+        (
+            args.breakpoint,
+            args.breakpoint_contains,
+            args.preinit_label,
+            args.sample_every,
+            args.coverage,
+            args.watch,
+        )
+    )
 
     if debug_file is None and debug_file_needed:
         if not args.silent:
-            parser_warning = 'Parser Warning - breakpoints are used but the debugging flag (-d) is not specified.'
+            parser_warning = 'Parser Warning - labels are used but the debugging flag (-d) is not specified.'
             if args.werror:
                 error_func(parser_warning)
             print(f"{parser_warning} Debugging data will be saved.")
@@ -208,18 +270,18 @@ def get_debug_file_path(args: argparse.Namespace, error_func: ErrorFunc, temp_di
     return Path(debug_file)
 
 
+def _check_int_positive(value: str) -> int:
+    int_value = int(value)
+    if int_value <= 0:
+        raise argparse.ArgumentTypeError(f"{value} is an invalid positive int value")
+    return int_value
+
+
 def add_run_only_arguments(parser: argparse.ArgumentParser) -> None:
     """
     add the arguments that are usable in run time.
     @param parser: the parser
     """
-
-    def _check_int_positive(value: str) -> int:
-        int_value = int(value)
-        if int_value <= 0:
-            raise argparse.ArgumentTypeError(f"{value} is an invalid positive int value")
-        return int_value
-
     run_arguments = parser.add_argument_group('run arguments', 'Ignored when using the --assemble option')
 
     run_arguments.add_argument(
@@ -244,8 +306,69 @@ def add_run_only_arguments(parser: argparse.ArgumentParser) -> None:
         default=None,
         help="the native engine's flat-storage window, in words (2^23 by default). memory below "
         "the window runs in the fast flat array; segments reaching above it keep the slower paged "
-        "mode for that part (hybrid). raising it costs startup time and memory (8 bytes per word of "
-        "window), never per-op speed. the FLIPJUMP_FLAT_MAX_WORDS environment variable sets the same limit",
+        "mode for that part (hybrid). the window is mapped on demand, so raising it costs address space: "
+        "only the memory the program touches (and its gaps between segments) is resident; never per-op speed. "
+        "the FLIPJUMP_FLAT_MAX_WORDS environment variable sets the same limit",
+    )
+    run_arguments.add_argument(
+        '--predecode',
+        help="run the code the program never writes as pre-decoded blocks - a large speedup for long runs "
+        "(the native fast loop, in flat storage). the run keeps no last-ops list (--debug-ops-list)",
+        action='store_true',
+    )
+    run_arguments.add_argument(
+        '--progress',
+        help="keep a live status line of the run on stderr - its op count, speed (ops/s over the last second), "
+        "current op and IO-waiting time - updated every second. needs the native engine",
+        action='store_true',
+    )
+
+    run_arguments.add_argument(
+        '--sample-every',
+        metavar='N',
+        type=_check_int_positive,
+        default=None,
+        help="run the sampling profiler: record the current op every N ops, and print the hottest labels and "
+        "macros after the run. its overhead is small (use N of ~1000 and above). needs the native engine",
+    )
+    run_arguments.add_argument(
+        '--sample-stacks',
+        metavar='PATH',
+        default=None,
+        help="with --sample-every: save the samples as collapsed stacks (per macro path) to PATH - "
+        "for flamegraph tools (flamegraph.pl, speedscope)",
+    )
+
+    run_arguments.add_argument(
+        '--coverage',
+        metavar='PATH',
+        default=None,
+        help="mark every executed op, and save the coverage report - the program's, and every macro's (the "
+        "executed ops out of its ops) - to PATH. needs the native engine",
+    )
+
+    run_arguments.add_argument(
+        '--trace-file',
+        metavar='PATH',
+        default=None,
+        help="save every executed op (its address, flip and jump) to the binary trace file PATH - a compact "
+        "--trace for long runs, decoded with `fj trace PATH` (with -d DEBUG_FILE - its labels too). "
+        "needs the native engine",
+    )
+
+    run_arguments.add_argument(
+        '--watch',
+        metavar='NAME',
+        default=[],
+        nargs="+",
+        help="print every flip of a bit in this label's words - NAME is a label or an address, optionally "
+        "followed by :WORDS (the number of words to watch; 2 by default - one op, e.g. a stl bit/hex "
+        "variable). needs the native engine",
+    )
+    run_arguments.add_argument(
+        '--watch-break',
+        help="with --watch: stop the run at the first flip of a watched bit, instead of printing it",
+        action='store_true',
     )
 
     def _io_mode(value: str) -> str:
@@ -267,6 +390,21 @@ def add_run_only_arguments(parser: argparse.ArgumentParser) -> None:
         "`pip install flipjump[io]`)",
     )
 
+    run_arguments.add_argument(
+        '--preinit',
+        metavar='PATH',
+        default=None,
+        help="pre-initialize the program instead of running it: run its startup up to its first input/output "
+        "(or up to --preinit-label) once, and save its memory at that point as a new .fjm at PATH - whose runs "
+        "skip the startup. needs the native engine",
+    )
+    run_arguments.add_argument(
+        '--preinit-label',
+        metavar='NAME',
+        default=None,
+        help="with --preinit: end the startup before this label (if it isn't ended by an input/output first)",
+    )
+
     run_arguments.add_argument(
         '-b', '--breakpoint', metavar='NAME', default=[], nargs="+", help="pause when reaching this label"
     )
@@ -319,7 +457,23 @@ def add_assemble_only_arguments(parser: argparse.ArgumentParser) -> None:
         choices=list(range(10)),
         help=f"The preset used for the LZMA2 algorithm compression ("
         f"{lzma.PRESET_DEFAULT} by default; "
-        f"used when version={FJMVersion.CompressedVersion}).",
+        f"used when version={FJMVersion.CompressedVersion} or {FJMVersion.IndexedVersion}).",
+    )
+    asm_arguments.add_argument(
+        '--chunk_words',
+        metavar='WORDS',
+        type=int,
+        default=_default_chunk_words,
+        help=f"The length of the independently-compressed chunks, in words ({_default_chunk_words} by default; "
+        f"used when version={FJMVersion.IndexedVersion}).",
+    )
+    asm_arguments.add_argument(
+        '--codec',
+        default=CHUNK_CODEC_NAMES[ChunkCodec.Lzma],
+        choices=list(CHUNK_CODECS_BY_NAME),
+        help=f"The codec of the independently-compressed chunks ({CHUNK_CODEC_NAMES[ChunkCodec.Lzma]} by default; "
+        f"used when version={FJMVersion.IndexedVersion}). zlib and rle load faster than lzma, and are bigger - "
+        f"compare them on a program with `fj {FJM_BENCH_COMMAND}`.",
     )
 
     asm_arguments.add_argument('--werror', help="treat all assemble warnings as errors", action='store_true')
@@ -391,7 +545,16 @@ def get_argument_parser() -> argparse.ArgumentParser:
         '  fj --asm  -o out.fjm  a.fj b.fj  --no_stl  -w 32   '
         '// assemble without the standard library, 32 bit memory\n\n'
         '  fj --run  prog.fjm                                 // just run\n'
-        '  fj --run  o.fjm  -d dir/debug.fjd  -B label        // run and debug\n ',
+        '  fj --run  prog.fjm  --predecode                    // run a long program faster\n'
+        '  fj --run  prog.fjm  --progress                     // show the run\'s progress live\n'
+        '  fj --run  o.fjm  -d dir/debug.fjd  -B label        // run and debug\n'
+        '  fj --run  o.fjm  --preinit warm.fjm                // save the program after its startup\n'
+        '  fj  a.fj  -d  --sample-every 1000                  // profile the hottest code\n'
+        '  fj  a.fj  -d  --watch counter:4 --watch-break      // stop at the first write to counter\n'
+        '  fj  a.fj  -d dbg.fjd  --trace-file run.trace       // save every executed op\n'
+        '  fj trace  run.trace  -d dbg.fjd  --head 1000       // decode the first 1000 of them\n'
+        '  fj batch  jobs.csv  -j 8  --time-limit 10          // run and check a table of programs\n'
+        '  fj fjm-bench  prog.fjm  --codecs zlib lzma         // compare the .fjm codecs on a program\n ',
     )
 
 
@@ -408,6 +571,194 @@ def parse_arguments(*, cmd_line_args: Optional[List[str]] = None) -> Tuple[argpa
     return parsed_args, parser.error
 
 
+def get_trace_argument_parser() -> argparse.ArgumentParser:
+    """
+    create the argument parser of `fj trace`.
+    @return: the argument parser
+    """
+    parser = argparse.ArgumentParser(
+        prog=f'fj {TRACE_COMMAND}',
+        description='Decode an execution-trace file (saved by a run with --trace-file): print every executed op '
+        '(its address, flip and jump, in hex), and the labels of the code it runs.',
+    )
+    parser.add_argument('trace_file', metavar='TRACE_FILE', help="the execution-trace file")
+    parser.add_argument(
+        '-d', '--debug', metavar='PATH', default=None, help="the program's debug-file - to show its labels"
+    )
+    parser.add_argument(
+        '--head', metavar='N', type=_check_int_positive, default=None, help="print only the first N executed ops"
+    )
+    return parser
+
+
+def print_trace(cmd_line_args: List[str]) -> None:
+    """
+    the `fj trace` command: decode and print an execution-trace file.
+    @param cmd_line_args: the command's arguments (after the 'trace')
+    """
+    parser = get_trace_argument_parser()
+    args = parser.parse_args(args=cmd_line_args)
+    trace_path = Path(args.trace_file)
+    verify_file_exists(parser.error, trace_path)
+    label_to_address = load_labels_dictionary(Path(args.debug), True) if args.debug is not None else {}
+
+    records = read_trace(trace_path)
+    if args.head is not None:
+        records = itertools.islice(records, args.head)
+    try:
+        for line in trace_lines(records, label_to_address):
+            print(line)
+    except FlipJumpRuntimeException as trace_error:
+        parser.error(str(trace_error))
+
+
+def _check_float_positive(value: str) -> float:
+    float_value = float(value)
+    if float_value <= 0:
+        raise argparse.ArgumentTypeError(f"{value} is an invalid positive float value")
+    return float_value
+
+
+def get_batch_argument_parser() -> argparse.ArgumentParser:
+    """
+    create the argument parser of `fj batch`.
+    @return: the argument parser
+    """
+    parser = argparse.ArgumentParser(
+        prog=f'fj {BATCH_COMMAND}',
+        description='Run a table of .fjm programs, and check their outputs. JOBS_CSV has a row per job: '
+        '"name, fjm, input, expected_output[, input_is_binary, output_is_binary]" - the format of '
+        'tests/tests_tables/test_run_*.csv. A JSON line is printed per job, in the table\'s order: its name, '
+        'status (passed/failed/op-limit/time-limit/error), termination cause, op count and whether its '
+        'output matched. Exits with 1 if any job didn\'t pass.',
+    )
+    parser.add_argument('jobs_csv', metavar='JOBS_CSV', help="the jobs table")
+    parser.add_argument(
+        '-j', '--jobs', metavar='N', type=_check_int_positive, default=1, help="run N jobs in parallel processes"
+    )
+    parser.add_argument(
+        '--max-ops', metavar='N', type=_check_int_positive, default=0, help="stop every job after N ops"
+    )
+    parser.add_argument(
+        '--time-limit',
+        metavar='SECONDS',
+        type=_check_float_positive,
+        default=None,
+        help="stop every job after about SECONDS seconds",
+    )
+    parser.add_argument(
+        '--root',
+        metavar='DIR',
+        default=None,
+        help="the directory of the table's relative paths (default: the current directory)",
+    )
+    parser.add_argument(
+        '-o', '--output', metavar='PATH', default=None, help="write the JSON lines to PATH (default: stdout)"
+    )
+    return parser
+
+
+def batch(cmd_line_args: List[str]) -> bool:
+    """
+    the `fj batch` command: run a jobs table, and print a JSON line per job (and a summary to stderr).
+    @param cmd_line_args: the command's arguments (after the 'batch')
+    @return: True if every job passed
+    """
+    parser = get_batch_argument_parser()
+    args = parser.parse_args(args=cmd_line_args)
+    jobs_csv_path = Path(args.jobs_csv)
+    verify_file_exists(parser.error, jobs_csv_path)
+    try:
+        jobs = read_jobs(jobs_csv_path, Path(args.root) if args.root is not None else None)
+    except FlipJumpRuntimeException as jobs_error:
+        parser.error(str(jobs_error))
+        raise  # error_func exits; re-raise in case a custom error_func returns
+
+    statuses: Dict[str, int] = {}
+    with open(args.output, 'w') if args.output is not None else nullcontext(sys.stdout) as results_file:
+        for result in run_batch(jobs, workers=args.jobs, max_ops=args.max_ops, time_limit=args.time_limit):
+            print(json.dumps(dataclasses.asdict(result)), file=results_file, flush=True)
+            statuses[result.status] = statuses.get(result.status, 0) + 1
+    summary = ', '.join(f'{count} {status}' for status, count in sorted(statuses.items()))
+    print(f'{len(jobs)} jobs: {summary or "none"}', file=sys.stderr)
+    return statuses.get(PASSED, 0) == len(jobs)
+
+
+def get_fjm_bench_argument_parser() -> argparse.ArgumentParser:
+    """
+    create the argument parser of `fj fjm-bench`.
+    @return: the argument parser
+    """
+    parser = argparse.ArgumentParser(
+        prog=f'fj {FJM_BENCH_COMMAND}',
+        description=f'Rewrite a .fjm program as the indexed version (-v {FJMVersion.IndexedVersion}) with every '
+        f'chunk codec, and print a line per codec: the file\'s size (and its ratio to the raw data), its writing '
+        f'time, and its loading time (the read and decompression of the data; the best of the runs).',
+    )
+    parser.add_argument('fjm', metavar='FJM', help="the .fjm program (any version)")
+    parser.add_argument(
+        '--codecs',
+        metavar='CODEC',
+        nargs='+',
+        default=list(CHUNK_CODECS_BY_NAME),
+        choices=list(CHUNK_CODECS_BY_NAME),
+        help=f"the codecs to compare (default: all - {', '.join(CHUNK_CODECS_BY_NAME)})",
+    )
+    parser.add_argument('--runs', metavar='N', type=_check_int_positive, default=3, help="load every file N times")
+    parser.add_argument(
+        '--chunk_words',
+        metavar='WORDS',
+        type=int,
+        default=_default_chunk_words,
+        help=f"the length of the chunks, in words ({_default_chunk_words} by default)",
+    )
+    parser.add_argument(
+        '--lzma_preset',
+        type=int,
+        default=lzma.PRESET_DEFAULT,
+        choices=list(range(10)),
+        help=f"the lzma codec's preset ({lzma.PRESET_DEFAULT} by default)",
+    )
+    parser.add_argument(
+        '-j', '--workers', metavar='N', type=_check_int_positive, default=None, help="(de)compress on N threads"
+    )
+    return parser
+
+
+def fjm_bench(cmd_line_args: List[str]) -> None:
+    """
+    the `fj fjm-bench` command: compare the chunk codecs' sizes and load times on a program.
+    @param cmd_line_args: the command's arguments (after the 'fjm-bench')
+    """
+    parser = get_fjm_bench_argument_parser()
+    args = parser.parse_args(args=cmd_line_args)
+    fjm_path = Path(args.fjm)
+    verify_fjm_file(parser.error, fjm_path)
+    if args.chunk_words <= 0 or args.chunk_words % 2 != 0:
+        parser.error(f'the chunk length must be a positive even number of words, not {args.chunk_words}.')
+
+    program = read_program(fjm_path)
+    data_size = max(program.data_size, 1)
+    print(f'{fjm_path}: {program.data_size} data bytes, {args.chunk_words}-word chunks')
+    print(f'{"codec":6} {"size":>12} {"ratio":>7} {"write":>9} {"load":>9}')
+    with TemporaryDirectory() as temp_dir_name:
+        for codec_name in args.codecs:
+            result = benchmark_codec(
+                program,
+                Path(temp_dir_name) / f'{codec_name}.fjm',
+                CHUNK_CODECS_BY_NAME[codec_name],
+                runs=args.runs,
+                chunk_words=args.chunk_words,
+                lzma_preset=args.lzma_preset,
+                workers=args.workers,
+            )
+            print(
+                f'{codec_name:6} {result.file_size:12} {result.file_size / data_size:7.1%} '
+                f'{result.write_seconds:8.3f}s {result.load_seconds:8.3f}s',
+                flush=True,
+            )
+
+
 def execute_assemble_run(args: argparse.Namespace, error_func: ErrorFunc) -> None:
     """
     prepare temp files, and execute the run and assemble functions.
@@ -429,8 +780,22 @@ def assemble_run_according_to_cmd_line_args(*, cmd_line_args: Optional[List[str]
     parse the command line arguments, prepare temp files, and execute the assemble() / run() functions
      (the command line arguments may indicate to execute only one of them, or to execute both).
     @param cmd_line_args: if specified, the command line arguments will be retrieved from this list.
-    @note: call with cmd_line_args=['-h'] to get help.
-    """
+    @note: call with cmd_line_args=['-h'] to get help. ['trace', ...] runs the `fj trace` command instead,
+    ['batch', ...] the `fj batch` command (which exits with 1 if a job didn't pass), and ['fjm-bench', ...]
+    the `fj fjm-bench` command.
+    """
+    if cmd_line_args is None:
+        cmd_line_args = sys.argv[1:]
+    if cmd_line_args[:1] == [TRACE_COMMAND]:
+        print_trace(cmd_line_args[1:])
+        return
+    if cmd_line_args[:1] == [BATCH_COMMAND]:
+        if not batch(cmd_line_args[1:]):
+            sys.exit(1)
+        return
+    if cmd_line_args[:1] == [FJM_BENCH_COMMAND]:
+        fjm_bench(cmd_line_args[1:])
+        return
     args, error_func = parse_arguments(cmd_line_args=cmd_line_args)
     execute_assemble_run(args, error_func)
 
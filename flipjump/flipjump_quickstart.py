@@ -1,28 +1,34 @@
 """
 the high-level programmatic API.
 the convenience wrappers for using flipjump from python - assemble, run, debug,
-run_test_output, and the combined assemble_and_run / assemble_and_debug /
+run_test_output, preinit, and the combined assemble_and_run / assemble_and_debug /
 assemble_and_run_test_output helpers.
 """
 
+import sys
 from pathlib import Path
 from tempfile import TemporaryDirectory
 from typing import List, Optional, Set
 
 from flipjump.assembler import assembler
-from flipjump.interpreter.debugging.breakpoints import get_breakpoint_handler
+from flipjump.interpreter.debugging.breakpoints import get_breakpoint_handler, load_labels_dictionary
+from flipjump.interpreter.debugging.coverage import coverage_report, program_op_addresses
+from flipjump.interpreter.debugging.sampling_profiler import attribute_samples, collapsed_stacks, top_report
+from flipjump.interpreter.debugging.watchpoints import WatchHit, parse_watchpoints
+from flipjump.fjm import fjm_reader
 from flipjump.fjm.fjm_consts import FJMVersion
 from flipjump.fjm.fjm_writer import Writer
 from flipjump.interpreter import fjm_run
 from flipjump.interpreter.io_devices.FixedIO import FixedIO
 from flipjump.interpreter.io_devices.IODevice import IODevice
 from flipjump.interpreter.io_devices.StandardIO import StandardIO
-from flipjump.utils.classes import TerminationCause
+from flipjump.utils.classes import TerminationCause, PrintTimer, RunProgress
 from flipjump.utils.constants import (
     LAST_OPS_DEBUGGING_LIST_DEFAULT_LENGTH,
     IO_BYTES_ENCODING,
     DEFAULT_MAX_MACRO_RECURSION_DEPTH,
 )
+from flipjump.utils.exceptions import FlipJumpRuntimeException
 from flipjump.utils.functions import get_file_tuples, get_temp_directory_suffix
 from flipjump.interpreter.fjm_run import TerminationStatistics
 
@@ -81,6 +87,9 @@ def run(
     last_ops_debugging_list_length: Optional[int] = LAST_OPS_DEBUGGING_LIST_DEFAULT_LENGTH,
     profile: bool = False,
     flat_max_words: Optional[int] = None,
+    cache_image: bool = False,
+    predecode: bool = False,
+    show_progress: bool = False,
 ) -> TerminationStatistics:
     """
     runs a .fjm file (with the FlipJump interpreter)
@@ -93,8 +102,13 @@ def run(
     @param last_ops_debugging_list_length: The length of the last-ops list
     @param profile: if true collect the full per-op statistics (uses the slower featured run-loop)
     @param flat_max_words: the native engine's flat-storage span limit, in words (2^23 by default).
-    only affects native-engine runs - ignored when a pure-python loop runs (e.g. when
-    breakpoints/tracing/profiling force the featured loop)
+    only affects native-engine runs - ignored when a pure-python loop runs (the engine isn't built)
+    @param cache_image: if true, reuse the cached program image of the .fjm file (native engine only) -
+    for running the same program many times (see fjm_run.run())
+    @param predecode: if true, run the code the program never writes as pre-decoded blocks (native engine,
+    without a last-ops list) - see fjm_run.run()
+    @param show_progress: if true, keep a live status line of the run (its ops, speed and ip) on stderr,
+    updated every second (native engine)
     @return: the run's termination-statistics
 
     :note: This is a wrapper function to the fjm_run.run() function.
@@ -112,6 +126,9 @@ def run(
         last_ops_debugging_list_length=last_ops_debugging_list_length,
         profile=profile,
         flat_max_words=flat_max_words,
+        cache_image=cache_image,
+        predecode=predecode,
+        show_progress=show_progress,
     )
 
 
@@ -129,6 +146,15 @@ def debug(
     last_ops_debugging_list_length: Optional[int] = LAST_OPS_DEBUGGING_LIST_DEFAULT_LENGTH,
     profile: bool = False,
     flat_max_words: Optional[int] = None,
+    cache_image: bool = False,
+    sample_every_ops: int = 0,
+    sample_stacks_path: Optional[Path] = None,
+    coverage_path: Optional[Path] = None,
+    watchpoints: Optional[Set[str]] = None,
+    watch_break: bool = False,
+    trace_path: Optional[Path] = None,
+    predecode: bool = False,
+    show_progress: bool = False,
 ) -> TerminationStatistics:
     """
     debugs a .fjm file (with the FlipJump interpreter+debugger)
@@ -146,8 +172,24 @@ def debug(
     @param last_ops_debugging_list_length: The length of the last-ops list
     @param profile: if true collect the full per-op statistics (uses the slower featured run-loop)
     @param flat_max_words: the native engine's flat-storage span limit, in words (2^23 by default).
-    only affects native-engine runs - ignored when a pure-python loop runs (e.g. when
-    breakpoints/tracing/profiling force the featured loop)
+    only affects native-engine runs - ignored when a pure-python loop runs (the engine isn't built)
+    @param cache_image: if true, reuse the cached program image of the .fjm file (native engine only) -
+    for running the same program many times (see fjm_run.run())
+    @param sample_every_ops: if positive, run the sampling profiler - sample the ip every that many ops
+    (native engine), and print the hottest labels and macros (with print_termination)
+    @param sample_stacks_path: if specified (with sample_every_ops), save the samples' collapsed stacks
+    (per macro path) to this file - the input of flamegraph tools
+    @param coverage_path: if specified, mark every executed op (native engine), and save the coverage
+    report (of the program, and of every macro) to this file
+    @param watchpoints: a set of watchpoints (native engine) - label names or addresses, each optionally
+    followed by :WORDS (the number of words to watch, 2 by default). every flip of a watched bit is printed
+    @param watch_break: if true, stop the run at the first flip of a watched bit (instead of printing it)
+    @param trace_path: if specified, save the execution trace (every executed op) to this binary file
+    (native engine) - read it with `fj trace`
+    @param predecode: if true, run the code the program never writes as pre-decoded blocks (native engine,
+    without a last-ops list) - see fjm_run.run()
+    @param show_progress: if true, keep a live status line of the run (its ops, speed and ip) on stderr,
+    updated every second (native engine)
     @return: the run's termination-statistics
 
     :note: This is a wrapper function to the fjm_run.run() function.
@@ -158,6 +200,24 @@ def debug(
     breakpoint_handler = get_breakpoint_handler(
         debugging_file, breakpoints_addresses, breakpoints, breakpoints_contains
     )
+    watch_ranges = []
+    if watchpoints:
+        watch_ranges = parse_watchpoints(
+            watchpoints, breakpoint_handler.label_to_address, fjm_reader.read_memory_width(fjm_path)
+        )
+
+    def on_watch(watch_hit: WatchHit) -> bool:
+        if not watch_break:
+            print(f'\n{watch_hit.describe(breakpoint_handler)}')
+        return watch_break
+
+    progress_reports = 0
+
+    def on_progress(progress: RunProgress) -> None:
+        nonlocal progress_reports
+        progress_reports += 1
+        print(f'\r{progress.describe()}\x1b[K', end='', file=sys.stderr, flush=True)
+
     termination_statistics = fjm_run.run(
         fjm_path,
         io_device=io_device,
@@ -167,12 +227,40 @@ def debug(
         last_ops_debugging_list_length=last_ops_debugging_list_length,
         profile=profile,
         flat_max_words=flat_max_words,
+        cache_image=cache_image,
+        sample_every_ops=sample_every_ops,
+        coverage=coverage_path is not None,
+        watchpoints=watch_ranges,
+        on_watch=on_watch,
+        trace_path=trace_path,
+        predecode=predecode,
+        on_progress=on_progress if show_progress else None,
     )
+    if progress_reports:
+        print(file=sys.stderr)  # end the status line
     if print_termination:
         termination_statistics.print(
             labels_handler=breakpoint_handler, output_to_print=io_device.get_output(allow_incomplete_output=True)
         )
 
+    if termination_statistics.samples is not None:
+        label_samples = attribute_samples(termination_statistics.samples, breakpoint_handler.label_to_address)
+        if print_termination:
+            print(f'\n{top_report(label_samples)}')
+        if sample_stacks_path is not None:
+            sample_stacks_path.write_text(''.join(f'{line}\n' for line in collapsed_stacks(label_samples)))
+
+    if termination_statistics.coverage is not None and coverage_path is not None:
+        report = coverage_report(
+            termination_statistics.coverage, breakpoint_handler.label_to_address, program_op_addresses(fjm_path)
+        )
+        coverage_path.write_text(f'{report}\n')
+        if print_termination:
+            print(f'\n{report.splitlines()[0]} The coverage report is saved to {coverage_path}.')
+
+    if trace_path is not None and print_termination:
+        print(f'\nThe execution trace is saved to {trace_path} (read it with `fj trace {trace_path}`).')
+
     return termination_statistics
 
 
@@ -188,6 +276,7 @@ def run_test_output(
     print_time: bool = True,
     print_termination: bool = True,
     last_ops_debugging_list_length: Optional[int] = LAST_OPS_DEBUGGING_LIST_DEFAULT_LENGTH,
+    cache_image: bool = False,
 ) -> bool:
     """
     runs a .fjm file (with the FlipJump interpreter) with the given input, and checks that it finished successfuly and
@@ -204,6 +293,8 @@ def run_test_output(
     @param print_time: if true print running times
     @param print_termination: if true print the termination statistics
     @param last_ops_debugging_list_length: The length of the last-ops list
+    @param cache_image: if true, reuse the cached program image of the .fjm file (native engine only) -
+    for testing the same program with many inputs
     @return: True if the run finished successfully, and with the expected output.
     @raises AssertionError: if should_raise_assertion_error, and the run finished unexpectedly or with an
     unexpected output.
@@ -225,6 +316,7 @@ def run_test_output(
         print_time=print_time,
         print_termination=print_termination,
         last_ops_debugging_list_length=last_ops_debugging_list_length,
+        cache_image=cache_image,
     )
 
     try:
@@ -239,6 +331,44 @@ def run_test_output(
         return False
 
 
+def preinit(
+    fjm_path: Path,
+    output_fjm_path: Path,
+    *,
+    debugging_file: Optional[Path] = None,
+    stop_label: Optional[str] = None,
+    print_time: bool = True,
+    flat_max_words: Optional[int] = None,
+) -> int:
+    """
+    pre-initializes a .fjm file: runs its startup (up to its first input/output, or up to stop_label) once, and
+     saves its memory at that point as a new .fjm file, whose runs start right there.
+    @param fjm_path:[in]: the path to the .fjm file
+    @param output_fjm_path:[out]: the path of the pre-initialized .fjm file
+    @param debugging_file:[in]: the path to the debugging file (needed for stop_label)
+    @param stop_label: if specified, the startup ends before this label (if not reaching an input/output first)
+    @param print_time: if true print the pre-initialization time
+    @param flat_max_words: the native engine's flat-storage span limit, in words (2^23 by default)
+    @return: the number of startup ops, skipped by the runs of the new file
+
+    :note: This is a wrapper function to the fjm_run.preinit() function.
+    """
+    stop_address = None
+    if stop_label is not None:
+        labels = load_labels_dictionary(debugging_file, True)
+        if stop_label not in labels:
+            raise FlipJumpRuntimeException(f"the stop label {stop_label} can't be found in the debugging labels")
+        stop_address = labels[stop_label]
+
+    with PrintTimer('  pre-initializing:  ', print_time=print_time):
+        startup_ops = fjm_run.preinit(
+            fjm_path, output_fjm_path, stop_address=stop_address, flat_max_words=flat_max_words
+        )
+    if print_time:
+        print(f'  saved {output_fjm_path} after {startup_ops:,} startup ops')
+    return startup_ops
+
+
 def assemble_and_run(
     fj_file_paths: List[Path],
     *,
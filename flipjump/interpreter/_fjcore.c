@@ -7,10 +7,19 @@
  *   - per-op order: read flip-word, output-check, input-check, flip, read jump-word,
  *     looping/null-ip termination checks, jump.
  *   - reads of in-segment untouched words are 0; reads outside any segment either
- *     terminate the run (garbage_stop) or read 0 (continue).
- *   - IO is routed through the Python io_device's read_bit/write_bit callbacks.
+ *     terminate the run (garbage_stop) or read 0 (continue) - reporting each such word
+ *     once through the optional garbage_callback (the lenient warning modes).
+ *   - IO is routed through the Python io_device's read_bit/write_bit callbacks - or, for
+ *     devices with the byte-level interface, assembled into bytes here and handed over
+ *     through read_bytes/write_bytes (output in batches).
  *
  * Only the run-loop lives in C; the .fjm parsing, devices and debugger stay in Python.
+ * The fast loops release the GIL while they execute ops, and take it back only to call
+ * into Python (IO, the garbage callback, signal checks) - so programs running in
+ * different threads, each on its own Memory, run in parallel.
+ *
+ * A ProgramImage freezes a loaded Memory; its new_memory() clones share the image's pages
+ * copy-on-write, so running the same program many times skips the loading.
  */
 
 #define PY_SSIZE_T_CLEAN
@@ -19,6 +28,7 @@
 #define Py_LIMITED_API 0x030A0000
 #endif
 #include <Python.h>
+#include <pythread.h>
 #include <stdint.h>
 #include <string.h>
 #include <time.h>
@@ -32,6 +42,10 @@
 
 #ifdef _WIN32
 #include <windows.h>
+#else
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
 #endif
 
 /* a monotonic wall clock in seconds - matches the python reference pause-timer, which uses
@@ -62,9 +76,10 @@ static double monotonic_seconds(void)
    w<=32, so bit 63 is free to mark out-of-segment words) use one dense array instead of
    the page table - removing the page lookup from the serial jump-address chain.
    the limit is the Memory(flat_max_words=...) parameter, else the FLIPJUMP_FLAT_MAX_WORDS
-   environment variable, else this default. raising it trades startup time + footprint
-   (the array is sentinel-filled: RSS = 8 bytes x span, fill ~0.1s/GB) for flat-path speed;
-   the per-op cost is unaffected by the limit's value. */
+   environment variable, else this default. the array is a demand-zero mapping (see
+   flat_alloc): its in-segment words start as the kernel's zero pages, and only the pages the
+   program touches (plus the gaps' sentinel fill) cost RAM - so raising the limit costs
+   address space, not startup time or footprint; the per-op cost is unaffected by it. */
 #define FLAT_MAX_WORDS_DEFAULT (1ull << 23) /* 8M words, 64MB */
 #define GARBAGE_SENTINEL (1ull << 63)
 /* the w=64 flat gap-fill sentinel. w<=32 keeps the in-band bit-63 sentinel (values are
@@ -81,11 +96,20 @@ static double monotonic_seconds(void)
 #define TERM_EOF 1
 #define TERM_NULL_IP 2
 #define TERM_MEMORY_ERROR 3
+#define TERM_BREAK 4 /* the featured loop stopped at a breakpoint (resumable - not a termination) */
+#define TERM_OP_BUDGET 5 /* the run executed its max_ops budget (resumable - not a termination) */
+#define TERM_WATCH 6 /* an op flipped a watched bit - stopped after it (resumable - not a termination) */
+
+/* the execution trace's chunks (see MemoryObject.trace_write) */
+#define TRACE_BUFFER_BYTES (1u << 20)
+#define TRACE_CHUNK_HEADER_BYTES 12
+#define TRACE_RECORD_MAX_BYTES 20 /* two 64-bit varints */
 
 typedef struct {
     uint64_t* words;       /* PAGE_WORDS lazily-calloc'd words (masked to w bits) */
     uint64_t valid_start;  /* page-local fast-path valid range [valid_start, valid_end) */
     uint64_t valid_end;
+    int shared;            /* owned by a ProgramImage: read-only, copied on the first fetch */
 } Page;
 
 typedef struct {
@@ -98,6 +122,59 @@ typedef struct {
     uint64_t end;   /* word address (exclusive) */
 } SegmentRange;
 
+typedef struct {
+    uint64_t start; /* bit address */
+    uint64_t end;   /* bit address (exclusive) */
+} BitRange;
+
+/* an open-addressing set of word addresses (power-of-two sized) */
+typedef struct {
+    uint64_t* keys_plus1; /* address + 1; 0 marks an empty slot */
+    uint64_t slot_count;
+    uint64_t slots_used;
+} AddressSet;
+
+/* an open-addressing map of addresses to counts (power-of-two sized) */
+typedef struct {
+    uint64_t* keys_plus1; /* address + 1; 0 marks an empty slot */
+    uint64_t* counts;
+    uint64_t slot_count;
+    uint64_t slots_used;
+} AddressCounts;
+
+/* the pre-decoding tier (see pd_decode) */
+#define PD_MAX_BLOCK_OPS 256
+
+typedef struct {
+    uint64_t word; /* a flipped word-address */
+    uint64_t mask; /* the XOR of the block's flips of it */
+} PdFlip;
+
+typedef struct {
+    uint64_t start_op;   /* the op index (ip / 2w) it starts at */
+    uint64_t ops;        /* 0: the op there can't be decoded - it runs on the normal path */
+    uint64_t exit_ip;    /* the ip after the block's last op */
+    size_t first_flip;   /* the block's flips are flips[first_flip, first_flip + flip_count) */
+    size_t flip_count;
+    uint64_t check_word; /* the last op is speculated: its jump word-address (else 0), which must hold exit_ip, */
+    uint64_t check_ip;   /* and the op (its flip is the block's last PdFlip) */
+} PdBlock;
+
+typedef struct {
+    uint64_t words;         /* the flat words it covers (flat_count) */
+    uint32_t* block_at;     /* per 2w-aligned op (ip / 2w): its block index + 1 (0 = not decoded yet) */
+    uint64_t* guarded;      /* bitmaps over the words: the decoded ops' words, */
+    uint64_t* targeted;     /* the decoded ops' flip targets, */
+    uint64_t* written_code; /* and the code words written while decoded (never decoded again) */
+    PdBlock* blocks;
+    size_t block_count, block_capacity;
+    PdFlip* flips;
+    size_t flip_count, flip_capacity;
+    uint64_t* guarded_words; /* the set guarded bits (to clear them) */
+    size_t guarded_count, guarded_capacity;
+    unsigned long long flushes, decoded_ops, speculated_ops, misses;
+} PdState;
+
 typedef struct {
     PyObject_HEAD
 
@@ -105,6 +182,11 @@ typedef struct {
     int ww;            /* log2(w) */
     uint64_t word_mask;
     int garbage_stop;  /* 1: out-of-segment access terminates; 0: reads 0 and continues */
+    /* continue-mode: the out-of-segment words already materialized (touched by the program
+       or written through the API) - each is reported to garbage_callback only once, and
+       in flat storage it is the word's license to live in the flat array. */
+    AddressSet garbage_words;
+    PyObject* garbage_callback; /* borrowed for the duration of a run; NULL = silent */
 
     Slot* slots;       /* open-addressing page table */
     uint64_t slot_count; /* power of two */
@@ -143,10 +225,281 @@ typedef struct {
     unsigned long long spec_first;  /* first executions of an ip (no prediction yet) */
     unsigned long long spec_misses; /* jump word differed from its previous execution */
 
+    /* the featured run-loop (the debugger / profiler): breakpoint addresses + per-op counters */
+    AddressSet break_addresses;
+    unsigned long long last_run_flip_count; /* flips (of bits >= 2w) of the last featured run */
+    unsigned long long last_run_jump_count; /* jumps (not to the next op) of the last featured run */
+    unsigned long long last_run_ip; /* the ip the last run stopped at (the op to resume from) */
+    uint64_t max_ops;               /* the current run's op budget (0 = unlimited) */
+
+    /* the sampling profiler (set_sampling): every sample_every ops, the ip of the next op is
+       counted in samples. the countdown persists across runs, so resumed runs (breaks, op
+       budgets) keep the cadence. */
+    uint64_t sample_every;     /* 0 = off */
+    uint64_t sample_countdown; /* ops left until the next sample */
+    AddressCounts samples;
+
+    /* the execution coverage (set_coverage): a bitmap of the executed 2w-aligned ops - the op
+       at bit-address i*2w is bit i%8 of byte i/8 - over the segments' ops below the flat-storage
+       limit (coverage_ops); the other executed ips (unaligned, or above the bitmap) go to
+       coverage_far. accumulates across runs, until take_coverage(). */
+    int coverage;
+    unsigned char* coverage_bits;
+    uint64_t coverage_ops;
+    AddressSet coverage_far;
+
+    /* the write watchpoints (set_watchpoints): sorted, merged bit-address ranges. a run stops
+       right after an op whose flip lands in one (TERM_WATCH); the hit (the op, the flipped bit,
+       its word before and after) is kept for last_watch_hit. the runs without watchpoints use
+       loop bodies without the check. */
+    BitRange* watch_ranges;
+    Py_ssize_t watch_count;
+    int watch_hit; /* did the last run hit a watchpoint? */
+    uint64_t watch_hit_ip;
+    uint64_t watch_hit_bit_address;
+    uint64_t watch_hit_old_word;
+    uint64_t watch_hit_new_word;
+
+    /* the execution trace (set_trace): each executed op's record - its flip address as a
+       zigzag varint delta from the previous op's flip, then its jump address as one from the
+       next op (ip + 2w); its ip is the previous op's jump - is appended to trace_buffer. the
+       buffer is a chunk (a TRACE_CHUNK_HEADER_BYTES header: the records' size (u32) and the
+       first op's ip (u64), little-endian; the flip deltas restart at 0) handed to trace_write
+       when it fills up and at each run's end. the traced runs use their own loop bodies. */
+    PyObject* trace_write; /* NULL = off */
+    unsigned char* trace_buffer;
+    size_t trace_used;
+    uint64_t trace_chunk_ip;
+    uint64_t trace_last_flip;
+
+    /* the pre-decoding tier (set_predecode / FLIPJUMP_PREDECODE=1): the flat runs without the
+       other features execute the straight-line code the program never writes as pre-decoded
+       blocks (pd). a write to a decoded op's word marks it pd_stale - the blocks are flushed
+       before the next one runs - and the written words are never decoded again. */
+    int predecode;
+    int pd_stale;
+    PdState* pd;
+
+    /* the progress reports (set_progress): the runs' signal checks call progress_callback(ops,
+       ip, paused_seconds) - of the current run - once progress_next (a monotonic_seconds time)
+       has passed, then every progress_interval seconds (across the runs - e.g. the slices of a
+       checkpointed run); a clock read per check otherwise. */
+    PyObject* progress_callback; /* NULL = off */
+    double progress_interval;
+    double progress_next;
+    int break_on_io;                /* the current featured run breaks before its first IO op */
+
+    /* byte-level IO (the device's optional read_bytes/write_bytes; NULL = per-bit calls).
+       the callbacks and the output buffer are borrowed/allocated for the duration of a run;
+       the bit positions persist, so a resumed run continues mid-byte. */
+    PyObject* read_bytes;
+    PyObject* write_bytes;
+    unsigned char* out_buffer; /* whole output bytes not yet handed to write_bytes */
+    Py_ssize_t out_buffer_size;
+    Py_ssize_t out_buffer_used;
+    unsigned int out_byte;      /* the output byte being assembled (lsb first) */
+    unsigned int out_bit_count; /* its bits so far (0..7) */
+    int out_byte_in_device;     /* a run ended mid-byte: its bits went through write_bit, so the
+                                   byte is finished per-bit before batching resumes */
+    unsigned int in_byte;       /* the current input byte's unread bits (lsb first) */
+    unsigned int in_bits_left;
+
+    /* the GIL: the fast loops run with it released (releases_gil), parking their thread
+       state in released_thread until they call into Python again (fj_hold_gil). */
+    int releases_gil;
+    PyThreadState* released_thread;
+    unsigned long running_thread; /* the thread ident inside run(); 0 when not running */
+
     unsigned long long last_run_op_count; /* op count of the last run (also on exceptions) */
     double last_run_paused_seconds;       /* IO-paused seconds of the last run (also on exceptions) */
+
+    /* program images: a frozen memory is the storage of a ProgramImage (never runs or changes);
+       a clone holds its image (which owns the shared pages it starts with) */
+    int frozen;
+    PyObject* image;
 } MemoryObject;
 
+/* an immutable, loaded program - Memory clones are made from it (new_memory) */
+typedef struct {
+    PyObject_HEAD
+    MemoryObject* memory; /* the frozen source memory - owns the shared pages */
+} ProgramImageObject;
+
+/* ---------------------------------------------------------------- the GIL */
+
+/* take the GIL back, if the running loop released it (before any Python API call) */
+static inline void fj_hold_gil(MemoryObject* m)
+{
+    if (m->released_thread) {
+        PyEval_RestoreThread(m->released_thread);
+        m->released_thread = NULL;
+    }
+}
+
+/* release the GIL again - only inside the loops that run without it */
+static inline void fj_release_gil(MemoryObject* m)
+{
+    if (m->releases_gil && !m->released_thread) {
+        m->released_thread = PyEval_SaveThread();
+    }
+}
+
+/* raise MemoryError from code that may run without the GIL */
+static void fj_no_memory(MemoryObject* m)
+{
+    fj_hold_gil(m);
+    PyErr_NoMemory();
+    fj_release_gil(m);
+}
+
+/* raise RuntimeError if the Memory can't be used now: it is inside run() on another thread
+   (its loop may be running without the GIL - the running thread itself, i.e. its device
+   callbacks, may use it), or it is a program image's frozen storage. */
+static int mem_unavailable(MemoryObject* m)
+{
+    if (m->frozen) {
+        PyErr_SetString(PyExc_RuntimeError, "the memory belongs to a program image - clone it with new_memory()");
+        return 1;
+    }
+    if (m->running_thread && m->running_thread != PyThread_get_thread_ident()) {
+        PyErr_SetString(PyExc_RuntimeError, "the memory is running on another thread");
+        return 1;
+    }
+    return 0;
+}
+
+/* ---------------------------------------------------------------- address sets */
+
+static int address_set_contains(const AddressSet* set, uint64_t address)
+{
+    uint64_t key = address + 1, h;
+    if (!set->slot_count) {
+        return 0;
+    }
+    h = (key * 0x9E3779B97F4A7C15ull) & (set->slot_count - 1);
+    while (set->keys_plus1[h]) {
+        if (set->keys_plus1[h] == key) {
+            return 1;
+        }
+        h = (h + 1) & (set->slot_count - 1);
+    }
+    return 0;
+}
+
+static int address_set_grow(AddressSet* set)
+{
+    uint64_t new_count = set->slot_count ? set->slot_count * 2 : 64;
+    uint64_t* new_keys = (uint64_t*)calloc((size_t)new_count, sizeof(uint64_t));
+    if (!new_keys) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    for (uint64_t i = 0; i < set->slot_count; i++) {
+        if (set->keys_plus1[i]) {
+            uint64_t h = (set->keys_plus1[i] * 0x9E3779B97F4A7C15ull) & (new_count - 1);
+            while (new_keys[h]) {
+                h = (h + 1) & (new_count - 1);
+            }
+            new_keys[h] = set->keys_plus1[i];
+        }
+    }
+    free(set->keys_plus1);
+    set->keys_plus1 = new_keys;
+    set->slot_count = new_count;
+    return 0;
+}
+
+/* returns 1 if inserted, 0 if already present, -1 on python error (no memory) */
+static int address_set_insert(AddressSet* set, uint64_t address)
+{
+    uint64_t key = address + 1, h;
+    if (set->slots_used * 2 >= set->slot_count) {
+        if (address_set_grow(set) < 0) {
+            return -1;
+        }
+    }
+    h = (key * 0x9E3779B97F4A7C15ull) & (set->slot_count - 1);
+    while (set->keys_plus1[h]) {
+        if (set->keys_plus1[h] == key) {
+            return 0;
+        }
+        h = (h + 1) & (set->slot_count - 1);
+    }
+    set->keys_plus1[h] = key;
+    set->slots_used++;
+    return 1;
+}
+
+static void address_set_clear(AddressSet* set)
+{
+    free(set->keys_plus1);
+    set->keys_plus1 = NULL;
+    set->slot_count = 0;
+    set->slots_used = 0;
+}
+
+static int address_counts_grow(AddressCounts* map)
+{
+    uint64_t new_count = map->slot_count ? map->slot_count * 2 : 1024;
+    uint64_t* new_keys = (uint64_t*)calloc((size_t)new_count, sizeof(uint64_t));
+    uint64_t* new_counts = (uint64_t*)malloc((size_t)new_count * sizeof(uint64_t));
+    if (!new_keys || !new_counts) {
+        free(new_keys);
+        free(new_counts);
+        return -1;
+    }
+    for (uint64_t i = 0; i < map->slot_count; i++) {
+        if (map->keys_plus1[i]) {
+            uint64_t h = (map->keys_plus1[i] * 0x9E3779B97F4A7C15ull) & (new_count - 1);
+            while (new_keys[h]) {
+                h = (h + 1) & (new_count - 1);
+            }
+            new_keys[h] = map->keys_plus1[i];
+            new_counts[h] = map->counts[i];
+        }
+    }
+    free(map->keys_plus1);
+    free(map->counts);
+    map->keys_plus1 = new_keys;
+    map->counts = new_counts;
+    map->slot_count = new_count;
+    return 0;
+}
+
+/* count one more hit of the address. runs without the GIL (the sampler): returns 0, or -1
+   on allocation failure WITHOUT setting a python error. */
+static int address_counts_add(AddressCounts* map, uint64_t address)
+{
+    uint64_t key = address + 1, h;
+    if (map->slots_used * 2 >= map->slot_count) {
+        if (address_counts_grow(map) < 0) {
+            return -1;
+        }
+    }
+    h = (key * 0x9E3779B97F4A7C15ull) & (map->slot_count - 1);
+    while (map->keys_plus1[h]) {
+        if (map->keys_plus1[h] == key) {
+            map->counts[h]++;
+            return 0;
+        }
+        h = (h + 1) & (map->slot_count - 1);
+    }
+    map->keys_plus1[h] = key;
+    map->counts[h] = 1;
+    map->slots_used++;
+    return 0;
+}
+
+static void address_counts_clear(AddressCounts* map)
+{
+    free(map->keys_plus1);
+    free(map->counts);
+    map->keys_plus1 = NULL;
+    map->counts = NULL;
+    map->slot_count = 0;
+    map->slots_used = 0;
+}
+
 /* ---------------------------------------------------------------- pages */
 
 static int mem_grow_slots(MemoryObject* m)
@@ -154,7 +507,7 @@ static int mem_grow_slots(MemoryObject* m)
     uint64_t new_count = m->slot_count ? m->slot_count * 2 : 64;
     Slot* new_slots = (Slot*)calloc((size_t)new_count, sizeof(Slot));
     if (!new_slots) {
-        PyErr_NoMemory();
+        fj_no_memory(m);
         return -1;
     }
     for (uint64_t i = 0; i < m->slot_count; i++) {
@@ -235,6 +588,32 @@ static inline void page_cache_fill(MemoryObject* m, uint64_t cache_slot, uint64_
     m->page_cache_valid_end[cache_slot] = page->valid_end;
 }
 
+/* copy-on-write: a clone fetches one of its image's shared pages - replace it with a private
+   copy. every page access of the run loops goes through mem_get_page (the page cache is filled
+   only here), so the shared pages are never written; a page is copied on its first fetch,
+   read or write - the cache doesn't tell them apart. returns 0, or -1 on MemoryError. */
+static int page_unshare(MemoryObject* m, Slot* slot)
+{
+    const Page* shared_page = slot->page;
+    Page* page = (Page*)malloc(sizeof(Page));
+    if (!page) {
+        fj_no_memory(m);
+        return -1;
+    }
+    page->words = (uint64_t*)malloc(PAGE_WORDS * sizeof(uint64_t));
+    if (!page->words) {
+        free(page);
+        fj_no_memory(m);
+        return -1;
+    }
+    memcpy(page->words, shared_page->words, PAGE_WORDS * sizeof(uint64_t));
+    page->valid_start = shared_page->valid_start;
+    page->valid_end = shared_page->valid_end;
+    page->shared = 0;
+    slot->page = page;
+    return 0;
+}
+
 static Page* mem_get_page(MemoryObject* m, uint64_t page_index)
 {
     uint64_t key = page_index + 1;
@@ -251,6 +630,9 @@ static Page* mem_get_page(MemoryObject* m, uint64_t page_index)
     h = (key * 0x9E3779B97F4A7C15ull) & (m->slot_count - 1);
     while (m->slots[h].key_plus1) {
         if (m->slots[h].key_plus1 == key) {
+            if (m->slots[h].page->shared && page_unshare(m, &m->slots[h]) < 0) {
+                return NULL;
+            }
             page_cache_fill(m, cache_slot, key, m->slots[h].page);
             return m->slots[h].page;
         }
@@ -260,15 +642,16 @@ static Page* mem_get_page(MemoryObject* m, uint64_t page_index)
     {
         Page* page = (Page*)malloc(sizeof(Page));
         if (!page) {
-            PyErr_NoMemory();
+            fj_no_memory(m);
             return NULL;
         }
         page->words = (uint64_t*)calloc(PAGE_WORDS, sizeof(uint64_t));
         if (!page->words) {
             free(page);
-            PyErr_NoMemory();
+            fj_no_memory(m);
             return NULL;
         }
+        page->shared = 0;
         page_compute_validity(m, page_index, page);
         m->slots[h].key_plus1 = key;
         m->slots[h].page = page;
@@ -278,12 +661,60 @@ static Page* mem_get_page(MemoryObject* m, uint64_t page_index)
     }
 }
 
+/* the allocated page holding the word-address, or NULL (never allocates) */
+static Page* mem_find_page(MemoryObject* m, uint64_t page_index)
+{
+    uint64_t key = page_index + 1, h;
+    if (!m->slot_count) {
+        return NULL;
+    }
+    h = (key * 0x9E3779B97F4A7C15ull) & (m->slot_count - 1);
+    while (m->slots[h].key_plus1) {
+        if (m->slots[h].key_plus1 == key) {
+            return m->slots[h].page;
+        }
+        h = (h + 1) & (m->slot_count - 1);
+    }
+    return NULL;
+}
+
+/* continue-mode: the program touched the out-of-segment word. the first touch of each
+   word materializes it (garbage_words) and reports its bit-address to garbage_callback -
+   the lenient modes warn once per word, like the python Reader materializing it in its
+   memory dict. returns 0, or -1 on python error (m->mem_error stays 0). */
+static int garbage_touch(MemoryObject* m, uint64_t word_address, int* first_touch)
+{
+    int inserted;
+    if (address_set_contains(&m->garbage_words, word_address)) {
+        *first_touch = 0;
+        return 0;
+    }
+    fj_hold_gil(m); /* the first touch may grow the set (MemoryError) and calls the callback */
+    inserted = address_set_insert(&m->garbage_words, word_address);
+    if (inserted > 0 && m->garbage_callback) {
+        PyObject* result = PyObject_CallFunction(m->garbage_callback, "K",
+                                                 (unsigned long long)(word_address << m->ww));
+        if (result) {
+            Py_DECREF(result);
+        } else {
+            inserted = -1;
+        }
+    }
+    fj_release_gil(m);
+    if (inserted < 0) {
+        return -1;
+    }
+    *first_touch = inserted;
+    return 0;
+}
+
 /* validity check for the interpreted program's accesses.
    returns 1 if ok to access; 0 if the run must terminate with a memory error (sets m->mem_error),
    -1 on python error. in continue-mode invalid accesses are allowed (read 0 / write). */
 static inline int access_check(MemoryObject* m, Page* page, uint64_t word_address)
 {
     uint64_t off = word_address & PAGE_MASK;
+    int first_touch;
     if (off >= page->valid_start && off < page->valid_end) {
         return 1;
     }
@@ -291,20 +722,32 @@ static inline int access_check(MemoryObject* m, Page* page, uint64_t word_addres
         return 1;
     }
     if (!m->garbage_stop) {
-        return 1;
+        return (garbage_touch(m, word_address, &first_touch) < 0) ? -1 : 1;
     }
     m->mem_error = 1;
     m->error_bit_address = word_address << m->ww;
     return 0;
 }
 
-static inline int flat_garbage(MemoryObject* m, uint64_t word_address)
+/* a gap word of the flat window was touched. garbage-stop: a memory error (returns -1 with
+   m->mem_error set). continue-mode: materialize it - the flat slot takes the word's
+   page-backed value (0 unless written through the API before the flat build) and loses
+   its sentinel, so later touches run the hot path. returns 0, or -1 on python error. */
+static int flat_garbage(MemoryObject* m, uint64_t word_address, uint64_t* value)
 {
-    if (!m->garbage_stop) {
-        return 1; /* continue-mode reads 0 (flat mode requires garbage_stop, but be safe) */
+    int first_touch;
+    Page* page;
+    if (m->garbage_stop) {
+        m->mem_error = 1;
+        m->error_bit_address = word_address << m->ww;
+        return -1;
     }
-    m->mem_error = 1;
-    m->error_bit_address = word_address << m->ww;
+    if (garbage_touch(m, word_address, &first_touch) < 0) {
+        return -1;
+    }
+    page = mem_find_page(m, word_address >> PAGE_BITS);
+    *value = page ? page->words[word_address & PAGE_MASK] : 0;
+    m->flat[word_address] = *value;
     return 0;
 }
 
@@ -326,20 +769,25 @@ static inline int flat_seg_contains(const MemoryObject* m, uint64_t word_address
     return 0;
 }
 
+/* does the word-address live in the flat array? in-segment words of the window do, and in
+   continue-mode so do the materialized gap words; other gap words stay page-backed. */
+static inline int flat_routes(const MemoryObject* m, uint64_t word_address)
+{
+    return m->flat && word_address < m->flat_count &&
+           (flat_seg_contains(m, word_address) ||
+            (!m->garbage_stop && address_set_contains(&m->garbage_words, word_address)));
+}
+
 /* a flat word whose value matched the width's sentinel: decide whether it is REAL
-   garbage (an out-of-segment touch - reported via flat_garbage, returns -1) or, at
-   w=64, an in-segment word that legitimately holds the magic value (kept, returns 0).
-   w<=32 has no collisions, so a sentinel match there is always real garbage. */
+   garbage (an out-of-segment touch - handled by flat_garbage, -1 on stop) or, at w=64,
+   an in-segment / materialized word that legitimately holds the magic value (kept,
+   returns 0). w<=32 has no collisions, so a sentinel match there is always real garbage. */
 static inline int flat_garbage_check(MemoryObject* m, uint64_t word_address, uint64_t* value)
 {
-    if (m->w > 32 && flat_seg_contains(m, word_address)) {
+    if (m->w > 32 && flat_routes(m, word_address)) {
         return 0; /* the word really holds the magic constant - real data */
     }
-    if (!flat_garbage(m, word_address)) {
-        return -1;
-    }
-    *value = 0; /* continue-mode safety (flat requires garbage_stop, so unreachable) */
-    return 0;
+    return flat_garbage(m, word_address, value);
 }
 
 /* read the w-bit word at the word-address. returns 0 on success, -1 on stop (mem_error or
@@ -360,13 +808,30 @@ static inline int mem_read_word(MemoryObject* m, uint64_t word_address, uint64_t
     if (!page) {
         return -1;
     }
-    if (!access_check(m, page, word_address)) {
+    if (access_check(m, page, word_address) <= 0) {
         return -1;
     }
     *out = page->words[word_address & PAGE_MASK];
     return 0;
 }
 
+static inline int pd_bit(const uint64_t* bits, uint64_t word)
+{
+    return (int)((bits[word >> 6] >> (word & 63)) & 1);
+}
+
+/* the program is about to write a flat word (see the pre-decoding tier, pd_decode): if it is
+   decoded code, the blocks are stale (flushed before the next one runs), and it is never decoded
+   again - self-modifying code runs on the normal path */
+static inline void pd_note_write(MemoryObject* m, uint64_t word_address)
+{
+    PdState* pd = m->pd;
+    if (pd && word_address < pd->words && pd_bit(pd->guarded, word_address)) {
+        pd->written_code[word_address >> 6] |= 1ull << (word_address & 63);
+        m->pd_stale = 1;
+    }
+}
+
 /* flip the bit at the bit-address. returns 0 on success, -1 on stop. */
 static inline int mem_flip_bit(MemoryObject* m, uint64_t bit_address)
 {
@@ -377,6 +842,7 @@ static inline int mem_flip_bit(MemoryObject* m, uint64_t bit_address)
         if (flat_is_garbage(m, value) && flat_garbage_check(m, word_address, &value) < 0) {
             return -1;
         }
+        pd_note_write(m, word_address);
         m->flat[word_address] = value ^ (1ull << (bit_address & (uint64_t)(m->w - 1)));
         return 0;
     }
@@ -385,7 +851,7 @@ static inline int mem_flip_bit(MemoryObject* m, uint64_t bit_address)
     if (!page) {
         return -1;
     }
-    if (!access_check(m, page, word_address)) {
+    if (access_check(m, page, word_address) <= 0) {
         return -1;
     }
     page->words[word_address & PAGE_MASK] ^= 1ull << (bit_address & (uint64_t)(m->w - 1));
@@ -403,6 +869,7 @@ static inline int mem_write_bit(MemoryObject* m, uint64_t bit_address, int bit_v
         if (flat_is_garbage(m, value) && flat_garbage_check(m, word_address, &value) < 0) {
             return -1;
         }
+        pd_note_write(m, word_address);
         m->flat[word_address] = bit_value ? (value | bit) : (value & ~bit);
         return 0;
     }
@@ -411,7 +878,7 @@ static inline int mem_write_bit(MemoryObject* m, uint64_t bit_address, int bit_v
     if (!page) {
         return -1;
     }
-    if (!access_check(m, page, word_address)) {
+    if (access_check(m, page, word_address) <= 0) {
         return -1;
     }
     if (bit_value) {
@@ -448,87 +915,448 @@ static inline int mem_get_word_unaligned(MemoryObject* m, uint64_t bit_address,
     return 0;
 }
 
-/* the effective flat-storage span limit: the constructor parameter, else the
-   FLIPJUMP_FLAT_MAX_WORDS environment variable, else the built-in default. */
-static uint64_t mem_flat_words_limit(MemoryObject* m)
+/* allocate a zero-filled flat array of `words` words, without touching it: on POSIX an
+   anonymous demand-zero mapping (MAP_NORESERVE - untouched pages read the kernel's zero
+   page and cost no RAM; advised to use transparent huge pages, cutting the flat loop's TLB
+   misses), on windows a committed VirtualAlloc region (demand-zero pages too), else calloc.
+   returns NULL on failure. free it with flat_free. */
+static uint64_t* flat_alloc(uint64_t words)
 {
-    if (m->flat_max_words) {
-        return m->flat_max_words;
+    const size_t bytes = (size_t)words * sizeof(uint64_t);
+#if defined(_WIN32)
+    return (uint64_t*)VirtualAlloc(NULL, bytes, MEM_RESERVE | MEM_COMMIT, PAGE_READWRITE);
+#elif defined(MAP_ANONYMOUS)
+    int flags = MAP_PRIVATE | MAP_ANONYMOUS;
+    void* flat;
+#  ifdef MAP_NORESERVE
+    flags |= MAP_NORESERVE;
+#  endif
+    flat = mmap(NULL, bytes, PROT_READ | PROT_WRITE, flags, -1, 0);
+    if (flat == MAP_FAILED) {
+        return NULL;
     }
-    {
-        const char* env_limit = getenv("FLIPJUMP_FLAT_MAX_WORDS");
-        if (env_limit && env_limit[0]) {
-            uint64_t limit = strtoull(env_limit, NULL, 0);
-            if (limit) {
-                return limit;
-            }
-        }
+#  ifdef MADV_HUGEPAGE
+    (void)madvise(flat, bytes, MADV_HUGEPAGE); /* a hint - THP may be disabled */
+#  endif
+    return (uint64_t*)flat;
+#else
+    return (uint64_t*)calloc((size_t)words, sizeof(uint64_t));
+#endif
+}
+
+static void flat_free(uint64_t* flat, uint64_t words)
+{
+    if (!flat) {
+        return;
     }
-    return FLAT_MAX_WORDS_DEFAULT;
+#if defined(_WIN32)
+    (void)words;
+    VirtualFree(flat, 0, MEM_RELEASE);
+#elif defined(MAP_ANONYMOUS)
+    munmap(flat, (size_t)words * sizeof(uint64_t));
+#else
+    (void)words;
+    free(flat);
+#endif
 }
 
-/* decide the storage mode (once, at the first run): in garbage-stop mode, the LOW WINDOW
-   of memory - segment data below the flat-words limit - gets a dense flat array (gaps
-   carry the in-band bit-63 sentinel at w<=32, the FLAT_GARBAGE_MAGIC fill at w=64).
-   when every segment fits inside the window the mode is 'flat' (exactly the historic
-   behavior); segments continuing or living above it stay page-backed and the mode is
-   'hybrid' - the run loop reads sub-window words from the array and falls back to the
-   paged helpers above it (FJ code lives low, so the hot op fetches stay flat even for
-   sieve-style programs whose data tables sit at 1<<63). copies the already-loaded
-   sub-window page data in; the pages are kept (see below). a failed/oversized flat allocation
-   WARNS to stderr and falls back to paged (set FLIPJUMP_NO_FLAT=1 to opt into paged silently);
-   but no segments, or no segment in the low window (the first op at address 0), RAISE - those
-   are malformed programs, not resource limits. */
-static int mem_decide_storage(MemoryObject* m)
+/* ------------------------------------------------ the pre-decoding tier
+
+   the straight-line code the program never writes is executed as pre-decoded blocks: a block
+   is a chain of ops (each the previous one's jump target) decoded at once, and running it is
+   XOR-ing its flips in - a flipped word's flips merged into one mask - and jumping to its exit.
+   an op is decoded only if nothing can change it meanwhile: its words are guarded (a write to
+   one marks the blocks stale, and is never decoded again), aren't any decoded op's flip target,
+   and its own flip doesn't land on a decoded op; IO ops, possible terminations (jumps to the
+   op itself / below 2w) and the words outside the flat window aren't decoded. the blocks run
+   on the flat loop's with_predecode clone (run_flat_loop_impl).
+   an op whose jump word the program writes (a decoded op's flip target, or a written code word -
+   the wflip dispatch) is speculated: it ends its block, its jump word isn't guarded, and the
+   block exits to the word's value when decoded (after the block's flips of it). the block checks
+   the word before the op runs - on a miss it stops before the op, which the normal path runs.
+   a speculated op doesn't continue the block: its targets vary (the dispatch), and each miss
+   target would start a block of its own, decoding the chain after it again. */
+
+static inline uint64_t pd_bitmap_words(uint64_t words)
 {
-    uint64_t max_end = 0, low_max_end = 0, limit, i;
-    Py_ssize_t seg;
-    if (m->storage_decided) {
-        return 0;
+    return (words + 63) / 64;
+}
+
+static inline uint64_t pd_block_at_words(uint64_t words)
+{
+    return (words / 2 + 1) / 2; /* a uint32 per op, two per (flat_alloc'd) uint64 */
+}
+
+static void pd_free(PdState* pd)
+{
+    if (!pd) {
+        return;
     }
-    m->storage_decided = 1;
+    flat_free((uint64_t*)pd->block_at, pd_block_at_words(pd->words));
+    flat_free(pd->guarded, pd_bitmap_words(pd->words));
+    flat_free(pd->targeted, pd_bitmap_words(pd->words));
+    flat_free(pd->written_code, pd_bitmap_words(pd->words));
+    free(pd->blocks);
+    free(pd->flips);
+    free(pd->guarded_words);
+    free(pd);
+}
 
-    if (m->segment_count == 0) {
-        PyErr_SetString(PyExc_ValueError,
-                        "the program has no memory segments - a FlipJump program must define its "
-                        "first op at address 0");
+/* grow a realloc'd array to hold `needed` items; returns 0 / -1 (out of memory) */
+static int pd_reserve(void** items, size_t* capacity, size_t needed, size_t item_size)
+{
+    size_t new_capacity;
+    void* grown;
+    if (needed <= *capacity) {
+        return 0;
+    }
+    new_capacity = *capacity ? *capacity * 2 : 1024;
+    while (new_capacity < needed) {
+        new_capacity *= 2;
+    }
+    grown = realloc(*items, new_capacity * item_size);
+    if (!grown) {
         return -1;
     }
-    if (!m->garbage_stop) {
-        return 0; /* continue-mode: paged (the flat sentinel scheme needs garbage-stop) */
+    *items = grown;
+    *capacity = new_capacity;
+    return 0;
+}
+
+/* drop every decoded block (the written_code words stay undecodable) */
+static void pd_flush(PdState* pd)
+{
+    for (size_t i = 0; i < pd->block_count; i++) {
+        pd->block_at[pd->blocks[i].start_op] = 0;
     }
-    {
-        const char* no_flat = getenv("FLIPJUMP_NO_FLAT");
-        if (no_flat && no_flat[0] == '1') {
-            return 0; /* paged (forced - for A/B benchmarking and debugging) */
-        }
+    for (size_t i = 0; i < pd->flip_count; i++) {
+        pd->targeted[pd->flips[i].word >> 6] &= ~(1ull << (pd->flips[i].word & 63));
     }
-    limit = mem_flat_words_limit(m);
-    for (seg = 0; seg < m->segment_count; seg++) {
-        const uint64_t start = m->segments[seg].start, end = m->segments[seg].end;
-        if (end > max_end) {
-            max_end = end;
+    for (size_t i = 0; i < pd->guarded_count; i++) {
+        pd->guarded[pd->guarded_words[i] >> 6] &= ~(1ull << (pd->guarded_words[i] & 63));
+    }
+    pd->block_count = pd->flip_count = pd->guarded_count = 0;
+    pd->flushes++;
+}
+
+/* make the pre-decoding state fit the flat window, and flush it if it's stale.
+   returns 0 / -1 (MemoryError set) */
+static int pd_prepare(MemoryObject* m)
+{
+    PdState* pd = m->pd;
+    if (pd && pd->words != m->flat_count) {
+        pd_free(pd);
+        m->pd = pd = NULL;
+    }
+    if (!pd) {
+        pd = (PdState*)calloc(1, sizeof(PdState));
+        if (!pd) {
+            PyErr_NoMemory();
+            return -1;
         }
-        if (start < limit) {
-            const uint64_t clamped_end = (end < limit) ? end : limit;
-            if (clamped_end > low_max_end) {
-                low_max_end = clamped_end;
-            }
+        pd->words = m->flat_count;
+        pd->block_at = (uint32_t*)flat_alloc(pd_block_at_words(pd->words));
+        pd->guarded = flat_alloc(pd_bitmap_words(pd->words));
+        pd->targeted = flat_alloc(pd_bitmap_words(pd->words));
+        pd->written_code = flat_alloc(pd_bitmap_words(pd->words));
+        m->pd = pd;
+        m->pd_stale = 0;
+        if (!pd->block_at || !pd->guarded || !pd->targeted || !pd->written_code) {
+            pd_free(pd);
+            m->pd = NULL;
+            PyErr_NoMemory();
+            return -1;
         }
     }
-    if (low_max_end == 0) {
-        /* every segment lies at or above the flat window - impossible for a valid program,
-           whose first op occupies words 0..1 (a segment at address 0, far below the window) */
-        PyErr_SetString(PyExc_ValueError,
-                        "the program has no segment in the low address window - the first op at "
-                        "address 0 is missing");
-        return -1;
-    }
-    if (low_max_end > SIZE_MAX / sizeof(uint64_t)) {
-        fprintf(stderr, "flipjump: flat-storage window is too large (byte size overflows); running paged (slower). lower --flat-max-words / "
-                "FLIPJUMP_FLAT_MAX_WORDS, or set FLIPJUMP_NO_FLAT=1 to silence this.\n");
-        fflush(stderr);
-        return 0; /* paged fallback */
+    if (m->pd_stale) {
+        pd_flush(pd);
+        m->pd_stale = 0;
+    }
+    return 0;
+}
+
+/* can the op at ip be decoded, as the next op of the block whose flips start at first_flip (see
+   the tier's comment)? sets its flip and (predicted) jump if so, and whether it's speculated */
+static int pd_decodable(const MemoryObject* m, const PdState* pd, uint64_t ip, size_t first_flip, uint64_t* f,
+                        uint64_t* j, int* speculated)
+{
+    const uint64_t w = (uint64_t)m->w, dw = 2 * w;
+    const int ww = m->ww;
+    const uint64_t in_lo_exclusive = 3 * w + (uint64_t)ww + 1 - dw;
+    const uint64_t a = ip >> ww;
+    uint64_t flip_word;
+    if ((ip & (w - 1)) || a + 1 >= pd->words) {
+        return 0;
+    }
+    *f = m->flat[a];
+    *j = m->flat[a + 1];
+    if (flat_is_garbage(m, *f) || flat_is_garbage(m, *j)) {
+        return 0;
+    }
+    *speculated = pd_bit(pd->targeted, a + 1) || pd_bit(pd->written_code, a + 1);
+    if (*speculated) { /* the jump word when the op runs: after the block's flips of it */
+        for (size_t i = first_flip; i < pd->flip_count; i++) {
+            if (pd->flips[i].word == a + 1) {
+                *j ^= pd->flips[i].mask;
+            }
+        }
+    }
+    if (*f - dw <= 1 || ip - in_lo_exclusive - 1 < dw || *j == ip || *j < dw) {
+        return 0; /* IO, or a possible termination */
+    }
+    flip_word = *f >> ww;
+    if (flip_word >= pd->words || flip_word == a || flip_word == a + 1 || flat_is_garbage(m, m->flat[flip_word])) {
+        return 0;
+    }
+    return !pd_bit(pd->guarded, flip_word) && !pd_bit(pd->targeted, a) && !pd_bit(pd->written_code, a);
+}
+
+/* decode the block starting at the (2w-aligned, flat) ip: the chain of decodable ops from it,
+   up to PD_MAX_BLOCK_OPS (none - a 0-ops block - if the first op isn't decodable).
+   returns its block_at value (its index + 1), or 0 when out of memory */
+static uint32_t pd_decode(MemoryObject* m, uint64_t ip)
+{
+    PdState* pd = m->pd;
+    const int ww = m->ww;
+    const uint64_t bit_mask = (uint64_t)m->w - 1;
+    const size_t first_flip = pd->flip_count;
+    uint64_t op_ip = ip, ops = 0, f, j, check_word = 0, check_ip = 0;
+    int speculated = 0;
+    PdBlock* block;
+    if (pd->block_count >= UINT32_MAX - 1
+        || pd_reserve((void**)&pd->blocks, &pd->block_capacity, pd->block_count + 1, sizeof(PdBlock)) < 0) {
+        return 0;
+    }
+    while (!speculated && ops < PD_MAX_BLOCK_OPS && pd_decodable(m, pd, op_ip, first_flip, &f, &j, &speculated)) {
+        const uint64_t a = op_ip >> ww, flip_word = f >> ww, flip_mask = 1ull << (f & bit_mask);
+        size_t i;
+        if (pd_reserve((void**)&pd->guarded_words, &pd->guarded_capacity, pd->guarded_count + 2, sizeof(uint64_t)) < 0
+            || pd_reserve((void**)&pd->flips, &pd->flip_capacity, pd->flip_count + 1, sizeof(PdFlip)) < 0) {
+            return 0;
+        }
+        for (uint64_t word = a; word <= a + 1 - (uint64_t)speculated; word++) { /* a speculated jump isn't guarded */
+            if (!pd_bit(pd->guarded, word)) {
+                pd->guarded[word >> 6] |= 1ull << (word & 63);
+                pd->guarded_words[pd->guarded_count++] = word;
+            }
+        }
+        /* the speculated op's flip is the block's last PdFlip (a miss skips it) */
+        i = speculated ? pd->flip_count : first_flip;
+        for (; i < pd->flip_count && pd->flips[i].word != flip_word; i++) {
+        }
+        if (i == pd->flip_count) {
+            pd->flips[pd->flip_count].word = flip_word;
+            pd->flips[pd->flip_count].mask = 0;
+            pd->flip_count++;
+            pd->targeted[flip_word >> 6] |= 1ull << (flip_word & 63);
+        }
+        pd->flips[i].mask ^= flip_mask;
+        if (speculated) {
+            check_word = a + 1;
+            check_ip = op_ip;
+            pd->speculated_ops++;
+        }
+        ops++;
+        op_ip = j;
+    }
+    block = &pd->blocks[pd->block_count++];
+    block->start_op = ip >> (ww + 1);
+    block->ops = ops;
+    block->exit_ip = op_ip;
+    block->first_flip = first_flip;
+    block->flip_count = pd->flip_count - first_flip;
+    block->check_word = check_word;
+    block->check_ip = check_ip;
+    pd->block_at[block->start_op] = (uint32_t)pd->block_count;
+    pd->decoded_ops += ops;
+    return (uint32_t)pd->block_count;
+}
+
+#if !defined(_WIN32) && defined(__linux__) && defined(MFD_CLOEXEC)
+/* linux: the interior of a big gap maps a shared sentinel-filled memory file (MAP_PRIVATE)
+   instead of being filled - reading it costs one shared FLAT_GAP_CHUNK_WORDS chunk, and a
+   (garbage) write copies just its page. so a far-away data table doesn't make the gap below
+   it resident. the mappings are capped below the kernel's per-process limit (vm.max_map_count,
+   65530 by default); the gap chunks above the cap are filled. */
+#  define FLAT_MAP_GAPS
+#  define FLAT_GAP_CHUNK_WORDS (1ull << 18) /* 2MB - a multiple of any page size's words */
+#  define FLAT_GAP_MAX_MAPPINGS 8192        /* 16GB of mapped gaps */
+
+/* a memory file holding one gap chunk of the fill value; -1 on failure */
+static int flat_gap_chunk_file(uint64_t fill)
+{
+    const size_t bytes = FLAT_GAP_CHUNK_WORDS * sizeof(uint64_t);
+    uint64_t* chunk;
+    uint64_t i;
+    int fd = memfd_create("flipjump-flat-gap", MFD_CLOEXEC);
+    if (fd < 0) {
+        return -1;
+    }
+    if (ftruncate(fd, (off_t)bytes) < 0) {
+        close(fd);
+        return -1;
+    }
+    chunk = (uint64_t*)mmap(NULL, bytes, PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);
+    if (chunk == MAP_FAILED) {
+        close(fd);
+        return -1;
+    }
+    for (i = 0; i < FLAT_GAP_CHUNK_WORDS; i++) {
+        chunk[i] = fill;
+    }
+    munmap(chunk, bytes);
+    return fd;
+}
+#endif
+
+/* fill the gap words of the (zero-filled) flat window with the width's garbage sentinel -
+   the in-segment words stay untouched zero pages. on linux the big gaps' aligned interiors
+   map the sentinel chunk file instead (see FLAT_MAP_GAPS). returns -1 if a gap mapping
+   failed and couldn't be restored (the array is then unusable - the caller frees it). */
+static int flat_fill_gaps(MemoryObject* m)
+{
+    const uint64_t fill = (m->w <= 32) ? GARBAGE_SENTINEL : FLAT_GARBAGE_MAGIC;
+    uint64_t covered_end = 0, i;
+    Py_ssize_t seg;
+    int result = 0;
+#ifdef FLAT_MAP_GAPS
+    const size_t chunk_bytes = FLAT_GAP_CHUNK_WORDS * sizeof(uint64_t);
+    int chunk_fd = -1, chunk_file_failed = 0, mappings = 0;
+#endif
+    mem_ensure_segments_sorted(m);
+    for (seg = 0; seg <= m->segment_count && covered_end < m->flat_count && result == 0; seg++) {
+        uint64_t gap_start = covered_end;
+        uint64_t gap_end = (seg < m->segment_count && m->segments[seg].start < m->flat_count) ? m->segments[seg].start
+                                                                                               : m->flat_count;
+        if (seg < m->segment_count && m->segments[seg].end > covered_end) {
+            covered_end = m->segments[seg].end;
+        }
+        if (gap_start >= gap_end) {
+            continue;
+        }
+#ifdef FLAT_MAP_GAPS
+        {
+            /* map the gap's chunk-aligned interior, fill its edges */
+            uint64_t chunk = (gap_start + FLAT_GAP_CHUNK_WORDS - 1) & ~(FLAT_GAP_CHUNK_WORDS - 1);
+            if (chunk + FLAT_GAP_CHUNK_WORDS <= gap_end && !chunk_file_failed && chunk_fd < 0) {
+                chunk_fd = flat_gap_chunk_file(fill);
+                chunk_file_failed = (chunk_fd < 0);
+            }
+            if (chunk + FLAT_GAP_CHUNK_WORDS <= gap_end && chunk_fd >= 0) {
+                for (i = gap_start; i < chunk; i++) {
+                    m->flat[i] = fill;
+                }
+                for (; chunk + FLAT_GAP_CHUNK_WORDS <= gap_end && mappings < FLAT_GAP_MAX_MAPPINGS;
+                     chunk += FLAT_GAP_CHUNK_WORDS, mappings++) {
+                    if (mmap(m->flat + chunk, chunk_bytes, PROT_READ | PROT_WRITE, MAP_PRIVATE | MAP_FIXED, chunk_fd,
+                             0) == MAP_FAILED) {
+                        /* a failed MAP_FIXED may have unmapped the range: restore it (then fill) */
+                        if (mmap(m->flat + chunk, chunk_bytes, PROT_READ | PROT_WRITE,
+                                 MAP_PRIVATE | MAP_ANONYMOUS | MAP_FIXED, -1, 0) == MAP_FAILED) {
+                            result = -1;
+                        }
+                        mappings = FLAT_GAP_MAX_MAPPINGS;
+                        break;
+                    }
+                }
+                gap_start = chunk;
+            }
+        }
+#endif
+        for (i = gap_start; i < gap_end && result == 0; i++) {
+            m->flat[i] = fill;
+        }
+    }
+#ifdef FLAT_MAP_GAPS
+    if (chunk_fd >= 0) {
+        close(chunk_fd); /* the mappings keep the file alive */
+    }
+#endif
+    return result;
+}
+
+/* the effective flat-storage span limit: the constructor parameter, else the
+   FLIPJUMP_FLAT_MAX_WORDS environment variable, else the built-in default. */
+static uint64_t mem_flat_words_limit(MemoryObject* m)
+{
+    if (m->flat_max_words) {
+        return m->flat_max_words;
+    }
+    {
+        const char* env_limit = getenv("FLIPJUMP_FLAT_MAX_WORDS");
+        if (env_limit && env_limit[0]) {
+            uint64_t limit = strtoull(env_limit, NULL, 0);
+            if (limit) {
+                return limit;
+            }
+        }
+    }
+    return FLAT_MAX_WORDS_DEFAULT;
+}
+
+/* decide the storage mode (once, at the first run): the LOW WINDOW of memory - segment
+   data below the flat-words limit - gets a dense flat array (gaps carry the in-band bit-63
+   sentinel at w<=32, the FLAT_GARBAGE_MAGIC fill at w=64). the array is a demand-zero
+   mapping, so only the gaps are written (flat_fill_gaps) - the in-segment words cost RAM
+   once the program (or its loaded data) touches them.
+   when every segment fits inside the window the mode is 'flat' (exactly the historic
+   behavior); segments continuing or living above it stay page-backed and the mode is
+   'hybrid' - the run loop reads sub-window words from the array and falls back to the
+   paged helpers above it (FJ code lives low, so the hot op fetches stay flat even for
+   sieve-style programs whose data tables sit at 1<<63). copies the already-loaded
+   sub-window page data in; the pages are kept (see below). continue-mode uses the same
+   sentinels: a gap word costs nothing until the program touches it, and the first touch
+   materializes it in the array (flat_garbage). a failed/oversized flat allocation
+   WARNS to stderr and falls back to paged (set FLIPJUMP_NO_FLAT=1 to opt into paged silently);
+   but no segments, or no segment in the low window (the first op at address 0), RAISE - those
+   are malformed programs, not resource limits. */
+static int mem_decide_storage(MemoryObject* m)
+{
+    uint64_t max_end = 0, low_max_end = 0, limit, i;
+    Py_ssize_t seg;
+    if (m->storage_decided) {
+        return 0;
+    }
+    m->storage_decided = 1;
+
+    if (m->segment_count == 0) {
+        PyErr_SetString(PyExc_ValueError,
+                        "the program has no memory segments - a FlipJump program must define its "
+                        "first op at address 0");
+        return -1;
+    }
+    {
+        const char* no_flat = getenv("FLIPJUMP_NO_FLAT");
+        if (no_flat && no_flat[0] == '1') {
+            return 0; /* paged (forced - for A/B benchmarking and debugging) */
+        }
+    }
+    limit = mem_flat_words_limit(m);
+    for (seg = 0; seg < m->segment_count; seg++) {
+        const uint64_t start = m->segments[seg].start, end = m->segments[seg].end;
+        if (end > max_end) {
+            max_end = end;
+        }
+        if (start < limit) {
+            const uint64_t clamped_end = (end < limit) ? end : limit;
+            if (clamped_end > low_max_end) {
+                low_max_end = clamped_end;
+            }
+        }
+    }
+    if (low_max_end == 0) {
+        /* every segment lies at or above the flat window - impossible for a valid program,
+           whose first op occupies words 0..1 (a segment at address 0, far below the window) */
+        PyErr_SetString(PyExc_ValueError,
+                        "the program has no segment in the low address window - the first op at "
+                        "address 0 is missing");
+        return -1;
+    }
+    if (low_max_end > SIZE_MAX / sizeof(uint64_t)) {
+        fprintf(stderr, "flipjump: flat-storage window is too large (byte size overflows); running paged (slower). lower --flat-max-words / "
+                "FLIPJUMP_FLAT_MAX_WORDS, or set FLIPJUMP_NO_FLAT=1 to silence this.\n");
+        fflush(stderr);
+        return 0; /* paged fallback */
     }
 
     {
@@ -542,29 +1370,20 @@ static int mem_decide_storage(MemoryObject* m)
             return 0; /* paged fallback */
         }
     }
-    m->flat = (uint64_t*)malloc((size_t)low_max_end * sizeof(uint64_t));
+    m->flat = flat_alloc(low_max_end);
+    m->flat_count = low_max_end;
+    if (m->flat && flat_fill_gaps(m) < 0) {
+        flat_free(m->flat, low_max_end);
+        m->flat = NULL;
+    }
     if (!m->flat) {
+        m->flat_count = 0;
         fprintf(stderr, "flipjump: flat-storage allocation failed; running paged (slower). lower --flat-max-words / "
                 "FLIPJUMP_FLAT_MAX_WORDS, or set FLIPJUMP_NO_FLAT=1 to silence this.\n");
         fflush(stderr);
         return 0; /* paged fallback - the program still runs, just slower */
     }
-    m->flat_count = low_max_end;
     m->flat_covers_all = (max_end <= low_max_end);
-    {
-        const uint64_t garbage_fill = (m->w <= 32) ? GARBAGE_SENTINEL : FLAT_GARBAGE_MAGIC;
-        for (i = 0; i < low_max_end; i++) {
-            m->flat[i] = garbage_fill;
-        }
-    }
-    for (seg = 0; seg < m->segment_count; seg++) {
-        const uint64_t start = m->segments[seg].start;
-        const uint64_t end_clamped =
-            (m->segments[seg].end < low_max_end) ? m->segments[seg].end : low_max_end;
-        if (start < end_clamped) {
-            memset(m->flat + start, 0, (size_t)(end_clamped - start) * sizeof(uint64_t));
-        }
-    }
     /* copy the loaded in-segment data: each allocated page, intersected with each
        segment. the pages themselves are KEPT: out-of-segment memory (gaps between
        segments, addresses beyond the span) stays page-backed for the API/device
@@ -593,6 +1412,16 @@ static int mem_decide_storage(MemoryObject* m)
             }
         }
     }
+    /* continue-mode: the gap words materialized before the build (API writes) move in too */
+    for (i = 0; i < m->garbage_words.slot_count; i++) {
+        const uint64_t word_address = m->garbage_words.keys_plus1[i] - 1;
+        Page* page;
+        if (!m->garbage_words.keys_plus1[i] || word_address >= low_max_end) {
+            continue;
+        }
+        page = mem_find_page(m, word_address >> PAGE_BITS);
+        m->flat[word_address] = page ? page->words[word_address & PAGE_MASK] : 0;
+    }
     return 0;
 }
 
@@ -603,7 +1432,8 @@ static void mem_free_allocations(MemoryObject* self)
 {
     if (self->slots) {
         for (uint64_t i = 0; i < self->slot_count; i++) {
-            if (self->slots[i].key_plus1) {
+            /* a clone's shared pages belong to its image's frozen memory */
+            if (self->slots[i].key_plus1 && (self->frozen || !self->slots[i].page->shared)) {
                 free(self->slots[i].page->words);
                 free(self->slots[i].page);
             }
@@ -611,10 +1441,28 @@ static void mem_free_allocations(MemoryObject* self)
         free(self->slots);
         self->slots = NULL;
     }
-    free(self->flat);
+    flat_free(self->flat, self->flat_count);
     self->flat = NULL;
     free(self->segments);
     self->segments = NULL;
+    address_set_clear(&self->garbage_words);
+    address_set_clear(&self->break_addresses);
+    address_counts_clear(&self->samples);
+    free(self->coverage_bits);
+    self->coverage_bits = NULL;
+    self->coverage_ops = 0;
+    address_set_clear(&self->coverage_far);
+    free(self->watch_ranges);
+    self->watch_ranges = NULL;
+    self->watch_count = 0;
+    free(self->trace_buffer);
+    self->trace_buffer = NULL;
+    Py_CLEAR(self->trace_write);
+    Py_CLEAR(self->progress_callback);
+    pd_free(self->pd);
+    self->pd = NULL;
+    self->pd_stale = 0;
+    Py_CLEAR(self->image);
 }
 
 static int Memory_init(PyObject* op, PyObject* args, PyObject* kwds)
@@ -630,11 +1478,20 @@ static int Memory_init(PyObject* op, PyObject* args, PyObject* kwds)
         PyErr_SetString(PyExc_ValueError, "memory_width must be 8, 16, 32 or 64");
         return -1;
     }
+    if (self->running_thread) {
+        PyErr_SetString(PyExc_RuntimeError, "cannot re-initialize a running memory");
+        return -1;
+    }
+    if (self->frozen) {
+        PyErr_SetString(PyExc_RuntimeError, "cannot re-initialize a program image's memory");
+        return -1;
+    }
     mem_free_allocations(self); /* __init__ may be called again on a live object */
     self->w = w;
     self->ww = (w == 8) ? 3 : (w == 16) ? 4 : (w == 32) ? 5 : 6;
     self->word_mask = (w == 64) ? ~0ull : ((1ull << w) - 1);
     self->garbage_stop = garbage_stop;
+    self->garbage_callback = NULL;
     self->slots = NULL;
     self->slot_count = 0;
     self->slots_used = 0;
@@ -658,8 +1515,36 @@ static int Memory_init(PyObject* op, PyObject* args, PyObject* kwds)
     self->spec_ops = 0;
     self->spec_first = 0;
     self->spec_misses = 0;
+    self->last_run_flip_count = 0;
+    self->last_run_jump_count = 0;
+    self->last_run_ip = 0;
+    self->max_ops = 0;
+    self->break_on_io = 0;
+    self->sample_every = 0;
+    self->sample_countdown = 0;
+    self->coverage = 0;
+    self->watch_hit = 0;
+    self->read_bytes = NULL;
+    self->write_bytes = NULL;
+    self->out_buffer = NULL;
+    self->out_buffer_size = 0;
+    self->out_buffer_used = 0;
+    self->out_byte = 0;
+    self->out_bit_count = 0;
+    self->out_byte_in_device = 0;
+    self->in_byte = 0;
+    self->in_bits_left = 0;
+    self->releases_gil = 0;
+    self->released_thread = NULL;
+    self->running_thread = 0;
     self->last_run_op_count = 0;
     self->last_run_paused_seconds = 0.0;
+    self->frozen = 0;
+    self->image = NULL;
+    {
+        const char* predecode = getenv("FLIPJUMP_PREDECODE");
+        self->predecode = predecode && predecode[0] == '1';
+    }
     return 0;
 }
 
@@ -674,61 +1559,93 @@ static void Memory_dealloc(PyObject* op)
     Py_DECREF(type); /* heap types own a reference from their instances */
 }
 
-static PyObject* Memory_add_segment(MemoryObject* self, PyObject* args)
+static int mem_add_segment(MemoryObject* m, uint64_t start_word, uint64_t length_words)
 {
-    unsigned long long start_word, length_words;
-    if (!PyArg_ParseTuple(args, "KK", &start_word, &length_words)) {
-        return NULL;
-    }
     /* reject overflowing ranges - a wrapped end would corrupt the flat-array build
        (memset/memcpy with a wild size) and the validity binary-search invariants */
     if (start_word + length_words < start_word) {
         PyErr_SetString(PyExc_ValueError, "segment range overflows the 64-bit word-address space");
-        return NULL;
+        return -1;
     }
-    if (self->segment_count == self->segment_capacity) {
-        Py_ssize_t new_capacity = self->segment_capacity ? self->segment_capacity * 2 : 8;
-        SegmentRange* new_segments = (SegmentRange*)realloc(self->segments, (size_t)new_capacity * sizeof(SegmentRange));
+    if (m->segment_count == m->segment_capacity) {
+        Py_ssize_t new_capacity = m->segment_capacity ? m->segment_capacity * 2 : 8;
+        SegmentRange* new_segments = (SegmentRange*)realloc(m->segments, (size_t)new_capacity * sizeof(SegmentRange));
         if (!new_segments) {
-            return PyErr_NoMemory();
+            PyErr_NoMemory();
+            return -1;
         }
-        self->segments = new_segments;
-        self->segment_capacity = new_capacity;
+        m->segments = new_segments;
+        m->segment_capacity = new_capacity;
     }
-    self->segments[self->segment_count].start = start_word;
-    self->segments[self->segment_count].end = start_word + length_words;
-    self->segment_count++;
-    self->segments_sorted = 0;
+    m->segments[m->segment_count].start = start_word;
+    m->segments[m->segment_count].end = start_word + length_words;
+    m->segment_count++;
+    m->segments_sorted = 0;
     /* validity ranges of already-allocated pages may change - recompute them */
-    if (self->slots) {
-        for (uint64_t i = 0; i < self->slot_count; i++) {
-            if (self->slots[i].key_plus1) {
-                page_compute_validity(self, self->slots[i].key_plus1 - 1, self->slots[i].page);
+    if (m->slots) {
+        for (uint64_t i = 0; i < m->slot_count; i++) {
+            if (m->slots[i].key_plus1) {
+                if (m->slots[i].page->shared && page_unshare(m, &m->slots[i]) < 0) {
+                    return -1;
+                }
+                page_compute_validity(m, m->slots[i].key_plus1 - 1, m->slots[i].page);
             }
         }
     }
+    return 0;
+}
+
+static PyObject* Memory_add_segment(MemoryObject* self, PyObject* args)
+{
+    unsigned long long start_word, length_words;
+    if (!PyArg_ParseTuple(args, "KK", &start_word, &length_words) || mem_unavailable(self)) {
+        return NULL;
+    }
+    if (mem_add_segment(self, start_word, length_words) < 0) {
+        return NULL;
+    }
     Py_RETURN_NONE;
 }
 
-static PyObject* Memory_set_word(MemoryObject* self, PyObject* args)
+/* store a word from outside the program (the API, the loader); -1 on MemoryError */
+static int mem_store_word(MemoryObject* m, uint64_t word_address, uint64_t value)
 {
-    unsigned long long word_address, value;
     Page* page;
-    if (!PyArg_ParseTuple(args, "KK", &word_address, &value)) {
-        return NULL;
+    if (!m->garbage_stop && !word_is_valid(m, word_address)) {
+        /* continue-mode: an API-written gap word is real memory from now on - the program
+           reads it back without a garbage report (like the python Reader's memory dict) */
+        if (address_set_insert(&m->garbage_words, word_address) < 0) {
+            return -1;
+        }
     }
-    if (self->flat && word_address < self->flat_count && flat_seg_contains(self, word_address)) {
-        self->flat[word_address] = value & self->word_mask;
-        Py_RETURN_NONE;
+    if (flat_routes(m, word_address)) {
+        if (m->pd && word_address < m->pd->words && pd_bit(m->pd->guarded, word_address)) {
+            m->pd_stale = 1; /* re-decoded from the new words */
+        }
+        m->flat[word_address] = value & m->word_mask;
+        return 0;
     }
     /* out-of-segment (or paged mode): page-backed - device/API memory beyond the declared
        segments behaves exactly as in paged mode (the program itself cannot touch it under
-       garbage-stop, so the flat array and the pages never alias). */
-    page = mem_get_page(self, word_address >> PAGE_BITS);
+       garbage-stop, and continue-mode routes the words it touched to flat, so the flat
+       array and the pages never alias). */
+    page = mem_get_page(m, word_address >> PAGE_BITS);
     if (!page) {
+        return -1;
+    }
+    page->words[word_address & PAGE_MASK] = value & m->word_mask;
+    return 0;
+}
+
+static PyObject* Memory_set_word(MemoryObject* self, PyObject* args)
+{
+    unsigned long long word_address, value;
+    if (!PyArg_ParseTuple(args, "KK", &word_address, &value) || mem_unavailable(self)) {
+        return NULL;
+    }
+    if (mem_store_word(self, word_address, value) < 0) {
         return NULL;
     }
-    page->words[word_address & PAGE_MASK] = value & self->word_mask;
     Py_RETURN_NONE;
 }
 
@@ -736,10 +1653,10 @@ static PyObject* Memory_get_word(MemoryObject* self, PyObject* args)
 {
     unsigned long long word_address;
     Page* page;
-    if (!PyArg_ParseTuple(args, "K", &word_address)) {
+    if (!PyArg_ParseTuple(args, "K", &word_address) || mem_unavailable(self)) {
         return NULL;
     }
-    if (self->flat && word_address < self->flat_count && flat_seg_contains(self, word_address)) {
+    if (flat_routes(self, word_address)) {
         return PyLong_FromUnsignedLongLong(self->flat[word_address]);
     }
     /* out-of-segment (or paged mode): page-backed - see set_word */
@@ -756,7 +1673,7 @@ static PyObject* Memory_set_words(MemoryObject* self, PyObject* args)
     unsigned long long start_word;
     PyObject* values;
     Py_ssize_t count, i;
-    if (!PyArg_ParseTuple(args, "KO", &start_word, &values)) {
+    if (!PyArg_ParseTuple(args, "KO", &start_word, &values) || mem_unavailable(self)) {
         return NULL;
     }
     count = PySequence_Size(values);
@@ -787,6 +1704,7 @@ static PyObject* Memory_set_words(MemoryObject* self, PyObject* args)
             return NULL;
         }
         if (self->flat) {
+            self->pd_stale = 1;
             self->flat[start_word + i] = value & self->word_mask;
             continue;
         }
@@ -801,78 +1719,953 @@ static PyObject* Memory_set_words(MemoryObject* self, PyObject* args)
     Py_RETURN_NONE;
 }
 
-#define CAUSE_PYTHON_ERROR (-2)
-
-/* ------------------------------------------------ speculation measurement
-
-   measures the would-be miss-rate of jump-target speculation: remember the last jump
-   word per executed ip; an execution whose jump word differs from the previous execution
-   of the same ip is a miss. enabled with FLIPJUMP_MEASURE_SPECULATION=1 - it runs a
-   dedicated slow reference-style loop (works for flat AND paged storage, any width), so
-   the normal run-loops' hot paths are completely untouched. */
-
-typedef struct {
-    uint64_t ip_plus1; /* ip + 1; 0 marks an empty slot */
-    uint64_t jump_word;
-} SpecSlot;
+static int host_is_little_endian(void)
+{
+    const uint16_t probe = 1;
+    return *(const unsigned char*)&probe == 1;
+}
 
-typedef struct {
-    SpecSlot* slots; /* open-addressing, power-of-two sized */
-    uint64_t slot_count;
-    uint64_t slots_used;
-} SpecShadow;
+/* read the little-endian word at data (word_bytes bytes) */
+static inline uint64_t load_le_word(const unsigned char* data, int word_bytes)
+{
+    uint64_t value = 0;
+    for (int i = word_bytes - 1; i >= 0; i--) {
+        value = (value << 8) | data[i];
+    }
+    return value;
+}
 
-static int spec_grow(SpecShadow* shadow)
+/* parse the .fjm segment table's seg-th entry into fields (segment_start, segment_length,
+   data_start, data_length). returns -1 with a python error set on failure. */
+static int fjm_segment_fields(PyObject* segments, Py_ssize_t seg, unsigned long long fields[4])
 {
-    uint64_t new_count = shadow->slot_count ? shadow->slot_count * 2 : (1ull << 16);
-    SpecSlot* new_slots = (SpecSlot*)calloc((size_t)new_count, sizeof(SpecSlot));
-    uint64_t i;
-    if (!new_slots) {
-        PyErr_NoMemory();
+    PyObject* item = PySequence_GetItem(segments, seg);
+    PyObject* tuple;
+    int parsed;
+    if (!item) {
         return -1;
     }
-    for (i = 0; i < shadow->slot_count; i++) {
-        if (shadow->slots[i].ip_plus1) {
-            uint64_t h = (shadow->slots[i].ip_plus1 * 0x9E3779B97F4A7C15ull) & (new_count - 1);
-            while (new_slots[h].ip_plus1) {
-                h = (h + 1) & (new_count - 1);
-            }
-            new_slots[h] = shadow->slots[i];
-        }
+    tuple = PySequence_Tuple(item);
+    Py_DECREF(item);
+    if (!tuple) {
+        return -1;
     }
-    free(shadow->slots);
-    shadow->slots = new_slots;
-    shadow->slot_count = new_count;
-    return 0;
+    parsed = PyArg_ParseTuple(tuple, "KKKK", &fields[0], &fields[1], &fields[2], &fields[3]);
+    Py_DECREF(tuple);
+    return parsed ? 0 : -1;
 }
 
-/* record one executed (ip, jump_word): bumps spec_first or spec_misses. -1 on alloc fail. */
-static int spec_record(SpecShadow* shadow, MemoryObject* m, uint64_t ip, uint64_t jump_word)
+/* store the loaded word at word_address - the offset-th word of a segment_length-word segment -
+   into the decided storage. returns -1 with a python error set on failure. */
+static int mem_load_word(MemoryObject* m, uint64_t word_address, uint64_t offset, uint64_t segment_length,
+                         uint64_t value)
 {
-    uint64_t key = ip + 1, h;
-    if (shadow->slots_used * 2 >= shadow->slot_count) {
-        if (spec_grow(shadow) < 0) {
+    if (offset >= segment_length) { /* data beyond the segment's end - stored like set_word */
+        return mem_store_word(m, word_address, value);
+    }
+    if (word_address < m->flat_count) {
+        m->pd_stale = 1;
+        m->flat[word_address] = value;
+    } else {
+        Page* page = mem_get_page(m, word_address >> PAGE_BITS);
+        if (!page) {
             return -1;
         }
+        page->words[word_address & PAGE_MASK] = value;
     }
-    h = (key * 0x9E3779B97F4A7C15ull) & (shadow->slot_count - 1);
-    while (shadow->slots[h].ip_plus1) {
-        if (shadow->slots[h].ip_plus1 == key) {
-            if (shadow->slots[h].jump_word != jump_word) {
-                m->spec_misses++;
-                shadow->slots[h].jump_word = jump_word;
-            }
-            return 0;
-        }
+    return 0;
+}
+
+/* load_fjm(segments, data, relative_jumps) - load a whole .fjm program: add its segments,
+   decide the storage mode (flat/hybrid/paged, see mem_decide_storage) and write the data
+   words straight into it. segments holds the .fjm segment table - (segment_start,
+   segment_length, data_start, data_length) tuples, in words; data is the (decompressed)
+   data pool as bytes of little-endian words. relative_jumps: the jump words are stored
+   relative to their own bit-address (the RelativeJump / Compressed versions). */
+static PyObject* Memory_load_fjm(MemoryObject* self, PyObject* args)
+{
+    PyObject* segments;
+    PyObject* data;
+    int relative_jumps;
+    char* data_bytes;
+    Py_ssize_t data_size, segment_count, seg;
+    uint64_t data_words;
+    const int word_bytes = self->w / 8;
+    if (!PyArg_ParseTuple(args, "OOp", &segments, &data, &relative_jumps) || mem_unavailable(self)) {
+        return NULL;
+    }
+    if (self->storage_decided) {
+        PyErr_SetString(PyExc_RuntimeError, "load_fjm must be called on a new memory (before any run)");
+        return NULL;
+    }
+    /* bytes are read in place (no copy) - the limited API has no buffer protocol before 3.11 */
+    if (PyBytes_AsStringAndSize(data, &data_bytes, &data_size) < 0) {
+        return NULL;
+    }
+    if (data_size % word_bytes != 0) {
+        PyErr_SetString(PyExc_ValueError, "the data size isn't a whole number of words");
+        return NULL;
+    }
+    data_words = (uint64_t)data_size / (uint64_t)word_bytes;
+    segment_count = PySequence_Size(segments);
+    if (segment_count < 0) {
+        return NULL;
+    }
+
+    for (seg = 0; seg < segment_count; seg++) {
+        unsigned long long fields[4]; /* segment_start, segment_length, data_start, data_length */
+        if (fjm_segment_fields(segments, seg, fields) < 0) {
+            return NULL;
+        }
+        if (fields[3] % 2 != 0 || fields[2] > data_words || fields[3] > data_words - fields[2]) {
+            PyErr_Format(PyExc_ValueError,
+                         "bad segment %zd: its data must be whole ops, inside the %llu-word data pool", seg,
+                         (unsigned long long)data_words);
+            return NULL;
+        }
+        if (mem_add_segment(self, fields[0], fields[1]) < 0) {
+            return NULL;
+        }
+    }
+    if (self->segment_count && mem_decide_storage(self) < 0) {
+        return NULL;
+    }
+
+    /* second pass: the storage is decided, write the data words straight into it */
+    for (seg = 0; seg < segment_count; seg++) {
+        unsigned long long fields[4];
+        uint64_t i;
+        if (fjm_segment_fields(segments, seg, fields) < 0) {
+            return NULL;
+        }
+        for (i = 0; i < fields[3]; i++) {
+            const uint64_t word_address = fields[0] + i;
+            uint64_t value = load_le_word((const unsigned char*)data_bytes + (fields[2] + i) * word_bytes, word_bytes);
+            if (relative_jumps && (i & 1)) {
+                value += word_address * (uint64_t)self->w; /* the jump word, relative to its bit-address */
+            }
+            if (mem_load_word(self, word_address, i, fields[1], value & self->word_mask) < 0) {
+                return NULL;
+            }
+        }
+    }
+    Py_RETURN_NONE;
+}
+
+#ifndef _WIN32
+/* map_fjm(fd, segments) - load a whole MappedVersion .fjm program from its open file (fd): like
+   load_fjm, but each data_start in segments is the file offset of its segment's data - absolute
+   little-endian words. the data is read from a read-only mapping of the file; and at w=64, the
+   whole pages of the segments' data inside the flat window are mapped from the file in place
+   (MAP_PRIVATE - copy-on-write: the program's writes copy their page, the file never changes),
+   wherever the file offset and the window address agree modulo the page size (the mapped version's
+   layout, see fjm_consts). so a big data segment is loaded by the kernel, a page on its first read;
+   its untouched pages are the page cache's, shared by all the runs of the file.
+   the file must not be truncated while the memory lives (the writer replaces the file instead). */
+static PyObject* Memory_map_fjm(MemoryObject* self, PyObject* args)
+{
+    int fd;
+    PyObject* segments;
+    struct stat file_stat;
+    unsigned char* file_view = NULL;
+    uint64_t file_size;
+    Py_ssize_t segment_count, seg;
+    PyObject* result = NULL;
+    const int word_bytes = self->w / 8;
+    const long page_size = sysconf(_SC_PAGESIZE);
+    if (!PyArg_ParseTuple(args, "iO", &fd, &segments) || mem_unavailable(self)) {
+        return NULL;
+    }
+    if (self->storage_decided) {
+        PyErr_SetString(PyExc_RuntimeError, "map_fjm must be called on a new memory (before any run)");
+        return NULL;
+    }
+    if (fstat(fd, &file_stat) < 0) {
+        return PyErr_SetFromErrno(PyExc_OSError);
+    }
+    file_size = (uint64_t)file_stat.st_size;
+    segment_count = PySequence_Size(segments);
+    if (segment_count < 0) {
+        return NULL;
+    }
+
+    for (seg = 0; seg < segment_count; seg++) {
+        unsigned long long fields[4]; /* segment_start, segment_length, data_offset, data_length */
+        if (fjm_segment_fields(segments, seg, fields) < 0) {
+            return NULL;
+        }
+        if (fields[3] % 2 != 0 || fields[2] > file_size || fields[3] > (file_size - fields[2]) / word_bytes) {
+            PyErr_Format(PyExc_ValueError, "bad segment %zd: its data must be whole ops, inside the %llu-byte file",
+                         seg, (unsigned long long)file_size);
+            return NULL;
+        }
+        if (mem_add_segment(self, fields[0], fields[1]) < 0) {
+            return NULL;
+        }
+    }
+    if (self->segment_count && mem_decide_storage(self) < 0) {
+        return NULL;
+    }
+    if (file_size > SIZE_MAX) {
+        PyErr_SetString(PyExc_OverflowError, "the file is too big to map");
+        return NULL;
+    }
+    if (file_size) {
+        file_view = (unsigned char*)mmap(NULL, (size_t)file_size, PROT_READ, MAP_PRIVATE, fd, 0);
+        if (file_view == MAP_FAILED) {
+            return PyErr_SetFromErrno(PyExc_OSError);
+        }
+    }
+
+    /* second pass: the storage is decided, map (or copy) the data words into it */
+    for (seg = 0; seg < segment_count; seg++) {
+        unsigned long long fields[4];
+        uint64_t mapped_start = 0, mapped_end = 0, i;
+        if (fjm_segment_fields(segments, seg, fields) < 0) {
+            goto done;
+        }
+#ifdef MAP_ANONYMOUS /* the flat array is an anonymous mapping (see flat_alloc) */
+        if (self->w == 64 && host_is_little_endian() && page_size > 0 && fields[0] < self->flat_count) {
+            /* the segment's data words in the flat window, and their whole pages */
+            const uint64_t page_words = (uint64_t)page_size / sizeof(uint64_t);
+            const uint64_t window_words = self->flat_count - fields[0];
+            const uint64_t in_window = (fields[3] < fields[1]) ? fields[3] : fields[1];
+            const uint64_t flat_words = (in_window < window_words) ? in_window : window_words;
+            const uintptr_t first_byte = (uintptr_t)(self->flat + fields[0]);
+            if (first_byte % (uint64_t)page_size == fields[2] % (uint64_t)page_size) {
+                mapped_start = (page_words - (first_byte / sizeof(uint64_t)) % page_words) % page_words;
+                mapped_end = mapped_start;
+                if (mapped_start < flat_words) {
+                    mapped_end += (flat_words - mapped_start) / page_words * page_words;
+                }
+            }
+            if (mapped_end > mapped_start) {
+                void* const target = self->flat + fields[0] + mapped_start;
+                const size_t bytes = (size_t)(mapped_end - mapped_start) * sizeof(uint64_t);
+                if (mmap(target, bytes, PROT_READ | PROT_WRITE, MAP_PRIVATE | MAP_FIXED, fd,
+                         (off_t)(fields[2] + mapped_start * sizeof(uint64_t))) == MAP_FAILED) {
+                    /* a failed MAP_FIXED may have unmapped the range: restore it (then copy) */
+                    if (mmap(target, bytes, PROT_READ | PROT_WRITE, MAP_PRIVATE | MAP_ANONYMOUS | MAP_FIXED, -1, 0)
+                        == MAP_FAILED) {
+                        PyErr_SetFromErrno(PyExc_OSError);
+                        goto done;
+                    }
+                    mapped_end = mapped_start;
+                }
+                self->pd_stale = 1;
+            }
+        }
+#endif
+        for (i = 0; i < fields[3]; i++) {
+            if (i == mapped_start && mapped_end > mapped_start) {
+                i = mapped_end - 1; /* already mapped */
+                continue;
+            }
+            if (mem_load_word(self, fields[0] + i, i, fields[1],
+                              load_le_word(file_view + fields[2] + i * word_bytes, word_bytes) & self->word_mask)
+                < 0) {
+                goto done;
+            }
+        }
+    }
+    Py_INCREF(Py_None);
+    result = Py_None;
+done:
+    if (file_view) {
+        munmap(file_view, (size_t)file_size);
+    }
+    return result;
+}
+#endif
+
+/* set_breakpoints(bit_addresses) - replace the featured loop's break-address set */
+static PyObject* Memory_set_breakpoints(MemoryObject* self, PyObject* addresses)
+{
+    PyObject* iterator;
+    PyObject* item;
+    if (mem_unavailable(self)) {
+        return NULL;
+    }
+    iterator = PyObject_GetIter(addresses);
+    if (!iterator) {
+        return NULL;
+    }
+    address_set_clear(&self->break_addresses);
+    while ((item = PyIter_Next(iterator))) {
+        unsigned long long address = PyLong_AsUnsignedLongLong(item);
+        Py_DECREF(item);
+        if ((address == (unsigned long long)-1 && PyErr_Occurred()) ||
+            address_set_insert(&self->break_addresses, address) < 0) {
+            Py_DECREF(iterator);
+            return NULL;
+        }
+    }
+    Py_DECREF(iterator);
+    if (PyErr_Occurred()) {
+        return NULL;
+    }
+    Py_RETURN_NONE;
+}
+
+/* set_sampling(every_ops) - the sampling profiler: from now on, every every_ops ops (of any
+   run loop but the speculation-measuring one), count the ip of the next op. 0 turns it off.
+   the samples accumulate until take_samples(). */
+static PyObject* Memory_set_sampling(MemoryObject* self, PyObject* every_ops)
+{
+    unsigned long long every = PyLong_AsUnsignedLongLong(every_ops);
+    if (every == (unsigned long long)-1 && PyErr_Occurred()) {
+        return NULL;
+    }
+    if (mem_unavailable(self)) {
+        return NULL;
+    }
+    self->sample_every = every;
+    self->sample_countdown = every;
+    Py_RETURN_NONE;
+}
+
+/* take_samples() -> {ip: count} - the samples so far (and clear them) */
+static PyObject* Memory_take_samples(MemoryObject* self, PyObject* Py_UNUSED(ignored))
+{
+    PyObject* samples;
+    if (mem_unavailable(self)) {
+        return NULL;
+    }
+    samples = PyDict_New();
+    if (!samples) {
+        return NULL;
+    }
+    for (uint64_t i = 0; i < self->samples.slot_count; i++) {
+        PyObject *address, *count;
+        int failed;
+        if (!self->samples.keys_plus1[i]) {
+            continue;
+        }
+        address = PyLong_FromUnsignedLongLong(self->samples.keys_plus1[i] - 1);
+        count = PyLong_FromUnsignedLongLong(self->samples.counts[i]);
+        failed = !address || !count || PyDict_SetItem(samples, address, count) < 0;
+        Py_XDECREF(address);
+        Py_XDECREF(count);
+        if (failed) {
+            Py_DECREF(samples);
+            return NULL;
+        }
+    }
+    address_counts_clear(&self->samples);
+    return samples;
+}
+
+/* set_coverage(enabled) - the execution coverage: from now on, the runs (of any run loop but
+   the speculation-measuring one) mark every op they execute. the marks accumulate until
+   take_coverage(). */
+static PyObject* Memory_set_coverage(MemoryObject* self, PyObject* enabled)
+{
+    int is_enabled = PyObject_IsTrue(enabled);
+    if (is_enabled < 0) {
+        return NULL;
+    }
+    if (mem_unavailable(self)) {
+        return NULL;
+    }
+    self->coverage = is_enabled;
+    Py_RETURN_NONE;
+}
+
+/* set_predecode(enabled) - run the flat runs without the other features on the pre-decoding tier
+   (see pd_decode); defaults to FLIPJUMP_PREDECODE=1. the decoded blocks persist across runs. */
+static PyObject* Memory_set_predecode(MemoryObject* self, PyObject* enabled)
+{
+    int is_enabled = PyObject_IsTrue(enabled);
+    if (is_enabled < 0) {
+        return NULL;
+    }
+    if (mem_unavailable(self)) {
+        return NULL;
+    }
+    self->predecode = is_enabled;
+    Py_RETURN_NONE;
+}
+
+/* set_progress(callback, interval_seconds) - call callback(ops, ip, paused_seconds) - the running
+   run's op count, its next op and its IO-paused time so far - every interval_seconds from now, over
+   the following runs (checked at the signal checks - every 2^18 ops); set_progress(None, 0) stops it. */
+static PyObject* Memory_set_progress(MemoryObject* self, PyObject* args)
+{
+    PyObject* callback;
+    double interval;
+    if (!PyArg_ParseTuple(args, "Od", &callback, &interval)) {
+        return NULL;
+    }
+    if (mem_unavailable(self)) {
+        return NULL;
+    }
+    if (self->running_thread) { /* e.g. from the progress callback itself */
+        PyErr_SetString(PyExc_RuntimeError, "cannot change the progress reports of a running memory");
+        return NULL;
+    }
+    if (callback == Py_None) {
+        Py_CLEAR(self->progress_callback);
+        Py_RETURN_NONE;
+    }
+    if (!PyCallable_Check(callback)) {
+        PyErr_SetString(PyExc_TypeError, "set_progress expects a callable (or None)");
+        return NULL;
+    }
+    if (!(interval > 0)) {
+        PyErr_SetString(PyExc_ValueError, "the progress interval must be positive");
+        return NULL;
+    }
+    Py_INCREF(callback);
+    Py_XDECREF(self->progress_callback);
+    self->progress_callback = callback;
+    self->progress_interval = interval;
+    self->progress_next = monotonic_seconds() + interval;
+    Py_RETURN_NONE;
+}
+
+/* report the run's progress, if its interval has passed (see set_progress). called from the
+   signal checks. returns 0, or -1 with the callback's python error set. */
+static int progress_report(MemoryObject* m, uint64_t ops, uint64_t ip, double paused_seconds)
+{
+    double now;
+    PyObject* result;
+    if (!m->progress_callback || ops == 0) { /* a run's (or slice's) first check has nothing to report */
+        return 0;
+    }
+    now = monotonic_seconds();
+    if (now < m->progress_next) {
+        return 0;
+    }
+    m->progress_next = now + m->progress_interval;
+    fj_hold_gil(m); /* io_flush_output, before it, may release it */
+    result = PyObject_CallFunction(m->progress_callback, "KKd", (unsigned long long)ops, (unsigned long long)ip,
+                                   paused_seconds);
+    Py_XDECREF(result);
+    fj_release_gil(m);
+    return result ? 0 : -1;
+}
+
+/* take_coverage() -> (bitmap, other_ips) - the executed ops so far (and clear them): the bitmap
+   bytes (the op at bit-address i*2w is bit i%8 of byte i/8), and the sorted list of the other
+   executed ips (unaligned, or above the bitmap) */
+static PyObject* Memory_take_coverage(MemoryObject* self, PyObject* Py_UNUSED(ignored))
+{
+    PyObject *bitmap, *other_ips;
+    if (mem_unavailable(self)) {
+        return NULL;
+    }
+    bitmap = PyBytes_FromStringAndSize((const char*)self->coverage_bits, (Py_ssize_t)(self->coverage_ops / 8));
+    other_ips = PyList_New(0);
+    if (!bitmap || !other_ips) {
+        Py_XDECREF(bitmap);
+        Py_XDECREF(other_ips);
+        return NULL;
+    }
+    for (uint64_t i = 0; i < self->coverage_far.slot_count; i++) {
+        PyObject* ip;
+        int failed;
+        if (!self->coverage_far.keys_plus1[i]) {
+            continue;
+        }
+        ip = PyLong_FromUnsignedLongLong(self->coverage_far.keys_plus1[i] - 1);
+        failed = !ip || PyList_Append(other_ips, ip) < 0;
+        Py_XDECREF(ip);
+        if (failed) {
+            Py_DECREF(bitmap);
+            Py_DECREF(other_ips);
+            return NULL;
+        }
+    }
+    if (PyList_Sort(other_ips) < 0) {
+        Py_DECREF(bitmap);
+        Py_DECREF(other_ips);
+        return NULL;
+    }
+    if (self->coverage_bits) {
+        memset(self->coverage_bits, 0, (size_t)(self->coverage_ops / 8));
+    }
+    address_set_clear(&self->coverage_far);
+    return Py_BuildValue("NN", bitmap, other_ips);
+}
+
+/* size the coverage bitmap to the segments' ops below the flat-storage limit - at the start of
+   every covered run, as segments may have been added since the last one */
+static int coverage_prepare(MemoryObject* m)
+{
+    uint64_t words, ops;
+    unsigned char* bits;
+    mem_ensure_segments_sorted(m);
+    words = m->segment_count ? m->segments[m->segment_count - 1].end : 0;
+    if (words > mem_flat_words_limit(m)) {
+        words = mem_flat_words_limit(m);
+    }
+    ops = (words / 2 + 7) & ~7ull;
+    if (ops <= m->coverage_ops) {
+        return 0;
+    }
+    bits = (unsigned char*)realloc(m->coverage_bits, (size_t)(ops / 8));
+    if (!bits) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    memset(bits + m->coverage_ops / 8, 0, (size_t)((ops - m->coverage_ops) / 8));
+    m->coverage_bits = bits;
+    m->coverage_ops = ops;
+    return 0;
+}
+
+/* mark an executed op outside the coverage bitmap. may run without the GIL (it takes it for the
+   set's allocation): returns 0, or -1 with a python error set (and the GIL held). */
+static int coverage_mark_far(MemoryObject* m, uint64_t ip)
+{
+    fj_hold_gil(m);
+    if (address_set_insert(&m->coverage_far, ip) < 0) {
+        return -1;
+    }
+    fj_release_gil(m);
+    return 0;
+}
+
+/* mark the op at ip executed. op_shift is log2(2w). returns 0, or -1 with a python error set. */
+static FJ_ALWAYS_INLINE int coverage_mark(MemoryObject* m, uint64_t ip, const uint64_t op_shift)
+{
+    const uint64_t op_index = ip >> op_shift;
+    if (op_index < m->coverage_ops && !(ip & ((1ull << op_shift) - 1))) {
+        m->coverage_bits[op_index >> 3] |= (unsigned char)(1u << (op_index & 7));
+        return 0;
+    }
+    return coverage_mark_far(m, ip);
+}
+
+static int bit_range_compare(const void* a, const void* b)
+{
+    const BitRange* ra = (const BitRange*)a;
+    const BitRange* rb = (const BitRange*)b;
+    return (ra->start > rb->start) - (ra->start < rb->start);
+}
+
+/* set_watchpoints(ranges) - replace the write watchpoints: an iterable of (start, end)
+   bit-address ranges (end exclusive; empty ranges are ignored). from now on, the runs (of any
+   run loop but the speculation-measuring one) stop right after an op that flips a watched bit. */
+static PyObject* Memory_set_watchpoints(MemoryObject* self, PyObject* ranges)
+{
+    PyObject* iterator;
+    PyObject* item;
+    BitRange* watch_ranges = NULL;
+    Py_ssize_t count = 0, capacity = 0, merged = 0;
+    if (mem_unavailable(self)) {
+        return NULL;
+    }
+    iterator = PyObject_GetIter(ranges);
+    if (!iterator) {
+        return NULL;
+    }
+    while ((item = PyIter_Next(iterator))) {
+        unsigned long long start, end;
+        int parsed = PyArg_ParseTuple(item, "KK;a watchpoint is a (start, end) range", &start, &end);
+        Py_DECREF(item);
+        if (!parsed) {
+            break;
+        }
+        if (start >= end) {
+            continue;
+        }
+        if (count == capacity) {
+            BitRange* grown;
+            capacity = capacity ? 2 * capacity : 8;
+            grown = (BitRange*)realloc(watch_ranges, (size_t)capacity * sizeof(BitRange));
+            if (!grown) {
+                PyErr_NoMemory();
+                break;
+            }
+            watch_ranges = grown;
+        }
+        watch_ranges[count].start = start;
+        watch_ranges[count].end = end;
+        count++;
+    }
+    Py_DECREF(iterator);
+    if (PyErr_Occurred()) {
+        free(watch_ranges);
+        return NULL;
+    }
+
+    if (count) {
+        qsort(watch_ranges, (size_t)count, sizeof(BitRange), bit_range_compare);
+        for (Py_ssize_t i = 1; i < count; i++) {
+            if (watch_ranges[i].start <= watch_ranges[merged].end) {
+                if (watch_ranges[i].end > watch_ranges[merged].end) {
+                    watch_ranges[merged].end = watch_ranges[i].end;
+                }
+            } else {
+                watch_ranges[++merged] = watch_ranges[i];
+            }
+        }
+        merged++;
+    }
+    free(self->watch_ranges);
+    self->watch_ranges = watch_ranges;
+    self->watch_count = merged;
+    Py_RETURN_NONE;
+}
+
+/* is the bit-address watched? (a binary search of the merged ranges) */
+static int watch_contains(const MemoryObject* m, uint64_t bit_address)
+{
+    Py_ssize_t low = 0, high = m->watch_count;
+    while (low < high) {
+        const Py_ssize_t middle = low + (high - low) / 2;
+        if (bit_address < m->watch_ranges[middle].start) {
+            high = middle;
+        } else if (bit_address >= m->watch_ranges[middle].end) {
+            low = middle + 1;
+        } else {
+            return 1;
+        }
+    }
+    return 0;
+}
+
+/* the watched flip of the op at ip: flip the bit through the generic helpers, and keep the hit -
+   the word holding the bit, before and after the flip. may run without the GIL (like the
+   helpers). returns 0 on success, -1 on stop (as mem_flip_bit). */
+static int watch_flip(MemoryObject* m, uint64_t ip, uint64_t bit_address)
+{
+    const uint64_t word_address = bit_address >> m->ww;
+    uint64_t old_word, new_word;
+    if (mem_read_word(m, word_address, &old_word) < 0 || mem_flip_bit(m, bit_address) < 0 ||
+        mem_read_word(m, word_address, &new_word) < 0) {
+        return -1;
+    }
+    m->watch_hit = 1;
+    m->watch_hit_ip = ip;
+    m->watch_hit_bit_address = bit_address;
+    m->watch_hit_old_word = old_word;
+    m->watch_hit_new_word = new_word;
+    return 0;
+}
+
+#define CAUSE_PYTHON_ERROR (-2)
+
+/* set_trace(write) - stream the execution trace (see MemoryObject.trace_write) to write(chunk),
+   from the next run on (of any run loop but the speculation-measuring one); set_trace(None)
+   stops it. each run hands its last chunk over before it returns. */
+static PyObject* Memory_set_trace(MemoryObject* self, PyObject* write)
+{
+    if (mem_unavailable(self)) {
+        return NULL;
+    }
+    if (self->running_thread) { /* e.g. from the trace's own write callback */
+        PyErr_SetString(PyExc_RuntimeError, "cannot change the trace of a running memory");
+        return NULL;
+    }
+    if (write == Py_None) {
+        Py_CLEAR(self->trace_write);
+        free(self->trace_buffer);
+        self->trace_buffer = NULL;
+        Py_RETURN_NONE;
+    }
+    if (!PyCallable_Check(write)) {
+        PyErr_SetString(PyExc_TypeError, "set_trace expects a callable (or None)");
+        return NULL;
+    }
+    if (!self->trace_buffer) {
+        self->trace_buffer = (unsigned char*)malloc(TRACE_BUFFER_BYTES);
+        if (!self->trace_buffer) {
+            return PyErr_NoMemory();
+        }
+    }
+    Py_INCREF(write);
+    Py_XDECREF(self->trace_write);
+    self->trace_write = write;
+    self->trace_used = TRACE_CHUNK_HEADER_BYTES;
+    Py_RETURN_NONE;
+}
+
+static FJ_ALWAYS_INLINE unsigned char* trace_put_varint(unsigned char* out, uint64_t value)
+{
+    while (value >= 0x80) {
+        *out++ = (unsigned char)(value | 0x80);
+        value >>= 7;
+    }
+    *out++ = (unsigned char)value;
+    return out;
+}
+
+/* append the op's trace record (the ops of a chunk follow each other: ip is the previous jump) */
+static FJ_ALWAYS_INLINE void trace_record(MemoryObject* m, uint64_t ip, uint64_t f, uint64_t j, const uint64_t dw)
+{
+    const uint64_t flip_delta = f - m->trace_last_flip, jump_delta = j - ip - dw;
+    unsigned char* out = m->trace_buffer + m->trace_used;
+    out = trace_put_varint(out, (flip_delta << 1) ^ (0 - (flip_delta >> 63))); /* zigzag */
+    out = trace_put_varint(out, (jump_delta << 1) ^ (0 - (jump_delta >> 63)));
+    m->trace_last_flip = f;
+    m->trace_used = (size_t)(out - m->trace_buffer);
+}
+
+/* is the trace chunk full? (it keeps room for one more record) */
+static FJ_ALWAYS_INLINE int trace_full(const MemoryObject* m)
+{
+    return m->trace_used > TRACE_BUFFER_BYTES - TRACE_RECORD_MAX_BYTES;
+}
+
+/* hand the trace chunk to trace_write (taking the GIL), and start the next one at next_ip.
+   returns 0 / -1 (python error) */
+static int trace_flush(MemoryObject* m, uint64_t next_ip)
+{
+    const uint64_t records_size = m->trace_used - TRACE_CHUNK_HEADER_BYTES;
+    PyObject* chunk;
+    PyObject* result = NULL;
+    if (records_size) {
+        for (int i = 0; i < 4; i++) {
+            m->trace_buffer[i] = (unsigned char)(records_size >> (8 * i));
+        }
+        for (int i = 0; i < 8; i++) {
+            m->trace_buffer[4 + i] = (unsigned char)(m->trace_chunk_ip >> (8 * i));
+        }
+        fj_hold_gil(m);
+        chunk = PyBytes_FromStringAndSize((const char*)m->trace_buffer, (Py_ssize_t)m->trace_used);
+        result = chunk ? PyObject_CallFunctionObjArgs(m->trace_write, chunk, NULL) : NULL;
+        Py_XDECREF(chunk);
+        Py_XDECREF(result);
+        fj_release_gil(m);
+    }
+    m->trace_used = TRACE_CHUNK_HEADER_BYTES;
+    m->trace_chunk_ip = next_ip;
+    m->trace_last_flip = 0;
+    return (records_size && !result) ? -1 : 0;
+}
+
+/* a run ended (with the GIL): hand its last trace chunk over - also when the run stopped on a
+   python error (e.g. Ctrl+C), whose last ops are the interesting ones. returns the run's cause,
+   or CAUSE_PYTHON_ERROR if the chunk's write failed. */
+static int trace_end_run(MemoryObject* m, int cause)
+{
+    PyObject *error_type, *error_value, *error_traceback;
+    if (!m->trace_write) {
+        return cause;
+    }
+    if (cause != CAUSE_PYTHON_ERROR) {
+        return (trace_flush(m, m->last_run_ip) < 0) ? CAUSE_PYTHON_ERROR : cause;
+    }
+    PyErr_Fetch(&error_type, &error_value, &error_traceback);
+    if (trace_flush(m, m->last_run_ip) < 0) {
+        PyErr_Clear(); /* the run's own error wins */
+    }
+    PyErr_Restore(error_type, error_value, error_traceback);
+    return cause;
+}
+
+/* ------------------------------------------------ speculation measurement
+
+   measures the would-be miss-rate of jump-target speculation: remember the last jump
+   word per executed ip; an execution whose jump word differs from the previous execution
+   of the same ip is a miss. enabled with FLIPJUMP_MEASURE_SPECULATION=1 - it runs a
+   dedicated slow reference-style loop (works for flat AND paged storage, any width), so
+   the normal run-loops' hot paths are completely untouched. */
+
+typedef struct {
+    uint64_t ip_plus1; /* ip + 1; 0 marks an empty slot */
+    uint64_t jump_word;
+} SpecSlot;
+
+typedef struct {
+    SpecSlot* slots; /* open-addressing, power-of-two sized */
+    uint64_t slot_count;
+    uint64_t slots_used;
+} SpecShadow;
+
+static int spec_grow(SpecShadow* shadow)
+{
+    uint64_t new_count = shadow->slot_count ? shadow->slot_count * 2 : (1ull << 16);
+    SpecSlot* new_slots = (SpecSlot*)calloc((size_t)new_count, sizeof(SpecSlot));
+    uint64_t i;
+    if (!new_slots) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    for (i = 0; i < shadow->slot_count; i++) {
+        if (shadow->slots[i].ip_plus1) {
+            uint64_t h = (shadow->slots[i].ip_plus1 * 0x9E3779B97F4A7C15ull) & (new_count - 1);
+            while (new_slots[h].ip_plus1) {
+                h = (h + 1) & (new_count - 1);
+            }
+            new_slots[h] = shadow->slots[i];
+        }
+    }
+    free(shadow->slots);
+    shadow->slots = new_slots;
+    shadow->slot_count = new_count;
+    return 0;
+}
+
+/* record one executed (ip, jump_word): bumps spec_first or spec_misses. -1 on alloc fail. */
+static int spec_record(SpecShadow* shadow, MemoryObject* m, uint64_t ip, uint64_t jump_word)
+{
+    uint64_t key = ip + 1, h;
+    if (shadow->slots_used * 2 >= shadow->slot_count) {
+        if (spec_grow(shadow) < 0) {
+            return -1;
+        }
+    }
+    h = (key * 0x9E3779B97F4A7C15ull) & (shadow->slot_count - 1);
+    while (shadow->slots[h].ip_plus1) {
+        if (shadow->slots[h].ip_plus1 == key) {
+            if (shadow->slots[h].jump_word != jump_word) {
+                m->spec_misses++;
+                shadow->slots[h].jump_word = jump_word;
+            }
+            return 0;
+        }
         h = (h + 1) & (shadow->slot_count - 1);
     }
-    shadow->slots[h].ip_plus1 = key;
-    shadow->slots[h].jump_word = jump_word;
-    shadow->slots_used++;
-    m->spec_first++;
+    shadow->slots[h].ip_plus1 = key;
+    shadow->slots[h].jump_word = jump_word;
+    shadow->slots_used++;
+    m->spec_first++;
+    return 0;
+}
+
+/* ---------------------------------------------------------------- IO
+
+   every run-loop routes its IO through these helpers. with the per-bit interface they
+   call the device's read_bit/write_bit; with the byte-level one, output bits are
+   assembled into bytes and buffered (handed to write_bytes when the buffer fills, before
+   every input read, at the signal-check strips and at the run's end), and input is read
+   one byte at a time (read_bytes(1), so the device never loses read-ahead input). */
+
+#define IO_INPUT_EOF (-3) /* io_input_bit: the device raised eof_exception_type */
+
+/* hand the buffered output bytes to write_bytes. returns 0 / -1 (python error) */
+static int io_flush_output(MemoryObject* m)
+{
+    PyObject* data;
+    PyObject* result;
+    if (m->out_buffer_used == 0) {
+        return 0;
+    }
+    fj_hold_gil(m);
+    data = PyBytes_FromStringAndSize((const char*)m->out_buffer, m->out_buffer_used);
+    m->out_buffer_used = 0;
+    result = data ? PyObject_CallFunctionObjArgs(m->write_bytes, data, NULL) : NULL;
+    Py_XDECREF(data);
+    Py_XDECREF(result);
+    fj_release_gil(m);
+    return result ? 0 : -1;
+}
+
+/* output one bit. returns 0 / -1 (python error) */
+static int io_output_bit(MemoryObject* m, PyObject* write_bit, int bit_value)
+{
+    PyObject* result;
+    if (m->write_bytes && !m->out_byte_in_device) {
+        m->out_byte |= (unsigned int)bit_value << m->out_bit_count;
+        if (++m->out_bit_count < 8) {
+            return 0;
+        }
+        m->out_buffer[m->out_buffer_used++] = (unsigned char)m->out_byte;
+        m->out_byte = 0;
+        m->out_bit_count = 0;
+        return (m->out_buffer_used == m->out_buffer_size) ? io_flush_output(m) : 0;
+    }
+    fj_hold_gil(m);
+    result = PyObject_CallFunctionObjArgs(write_bit, bit_value ? Py_True : Py_False, NULL);
+    Py_XDECREF(result);
+    fj_release_gil(m);
+    if (!result) {
+        return -1;
+    }
+    if (m->out_byte_in_device && ++m->out_bit_count == 8) {
+        m->out_bit_count = 0;
+        m->out_byte_in_device = 0;
+    }
+    return 0;
+}
+
+/* the run's end: flush the buffered bytes, and hand a partially assembled byte's bits to
+   write_bit (the device then holds them, like any per-bit output). returns 0 / -1 */
+static int io_finish_output(MemoryObject* m, PyObject* write_bit)
+{
+    if (!m->write_bytes) {
+        return 0;
+    }
+    if (io_flush_output(m) < 0) {
+        return -1;
+    }
+    if (m->out_bit_count && !m->out_byte_in_device) {
+        for (unsigned int i = 0; i < m->out_bit_count; i++) {
+            PyObject* bit = ((m->out_byte >> i) & 1) ? Py_True : Py_False;
+            PyObject* result = PyObject_CallFunctionObjArgs(write_bit, bit, NULL);
+            if (!result) {
+                return -1;
+            }
+            Py_DECREF(result);
+        }
+        m->out_byte = 0;
+        m->out_byte_in_device = 1;
+    }
     return 0;
 }
 
+/* the python side of io_input_bit (called with the GIL): a bit from read_bit, or the
+   next byte from read_bytes (its first bit returned, the rest kept in m->in_byte).
+   returns the bit (0/1), IO_INPUT_EOF, or -1 (python error) */
+static int io_call_input(MemoryObject* m, PyObject* read_bit, PyObject* eof_exception_type)
+{
+    PyObject* result;
+    int bit_value;
+
+    result = m->read_bytes ? PyObject_CallFunction(m->read_bytes, "n", (Py_ssize_t)1) : PyObject_CallNoArgs(read_bit);
+    if (!result) {
+        if (PyErr_ExceptionMatches(eof_exception_type)) {
+            PyErr_Clear();
+            return IO_INPUT_EOF;
+        }
+        return -1;
+    }
+    if (!m->read_bytes) {
+        bit_value = PyObject_IsTrue(result);
+        Py_DECREF(result);
+        return bit_value;
+    }
+    if (!PyBytes_Check(result) || PyBytes_Size(result) < 1) {
+        Py_DECREF(result);
+        PyErr_SetString(PyExc_ValueError, "read_bytes must return a non-empty bytes object");
+        return -1;
+    }
+    m->in_byte = (unsigned char)PyBytes_AsString(result)[0];
+    Py_DECREF(result);
+    bit_value = (int)(m->in_byte & 1);
+    m->in_byte >>= 1;
+    m->in_bits_left = 7;
+    return bit_value;
+}
+
+/* input one bit (the device's blocking time is added to *paused_seconds).
+   returns the bit (0/1), IO_INPUT_EOF, or -1 (python error) */
+static int io_input_bit(MemoryObject* m, PyObject* read_bit, PyObject* eof_exception_type, double* paused_seconds)
+{
+    int bit_value;
+    double io_start;
+
+    if (io_flush_output(m) < 0) { /* the device sees all the output before it is asked for input */
+        return -1;
+    }
+    if (m->read_bytes && m->in_bits_left) {
+        bit_value = (int)(m->in_byte & 1);
+        m->in_byte >>= 1;
+        m->in_bits_left--;
+        return bit_value;
+    }
+
+    io_start = monotonic_seconds();
+    fj_hold_gil(m);
+    bit_value = io_call_input(m, read_bit, eof_exception_type);
+    fj_release_gil(m);
+    *paused_seconds += monotonic_seconds() - io_start;
+    return bit_value;
+}
+
 /* the measurement run-loop: the reference op order through the generic mem_* helpers
    (slow - measurement only). returns the termination cause / CAUSE_PYTHON_ERROR. */
 static int run_measured_loop(MemoryObject* self, PyObject* read_bit, PyObject* write_bit,
@@ -900,11 +2693,17 @@ static int run_measured_loop(MemoryObject* self, PyObject* read_bit, PyObject* w
 
         if ((ops & SIGNAL_CHECK_MASK) == SIGNAL_CHECK_MASK) {
             self->last_run_op_count = ops;
-            if (PyErr_CheckSignals() < 0) {
+            if (PyErr_CheckSignals() < 0 || io_flush_output(self) < 0
+                || progress_report(self, ops, ip, *paused_seconds_out) < 0) {
                 goto done;
             }
         }
 
+        if (self->max_ops && ops == self->max_ops) {
+            cause = TERM_OP_BUDGET;
+            goto done;
+        }
+
         /* read flip word */
         if (mem_get_word_unaligned(self, ip, &f) < 0) {
             goto memory_error;
@@ -912,33 +2711,20 @@ static int run_measured_loop(MemoryObject* self, PyObject* read_bit, PyObject* w
 
         /* handle output */
         if (f <= out1 && f >= dw) {
-            PyObject* result = PyObject_CallFunctionObjArgs(write_bit, (f == out1) ? Py_True : Py_False, NULL);
-            if (!result) {
+            if (io_output_bit(self, write_bit, f == out1) < 0) {
                 goto done;
             }
-            Py_DECREF(result);
         }
 
         /* handle input */
         if (ip <= in_addr && ip > in_lo_exclusive) {
-            PyObject* result;
-            int bit_value;
-            double io_start = monotonic_seconds();
-            result = PyObject_CallNoArgs(read_bit);
-            *paused_seconds_out += monotonic_seconds() - io_start;
-            if (!result) {
-                if (PyErr_ExceptionMatches(eof_exception_type)) {
-                    PyErr_Clear();
+            int bit_value = io_input_bit(self, read_bit, eof_exception_type, paused_seconds_out);
+            if (bit_value < 0) {
+                if (bit_value == IO_INPUT_EOF) {
                     cause = TERM_EOF;
-                    goto done;
                 }
                 goto done;
             }
-            bit_value = PyObject_IsTrue(result);
-            Py_DECREF(result);
-            if (bit_value < 0) {
-                goto done;
-            }
             if (mem_write_bit(self, in_addr, bit_value) < 0) {
                 goto memory_error;
             }
@@ -981,8 +2767,180 @@ memory_error:
 done:
     free(shadow.slots);
     self->spec_ops = ops;
+    self->last_run_ip = ip;
+    self->last_run_op_count = ops;
+    self->last_run_paused_seconds = *paused_seconds_out;
+    *ops_out = ops;
+    return cause;
+}
+
+/* ------------------------------------------------ the featured run-loop
+
+   the debugger/profiler loop: the reference op order through the generic mem_* helpers
+   (any storage, any width), plus per op: the last-ops ring, the flip/jump counters, and
+   the break checks - an ip in break_addresses, or the op-count reaching break_after_ops
+   (0 = none), or an IO op when break_on_io is set (the pre-initialization's stop). a break
+   stops the run BEFORE executing the op (TERM_BREAK, last_run_ip = the op, the memory
+   untouched by it) so python can run the debugger prompt; the run is then resumed at that ip with
+   resuming=1, which skips the first op's ring write and break checks (they already
+   happened). the fast loops never see any of this. a watched flip (set_watchpoints) stops
+   the run AFTER its op instead (TERM_WATCH, last_run_ip = the next op - resumed with resuming=0).
+   returns the termination cause / CAUSE_PYTHON_ERROR. */
+static int run_featured_loop(MemoryObject* self, PyObject* read_bit, PyObject* write_bit,
+                             PyObject* eof_exception_type, uint64_t start_ip, uint64_t break_after_ops,
+                             int resuming, uint64_t* last_ops_ring, Py_ssize_t last_ops_length,
+                             uint64_t* ring_writes_out, uint64_t* ops_out, double* paused_seconds_out)
+{
+    const uint64_t width = (uint64_t)self->w;
+    const uint64_t ww = (uint64_t)self->ww;
+    const uint64_t dw = 2 * width;
+    const uint64_t out1 = dw + 1;
+    const uint64_t in_addr = 3 * width + ww + 1; /* 3w + #w */
+    const uint64_t in_lo_exclusive = in_addr - dw;
+    const int has_break_addresses = self->break_addresses.slots_used != 0;
+    const uint64_t sample_every = self->sample_every;
+    const uint64_t watch_start = self->watch_count ? self->watch_ranges[0].start : 0;
+    const uint64_t watch_span = self->watch_count ? self->watch_ranges[self->watch_count - 1].end - watch_start : 0;
+
+    uint64_t ip = start_ip, ops = 0, flips = 0, jumps = 0, ring_writes = 0;
+    uint64_t next_sample = sample_every ? self->sample_countdown : UINT64_MAX;
+    int watch_stop = 0;
+    int cause = CAUSE_PYTHON_ERROR;
+
+    self->mem_error = 0;
+    for (;;) {
+        uint64_t f, j;
+
+        if ((ops & SIGNAL_CHECK_MASK) == SIGNAL_CHECK_MASK) {
+            self->last_run_op_count = ops;
+            if (PyErr_CheckSignals() < 0 || io_flush_output(self) < 0
+                || progress_report(self, ops, ip, *paused_seconds_out) < 0) {
+                goto done;
+            }
+        }
+
+        if (self->max_ops && ops == self->max_ops) {
+            cause = TERM_OP_BUDGET;
+            goto done;
+        }
+
+        if (ops == next_sample) {
+            if (address_counts_add(&self->samples, ip) < 0) {
+                PyErr_NoMemory();
+                goto done;
+            }
+            next_sample += sample_every;
+        }
+
+        if (!resuming || ops) {
+            if (last_ops_ring) {
+                last_ops_ring[ring_writes % (uint64_t)last_ops_length] = ip;
+                ring_writes++;
+            }
+            if ((break_after_ops && ops == break_after_ops) ||
+                (has_break_addresses && address_set_contains(&self->break_addresses, ip))) {
+                cause = TERM_BREAK;
+                goto done;
+            }
+        }
+
+        if (self->coverage && coverage_mark(self, ip, ww + 1) < 0) {
+            goto done;
+        }
+
+        /* read flip word */
+        if (mem_get_word_unaligned(self, ip, &f) < 0) {
+            goto memory_error;
+        }
+
+        if (self->break_on_io && (!resuming || ops) &&
+            ((f <= out1 && f >= dw) || (ip <= in_addr && ip > in_lo_exclusive))) {
+            cause = TERM_BREAK;
+            goto done;
+        }
+
+        /* handle output */
+        if (f <= out1 && f >= dw) {
+            if (io_output_bit(self, write_bit, f == out1) < 0) {
+                goto done;
+            }
+        }
+
+        /* handle input */
+        if (ip <= in_addr && ip > in_lo_exclusive) {
+            int bit_value = io_input_bit(self, read_bit, eof_exception_type, paused_seconds_out);
+            if (bit_value < 0) {
+                if (bit_value == IO_INPUT_EOF) {
+                    cause = TERM_EOF;
+                }
+                goto done;
+            }
+            if (mem_write_bit(self, in_addr, bit_value) < 0) {
+                goto memory_error;
+            }
+        }
+
+        /* FLIP! (a watched flip keeps the hit, and stops the run after the op) */
+        if (f - watch_start < watch_span && watch_contains(self, f)) {
+            if (watch_flip(self, ip, f) < 0) {
+                goto memory_error;
+            }
+            watch_stop = 1;
+        } else if (mem_flip_bit(self, f) < 0) {
+            goto memory_error;
+        }
+
+        /* read jump word (after the flip - the flip may modify it) */
+        if (mem_get_word_unaligned(self, ip + width, &j) < 0) {
+            goto memory_error;
+        }
+        ops++;
+        if (self->trace_write) {
+            trace_record(self, ip, f, j, dw);
+            if (trace_full(self) && trace_flush(self, j) < 0) {
+                goto done;
+            }
+        }
+        if (f >= dw) {
+            flips++;
+        }
+        if (j != ip + dw) {
+            jumps++;
+        }
+
+        /* check finish? */
+        if (j == ip && !(f >= ip && f - ip < dw)) {
+            cause = TERM_LOOPING;
+            goto done;
+        }
+        if (j < dw) {
+            cause = TERM_NULL_IP;
+            goto done;
+        }
+
+        /* JUMP! */
+        ip = j;
+        if (watch_stop) {
+            cause = TERM_WATCH;
+            goto done;
+        }
+    }
+
+memory_error:
+    if (self->mem_error) {
+        self->mem_error = 0;
+        cause = TERM_MEMORY_ERROR;
+    }
+done:
+    if (sample_every) {
+        self->sample_countdown = next_sample - ops;
+    }
+    self->last_run_flip_count = flips;
+    self->last_run_jump_count = jumps;
+    self->last_run_ip = ip;
     self->last_run_op_count = ops;
     self->last_run_paused_seconds = *paused_seconds_out;
+    *ring_writes_out = ring_writes;
     *ops_out = ops;
     return cause;
 }
@@ -1003,32 +2961,108 @@ done:
    returns the termination cause, or CAUSE_PYTHON_ERROR with the python error set. */
 static FJ_ALWAYS_INLINE int run_flat_loop_impl(MemoryObject* self, PyObject* read_bit, PyObject* write_bit,
                                                PyObject* eof_exception_type, uint64_t start_ip, uint64_t* ops_out,
-                                               double* paused_seconds_out, const uint64_t width, const uint64_t ww)
+                                               double* paused_seconds_out, const uint64_t width, const uint64_t ww,
+                                               const int with_coverage, const int with_watch, const int with_trace,
+                                               const int with_predecode)
 {
     const uint64_t bit_mask = width - 1;
     const uint64_t dw = 2 * width;
     const uint64_t in_addr = 3 * width + ww + 1; /* 3w + #w */
     const uint64_t in_lo_exclusive = in_addr - dw;
     uint64_t* const flat = self->flat;
+    PdState* const pd = with_predecode ? self->pd : NULL;
+    const uint64_t pd_ops = with_predecode ? pd->words / 2 : 0;
+    uint32_t pd_block_id = 0;
+    const PdBlock* pd_block = NULL; /* the block whose speculated op missed */
     const uint64_t flat_count = self->flat_count;
+    const uint64_t max_ops = self->max_ops;
+    const uint64_t sample_every = self->sample_every;
+    const uint64_t watch_start = with_watch ? self->watch_ranges[0].start : 0;
+    const uint64_t watch_span = with_watch ? self->watch_ranges[self->watch_count - 1].end - watch_start : 0;
 
     uint64_t ip = start_ip, ops = 0;
     uint64_t word_address, f, flip_word_address, flip_value, j;
     uint64_t cold_word; /* out-param for the cold-path reads, so f/j stay in registers */
     uint64_t inner_left;
+    uint64_t next_check = 0; /* the op count of the next signal check */
+    uint64_t next_sample = sample_every ? self->sample_countdown : UINT64_MAX;
+    int watch_stop = 0;
     int cause = CAUSE_PYTHON_ERROR;
 
     self->mem_error = 0;
+    self->releases_gil = 1;
     for (;;) {
         /* the signal check is strip-mined out of the per-op path: the inner do-while
            runs SIGNAL_CHECK_MASK+1 ops on a fused dec-jnz back-edge, the outer loop
-           checks signals - same cadence as a per-op (ops & MASK) == MASK test. */
-        self->last_run_op_count = ops;
-        if (PyErr_CheckSignals() < 0) {
-            goto done;
+           checks signals - same cadence as a per-op (ops & MASK) == MASK test.
+           the strips run without the GIL. */
+        if (ops == next_check) {
+            self->last_run_op_count = ops;
+            fj_hold_gil(self);
+            if (PyErr_CheckSignals() < 0 || io_flush_output(self) < 0
+                || progress_report(self, ops, ip, *paused_seconds_out) < 0) {
+                goto done;
+            }
+            next_check = ops + SIGNAL_CHECK_MASK + 1;
+            if (max_ops) { /* the op budget shortens the strips - the per-op path is untouched */
+                if (ops >= max_ops) {
+                    cause = TERM_OP_BUDGET;
+                    goto done;
+                }
+                if (max_ops < next_check) {
+                    next_check = max_ops;
+                }
+            }
+            fj_release_gil(self);
+        }
+        /* the sampler splits the strips too (without taking the GIL) */
+        if (ops == next_sample) {
+            if (address_counts_add(&self->samples, ip) < 0) {
+                fj_no_memory(self);
+                goto done;
+            }
+            next_sample += sample_every;
+        }
+        inner_left = next_check - ops;
+        if (next_sample - ops < inner_left) {
+            inner_left = next_sample - ops;
         }
-        inner_left = SIGNAL_CHECK_MASK + 1;
         do {
+            if (with_coverage && coverage_mark(self, ip, ww + 1) < 0) {
+                goto done;
+            }
+            if (with_predecode && !(ip & (dw - 1)) && (ip >> (ww + 1)) < pd_ops) {
+                pd_block_id = pd->block_at[ip >> (ww + 1)];
+                if (!pd_block_id || self->pd_stale) {
+                    goto cold_pd_decode;
+                }
+            pd_block_ready:
+                {
+                    /* a block runs whole - if it fits in the strip (the signal / sample cadence) */
+                    const PdBlock* const block = &pd->blocks[pd_block_id - 1];
+                    if (block->ops && block->ops <= inner_left) {
+                        const PdFlip* pd_flip = pd->flips + block->first_flip;
+                        const PdFlip* const pd_flips_end = pd_flip + block->flip_count;
+                        for (const PdFlip* const pd_checked_end = pd_flips_end - (block->check_word != 0);
+                             pd_flip < pd_checked_end; pd_flip++) {
+                            flat[pd_flip->word] ^= pd_flip->mask;
+                        }
+                        if (block->check_word) {
+                            if (flat[block->check_word] != block->exit_ip) {
+                                pd_block = block;
+                                goto cold_pd_miss;
+                            }
+                            flat[pd_flip->word] ^= pd_flip->mask;
+                        }
+                        ops += block->ops;
+                        ip = block->exit_ip;
+                        inner_left -= block->ops - 1;
+                        continue;
+                    }
+                }
+            }
+
+        pd_normal_op:
             /* read flip word */
             if (ip & bit_mask) {
                 goto cold_unaligned_flip_word;
@@ -1053,6 +3087,10 @@ static FJ_ALWAYS_INLINE int run_flat_loop_impl(MemoryObject* self, PyObject* rea
                 goto cold_input;
             }
         after_input:
+            if (with_watch && f - watch_start < watch_span) {
+                goto cold_maybe_watched;
+            }
+        not_watched:
 
             /* FLIP! */
             flip_word_address = f >> ww;
@@ -1064,6 +3102,9 @@ static FJ_ALWAYS_INLINE int run_flat_loop_impl(MemoryObject* self, PyObject* rea
                 goto cold_flip_garbage;
             }
         flip_value_ready:
+            if (with_predecode && pd_bit(pd->guarded, flip_word_address)) {
+                pd_note_write(self, flip_word_address); /* self-modifying code */
+            }
             flat[flip_word_address] = flip_value ^ (1ull << (f & bit_mask));
         after_flip:
 
@@ -1078,6 +3119,13 @@ static FJ_ALWAYS_INLINE int run_flat_loop_impl(MemoryObject* self, PyObject* rea
             }
         jump_word_ready:
             ops++;
+            if (with_trace) {
+                trace_record(self, ip, f, j, dw);
+                if (trace_full(self)) {
+                    goto cold_trace_flush;
+                }
+            }
+        after_trace:
 
             /* check finish? */
             if (j == ip) {
@@ -1091,6 +3139,10 @@ static FJ_ALWAYS_INLINE int run_flat_loop_impl(MemoryObject* self, PyObject* rea
 
             /* JUMP! */
             ip = j;
+            if (with_watch && watch_stop) {
+                cause = TERM_WATCH;
+                goto done;
+            }
         } while (--inner_left);
         continue;
 
@@ -1098,6 +3150,28 @@ static FJ_ALWAYS_INLINE int run_flat_loop_impl(MemoryObject* self, PyObject* rea
            outside the do-while and goto back into it (labels are function-scope) so the
            hot path's only taken branch is the dec-jnz back-edge. */
 
+    cold_pd_decode: /* the first visit of a block (since the last flush) */
+        if (self->pd_stale) {
+            pd_flush(pd);
+            self->pd_stale = 0;
+        }
+        pd_block_id = pd->block_at[ip >> (ww + 1)];
+        if (!pd_block_id) {
+            pd_block_id = pd_decode(self, ip);
+            if (!pd_block_id) {
+                fj_no_memory(self);
+                goto done;
+            }
+        }
+        goto pd_block_ready;
+
+    cold_pd_miss: /* the speculated op's jump word changed: the block ran up to it, the normal path runs it */
+        pd->misses++;
+        ops += pd_block->ops - 1;
+        inner_left -= pd_block->ops - 1;
+        ip = pd_block->check_ip;
+        goto pd_normal_op;
+
     cold_unaligned_flip_word:
         if (mem_get_word_unaligned(self, ip, &cold_word) < 0) {
             goto memory_error;
@@ -1123,35 +3197,20 @@ static FJ_ALWAYS_INLINE int run_flat_loop_impl(MemoryObject* self, PyObject* rea
         goto flip_word_ready;
 
     cold_output:
-    {
-        PyObject* result = PyObject_CallFunctionObjArgs(write_bit, (f == dw + 1) ? Py_True : Py_False, NULL);
-        if (!result) {
+        if (io_output_bit(self, write_bit, f == dw + 1) < 0) {
             goto done;
         }
-        Py_DECREF(result);
         goto after_output;
-    }
 
     cold_input:
     {
-        PyObject* result;
-        int bit_value;
-        double io_start = monotonic_seconds();
-        result = PyObject_CallNoArgs(read_bit);
-        *paused_seconds_out += monotonic_seconds() - io_start;
-        if (!result) {
-            if (PyErr_ExceptionMatches(eof_exception_type)) {
-                PyErr_Clear();
+        int bit_value = io_input_bit(self, read_bit, eof_exception_type, paused_seconds_out);
+        if (bit_value < 0) {
+            if (bit_value == IO_INPUT_EOF) {
                 cause = TERM_EOF;
-                goto done;
             }
             goto done;
         }
-        bit_value = PyObject_IsTrue(result);
-        Py_DECREF(result);
-        if (bit_value < 0) {
-            goto done;
-        }
         if (mem_write_bit(self, in_addr, bit_value) < 0) {
             goto memory_error;
         }
@@ -1166,6 +3225,16 @@ static FJ_ALWAYS_INLINE int run_flat_loop_impl(MemoryObject* self, PyObject* rea
         }
         goto after_flip;
 
+    cold_maybe_watched: /* the flip is within the watched span - is its bit watched? */
+        if (!watch_contains(self, f)) {
+            goto not_watched;
+        }
+        if (watch_flip(self, ip, f) < 0) {
+            goto memory_error;
+        }
+        watch_stop = 1;
+        goto after_flip;
+
     cold_flip_garbage: /* w=64: possibly real data equal to the magic fill */
         if (flat_garbage_check(self, flip_word_address, &flip_value) < 0) {
             goto memory_error;
@@ -1185,6 +3254,12 @@ static FJ_ALWAYS_INLINE int run_flat_loop_impl(MemoryObject* self, PyObject* rea
         }
         goto jump_word_ready;
 
+    cold_trace_flush: /* the trace chunk is full - hand it over (with the GIL) */
+        if (trace_flush(self, j) < 0) {
+            goto done;
+        }
+        goto after_trace;
+
     cold_maybe_looping:
         if (f >= ip && f - ip < dw) {
             goto not_looping; /* the op flips its own words - not a halt */
@@ -1199,6 +3274,12 @@ memory_error:
         cause = TERM_MEMORY_ERROR;
     }
 done:
+    fj_hold_gil(self);
+    self->releases_gil = 0;
+    if (sample_every) {
+        self->sample_countdown = next_sample - ops;
+    }
+    self->last_run_ip = ip;
     self->last_run_op_count = ops;
     self->last_run_paused_seconds = *paused_seconds_out;
     *ops_out = ops;
@@ -1206,26 +3287,57 @@ done:
 }
 
 /* dispatch with literal width/ww (the supported power-of-two widths) so the
-   force-inlined body constant-folds; unusual widths keep the generic body. */
+   force-inlined body constant-folds; unusual widths keep the generic body. the traced, the
+   covered and the watched runs get their own (generic-width) bodies, so the others don't pay
+   for the trace records / the marking / the watch check. */
 static int run_flat_loop(MemoryObject* self, PyObject* read_bit, PyObject* write_bit, PyObject* eof_exception_type,
                          uint64_t start_ip, uint64_t* ops_out, double* paused_seconds_out)
 {
+    if (self->trace_write) {
+        return run_flat_loop_impl(self, read_bit, write_bit, eof_exception_type, start_ip, ops_out,
+                                  paused_seconds_out, (uint64_t)self->w, (uint64_t)self->ww, self->coverage,
+                                  self->watch_count != 0, 1, 0);
+    }
+    if (self->watch_count) {
+        return run_flat_loop_impl(self, read_bit, write_bit, eof_exception_type, start_ip, ops_out,
+                                  paused_seconds_out, (uint64_t)self->w, (uint64_t)self->ww, self->coverage, 1, 0, 0);
+    }
+    if (self->coverage) {
+        return run_flat_loop_impl(self, read_bit, write_bit, eof_exception_type, start_ip, ops_out,
+                                  paused_seconds_out, (uint64_t)self->w, (uint64_t)self->ww, 1, 0, 0, 0);
+    }
+    if (self->predecode) {
+        if (pd_prepare(self) < 0) {
+            return CAUSE_PYTHON_ERROR;
+        }
+        switch (self->w) {
+            case 64:
+                return run_flat_loop_impl(self, read_bit, write_bit, eof_exception_type, start_ip, ops_out,
+                                          paused_seconds_out, 64, 6, 0, 0, 0, 1);
+            case 32:
+                return run_flat_loop_impl(self, read_bit, write_bit, eof_exception_type, start_ip, ops_out,
+                                          paused_seconds_out, 32, 5, 0, 0, 0, 1);
+            default:
+                return run_flat_loop_impl(self, read_bit, write_bit, eof_exception_type, start_ip, ops_out,
+                                          paused_seconds_out, (uint64_t)self->w, (uint64_t)self->ww, 0, 0, 0, 1);
+        }
+    }
     switch (self->w) {
         case 64:
             return run_flat_loop_impl(self, read_bit, write_bit, eof_exception_type, start_ip, ops_out,
-                                      paused_seconds_out, 64, 6);
+                                      paused_seconds_out, 64, 6, 0, 0, 0, 0);
         case 32:
             return run_flat_loop_impl(self, read_bit, write_bit, eof_exception_type, start_ip, ops_out,
-                                      paused_seconds_out, 32, 5);
+                                      paused_seconds_out, 32, 5, 0, 0, 0, 0);
         case 16:
             return run_flat_loop_impl(self, read_bit, write_bit, eof_exception_type, start_ip, ops_out,
-                                      paused_seconds_out, 16, 4);
+                                      paused_seconds_out, 16, 4, 0, 0, 0, 0);
         case 8:
             return run_flat_loop_impl(self, read_bit, write_bit, eof_exception_type, start_ip, ops_out,
-                                      paused_seconds_out, 8, 3);
+                                      paused_seconds_out, 8, 3, 0, 0, 0, 0);
         default:
             return run_flat_loop_impl(self, read_bit, write_bit, eof_exception_type, start_ip, ops_out,
-                                      paused_seconds_out, (uint64_t)self->w, (uint64_t)self->ww);
+                                      paused_seconds_out, (uint64_t)self->w, (uint64_t)self->ww, 0, 0, 0, 0);
     }
 }
 
@@ -1249,7 +3361,8 @@ static FJ_ALWAYS_INLINE int run_paged_loop_impl(MemoryObject* self, PyObject* re
                                                 PyObject* eof_exception_type, uint64_t start_ip, uint64_t* ops_out,
                                                 double* paused_seconds_out, uint64_t* last_ops_ring,
                                                 Py_ssize_t last_ops_length, uint64_t* ring_writes_out,
-                                                const uint64_t width, const uint64_t ww, const int with_ring)
+                                                const uint64_t width, const uint64_t ww, const int with_ring,
+                                                const int with_coverage, const int with_watch, const int with_trace)
 {
     const uint64_t bit_mask = width - 1;
     const uint64_t dw = 2 * width;
@@ -1257,6 +3370,10 @@ static FJ_ALWAYS_INLINE int run_paged_loop_impl(MemoryObject* self, PyObject* re
     const uint64_t in_lo_exclusive = in_addr - dw;
     uint64_t* const flat = self->flat; /* non-NULL only in the with_ring clone */
     const uint64_t flat_count = self->flat_count;
+    const uint64_t max_ops = self->max_ops;
+    const uint64_t sample_every = self->sample_every;
+    const uint64_t watch_start = with_watch ? self->watch_ranges[0].start : 0;
+    const uint64_t watch_span = with_watch ? self->watch_ranges[self->watch_count - 1].end - watch_start : 0;
 
     uint64_t ip = start_ip, ops = 0, ring_writes = 0;
     uint64_t word_address, op_offset, op_slot, f, j;
@@ -1264,17 +3381,50 @@ static FJ_ALWAYS_INLINE int run_paged_loop_impl(MemoryObject* self, PyObject* re
     uint64_t* op_flat_jump = NULL;
     uint64_t cold_word; /* out-param for the cold-path reads, so f/j stay in registers */
     uint64_t inner_left;
+    uint64_t next_check = 0; /* the op count of the next signal check */
+    uint64_t next_sample = sample_every ? self->sample_countdown : UINT64_MAX;
+    int watch_stop = 0;
     int cause = CAUSE_PYTHON_ERROR;
 
     self->mem_error = 0;
     self->last_run_op_count = 0;
+    self->releases_gil = 1;
     for (;;) {
-        self->last_run_op_count = ops;
-        if (PyErr_CheckSignals() < 0) {
-            goto loop_done; /* python error - cause stays CAUSE_PYTHON_ERROR */
+        if (ops == next_check) {
+            self->last_run_op_count = ops;
+            fj_hold_gil(self); /* the strips run without the GIL */
+            if (PyErr_CheckSignals() < 0 || io_flush_output(self) < 0
+                || progress_report(self, ops, ip, *paused_seconds_out) < 0) {
+                goto loop_done; /* python error - cause stays CAUSE_PYTHON_ERROR */
+            }
+            next_check = ops + SIGNAL_CHECK_MASK + 1;
+            if (max_ops) { /* the op budget shortens the strips - the per-op path is untouched */
+                if (ops >= max_ops) {
+                    cause = TERM_OP_BUDGET;
+                    goto loop_done;
+                }
+                if (max_ops < next_check) {
+                    next_check = max_ops;
+                }
+            }
+            fj_release_gil(self);
+        }
+        /* the sampler splits the strips too (without taking the GIL) */
+        if (ops == next_sample) {
+            if (address_counts_add(&self->samples, ip) < 0) {
+                fj_no_memory(self);
+                goto loop_done;
+            }
+            next_sample += sample_every;
+        }
+        inner_left = next_check - ops;
+        if (next_sample - ops < inner_left) {
+            inner_left = next_sample - ops;
         }
-        inner_left = SIGNAL_CHECK_MASK + 1;
         do {
+            if (with_coverage && coverage_mark(self, ip, ww + 1) < 0) {
+                goto loop_done;
+            }
             if (with_ring) {
                 last_ops_ring[ring_writes % (uint64_t)last_ops_length] = ip;
                 ring_writes++;
@@ -1316,6 +3466,10 @@ static FJ_ALWAYS_INLINE int run_paged_loop_impl(MemoryObject* self, PyObject* re
                 goto cold_input;
             }
         after_input:
+            if (with_watch && f - watch_start < watch_span) {
+                goto cold_maybe_watched;
+            }
+        not_watched:
 
             /* FLIP - the cache-hit valid-range fast path inline; the rest falls back to
                mem_flip_bit (page miss, outside the valid range, flat - all cold) */
@@ -1363,6 +3517,13 @@ static FJ_ALWAYS_INLINE int run_paged_loop_impl(MemoryObject* self, PyObject* re
             }
         jump_word_ready:
             ops++;
+            if (with_trace) {
+                trace_record(self, ip, f, j, dw);
+                if (trace_full(self)) {
+                    goto cold_trace_flush;
+                }
+            }
+        after_trace:
 
             /* check finish? */
             if (j == ip) {
@@ -1376,6 +3537,10 @@ static FJ_ALWAYS_INLINE int run_paged_loop_impl(MemoryObject* self, PyObject* re
 
             /* JUMP! */
             ip = j;
+            if (with_watch && watch_stop) {
+                cause = TERM_WATCH;
+                goto loop_done;
+            }
         } while (--inner_left);
         continue;
 
@@ -1434,35 +3599,20 @@ static FJ_ALWAYS_INLINE int run_paged_loop_impl(MemoryObject* self, PyObject* re
         goto flip_word_ready;
 
     cold_output:
-    {
-        PyObject* result = PyObject_CallFunctionObjArgs(write_bit, (f == dw + 1) ? Py_True : Py_False, NULL);
-        if (!result) {
+        if (io_output_bit(self, write_bit, f == dw + 1) < 0) {
             goto loop_done;
         }
-        Py_DECREF(result);
         goto after_output;
-    }
 
     cold_input:
     {
-        PyObject* result;
-        int bit_value;
-        double io_start = monotonic_seconds();
-        result = PyObject_CallNoArgs(read_bit);
-        *paused_seconds_out += monotonic_seconds() - io_start;
-        if (!result) {
-            if (PyErr_ExceptionMatches(eof_exception_type)) {
-                PyErr_Clear();
+        int bit_value = io_input_bit(self, read_bit, eof_exception_type, paused_seconds_out);
+        if (bit_value < 0) {
+            if (bit_value == IO_INPUT_EOF) {
                 cause = TERM_EOF;
-                goto loop_done;
             }
             goto loop_done;
         }
-        bit_value = PyObject_IsTrue(result);
-        Py_DECREF(result);
-        if (bit_value < 0) {
-            goto loop_done;
-        }
         if (mem_write_bit(self, in_addr, bit_value) < 0) {
             goto memory_or_python_error;
         }
@@ -1475,6 +3625,16 @@ static FJ_ALWAYS_INLINE int run_paged_loop_impl(MemoryObject* self, PyObject* re
         }
         goto after_flip;
 
+    cold_maybe_watched: /* the flip is within the watched span - is its bit watched? */
+        if (!watch_contains(self, f)) {
+            goto not_watched;
+        }
+        if (watch_flip(self, ip, f) < 0) {
+            goto memory_or_python_error;
+        }
+        watch_stop = 1;
+        goto after_flip;
+
     cold_jump_word_slow: /* hot op whose jump word lies past the fast valid range */
         if (mem_read_word(self, (ip >> ww) + 1, &cold_word) < 0) {
             goto memory_or_python_error;
@@ -1482,6 +3642,12 @@ static FJ_ALWAYS_INLINE int run_paged_loop_impl(MemoryObject* self, PyObject* re
         j = cold_word;
         goto jump_word_ready;
 
+    cold_trace_flush: /* the trace chunk is full - hand it over (with the GIL) */
+        if (trace_flush(self, j) < 0) {
+            goto loop_done;
+        }
+        goto after_trace;
+
     cold_maybe_looping:
         if (f >= ip && f - ip < dw) {
             goto not_looping; /* the op flips its own words - not a halt */
@@ -1496,6 +3662,12 @@ memory_or_python_error:
         cause = TERM_MEMORY_ERROR;
     }
 loop_done:
+    fj_hold_gil(self);
+    self->releases_gil = 0;
+    if (sample_every) {
+        self->sample_countdown = next_sample - ops;
+    }
+    self->last_run_ip = ip;
     self->last_run_op_count = ops;
     self->last_run_paused_seconds = *paused_seconds_out;
     *ops_out = ops;
@@ -1504,7 +3676,8 @@ loop_done:
 }
 
 /* dispatch with literal width/ww and the ring flag, mirroring run_flat_loop: the
-   no-ring clones fold away the ring write and the flat sub-lane. */
+   no-ring clones fold away the ring write and the flat sub-lane. the ring, the traced, the
+   covered and the watched runs keep the generic-width body. */
 static int run_generic_loop(MemoryObject* self, PyObject* read_bit, PyObject* write_bit,
                             PyObject* eof_exception_type, uint64_t start_ip, uint64_t* ops_out,
                             double* paused_seconds_out, uint64_t* last_ops_ring, Py_ssize_t last_ops_length,
@@ -1512,26 +3685,42 @@ static int run_generic_loop(MemoryObject* self, PyObject* read_bit, PyObject* wr
 {
     if (last_ops_ring) {
         return run_paged_loop_impl(self, read_bit, write_bit, eof_exception_type, start_ip, ops_out,
-                                   paused_seconds_out, last_ops_ring, last_ops_length, ring_writes_out,
-                                   (uint64_t)self->w, (uint64_t)self->ww, 1);
+                                   paused_seconds_out, last_ops_ring, last_ops_length, ring_writes_out,
+                                   (uint64_t)self->w, (uint64_t)self->ww, 1, self->coverage, self->watch_count != 0,
+                                   self->trace_write != NULL);
+    }
+    if (self->trace_write) {
+        return run_paged_loop_impl(self, read_bit, write_bit, eof_exception_type, start_ip, ops_out,
+                                   paused_seconds_out, NULL, 0, ring_writes_out, (uint64_t)self->w,
+                                   (uint64_t)self->ww, 0, self->coverage, self->watch_count != 0, 1);
+    }
+    if (self->watch_count) {
+        return run_paged_loop_impl(self, read_bit, write_bit, eof_exception_type, start_ip, ops_out,
+                                   paused_seconds_out, NULL, 0, ring_writes_out, (uint64_t)self->w,
+                                   (uint64_t)self->ww, 0, self->coverage, 1, 0);
+    }
+    if (self->coverage) {
+        return run_paged_loop_impl(self, read_bit, write_bit, eof_exception_type, start_ip, ops_out,
+                                   paused_seconds_out, NULL, 0, ring_writes_out, (uint64_t)self->w,
+                                   (uint64_t)self->ww, 0, 1, 0, 0);
     }
     switch (self->w) {
         case 64:
             return run_paged_loop_impl(self, read_bit, write_bit, eof_exception_type, start_ip, ops_out,
-                                       paused_seconds_out, NULL, 0, ring_writes_out, 64, 6, 0);
+                                       paused_seconds_out, NULL, 0, ring_writes_out, 64, 6, 0, 0, 0, 0);
         case 32:
             return run_paged_loop_impl(self, read_bit, write_bit, eof_exception_type, start_ip, ops_out,
-                                       paused_seconds_out, NULL, 0, ring_writes_out, 32, 5, 0);
+                                       paused_seconds_out, NULL, 0, ring_writes_out, 32, 5, 0, 0, 0, 0);
         case 16:
             return run_paged_loop_impl(self, read_bit, write_bit, eof_exception_type, start_ip, ops_out,
-                                       paused_seconds_out, NULL, 0, ring_writes_out, 16, 4, 0);
+                                       paused_seconds_out, NULL, 0, ring_writes_out, 16, 4, 0, 0, 0, 0);
         case 8:
             return run_paged_loop_impl(self, read_bit, write_bit, eof_exception_type, start_ip, ops_out,
-                                       paused_seconds_out, NULL, 0, ring_writes_out, 8, 3, 0);
+                                       paused_seconds_out, NULL, 0, ring_writes_out, 8, 3, 0, 0, 0, 0);
         default:
             return run_paged_loop_impl(self, read_bit, write_bit, eof_exception_type, start_ip, ops_out,
                                        paused_seconds_out, NULL, 0, ring_writes_out, (uint64_t)self->w,
-                                       (uint64_t)self->ww, 0);
+                                       (uint64_t)self->ww, 0, 0, 0, 0);
     }
 }
 
@@ -1578,36 +3767,52 @@ static PyObject* build_run_result(MemoryObject* self, int cause, uint64_t ops, u
     return Py_BuildValue("iKNNd", cause, (unsigned long long)ops, error_address, last_ops_list, paused_seconds);
 }
 
-/* the run loop.
-   run(read_bit, write_bit, eof_exception_type, last_ops_length=0, start_ip=0)
-   -> (termination_cause, op_count, error_bit_address_or_None, last_ops_list, paused_seconds) */
-static PyObject* Memory_run(MemoryObject* self, PyObject* args, PyObject* kwds)
+/* the run loop (see Memory_run) */
+static PyObject* memory_run_loops(MemoryObject* self, PyObject* read_bit, PyObject* write_bit,
+                                  PyObject* eof_exception_type, Py_ssize_t last_ops_length, uint64_t start_ip,
+                                  int featured, uint64_t break_after_ops, int resuming)
 {
-    static char* kwlist[] = {"read_bit", "write_bit", "eof_exception_type", "last_ops_length", "start_ip", NULL};
-    PyObject* read_bit;
-    PyObject* write_bit;
-    PyObject* eof_exception_type;
-    Py_ssize_t last_ops_length = 0;
-    unsigned long long start_ip = 0;
-
     uint64_t* last_ops_ring = NULL;
 
-    if (!PyArg_ParseTupleAndKeywords(args, kwds, "OOO|nK", kwlist, &read_bit, &write_bit, &eof_exception_type,
-                                     &last_ops_length, &start_ip)) {
+    if (mem_decide_storage(self) < 0) {
         return NULL;
     }
-    if (last_ops_length < 0) {
-        last_ops_length = 0;
+    if (self->coverage && coverage_prepare(self) < 0) {
+        return NULL;
+    }
+    self->spec_measured = 0;
+    self->watch_hit = 0;
+    if (self->trace_write) {
+        self->trace_used = TRACE_CHUNK_HEADER_BYTES;
+        self->trace_chunk_ip = start_ip;
+        self->trace_last_flip = 0;
     }
 
-    if (mem_decide_storage(self) < 0) {
-        return NULL;
+    if (last_ops_length > 0) {
+        last_ops_ring = (uint64_t*)calloc((size_t)last_ops_length, sizeof(uint64_t));
+        if (!last_ops_ring) {
+            return PyErr_NoMemory();
+        }
+    }
+
+    if (featured) {
+        uint64_t featured_ops = 0, featured_ring_writes = 0;
+        double featured_paused = 0.0;
+        int featured_cause =
+            run_featured_loop(self, read_bit, write_bit, eof_exception_type, start_ip, break_after_ops, resuming,
+                              last_ops_ring, last_ops_length, &featured_ring_writes, &featured_ops, &featured_paused);
+        featured_cause = trace_end_run(self, featured_cause);
+        if (featured_cause == CAUSE_PYTHON_ERROR) {
+            free(last_ops_ring);
+            return NULL;
+        }
+        return build_run_result(self, featured_cause, featured_ops, last_ops_ring, last_ops_length,
+                                featured_ring_writes, featured_paused);
     }
 
-    self->spec_measured = 0;
     {
         const char* measure_speculation = getenv("FLIPJUMP_MEASURE_SPECULATION");
-        if (measure_speculation && measure_speculation[0] == '1' && last_ops_length == 0) {
+        if (measure_speculation && measure_speculation[0] == '1' && !last_ops_ring) {
             uint64_t measured_ops = 0;
             double measured_paused = 0.0;
             int measured_cause = run_measured_loop(self, read_bit, write_bit, eof_exception_type, start_ip,
@@ -1620,30 +3825,25 @@ static PyObject* Memory_run(MemoryObject* self, PyObject* args, PyObject* kwds)
         }
     }
 
-    if (self->flat && last_ops_length == 0) {
+    if (self->flat && !last_ops_ring) {
         /* the common fast case gets the dedicated loop (no ring, no paged branches) */
         uint64_t fast_ops = 0;
         double fast_paused = 0.0;
         int fast_cause =
             run_flat_loop(self, read_bit, write_bit, eof_exception_type, start_ip, &fast_ops, &fast_paused);
+        fast_cause = trace_end_run(self, fast_cause);
         if (fast_cause == CAUSE_PYTHON_ERROR) {
             return NULL;
         }
         return build_run_result(self, fast_cause, fast_ops, NULL, 0, 0, fast_paused);
     }
 
-    if (last_ops_length > 0) {
-        last_ops_ring = (uint64_t*)calloc((size_t)last_ops_length, sizeof(uint64_t));
-        if (!last_ops_ring) {
-            return PyErr_NoMemory();
-        }
-    }
-
     {
         uint64_t loop_ops = 0, loop_ring_writes = 0;
         double loop_paused = 0.0;
         int loop_cause = run_generic_loop(self, read_bit, write_bit, eof_exception_type, start_ip, &loop_ops,
                                           &loop_paused, last_ops_ring, last_ops_length, &loop_ring_writes);
+        loop_cause = trace_end_run(self, loop_cause);
         if (loop_cause == CAUSE_PYTHON_ERROR) {
             free(last_ops_ring);
             return NULL;
@@ -1653,12 +3853,413 @@ static PyObject* Memory_run(MemoryObject* self, PyObject* args, PyObject* kwds)
     }
 }
 
+/* the run loop.
+   run(read_bit, write_bit, eof_exception_type, last_ops_length=0, start_ip=0, garbage_callback=None,
+       featured=False, break_after_ops=0, resuming=False, read_bytes=None, write_bytes=None,
+       write_batch_size=4096, max_ops=0, break_on_io=False)
+   -> (termination_cause, op_count, error_bit_address_or_None, last_ops_list, paused_seconds)
+   garbage_callback(bit_address) is called (continue-mode only) once per out-of-segment word
+   the program touches - the lenient garbage-handling modes' warning hook.
+   featured=True runs the featured loop: flip/jump counters, and breaks (TERM_BREAK) at the
+   set_breakpoints() addresses and when the op count reaches break_after_ops (0 = never);
+   resuming=True continues from a break at start_ip without re-breaking there.
+   break_on_io=True (featured only) also breaks before the first op that reads input or
+   writes output.
+   read_bytes(n) / write_bytes(data) are the device's byte-level interface (None = per-bit):
+   input is read a byte at a time, output is handed over in batches of up to
+   write_batch_size bytes (at the latest before an input read and at the run's end).
+   max_ops > 0 is an op budget: the run stops after executing that many ops (TERM_OP_BUDGET),
+   and is continued by a run with start_ip=last_run_ip - the time-slicing of long programs.
+   with set_watchpoints() ranges, the run stops right after an op that flips a watched bit
+   (TERM_WATCH - see last_watch_hit), and is continued by a run with start_ip=last_run_ip.
+   with set_trace(write), the run streams its execution trace to write (see trace_write).
+   with set_predecode(True), the flat runs execute the code the program never writes as
+   pre-decoded blocks (see pd_decode).
+   with set_progress(callback, interval), the run reports its progress every interval seconds. */
+static PyObject* Memory_run(MemoryObject* self, PyObject* args, PyObject* kwds)
+{
+    static char* kwlist[] = {"read_bit", "write_bit", "eof_exception_type", "last_ops_length", "start_ip",
+                             "garbage_callback", "featured", "break_after_ops", "resuming", "read_bytes",
+                             "write_bytes", "write_batch_size", "max_ops", "break_on_io", NULL};
+    PyObject* read_bit;
+    PyObject* write_bit;
+    PyObject* eof_exception_type;
+    Py_ssize_t last_ops_length = 0;
+    unsigned long long start_ip = 0;
+    PyObject* garbage_callback = Py_None;
+    int featured = 0, resuming = 0, break_on_io = 0;
+    unsigned long long break_after_ops = 0;
+    PyObject* read_bytes = Py_None;
+    PyObject* write_bytes = Py_None;
+    Py_ssize_t write_batch_size = 4096;
+    unsigned long long max_ops = 0;
+    PyObject* result;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "OOO|nKOpKpOOnKp", kwlist, &read_bit, &write_bit,
+                                     &eof_exception_type, &last_ops_length, &start_ip, &garbage_callback, &featured,
+                                     &break_after_ops, &resuming, &read_bytes, &write_bytes, &write_batch_size,
+                                     &max_ops, &break_on_io)) {
+        return NULL;
+    }
+    if (self->running_thread) {
+        PyErr_SetString(PyExc_RuntimeError, "the memory is already running");
+        return NULL;
+    }
+    if (mem_unavailable(self)) {
+        return NULL;
+    }
+    if (last_ops_length < 0) {
+        last_ops_length = 0;
+    }
+    if (write_bytes != Py_None) {
+        if (write_batch_size < 1) {
+            PyErr_SetString(PyExc_ValueError, "write_batch_size must be positive");
+            return NULL;
+        }
+        self->out_buffer = (unsigned char*)malloc((size_t)write_batch_size);
+        if (!self->out_buffer) {
+            return PyErr_NoMemory();
+        }
+        self->out_buffer_size = write_batch_size;
+        self->out_buffer_used = 0;
+        self->write_bytes = write_bytes;
+    }
+    self->read_bytes = (read_bytes == Py_None) ? NULL : read_bytes;
+    self->max_ops = max_ops;
+    self->break_on_io = break_on_io;
+
+    self->garbage_callback = (garbage_callback == Py_None) ? NULL : garbage_callback;
+    self->running_thread = PyThread_get_thread_ident();
+    result = memory_run_loops(self, read_bit, write_bit, eof_exception_type, last_ops_length, start_ip, featured,
+                              break_after_ops, resuming);
+    self->garbage_callback = NULL;
+
+    /* the device gets the buffered output on every exit - an error from the run itself
+       takes precedence over one from the flush */
+    if (result) {
+        if (io_finish_output(self, write_bit) < 0) {
+            Py_CLEAR(result);
+        }
+    } else {
+        PyObject *error_type, *error_value, *error_traceback;
+        PyErr_Fetch(&error_type, &error_value, &error_traceback);
+        if (io_finish_output(self, write_bit) < 0) {
+            PyErr_Clear();
+        }
+        PyErr_Restore(error_type, error_value, error_traceback);
+    }
+    free(self->out_buffer);
+    self->out_buffer = NULL;
+    self->out_buffer_size = 0;
+    self->out_buffer_used = 0;
+    self->write_bytes = NULL;
+    self->read_bytes = NULL;
+    self->max_ops = 0;
+    self->break_on_io = 0;
+    self->running_thread = 0;
+    return result;
+}
+
+/* ---------------------------------------------------------------- snapshots */
+
+/* the snapshot format (every field a little-endian u64):
+     header:  SNAPSHOT_MAGIC, w, flat_count, ip, op_count, the 5 byte-level IO fields
+              (out_byte, out_bit_count, out_byte_in_device, in_byte, in_bits_left),
+              flat_chunk_count, page_count, garbage_word_count
+     flat_chunk_count x (chunk index, its PAGE_WORDS words - fewer for the flat array's last chunk)
+     page_count x (page index, its PAGE_WORDS words)
+     garbage_word_count x (a continue-mode materialized gap-word address)
+   a clone of a ProgramImage saves only the flat chunks / pages that differ from its image. */
+#define SNAPSHOT_MAGIC 0x31304E5341534A46ull /* "FJSASN01" */
+#define SNAPSHOT_HEADER_FIELDS 13
+
+static void store_le_words(unsigned char* out, const uint64_t* words, uint64_t count)
+{
+    if (host_is_little_endian()) {
+        memcpy(out, words, (size_t)count * sizeof(uint64_t));
+        return;
+    }
+    for (uint64_t i = 0; i < count; i++) {
+        for (int b = 0; b < 8; b++) {
+            out[i * 8 + b] = (unsigned char)(words[i] >> (8 * b));
+        }
+    }
+}
+
+static void load_le_words(uint64_t* words, const unsigned char* data, uint64_t count)
+{
+    if (host_is_little_endian()) {
+        memcpy(words, data, (size_t)count * sizeof(uint64_t));
+        return;
+    }
+    for (uint64_t i = 0; i < count; i++) {
+        words[i] = load_le_word(data + i * 8, 8);
+    }
+}
+
+/* the words of the flat array's chunk (PAGE_WORDS, fewer for the last one) */
+static uint64_t flat_chunk_words(const MemoryObject* m, uint64_t chunk)
+{
+    const uint64_t start = chunk << PAGE_BITS;
+    return (m->flat_count - start < PAGE_WORDS) ? (m->flat_count - start) : PAGE_WORDS;
+}
+
+/* is the page's content the same as the image memory's (an image page absent reads as zeros)? */
+static int page_matches_image(const MemoryObject* base, uint64_t page_index, const Page* page)
+{
+    const Page* base_page;
+    if (!base) {
+        return 0;
+    }
+    base_page = mem_find_page((MemoryObject*)base, page_index);
+    if (base_page) {
+        return memcmp(page->words, base_page->words, PAGE_WORDS * sizeof(uint64_t)) == 0;
+    }
+    for (uint64_t i = 0; i < PAGE_WORDS; i++) {
+        if (page->words[i]) {
+            return 0;
+        }
+    }
+    return 1;
+}
+
+/* snapshot(op_count=0) -> bytes: the memory state (see the format above), the ip the last run
+   stopped at (its resume ip), and the caller's op count */
+static PyObject* Memory_snapshot(MemoryObject* self, PyObject* args)
+{
+    unsigned long long op_count = 0;
+    const MemoryObject* base;
+    uint64_t chunk_count, flat_chunks = 0, page_count = 0, garbage_count = 0, i;
+    uint64_t* flat_chunk_indices = NULL;
+    Slot** dirty_slots = NULL;
+    uint64_t header[SNAPSHOT_HEADER_FIELDS];
+    size_t size;
+    PyObject* snapshot = NULL;
+    unsigned char* out;
+    if (!PyArg_ParseTuple(args, "|K", &op_count) || mem_unavailable(self) || mem_decide_storage(self) < 0) {
+        return NULL;
+    }
+    base = self->image ? ((ProgramImageObject*)self->image)->memory : NULL;
+
+    chunk_count = (self->flat_count + PAGE_WORDS - 1) >> PAGE_BITS;
+    flat_chunk_indices = (uint64_t*)malloc((size_t)(chunk_count ? chunk_count : 1) * sizeof(uint64_t));
+    dirty_slots = (Slot**)malloc((size_t)(self->slots_used ? self->slots_used : 1) * sizeof(Slot*));
+    if (!flat_chunk_indices || !dirty_slots) {
+        PyErr_NoMemory();
+        goto done;
+    }
+    for (i = 0; i < chunk_count; i++) {
+        const uint64_t start = i << PAGE_BITS;
+        if (base && base->flat && base->flat_count == self->flat_count &&
+            memcmp(self->flat + start, base->flat + start, (size_t)flat_chunk_words(self, i) * sizeof(uint64_t)) == 0) {
+            continue;
+        }
+        flat_chunk_indices[flat_chunks++] = i;
+    }
+    for (i = 0; i < self->slot_count; i++) {
+        Slot* slot = &self->slots[i];
+        /* a still-shared page is the image's own - unchanged by definition */
+        if (!slot->key_plus1 || slot->page->shared || page_matches_image(base, slot->key_plus1 - 1, slot->page)) {
+            continue;
+        }
+        dirty_slots[page_count++] = slot;
+    }
+    for (i = 0; i < self->garbage_words.slot_count; i++) {
+        garbage_count += self->garbage_words.keys_plus1[i] != 0;
+    }
+
+    size = SNAPSHOT_HEADER_FIELDS * 8 + (size_t)page_count * (1 + PAGE_WORDS) * 8 + (size_t)garbage_count * 8;
+    for (i = 0; i < flat_chunks; i++) {
+        size += (1 + (size_t)flat_chunk_words(self, flat_chunk_indices[i])) * 8;
+    }
+    snapshot = PyBytes_FromStringAndSize(NULL, (Py_ssize_t)size);
+    if (!snapshot) {
+        goto done;
+    }
+    out = (unsigned char*)PyBytes_AsString(snapshot);
+
+    header[0] = SNAPSHOT_MAGIC;
+    header[1] = (uint64_t)self->w;
+    header[2] = self->flat_count;
+    header[3] = self->last_run_ip;
+    header[4] = op_count;
+    header[5] = self->out_byte;
+    header[6] = self->out_bit_count;
+    header[7] = (uint64_t)self->out_byte_in_device;
+    header[8] = self->in_byte;
+    header[9] = self->in_bits_left;
+    header[10] = flat_chunks;
+    header[11] = page_count;
+    header[12] = garbage_count;
+    store_le_words(out, header, SNAPSHOT_HEADER_FIELDS);
+    out += SNAPSHOT_HEADER_FIELDS * 8;
+    for (i = 0; i < flat_chunks; i++) {
+        const uint64_t chunk = flat_chunk_indices[i], words = flat_chunk_words(self, chunk);
+        store_le_words(out, &chunk, 1);
+        store_le_words(out + 8, self->flat + (chunk << PAGE_BITS), words);
+        out += (1 + words) * 8;
+    }
+    for (i = 0; i < page_count; i++) {
+        const uint64_t page_index = dirty_slots[i]->key_plus1 - 1;
+        store_le_words(out, &page_index, 1);
+        store_le_words(out + 8, dirty_slots[i]->page->words, PAGE_WORDS);
+        out += (1 + PAGE_WORDS) * 8;
+    }
+    for (i = 0; i < self->garbage_words.slot_count; i++) {
+        if (self->garbage_words.keys_plus1[i]) {
+            const uint64_t word_address = self->garbage_words.keys_plus1[i] - 1;
+            store_le_words(out, &word_address, 1);
+            out += 8;
+        }
+    }
+
+done:
+    free(flat_chunk_indices);
+    free(dirty_slots);
+    return snapshot;
+}
+
+/* restore(snapshot) -> (ip, op_count): load a snapshot() of the same program into this memory -
+   a fresh one (a new load, or an image's new_memory() for a clone's snapshot). then run it
+   from the returned ip. */
+static PyObject* Memory_restore(MemoryObject* self, PyObject* args)
+{
+    PyObject* snapshot;
+    char* data;
+    Py_ssize_t data_size;
+    const unsigned char* in;
+    uint64_t header[SNAPSHOT_HEADER_FIELDS], expected_size, i;
+    if (!PyArg_ParseTuple(args, "O", &snapshot) || mem_unavailable(self) || mem_decide_storage(self) < 0) {
+        return NULL;
+    }
+    if (PyBytes_AsStringAndSize(snapshot, &data, &data_size) < 0) {
+        return NULL;
+    }
+    in = (const unsigned char*)data;
+    if (data_size < SNAPSHOT_HEADER_FIELDS * 8) {
+        goto bad_snapshot;
+    }
+    load_le_words(header, in, SNAPSHOT_HEADER_FIELDS);
+    if (header[0] != SNAPSHOT_MAGIC) {
+        goto bad_snapshot;
+    }
+    if (header[1] != (uint64_t)self->w || header[2] != self->flat_count) {
+        PyErr_SetString(PyExc_ValueError,
+                        "the snapshot's memory layout (width / flat storage) doesn't match this memory's");
+        return NULL;
+    }
+    /* validate the whole snapshot up front (its size, the flat chunks' and the pages' indices) -
+       nothing is changed by a bad snapshot */
+    if (header[11] > (uint64_t)data_size / ((1 + PAGE_WORDS) * 8) || header[12] > (uint64_t)data_size / 8 ||
+        header[10] > ((self->flat_count + PAGE_WORDS - 1) >> PAGE_BITS)) {
+        goto bad_snapshot;
+    }
+    expected_size = SNAPSHOT_HEADER_FIELDS * 8;
+    for (i = 0; i < header[10]; i++) {
+        uint64_t chunk;
+        if (expected_size + 8 > (uint64_t)data_size) {
+            goto bad_snapshot;
+        }
+        load_le_words(&chunk, in + expected_size, 1);
+        if (chunk >= ((self->flat_count + PAGE_WORDS - 1) >> PAGE_BITS)) {
+            goto bad_snapshot;
+        }
+        expected_size += (1 + flat_chunk_words(self, chunk)) * 8;
+    }
+    for (i = 0; i < header[11]; i++) {
+        uint64_t page_index;
+        if (expected_size + (1 + PAGE_WORDS) * 8 > (uint64_t)data_size) {
+            goto bad_snapshot;
+        }
+        load_le_words(&page_index, in + expected_size, 1);
+        /* a page inside the flat window would be hidden by the flat storage (snapshot() never saves one) */
+        if (page_index > (self->word_mask >> PAGE_BITS) ||
+            (self->flat && page_index < (self->flat_count >> PAGE_BITS))) {
+            goto bad_snapshot;
+        }
+        expected_size += (1 + PAGE_WORDS) * 8;
+    }
+    expected_size += header[12] * 8;
+    if (expected_size != (uint64_t)data_size) {
+        goto bad_snapshot;
+    }
+
+    in += SNAPSHOT_HEADER_FIELDS * 8;
+    for (i = 0; i < header[10]; i++) {
+        uint64_t chunk;
+        load_le_words(&chunk, in, 1);
+        load_le_words(self->flat + (chunk << PAGE_BITS), in + 8, flat_chunk_words(self, chunk));
+        self->pd_stale = 1;
+        in += (1 + flat_chunk_words(self, chunk)) * 8;
+    }
+    for (i = 0; i < header[11]; i++) {
+        uint64_t page_index;
+        Page* page;
+        load_le_words(&page_index, in, 1);
+        page = mem_get_page(self, page_index);
+        if (!page) {
+            return NULL;
+        }
+        load_le_words(page->words, in + 8, PAGE_WORDS);
+        in += (1 + PAGE_WORDS) * 8;
+    }
+    for (i = 0; i < header[12]; i++) {
+        uint64_t word_address;
+        load_le_words(&word_address, in, 1);
+        if (address_set_insert(&self->garbage_words, word_address) < 0) {
+            return NULL;
+        }
+        in += 8;
+    }
+    self->last_run_ip = header[3];
+    self->out_byte = (unsigned int)header[5] & 0xFF;
+    self->out_bit_count = (unsigned int)header[6] & 7;
+    self->out_byte_in_device = header[7] != 0;
+    self->in_byte = (unsigned int)header[8] & 0xFF;
+    self->in_bits_left = (unsigned int)header[9] & 0xF;
+    return Py_BuildValue("KK", (unsigned long long)header[3], (unsigned long long)header[4]);
+
+bad_snapshot:
+    PyErr_SetString(PyExc_ValueError, "not a valid memory snapshot (bad magic, or truncated / corrupted)");
+    return NULL;
+}
+
 static PyObject* Memory_get_op_count(MemoryObject* self, void* closure)
 {
     (void)closure;
     return PyLong_FromUnsignedLongLong(self->last_run_op_count);
 }
 
+static PyObject* Memory_get_flip_count(MemoryObject* self, void* closure)
+{
+    (void)closure;
+    return PyLong_FromUnsignedLongLong(self->last_run_flip_count);
+}
+
+static PyObject* Memory_get_jump_count(MemoryObject* self, void* closure)
+{
+    (void)closure;
+    return PyLong_FromUnsignedLongLong(self->last_run_jump_count);
+}
+
+static PyObject* Memory_get_last_run_ip(MemoryObject* self, void* closure)
+{
+    (void)closure;
+    return PyLong_FromUnsignedLongLong(self->last_run_ip);
+}
+
+static PyObject* Memory_get_last_watch_hit(MemoryObject* self, void* closure)
+{
+    (void)closure;
+    if (!self->watch_hit) {
+        Py_RETURN_NONE;
+    }
+    return Py_BuildValue("(KKKKK)", (unsigned long long)self->watch_hit_ip,
+                         (unsigned long long)self->watch_hit_bit_address,
+                         (unsigned long long)(self->watch_hit_bit_address & ~(uint64_t)(self->w - 1)),
+                         (unsigned long long)self->watch_hit_old_word, (unsigned long long)self->watch_hit_new_word);
+}
+
 static PyObject* Memory_get_paused_seconds(MemoryObject* self, void* closure)
 {
     (void)closure;
@@ -1674,6 +4275,17 @@ static PyObject* Memory_get_storage_mode(MemoryObject* self, void* closure)
     return PyUnicode_FromString(self->flat ? (self->flat_covers_all ? "flat" : "hybrid") : "paged");
 }
 
+static PyObject* Memory_get_predecode_stats(MemoryObject* self, void* closure)
+{
+    (void)closure;
+    if (!self->pd) {
+        Py_RETURN_NONE;
+    }
+    return Py_BuildValue("{s:n, s:K, s:K, s:K, s:K}", "blocks", (Py_ssize_t)self->pd->block_count, "decoded_ops",
+                         self->pd->decoded_ops, "flushes", self->pd->flushes, "speculated_ops",
+                         self->pd->speculated_ops, "misses", self->pd->misses);
+}
+
 static PyObject* Memory_get_speculation_stats(MemoryObject* self, void* closure)
 {
     (void)closure;
@@ -1686,9 +4298,17 @@ static PyObject* Memory_get_speculation_stats(MemoryObject* self, void* closure)
 
 static PyObject* Memory_get_allocated_bytes(MemoryObject* self, void* closure)
 {
+    uint64_t private_pages = self->slots_used;
     (void)closure;
+    if (self->image) { /* a clone: its image's shared pages aren't its own footprint */
+        for (uint64_t i = 0; i < self->slot_count; i++) {
+            if (self->slots[i].key_plus1 && self->slots[i].page->shared) {
+                private_pages--;
+            }
+        }
+    }
     return PyLong_FromUnsignedLongLong(self->flat_count * sizeof(uint64_t) +
-                                       self->slots_used * PAGE_WORDS * sizeof(uint64_t) +
+                                       private_pages * PAGE_WORDS * sizeof(uint64_t) +
                                        self->slot_count * sizeof(Slot));
 }
 
@@ -1698,8 +4318,40 @@ static PyMethodDef Memory_methods[] = {
     {"set_word", (PyCFunction)Memory_set_word, METH_VARARGS, "set_word(word_address, value)"},
     {"get_word", (PyCFunction)Memory_get_word, METH_VARARGS, "get_word(word_address) -> value"},
     {"set_words", (PyCFunction)Memory_set_words, METH_VARARGS, "set_words(start_word_address, values)"},
+#ifndef _WIN32
+    {"map_fjm", (PyCFunction)Memory_map_fjm, METH_VARARGS,
+     "map_fjm(fd, segments) - load a whole mapped-version .fjm program from its open file (mapped in place"
+     " where the layout allows)"},
+#endif
+    {"load_fjm", (PyCFunction)Memory_load_fjm, METH_VARARGS,
+     "load_fjm(segments, data, relative_jumps) - load a .fjm program (its segment table and data-pool bytes)"},
+    {"snapshot", (PyCFunction)Memory_snapshot, METH_VARARGS,
+     "snapshot(op_count=0) -> bytes - the memory state, its resume ip and the op count (a clone: its image's diff)"},
+    {"restore", (PyCFunction)Memory_restore, METH_VARARGS,
+     "restore(snapshot) -> (ip, op_count) - load a snapshot() of the same program into a fresh memory"},
+    {"set_breakpoints", (PyCFunction)Memory_set_breakpoints, METH_O,
+     "set_breakpoints(bit_addresses) - the ips the featured run-loop breaks at"},
+    {"set_sampling", (PyCFunction)Memory_set_sampling, METH_O,
+     "set_sampling(every_ops) - count the ip every every_ops ops of the runs (0 = off)"},
+    {"take_samples", (PyCFunction)Memory_take_samples, METH_NOARGS,
+     "take_samples() -> {ip: count} - the sampled ips so far (clears them)"},
+    {"set_coverage", (PyCFunction)Memory_set_coverage, METH_O,
+     "set_coverage(enabled) - mark every op the runs execute"},
+    {"take_coverage", (PyCFunction)Memory_take_coverage, METH_NOARGS,
+     "take_coverage() -> (bitmap, other_ips) - the executed ops so far (clears them)"},
+    {"set_watchpoints", (PyCFunction)Memory_set_watchpoints, METH_O,
+     "set_watchpoints(ranges) - the (start, end) bit-address ranges whose flips stop the runs (TERM_WATCH)"},
+    {"set_trace", (PyCFunction)Memory_set_trace, METH_O,
+     "set_trace(write) - stream the runs' execution trace chunks to write(bytes) (None = stop)"},
+    {"set_progress", (PyCFunction)Memory_set_progress, METH_VARARGS,
+     "set_progress(callback, interval_seconds) - call callback(ops, ip, paused_seconds) every interval of the runs"
+     " (None = stop)"},
+    {"set_predecode", (PyCFunction)Memory_set_predecode, METH_O,
+     "set_predecode(enabled) - run the code the program never writes as pre-decoded blocks (flat runs)"},
     {"run", (PyCFunction)Memory_run, METH_VARARGS | METH_KEYWORDS,
-     "run(read_bit, write_bit, eof_exception_type, last_ops_length=0, start_ip=0)\n"
+     "run(read_bit, write_bit, eof_exception_type, last_ops_length=0, start_ip=0, garbage_callback=None,\n"
+     "    featured=False, break_after_ops=0, resuming=False, read_bytes=None, write_bytes=None,\n"
+     "    write_batch_size=4096, max_ops=0, break_on_io=False)\n"
      "-> (termination_cause, op_count, error_bit_address_or_None, last_ops, paused_seconds)"},
     {NULL, NULL, 0, NULL},
 };
@@ -1707,12 +4359,25 @@ static PyMethodDef Memory_methods[] = {
 static PyGetSetDef Memory_getset[] = {
     {"last_run_op_count", (getter)Memory_get_op_count, NULL, "op count of the last run (valid on exceptions too)",
      NULL},
+    {"last_run_flip_count", (getter)Memory_get_flip_count, NULL,
+     "flips (of bits >= 2w) executed by the last featured run (valid on exceptions too)", NULL},
+    {"last_run_jump_count", (getter)Memory_get_jump_count, NULL,
+     "jumps (to anywhere but the next op) executed by the last featured run (valid on exceptions too)", NULL},
+    {"last_run_ip", (getter)Memory_get_last_run_ip, NULL,
+     "the ip the last run stopped at (the op to resume from after TERM_BREAK / TERM_OP_BUDGET / TERM_WATCH)",
+     NULL},
+    {"last_watch_hit", (getter)Memory_get_last_watch_hit, NULL,
+     "(ip, bit_address, word_bit_address, old_word, new_word) of the last run's watched flip, else None", NULL},
     {"last_run_paused_seconds", (getter)Memory_get_paused_seconds, NULL,
      "IO-paused seconds of the last run (valid on exceptions too)", NULL},
     {"allocated_bytes", (getter)Memory_get_allocated_bytes, NULL,
      "bytes allocated for memory pages (footprint scales with touched memory, not segment sizes)", NULL},
     {"storage_mode", (getter)Memory_get_storage_mode, NULL,
      "'flat'/'hybrid'/'paged' - the storage mode chosen at the first run (None before it)", NULL},
+    {"predecode_stats", (getter)Memory_get_predecode_stats, NULL,
+     "dict(blocks, decoded_ops, flushes, speculated_ops, misses) of the pre-decoding tier (the current blocks;"
+     " totals), else None",
+     NULL},
     {"speculation_stats", (getter)Memory_get_speculation_stats, NULL,
      "dict(ops, first_executions, misses) of the last FLIPJUMP_MEASURE_SPECULATION=1 run, else None", NULL},
     {NULL, NULL, NULL, NULL, NULL},
@@ -1736,6 +4401,208 @@ static PyType_Spec Memory_type_spec = {
     Memory_type_slots,       /* slots */
 };
 
+/* ---------------------------------------------------------------- ProgramImage */
+
+static PyTypeObject* memory_type_object; /* _fjcore.Memory (set at the module init) */
+
+/* ProgramImage(memory) - freeze a loaded Memory (load_fjm / set_words, never run) into an
+   immutable program image. the memory becomes the image's storage: it can't be used directly
+   anymore, and its pages are shared by the clones. */
+static int ProgramImage_init(PyObject* op, PyObject* args, PyObject* kwds)
+{
+    ProgramImageObject* self = (ProgramImageObject*)op;
+    static char* kwlist[] = {"memory", NULL};
+    PyObject* memory_arg;
+    MemoryObject* memory;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O", kwlist, &memory_arg)) {
+        return -1;
+    }
+    if (self->memory) {
+        PyErr_SetString(PyExc_RuntimeError, "the program image is already initialized");
+        return -1;
+    }
+    if (!PyObject_TypeCheck(memory_arg, memory_type_object)) {
+        PyErr_SetString(PyExc_TypeError, "a ProgramImage is made of a _fjcore.Memory");
+        return -1;
+    }
+    memory = (MemoryObject*)memory_arg;
+    if (mem_unavailable(memory)) {
+        return -1;
+    }
+    if (memory->running_thread) {
+        PyErr_SetString(PyExc_RuntimeError, "the memory is running");
+        return -1;
+    }
+    if (memory->image) {
+        PyErr_SetString(PyExc_ValueError, "a memory cloned from a program image can't be frozen again");
+        return -1;
+    }
+    if (mem_decide_storage(memory) < 0) {
+        return -1;
+    }
+    for (uint64_t i = 0; i < memory->slot_count; i++) {
+        if (memory->slots[i].key_plus1) {
+            memory->slots[i].page->shared = 1;
+        }
+    }
+    memory->frozen = 1;
+    Py_INCREF(memory_arg);
+    self->memory = memory;
+    return 0;
+}
+
+static void ProgramImage_dealloc(PyObject* op)
+{
+    ProgramImageObject* self = (ProgramImageObject*)op;
+    PyTypeObject* type = Py_TYPE(op);
+    freefunc tp_free;
+    Py_CLEAR(self->memory);
+    tp_free = (freefunc)PyType_GetSlot(type, Py_tp_free);
+    tp_free(op);
+    Py_DECREF(type);
+}
+
+/* new_memory() -> Memory: a clone of the program, ready to run. the flat array's written
+   words (if any) are copied; the pages are shared with the image and copied on their first
+   fetch. */
+static PyObject* ProgramImage_new_memory(ProgramImageObject* self, PyObject* Py_UNUSED(ignored))
+{
+    MemoryObject* source = self->memory;
+    MemoryObject* clone;
+    if (!source) {
+        PyErr_SetString(PyExc_RuntimeError, "the program image isn't initialized");
+        return NULL;
+    }
+    clone = (MemoryObject*)PyObject_CallFunction((PyObject*)memory_type_object, "iiK", source->w, source->garbage_stop,
+                                                 (unsigned long long)source->flat_max_words);
+    if (!clone) {
+        return NULL;
+    }
+    if (source->segment_count) {
+        clone->segments = (SegmentRange*)malloc((size_t)source->segment_count * sizeof(SegmentRange));
+        if (!clone->segments) {
+            goto no_memory;
+        }
+        memcpy(clone->segments, source->segments, (size_t)source->segment_count * sizeof(SegmentRange));
+    }
+    clone->segment_count = clone->segment_capacity = source->segment_count;
+    clone->segments_sorted = source->segments_sorted;
+    clone->flat_count = source->flat_count;
+    clone->flat_covers_all = source->flat_covers_all;
+    if (source->flat) {
+        uint64_t i;
+        Py_ssize_t seg;
+        clone->flat = flat_alloc(source->flat_count);
+        if (!clone->flat || flat_fill_gaps(clone) < 0) {
+            goto no_memory;
+        }
+        /* copy only the in-segment pieces the image wrote (the rest stay untouched zero pages),
+           and its materialized gap words - the gaps themselves are never read */
+        for (seg = 0; seg < source->segment_count; seg++) {
+            const uint64_t end = (source->segments[seg].end < source->flat_count) ? source->segments[seg].end
+                                                                                   : source->flat_count;
+            uint64_t start, piece_end;
+            for (start = source->segments[seg].start; start < end; start = piece_end) {
+                piece_end = ((start >> PAGE_BITS) + 1) << PAGE_BITS;
+                if (piece_end > end) {
+                    piece_end = end;
+                }
+                if (memcmp(clone->flat + start, source->flat + start, (size_t)(piece_end - start) * sizeof(uint64_t))) {
+                    memcpy(clone->flat + start, source->flat + start, (size_t)(piece_end - start) * sizeof(uint64_t));
+                }
+            }
+        }
+        for (i = 0; i < source->garbage_words.slot_count; i++) {
+            const uint64_t word_address = source->garbage_words.keys_plus1[i] - 1;
+            if (source->garbage_words.keys_plus1[i] && word_address < source->flat_count) {
+                clone->flat[word_address] = source->flat[word_address];
+            }
+        }
+    }
+    clone->storage_decided = 1;
+    if (source->slots) {
+        clone->slots = (Slot*)malloc((size_t)source->slot_count * sizeof(Slot));
+        if (!clone->slots) {
+            goto no_memory;
+        }
+        memcpy(clone->slots, source->slots, (size_t)source->slot_count * sizeof(Slot));
+        clone->slot_count = source->slot_count;
+        clone->slots_used = source->slots_used;
+    }
+    if (source->garbage_words.keys_plus1) {
+        AddressSet* set = &clone->garbage_words;
+        set->keys_plus1 = (uint64_t*)malloc((size_t)source->garbage_words.slot_count * sizeof(uint64_t));
+        if (!set->keys_plus1) {
+            goto no_memory;
+        }
+        memcpy(set->keys_plus1, source->garbage_words.keys_plus1,
+               (size_t)source->garbage_words.slot_count * sizeof(uint64_t));
+        set->slot_count = source->garbage_words.slot_count;
+        set->slots_used = source->garbage_words.slots_used;
+    }
+    Py_INCREF(self);
+    clone->image = (PyObject*)self;
+    return (PyObject*)clone;
+
+no_memory:
+    Py_DECREF(clone);
+    return PyErr_NoMemory();
+}
+
+static PyObject* ProgramImage_get_memory_width(ProgramImageObject* self, void* closure)
+{
+    (void)closure;
+    return PyLong_FromLong(self->memory ? self->memory->w : 0);
+}
+
+static PyObject* ProgramImage_get_storage_mode(ProgramImageObject* self, void* closure)
+{
+    if (!self->memory) {
+        Py_RETURN_NONE;
+    }
+    return Memory_get_storage_mode(self->memory, closure);
+}
+
+static PyObject* ProgramImage_get_allocated_bytes(ProgramImageObject* self, void* closure)
+{
+    if (!self->memory) {
+        return PyLong_FromLong(0);
+    }
+    return Memory_get_allocated_bytes(self->memory, closure);
+}
+
+static PyMethodDef ProgramImage_methods[] = {
+    {"new_memory", (PyCFunction)ProgramImage_new_memory, METH_NOARGS,
+     "new_memory() -> Memory - a copy-on-write clone of the program, ready to run"},
+    {NULL, NULL, 0, NULL},
+};
+
+static PyGetSetDef ProgramImage_getset[] = {
+    {"memory_width", (getter)ProgramImage_get_memory_width, NULL, "the program's memory width", NULL},
+    {"storage_mode", (getter)ProgramImage_get_storage_mode, NULL, "the clones' storage mode: 'flat' / 'hybrid' / 'paged'",
+     NULL},
+    {"allocated_bytes", (getter)ProgramImage_get_allocated_bytes, NULL, "the image's footprint (bytes)", NULL},
+    {NULL, NULL, NULL, NULL, NULL},
+};
+
+static PyType_Slot ProgramImage_type_slots[] = {
+    {Py_tp_dealloc, (void*)ProgramImage_dealloc},
+    {Py_tp_doc, (void*)"an immutable loaded FlipJump program - Memory clones are made from it, copy-on-write"},
+    {Py_tp_methods, (void*)ProgramImage_methods},
+    {Py_tp_getset, (void*)ProgramImage_getset},
+    {Py_tp_init, (void*)ProgramImage_init},
+    {Py_tp_new, (void*)PyType_GenericNew},
+    {0, NULL},
+};
+
+static PyType_Spec ProgramImage_type_spec = {
+    "_fjcore.ProgramImage",       /* name */
+    sizeof(ProgramImageObject),   /* basicsize */
+    0,                            /* itemsize */
+    Py_TPFLAGS_DEFAULT,           /* flags */
+    ProgramImage_type_slots,      /* slots */
+};
+
 static PyModuleDef fjcore_module = {
     PyModuleDef_HEAD_INIT, "_fjcore", "native FlipJump interpreter engine", -1, NULL, NULL, NULL, NULL, NULL,
 };
@@ -1743,6 +4610,7 @@ static PyModuleDef fjcore_module = {
 PyMODINIT_FUNC PyInit__fjcore(void)
 {
     PyObject* module;
+    PyObject* program_image_type;
     PyObject* memory_type = PyType_FromSpec(&Memory_type_spec);
     if (!memory_type) {
         return NULL;
@@ -1757,10 +4625,20 @@ PyMODINIT_FUNC PyInit__fjcore(void)
         Py_DECREF(module);
         return NULL;
     }
+    memory_type_object = (PyTypeObject*)memory_type; /* the module keeps it alive */
+    program_image_type = PyType_FromSpec(&ProgramImage_type_spec);
+    if (!program_image_type || PyModule_AddObject(module, "ProgramImage", program_image_type) < 0) {
+        Py_XDECREF(program_image_type);
+        Py_DECREF(module);
+        return NULL;
+    }
     PyModule_AddIntConstant(module, "TERM_LOOPING", TERM_LOOPING);
     PyModule_AddIntConstant(module, "TERM_EOF", TERM_EOF);
     PyModule_AddIntConstant(module, "TERM_NULL_IP", TERM_NULL_IP);
     PyModule_AddIntConstant(module, "TERM_MEMORY_ERROR", TERM_MEMORY_ERROR);
+    PyModule_AddIntConstant(module, "TERM_BREAK", TERM_BREAK);
+    PyModule_AddIntConstant(module, "TERM_OP_BUDGET", TERM_OP_BUDGET);
+    PyModule_AddIntConstant(module, "TERM_WATCH", TERM_WATCH);
     PyModule_AddObject(module, "FLAT_GARBAGE_MAGIC", PyLong_FromUnsignedLongLong(FLAT_GARBAGE_MAGIC));
     return module;
 }
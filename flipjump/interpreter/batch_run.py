@@ -0,0 +1,182 @@
+"""
+the batch runner.
+runs a table of jobs - each a .fjm program, its input and its expected output - on a process pool,
+and reports one BatchResult per job, in the table's order (`fj batch JOBS_CSV -j N`).
+every worker process runs its jobs on the native engine's cached program images (run(cache_image=True)),
+so the jobs of the same program share its loaded image; a job may be limited in ops and in seconds.
+
+the jobs table is a csv in the run-tests' format (tests/tests_tables/test_run_*.csv): a row per job -
+its name, the .fjm path, the input file, the expected-output file (both may be empty - no input / no
+output expected), and optionally whether the input and the expected output are read as binary files
+(True/False; text files by default). the relative paths are relative to the root directory.
+"""
+
+import csv
+import dataclasses
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+from flipjump.interpreter import fjm_run
+from flipjump.interpreter.io_devices.FixedIO import FixedIO
+from flipjump.utils.classes import RunProgress, TerminationCause
+from flipjump.utils.constants import IO_BYTES_ENCODING
+from flipjump.utils.exceptions import FlipJumpException, FlipJumpRuntimeException
+
+# the statuses of a finished job
+PASSED = 'passed'  # terminated by looping, with the expected output
+FAILED = 'failed'  # terminated otherwise, or with another output
+OP_LIMIT = 'op-limit'  # stopped after max_ops ops
+TIME_LIMIT = 'time-limit'  # stopped after time_limit seconds
+ERROR = 'error'  # couldn't run (e.g. a missing file, a bad .fjm)
+
+_CSV_BOOLEANS = {'True': True, 'False': False}
+
+# the pool hands out the jobs in chunks of len(jobs) / (workers * this) jobs (at least 1) - so every worker gets
+# jobs, even in a batch of as many jobs as workers (every worker caches its programs' images anyway)
+_JOB_CHUNKS_PER_WORKER = 4
+
+# a run's time limit is checked this many times over its span (on the engine's progress reports)
+_TIME_LIMIT_CHECKS = 10
+
+
+@dataclasses.dataclass(frozen=True)
+class BatchJob:
+    """
+    a program run of the batch, and its expected output.
+    """
+
+    name: str
+    fjm_path: Path
+    input_path: Optional[Path] = None  # None - no input
+    expected_output_path: Optional[Path] = None  # None - no output expected
+    input_is_binary: bool = False
+    output_is_binary: bool = False
+
+
+@dataclasses.dataclass(frozen=True)
+class BatchResult:
+    """
+    how a job of the batch ended. the results of the same jobs are identical across the batches (they
+    hold no times; only a TIME_LIMIT job's op count varies), so the result streams of two batches can be
+    compared as is.
+    """
+
+    name: str
+    status: str  # PASSED, FAILED, OP_LIMIT, TIME_LIMIT or ERROR
+    termination: Optional[str] = None  # the termination cause (None on ERROR)
+    op_counter: int = 0
+    output_matches: Optional[bool] = None  # None if the run didn't finish (ERROR, OP_LIMIT, TIME_LIMIT)
+    error: Optional[str] = None  # the error of an ERROR job
+
+
+class _TimeLimitExceeded(FlipJumpRuntimeException):
+    def __init__(self, time_limit: float, op_counter: int):
+        super().__init__(f'the run took more than its time limit ({time_limit}s)')
+        self.op_counter = op_counter
+
+
+def read_jobs(jobs_csv_path: Path, root: Optional[Path] = None) -> List[BatchJob]:
+    """
+    @param jobs_csv_path: the jobs table (see the module's docstring)
+    @param root: the directory of the table's relative paths (default: the current directory)
+    @raise FlipJumpRuntimeException: on a malformed row
+    @return: the table's jobs, in order
+    """
+    root = Path() if root is None else root
+    jobs = []
+    with open(jobs_csv_path, 'r', newline='') as jobs_file:
+        for line_index, row in enumerate(csv.reader(jobs_file)):
+            fields = [field.strip() for field in row]
+            if not fields:
+                continue
+            binary_flags = fields[4:]
+            if len(fields) not in (4, 6) or any(flag not in _CSV_BOOLEANS for flag in binary_flags):
+                raise FlipJumpRuntimeException(
+                    f'bad job in {jobs_csv_path}, line {line_index + 1}: expected "name, fjm, input, '
+                    f'expected_output[, input_is_binary, output_is_binary]", got {row}'
+                )
+            name, fjm_path, input_path, expected_output_path = fields[:4]
+            jobs.append(
+                BatchJob(
+                    name,
+                    root / fjm_path,
+                    root / input_path if input_path else None,
+                    root / expected_output_path if expected_output_path else None,
+                    *(_CSV_BOOLEANS[flag] for flag in binary_flags),
+                )
+            )
+    return jobs
+
+
+def _read_job_file(path: Optional[Path], is_binary: bool) -> bytes:
+    if path is None:
+        return b''
+    if is_binary:
+        return path.read_bytes()
+    return path.read_text().encode(IO_BYTES_ENCODING)
+
+
+def run_job(job: BatchJob, max_ops: int = 0, time_limit: Optional[float] = None) -> BatchResult:
+    """
+    run a job (on the native engine's cached program image, when it's available).
+    @param job: the job
+    @param max_ops: if positive, stop the run after that many ops (needs the native engine)
+    @param time_limit: if specified, stop the run after about that many seconds - of elapsed time, including
+    the time it waits on IO (needs the native engine; checked every time_limit/10 seconds, every 2^18 ops)
+    @return: the job's result
+    """
+
+    def stop_on_time_limit(progress: RunProgress) -> None:
+        if time_limit is not None and progress.run_time + progress.paused_seconds >= time_limit:
+            raise _TimeLimitExceeded(time_limit, progress.op_counter)
+
+    try:
+        io_device = FixedIO(_read_job_file(job.input_path, job.input_is_binary))
+        expected_output = _read_job_file(job.expected_output_path, job.output_is_binary)
+        statistics = fjm_run.run(
+            job.fjm_path,
+            io_device=io_device,
+            last_ops_debugging_list_length=None,
+            cache_image=True,
+            max_ops=max_ops,
+            on_progress=stop_on_time_limit if time_limit is not None else None,
+            progress_every_seconds=time_limit / _TIME_LIMIT_CHECKS if time_limit is not None else 1.0,
+        )
+    except _TimeLimitExceeded as time_limit_exceeded:
+        return BatchResult(job.name, TIME_LIMIT, op_counter=time_limit_exceeded.op_counter)
+    except (FlipJumpException, OSError) as run_error:
+        return BatchResult(job.name, ERROR, error=str(run_error))
+
+    termination_cause = statistics.termination_cause
+    if termination_cause == TerminationCause.OpBudgetExhausted:
+        return BatchResult(job.name, OP_LIMIT, str(termination_cause), statistics.op_counter)
+    output_matches = io_device.get_output(allow_incomplete_output=True) == expected_output
+    status = PASSED if termination_cause == TerminationCause.Looping and output_matches else FAILED
+    return BatchResult(job.name, status, str(termination_cause), statistics.op_counter, output_matches)
+
+
+def run_batch(
+    jobs: Iterable[BatchJob],
+    *,
+    workers: int = 1,
+    max_ops: int = 0,
+    time_limit: Optional[float] = None,
+) -> Iterator[BatchResult]:
+    """
+    run the jobs on a pool of worker processes (in this process, with a single worker).
+    @param jobs: the jobs
+    @param workers: the number of worker processes
+    @param max_ops: if positive, every job stops after that many ops (see run_job)
+    @param time_limit: if specified, every job stops after about that many seconds (see run_job)
+    @return: the jobs' results, in the jobs' order - each as soon as it and the jobs before it are done
+    """
+    job_list = list(jobs)
+    max_ops_list = [max_ops] * len(job_list)
+    time_limit_list = [time_limit] * len(job_list)
+    if workers <= 1:
+        yield from map(run_job, job_list, max_ops_list, time_limit_list)
+        return
+    chunk_size = max(1, len(job_list) // (workers * _JOB_CHUNKS_PER_WORKER))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(run_job, job_list, max_ops_list, time_limit_list, chunksize=chunk_size)
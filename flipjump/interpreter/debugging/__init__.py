@@ -1,5 +1,6 @@
 """
 the debugging subpackage.
 the tools used while running a .fjm program: breakpoint handling, macro code-usage
-statistics graphs, and the gui message-boxes that drive interactive debugging.
+statistics graphs, the sampling profiler's reports, the execution coverage, the write
+watchpoints, the execution trace's reader, and the gui message-boxes that drive interactive debugging.
 """
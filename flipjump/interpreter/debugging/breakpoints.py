@@ -6,9 +6,8 @@ back to labels, and pauses the run to let the user inspect memory and program st
 
 import re
 from pathlib import Path
-from typing import Optional, Dict, Set, Tuple
+from typing import Optional, Dict, Set, Tuple, Protocol
 
-from flipjump.fjm import fjm_reader
 from flipjump.interpreter.debugging.user_queries import ask_for_command, show_message
 from flipjump.utils.classes import RunStatistics
 from flipjump.utils.constants import MACRO_SEPARATOR_STRING
@@ -20,6 +19,17 @@ class BreakpointHandlerUnnecessary(Exception):
     pass
 
 
+class DebuggedMemory(Protocol):
+    """
+    the memory of the program being debugged - the fjm_reader.Reader (the python run-loops),
+    or the native engine's view of its memory (get_word reads a word, unaligned included).
+    """
+
+    memory_width: int
+
+    def get_word(self, bit_address: int) -> int: ...
+
+
 DEBUGGER_HELP = (
     "commands (one per line):\n"
     "  h / help / ?            show this help\n"
@@ -44,7 +54,7 @@ DEBUGGER_HELP = (
 
 
 def calculate_variable_value(
-    variable_prefix: Tuple[str, int, int], address: int, mem: fjm_reader.Reader
+    variable_prefix: Tuple[str, int, int], address: int, mem: DebuggedMemory
 ) -> Tuple[int, int, int]:
     """
     Read the variable related memory words (using 'mem'),
@@ -98,7 +108,7 @@ def show_memory_address(
     variable_prefix: Optional[Tuple[str, int, int]],
     user_query: str,
     address: int,
-    mem: fjm_reader.Reader,
+    mem: DebuggedMemory,
     label_name: Optional[str],
 ) -> None:
     """
@@ -114,7 +124,7 @@ def show_memory_address(
      ).
     @param user_query: the string the user entered.
     @param address: the address resolved from user_query string.
-    @param mem: the fjm_reader.Reader for the current running fj. Used for reading the actual memory values
+    @param mem: the memory of the current running fj. Used for reading the actual memory values
      of the given address (or addresses if the user asked for a variable).
     @param label_name: if not None - the user asked for an integer address, and this its label-name,
      or the closest label to it.
@@ -211,7 +221,7 @@ class BreakpointHandler:
             except ValueError:
                 return f'{hex(address)}'
 
-    def get_breakpoint_message_body(self, ip: int, mem: fjm_reader.Reader, op_counter: int) -> str:
+    def get_breakpoint_message_body(self, ip: int, mem: DebuggedMemory, op_counter: int) -> str:
         """
         @return the message box body for the debug-action query, for the current ip.
         """
@@ -220,14 +230,14 @@ class BreakpointHandler:
         jump = self.get_address_str(mem.get_word(ip + mem.memory_width))
         return f'Address {address}.\n\n{op_counter} ops executed.\n\nflip {flip}.\n\njump {jump}.'
 
-    def handle_read_memory(self, target: str, mem: fjm_reader.Reader) -> None:
+    def handle_read_memory(self, target: str, mem: DebuggedMemory) -> None:
         """
         Reads the memory-word / flipjump-variable named by 'target' (an address, a label, or a
         ':'-prefixed flipjump-variable - see DEBUGGER_HELP), and shows its value and the most
         useful information we know about it.
 
         @param target: the read target the user typed after the read command.
-        @param mem: the fjm_reader.Reader for the current running fj. Used for reading the actual memory values
+        @param mem: the memory of the current running fj. Used for reading the actual memory values
          of the given address (or addresses if the user asked for a variable).
         """
         variable_prefix = None
@@ -260,7 +270,7 @@ class BreakpointHandler:
                     title_message='Invalid memory address.',
                 )
 
-    def query_user_for_debug_action(self, ip: int, mem: fjm_reader.Reader, op_counter: int) -> Tuple[str, int]:
+    def query_user_for_debug_action(self, ip: int, mem: DebuggedMemory, op_counter: int) -> Tuple[str, int]:
         """
         Run the debugger prompt at the current breakpoint, handling read/help inline and looping
         until the user picks an action that resumes the run.
@@ -329,7 +339,7 @@ class BreakpointHandler:
 
 
 def handle_breakpoint(
-    breakpoint_handler: BreakpointHandler, ip: int, mem: fjm_reader.Reader, statistics: RunStatistics
+    breakpoint_handler: BreakpointHandler, ip: int, mem: DebuggedMemory, statistics: RunStatistics
 ) -> Optional[BreakpointHandler]:
     """
     show debug message, query user for action, apply its action.
@@ -0,0 +1,118 @@
+"""
+the execution coverage.
+ExecutionCoverage holds the ops a native run executed (run(coverage=True)) - the engine's bitmap of
+the 2w-aligned ops, and the other executed op addresses. macro_coverage folds it into per-macro
+coverage (the executed ops out of the macro's ops, including its nested macro calls'), attributing
+each op of the program to the nearest label at or before it - to find the unused macros, or to
+measure how much of the code a test-suite runs.
+"""
+
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple, Union
+
+from flipjump.fjm.fjm_reader import Reader
+from flipjump.interpreter.debugging.sampling_profiler import attribute_samples, label_macro_calls
+
+
+class ExecutionCoverage:
+    """
+    the executed ops: bitmap holds the 2w-aligned ops (the op at bit-address i*2w is bit i%8 of
+    bitmap[i//8]); other_addresses holds the rest (unaligned ops, or ops above the bitmap).
+    """
+
+    def __init__(self, memory_width: int, bitmap: bytes = b'', other_addresses: Iterable[int] = ()) -> None:
+        self.memory_width = memory_width
+        self.bitmap = bytearray(bitmap)
+        self.other_addresses = set(other_addresses)
+
+    def add(self, bitmap: Union[bytes, bytearray], other_addresses: Iterable[int]) -> None:
+        """
+        add the executed ops of another run (the engine's take_coverage() result).
+        """
+        merged = int.from_bytes(self.bitmap, 'little') | int.from_bytes(bitmap, 'little')
+        self.bitmap = bytearray(merged.to_bytes(max(len(self.bitmap), len(bitmap)), 'little'))
+        self.other_addresses.update(other_addresses)
+
+    def update(self, other: 'ExecutionCoverage') -> None:
+        """
+        add the executed ops of another coverage (e.g. of another run of the same program).
+        """
+        self.add(other.bitmap, other.other_addresses)
+
+    def __contains__(self, address: int) -> bool:
+        op_size = 2 * self.memory_width
+        op_index = address // op_size
+        if address % op_size == 0 and op_index < len(self.bitmap) * 8:
+            return bool(self.bitmap[op_index >> 3] & (1 << (op_index & 7)))
+        return address in self.other_addresses
+
+    def addresses(self) -> List[int]:
+        """
+        @return: the sorted addresses of the executed ops
+        """
+        op_size = 2 * self.memory_width
+        executed = set(self.other_addresses)
+        for index, byte in enumerate(self.bitmap):
+            if byte:
+                executed.update((index * 8 + bit) * op_size for bit in range(8) if byte & (1 << bit))
+        return sorted(executed)
+
+    def __len__(self) -> int:
+        return len(self.addresses())
+
+
+def program_op_addresses(fjm_path: Path) -> List[int]:
+    """
+    @return: the addresses of the program's ops - the op-pairs of words the .fjm file holds
+    (not the reserved zeros)
+    """
+    reader = Reader(fjm_path, keep_raw_data=True)
+    assert reader.raw_segments is not None
+    return [
+        (segment_start + word_offset) * reader.memory_width
+        for segment_start, _, _, data_length in reader.raw_segments
+        for word_offset in range(0, data_length, 2)
+    ]
+
+
+def macro_coverage(
+    coverage: ExecutionCoverage, label_to_address: Dict[str, int], op_addresses: Iterable[int]
+) -> Dict[str, Tuple[int, int]]:
+    """
+    @param coverage: the executed ops
+    @param label_to_address: the program's labels (from the debugging file)
+    @param op_addresses: the program's ops (from program_op_addresses)
+    @return: {macro: (executed ops, ops)} - each macro's ops include its nested macro calls'
+    """
+    op_addresses = list(op_addresses)
+    label_ops = attribute_samples({address: 1 for address in op_addresses}, label_to_address)
+    label_executed_ops = attribute_samples(
+        {address: 1 for address in op_addresses if address in coverage}, label_to_address
+    )
+
+    macros: Dict[str, Tuple[int, int]] = {}
+    for label, ops in label_ops.items():
+        executed_ops = label_executed_ops.get(label, 0)
+        for macro_call in set(label_macro_calls(label)):
+            macro_executed_ops, macro_ops = macros.get(macro_call, (0, 0))
+            macros[macro_call] = macro_executed_ops + executed_ops, macro_ops + ops
+    return macros
+
+
+def coverage_report(coverage: ExecutionCoverage, label_to_address: Dict[str, int], op_addresses: Iterable[int]) -> str:
+    """
+    @return: a text report of the program's coverage, and of every macro's (the least covered first)
+    """
+    op_addresses = list(op_addresses)
+    executed_ops = sum(1 for address in op_addresses if address in coverage)
+    total_ops = len(op_addresses)
+    lines = [f'{executed_ops:,} of the program\'s {total_ops:,} ops were executed ({executed_ops / total_ops:.2%}).']
+
+    macros = macro_coverage(coverage, label_to_address, op_addresses)
+    if macros:
+        lines += ['', 'The macros coverage (executed / all ops, including their nested macro calls):']
+        for macro, (macro_executed_ops, macro_ops) in sorted(
+            macros.items(), key=lambda item: (item[1][0] / item[1][1], item[0])
+        ):
+            lines.append(f'  {macro_executed_ops / macro_ops:7.2%}  {macro_executed_ops:,} / {macro_ops:,}  {macro}')
+    return '\n'.join(lines)
@@ -0,0 +1,118 @@
+"""
+the execution trace.
+a native run (run(trace_path=...)) streams every executed op - its (ip, flip, jump) - to a binary
+trace file, which read_trace decodes offline (`fj trace`), and trace_lines renders like show_trace,
+with the label of every change of code.
+
+the file is a header (TRACE_MAGIC, the memory width - u64), then the chunks the engine hands over.
+a chunk is its records' size (u32) and its first op's ip (u64), then one record per op - the zigzag
+varints of the op's flip minus the previous op's flip (0 for the chunk's first op), and of its jump
+minus the next op (ip + 2w). the ip of every op but the chunk's first is the previous op's jump.
+all the integers are little-endian; the deltas wrap around 2^64.
+"""
+
+import struct
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, NamedTuple, Optional
+
+from flipjump.interpreter.debugging.sampling_profiler import label_frames, nearest_label_finder
+from flipjump.utils.exceptions import FlipJumpRuntimeException
+
+TRACE_MAGIC = b'FJTRACE1'
+
+_FILE_HEADER = struct.Struct('<8sQ')
+_CHUNK_HEADER = struct.Struct('<IQ')
+_MASK_64 = (1 << 64) - 1
+
+
+class TraceRecord(NamedTuple):
+    """
+    an executed op.
+    """
+
+    ip: int
+    flip: int
+    jump: int
+
+
+def write_trace_header(trace_file: BinaryIO, memory_width: int) -> None:
+    """
+    start a trace file, before the engine writes its chunks to it.
+    """
+    trace_file.write(_FILE_HEADER.pack(TRACE_MAGIC, memory_width))
+
+
+def _zigzag_varints(data: bytes) -> Iterator[int]:
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            yield (value >> 1) ^ -(value & 1)
+            value = shift = 0
+    if shift:
+        raise FlipJumpRuntimeException('bad trace chunk: its last record is cut')
+
+
+def _chunk_records(data: bytes, ip: int, dw: int) -> Iterator[TraceRecord]:
+    deltas = _zigzag_varints(data)
+    flip = 0
+    for flip_delta in deltas:
+        jump_delta = next(deltas, None)
+        if jump_delta is None:
+            raise FlipJumpRuntimeException('bad trace chunk: its last record is cut')
+        flip = (flip + flip_delta) & _MASK_64
+        jump = (ip + dw + jump_delta) & _MASK_64
+        yield TraceRecord(ip, flip, jump)
+        ip = jump
+
+
+def _read_header(trace_file: BinaryIO, trace_path: Path) -> int:
+    """
+    @raise FlipJumpRuntimeException: if the file isn't a trace file
+    @return: the memory width of the traced program
+    """
+    header = trace_file.read(_FILE_HEADER.size)
+    if len(header) != _FILE_HEADER.size or header[: len(TRACE_MAGIC)] != TRACE_MAGIC:
+        raise FlipJumpRuntimeException(f"{trace_path} isn't an execution-trace file")
+    _, memory_width = _FILE_HEADER.unpack(header)
+    return int(memory_width)
+
+
+def read_trace(trace_path: Path) -> Iterator[TraceRecord]:
+    """
+    decode a trace file, a chunk at a time.
+    @raise FlipJumpRuntimeException: if the file isn't a trace file, or is cut (after yielding its whole chunks)
+    @return: the executed ops, in order
+    """
+    with open(trace_path, 'rb') as trace_file:
+        dw = 2 * _read_header(trace_file, trace_path)
+        while True:
+            chunk_header = trace_file.read(_CHUNK_HEADER.size)
+            if not chunk_header:
+                return
+            if len(chunk_header) != _CHUNK_HEADER.size:
+                raise FlipJumpRuntimeException(f'the trace file {trace_path} is cut')
+            records_size, first_ip = _CHUNK_HEADER.unpack(chunk_header)
+            data = trace_file.read(records_size)
+            if len(data) != records_size:
+                raise FlipJumpRuntimeException(f'the trace file {trace_path} is cut')
+            yield from _chunk_records(data, first_ip, dw)
+
+
+def trace_lines(records: Iterator[TraceRecord], label_to_address: Dict[str, int]) -> Iterator[str]:
+    """
+    @param records: the executed ops (from read_trace)
+    @param label_to_address: the program's labels (from the debugging file); may be empty
+    @return: a show_trace-like line per op ("ip:   flip; jump", in hex), preceded by the frames of its
+    nearest label (see label_frames) whenever they change
+    """
+    nearest_label = nearest_label_finder(label_to_address) if label_to_address else None
+    last_frames: Optional[str] = None
+    for ip, flip, jump in records:
+        if nearest_label is not None:
+            frames = ' -> '.join(label_frames(nearest_label(ip)))
+            if frames != last_frames:
+                yield f'[{frames}]'
+                last_frames = frames
+        yield f'{hex(ip)[2:].rjust(7)}:   {hex(flip)[2:]}; {hex(jump)[2:]}'
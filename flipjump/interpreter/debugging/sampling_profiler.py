@@ -0,0 +1,127 @@
+"""
+the sampling profiler's reports.
+maps the ip histogram of a sampled native run (run(sample_every_ops=N)) to the program's labels -
+each sampled ip is attributed to the nearest label at or before it - and renders it as a top-N text
+report, or as collapsed stacks (one "frame;frame;...;frame count" line per macro path), the input
+format of flamegraph tools (e.g. flamegraph.pl, speedscope).
+a label is a macro path (its macro calls, separated by '---'), so its frames are these macro calls.
+the attribution is approximate: a macro's code that follows a nested macro call (until the macro's
+next label) is attributed to the nested call.
+"""
+
+import bisect
+import re
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+
+from flipjump.utils.constants import MACRO_SEPARATOR_STRING
+
+# the label of the samples before the program's first label (or of a program without labels)
+UNLABELED_FRAME = '(unlabeled)'
+
+# the file/line/rep prefix of a macro call in a label, e.g. 'f1:l3:' or 's1:l166:rep0:'
+_MACRO_CALL_PREFIX = re.compile(r'^[fs]\d+:l\d+:(rep\d+:)?')
+# the wflips blocks' labels, e.g. ':wflips:1252'
+_WFLIPS_LABEL = re.compile(r'^:wflips:\d+$')
+_START_LABEL = ':start:'
+
+
+def label_macro_calls(label: str) -> List[str]:
+    """
+    @return: the label's macro calls (without their file/line/rep prefixes)
+    """
+    return [_MACRO_CALL_PREFIX.sub('', macro_call) for macro_call in label.split(MACRO_SEPARATOR_STRING)[:-1]]
+
+
+def label_frames(label: str) -> List[str]:
+    """
+    split a label into its stack frames - its macro calls (without their file/line/rep prefixes),
+    then the label itself (unless it's a macro's ':start:' label).
+    e.g. 'f1:l3:stl.output(1)---s1:l166:rep0:stl.output_char(1)---:start:' => ['stl.output(1)', 'stl.output_char(1)'].
+    """
+    frames = label_macro_calls(label)
+    name = label.split(MACRO_SEPARATOR_STRING)[-1]
+    if _WFLIPS_LABEL.match(name):
+        frames.append(':wflips:')
+    elif name != _START_LABEL or not frames:
+        frames.append(name)
+    return frames
+
+
+def _label_depth(label: str) -> int:
+    return label.count(MACRO_SEPARATOR_STRING)
+
+
+def nearest_label_finder(label_to_address: Dict[str, int]) -> Callable[[int], str]:
+    """
+    @param label_to_address: the program's labels (from the debugging file); may be empty
+    @return: a function from an address to the nearest label at or before it (of the labels on the
+    same address, the most nested one), or to UNLABELED_FRAME before the first label
+    """
+    address_to_label: Dict[int, str] = {}
+    for label, address in label_to_address.items():
+        if address not in address_to_label or _label_depth(label) > _label_depth(address_to_label[address]):
+            address_to_label[address] = label
+    addresses = sorted(address_to_label)
+
+    def nearest_label(address: int) -> str:
+        index = bisect.bisect_right(addresses, address) - 1
+        return address_to_label[addresses[index]] if index >= 0 else UNLABELED_FRAME
+
+    return nearest_label
+
+
+def attribute_samples(samples: Dict[int, int], label_to_address: Dict[str, int]) -> Dict[str, int]:
+    """
+    attribute each sampled ip to the nearest label at or before it (of the labels on the same
+    address, the most nested one).
+    @param samples: the run's {ip: samples} histogram
+    @param label_to_address: the program's labels (from the debugging file); may be empty
+    @return: {label: samples} (the samples before the first label go to UNLABELED_FRAME)
+    """
+    nearest_label = nearest_label_finder(label_to_address)
+    label_samples: Dict[str, int] = defaultdict(int)
+    for ip, count in samples.items():
+        label_samples[nearest_label(ip)] += count
+    return dict(label_samples)
+
+
+def collapsed_stacks(label_samples: Dict[str, int]) -> List[str]:
+    """
+    @param label_samples: the {label: samples} attribution (from attribute_samples)
+    @return: the collapsed-stack lines ("frame;frame;...;frame count"), sorted by the stack
+    """
+    stack_samples: Dict[str, int] = defaultdict(int)
+    for label, count in label_samples.items():
+        stack_samples[';'.join(label_frames(label))] += count
+    return [f'{stack} {count}' for stack, count in sorted(stack_samples.items())]
+
+
+def _hottest(samples: Dict[str, int], top: int) -> List[Tuple[str, int]]:
+    return sorted(samples.items(), key=lambda name_count: (-name_count[1], name_count[0]))[:top]
+
+
+def top_report(label_samples: Dict[str, int], top: int = 20) -> str:
+    """
+    @param label_samples: the {label: samples} attribution (from attribute_samples)
+    @param top: how many labels / macros to list
+    @return: a text report of the hottest labels (their own samples) and the hottest macros
+    (their samples including their nested macro calls')
+    """
+    total = sum(label_samples.values())
+    if total == 0:
+        return 'The sampling profiler took no samples.'
+
+    self_samples: Dict[str, int] = defaultdict(int)
+    inclusive_samples: Dict[str, int] = defaultdict(int)
+    for label, count in label_samples.items():
+        self_samples[' -> '.join(label_frames(label))] += count
+        for macro_call in set(label_macro_calls(label)):  # a recursive macro counts once per sample
+            inclusive_samples[macro_call] += count
+
+    lines = [f'The sampling profiler took {total:,} samples.', '', 'The hottest code (by label):']
+    lines += [f'  {count / total:7.2%}  {name}' for name, count in _hottest(self_samples, top)]
+    if inclusive_samples:
+        lines += ['', 'The hottest macros (including their nested macro calls):']
+        lines += [f'  {count / total:7.2%}  {name}' for name, count in _hottest(inclusive_samples, top)]
+    return '\n'.join(lines)
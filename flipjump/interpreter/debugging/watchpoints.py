@@ -0,0 +1,81 @@
+"""
+the write watchpoints.
+a watchpoint is a range of bit-addresses [start, end); a native run (run(watchpoints=...)) stops
+right after an op whose flip lands in one, and reports its WatchHit - the op, the flipped bit, and
+the word holding it before and after the flip. the run's on_watch callback decides whether the run
+stops there, or logs the write and continues. the check runs in dedicated native loop bodies, so
+the runs without watchpoints don't pay for it.
+"""
+
+import dataclasses
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flipjump.interpreter.debugging.breakpoints import BreakpointHandler
+from flipjump.utils.exceptions import FlipJumpRuntimeException
+
+# the words a watchpoint spec without a :WORDS suffix watches - one op (e.g. a stl bit/hex variable)
+DEFAULT_WATCH_WORDS = 2
+
+
+@dataclasses.dataclass(frozen=True)
+class WatchHit:
+    """
+    an op's flip of a watched bit.
+    """
+
+    op_counter: int  # the run's op count, including the flipping op
+    ip: int  # the flipping op
+    bit_address: int  # the flipped bit
+    word_address: int  # the (bit-)address of the word holding the flipped bit
+    old_word: int  # the word, before the flip
+    new_word: int  # the word, after the flip
+
+    def describe(self, labels_handler: Optional[BreakpointHandler] = None) -> str:
+        """
+        @param labels_handler: used to find the label names of the op and of the word (if given)
+        @return: a text description of the hit
+        """
+
+        def address_str(address: int) -> str:
+            if labels_handler is None or not labels_handler.address_to_label:
+                return hex(address)
+            return labels_handler.get_address_str(address)
+
+        return (
+            f'Watchpoint hit after {self.op_counter:,} ops: the op at {address_str(self.ip)}\n'
+            f'flipped bit {hex(self.bit_address)} of the word at {address_str(self.word_address)}\n'
+            f'  {hex(self.old_word)} -> {hex(self.new_word)}'
+        )
+
+
+def parse_watchpoints(
+    watch_specs: Iterable[str], label_to_address: Dict[str, int], memory_width: int
+) -> List[Tuple[int, int]]:
+    """
+    @param watch_specs: the watchpoints, each a label name or a (hex/decimal) bit-address, optionally
+    followed by :WORDS - the number of words to watch from there (DEFAULT_WATCH_WORDS by default)
+    @param label_to_address: the program's labels (from the debugging file)
+    @param memory_width: the program's memory width
+    @raise FlipJumpRuntimeException: if a spec isn't a label / an address, or has a bad :WORDS
+    @return: the watched bit-address ranges [start, end)
+    """
+    watch_ranges = []
+    for watch_spec in watch_specs:
+        name, words = watch_spec, DEFAULT_WATCH_WORDS
+        if watch_spec not in label_to_address and ':' in watch_spec:  # labels may contain ':' too
+            name, words_str = watch_spec.rsplit(':', 1)
+            if not words_str.isdecimal() or int(words_str) <= 0:
+                raise FlipJumpRuntimeException(f'bad watchpoint {watch_spec}: WORDS must be a positive number')
+            words = int(words_str)
+
+        if name in label_to_address:
+            start = label_to_address[name]
+        else:
+            try:
+                start = int(name, 0)
+            except ValueError:
+                raise FlipJumpRuntimeException(
+                    f"the watchpoint {name} isn't an address, and can't be found in the debugging labels"
+                ) from None
+        watch_ranges.append((start, start + words * memory_width))
+    return watch_ranges
@@ -6,28 +6,75 @@ and collecting run statistics (returned as TerminationStatistics).
 
 three run-loops (engines) are implemented:
 - the native engine (the default when built): the _fjcore C-extension - segment-aware paged
-  memory and the fetch-flipjump loop in C, calling back into python only for IO. ~500x
-  faster than the featured loop. build it with `python build_fjcore.py`; disable it with the
-  FLIPJUMP_NO_NATIVE=1 environment variable.
+  memory and the fetch-flipjump loop in C, calling back into python only for IO (per byte /
+  per output batch, for devices with the byte-level interface). ~500x faster than the
+  featured loop. build it with `python build_fjcore.py`; disable it with the
+  FLIPJUMP_NO_NATIVE=1 environment variable. it has a featured mode too (breakpoints, the
+  flip/jump counters) that returns to python only when a break fires - the debugger runs on it.
 - the fast loop (the default otherwise): pure-python, the memory accesses and IO/termination
   checks are inlined, and the per-op statistics (flip/jump counters) are skipped. ~20x faster.
-- the featured loop: supports breakpoints, tracing, and full statistics. selected when
-  debugging features are requested, or explicitly with profile=True.
+- the featured loop: supports breakpoints, tracing, and full statistics. selected for tracing,
+  and for breakpoints / profile=True when the native engine isn't available.
+
+run_in_slices runs a program on the native engine in op-budgeted slices, pausing between them
+(time-slicing several programs, op quotas, progress reports).
+run_many runs a batch of programs on a thread pool - the native engine's run-loop releases the
+GIL (reacquiring it for IO callbacks and signal checks), so the programs run in parallel.
+run(cache_image=True) keeps the loaded program as a native program image, and runs it on
+copy-on-write clones - for running the same .fjm many times.
+run(checkpoint_every_ops=N) saves a checkpoint file (the memory's diff from the program image,
+the ip and the op count) every N ops; run(resume_from=path) continues a run from one.
+run(sample_every_ops=N) samples the ip every N ops (a native histogram), for the sampling profiler's
+reports (debugging/sampling_profiler.py); run(coverage=True) marks every executed op (a native bitmap),
+for the per-macro coverage (debugging/coverage.py). run(watchpoints=...) stops the native run right
+after an op flips a watched bit, for its on_watch callback (debugging/watchpoints.py).
+run(trace_path=...) streams every executed op to a binary trace file (the native engine's delta-encoded
+records), decoded offline by debugging/execution_trace.py - the show_trace of long runs.
+run(predecode=True) has the native engine run the code the program never writes as pre-decoded blocks.
+run(on_progress=...) reports a long native run's progress (its ops, ip, speed and IO-paused time) every
+progress_every_seconds, from the engine's signal checks - `fj --progress` prints it as a status line.
+run(max_ops=N) stops the native run after N ops (the op limit of the batch runner, batch_run.py).
+preinit runs a program's startup once (up to its first IO op) and saves it as a new .fjm.
 """
 
-from os import environ
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from os import environ, fsync, replace
 from pathlib import Path
-from typing import List, Optional, Deque
+from time import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    MutableMapping,
+    Optional,
+    Deque,
+    Tuple,
+    Type,
+    Union,
+)
 
 from flipjump.fjm import fjm_reader
-from flipjump.fjm.fjm_reader import GarbageHandling
+from flipjump.fjm.fjm_consts import _new_garbage_val
+from flipjump.fjm.fjm_reader import GarbageHandling, report_garbage_read
+from flipjump.fjm.fjm_writer import Writer
 
 try:
     from flipjump.interpreter import _fjcore  # type: ignore[attr-defined]
 except ImportError:  # the native engine is optional - fall back to the pure-python loops
     _fjcore = None
 from flipjump.interpreter.debugging.breakpoints import BreakpointHandler, handle_breakpoint
-from flipjump.utils.classes import TerminationCause, PrintTimer, RunStatistics
+from flipjump.interpreter.debugging.coverage import ExecutionCoverage
+from flipjump.interpreter.debugging.execution_trace import write_trace_header
+from flipjump.interpreter.debugging.watchpoints import WatchHit
+from flipjump.utils.classes import TerminationCause, PrintTimer, RunProgress, RunStatistics
 from flipjump.utils.exceptions import (
     FlipJumpRuntimeMemoryException,
     IOReadOnEOF,
@@ -38,6 +85,18 @@ from flipjump.interpreter.io_devices.BrokenIO import BrokenIO
 from flipjump.interpreter.io_devices.IODevice import IODevice
 from flipjump.interpreter.io_devices.device_memory import NativeDeviceMemory, ReaderDeviceMemory
 
+# the program images kept by run(cache_image=True) - the most recently used ones
+_PROGRAM_IMAGE_CACHE_SIZE = 8
+
+# a checkpoint file: this header (magic, the .fjm file's size and crc32), then the memory snapshot
+_CHECKPOINT_MAGIC = b'FJCKPT01'
+_CHECKPOINT_HEADER = struct.Struct('<8sQL')
+
+# the _fjcore memory snapshot layout (see Memory.snapshot): a 13-field header, then the
+# flat chunks / pages - each is its index and (up to) 2^14 words, all little-endian u64
+_SNAPSHOT_HEADER = struct.Struct('<13Q')
+_SNAPSHOT_PAGE_WORDS = 1 << 14
+
 
 class TerminationStatistics:
     """
@@ -51,7 +110,15 @@ class TerminationStatistics:
         termination_cause: TerminationCause,
         *,
         memory_error_address: Optional[int] = None,
+        resume_ip: Optional[int] = None,
+        watch_hit: Optional[WatchHit] = None,
     ) -> None:
+        """
+        @param memory_error_address: the accessed address, when terminated by a runtime memory error
+        @param resume_ip: the next op's address, when paused by an exhausted op budget (run_in_slices)
+        or stopped by a watchpoint
+        @param watch_hit: the watched flip, when stopped by a watchpoint
+        """
         self.run_time = run_statistics.get_run_time()
 
         self.op_counter = run_statistics.op_counter
@@ -60,10 +127,14 @@ class TerminationStatistics:
         self.detailed_statistics = run_statistics.detailed_statistics
         self.storage_mode = run_statistics.storage_mode
         self.speculation_stats = run_statistics.speculation_stats
+        self.samples = run_statistics.samples
+        self.coverage = run_statistics.coverage
         self.last_ops_addresses: Optional[Deque[int]] = run_statistics.last_ops_addresses
 
         self.termination_cause = termination_cause
         self.memory_error_address = memory_error_address
+        self.resume_ip = resume_ip
+        self.watch_hit = watch_hit
 
     @staticmethod
     def beautify_address(address: int, breakpoint_handler: Optional[BreakpointHandler]) -> str:
@@ -113,6 +184,7 @@ class TerminationStatistics:
         termination_cause_str = str(self.termination_cause)
         if self.memory_error_address is not None:
             termination_cause_str += f" (address {hex(self.memory_error_address)})"
+        watch_hit_str = f'\n\n{self.watch_hit.describe(labels_handler)}' if self.watch_hit is not None else ''
         print(
             f'\n'
             f'{output_str}'
@@ -122,6 +194,7 @@ class TerminationStatistics:
             f'{flips_jumps_str}'
             f'{storage_str}'
             f').'
+            f'{watch_hit_str}'
             f'{last_ops_str}'
         )
 
@@ -175,6 +248,21 @@ def run(
     last_ops_debugging_list_length: Optional[int] = None,
     profile: bool = False,
     flat_max_words: Optional[int] = None,
+    garbage_handling: GarbageHandling = GarbageHandling.Stop,
+    cache_image: bool = False,
+    checkpoint_every_ops: int = 0,
+    checkpoint_path: Optional[Path] = None,
+    resume_from: Optional[Path] = None,
+    sample_every_ops: int = 0,
+    coverage: bool = False,
+    watchpoints: Iterable[Tuple[int, int]] = (),
+    on_watch: Optional[Callable[[WatchHit], bool]] = None,
+    trace_path: Optional[Path] = None,
+    predecode: bool = False,
+    on_progress: Optional[Callable[[RunProgress], None]] = None,
+    progress_every_seconds: float = 1.0,
+    max_ops: int = 0,
+    lazy_load: bool = False,
 ) -> TerminationStatistics:
     """
     run / debug a .fjm file (a FlipJump interpreter)
@@ -188,12 +276,80 @@ def run(
     (flip/jump counters). by default the fast loop is used (which skips them).
     @param flat_max_words: the native engine's flat-storage window, in words (default 2^23,
     also settable with the FLIPJUMP_FLAT_MAX_WORDS environment variable). memory below the window
-    runs flat; segments reaching above it keep the paged path for that part (hybrid). raising it
-    costs startup time + footprint (8 bytes x window), never per-op speed.
+    runs flat; segments reaching above it keep the paged path for that part (hybrid). the window is
+    mapped on demand (only its touched pages are resident), so raising it is cheap; never per-op speed.
+    @param garbage_handling: what to do when the program touches memory outside any segment
+    (every engine supports every mode)
+    @param cache_image: if true (and the native engine runs it), reuse the loaded program image of an
+    earlier run of the same .fjm file (while unchanged - keyed by its path and mtime): the file isn't
+    read again, and the run's memory is a copy-on-write clone of the image.
+    @param checkpoint_every_ops: if positive, save a checkpoint of the run (its memory - the pages that
+    differ from the loaded program, its ip and op count) to checkpoint_path every that many ops
+    (native engine, fast loop only)
+    @param checkpoint_path: the checkpoint file (default: the fjm path + '.checkpoint'); replaced atomically
+    @param resume_from: a checkpoint file of this program to resume the run from (native engine, fast loop
+    only). the io_device should continue where the checkpointed run's device was - e.g. the input
+    already consumed isn't read again.
+    @param sample_every_ops: if positive, record the ip every that many ops (native engine); the
+    {ip: samples} histogram is returned in the termination-statistics' samples
+    @param coverage: if true, mark every executed op (native engine); the ExecutionCoverage is returned
+    in the termination-statistics' coverage
+    @param watchpoints: bit-address ranges [start, end) to watch (native engine): right after an op flips
+    a bit in one of them, its WatchHit is passed to on_watch
+    @param on_watch: called with every watchpoint hit; the run stops there (TerminationCause.Watchpoint,
+    with the hit and the resume_ip in the termination-statistics) if it returns true, and continues
+    otherwise (e.g. logging the writes). without it, the run stops at the first hit.
+    @param trace_path: if specified, stream every executed op - its ip, flip and jump - to this binary
+    trace file (native engine); read it with debugging/execution_trace.py (`fj trace`)
+    @param predecode: if true, run the code the program never writes as pre-decoded blocks (native engine,
+    fast loop without a last-ops list, flat storage; also set by FLIPJUMP_PREDECODE=1). the blocks are
+    decoded on their first run and dropped whenever the program writes one of their ops - a large speedup
+    for long runs, a small decoding cost for short ones
+    @param on_progress: if specified, called with the run's RunProgress every progress_every_seconds (native
+    engine). it's called from the run - an exception it raises ends the run (a KeyboardInterrupt like Ctrl+C)
+    @param progress_every_seconds: the interval of the on_progress reports (positive)
+    @param max_ops: if positive, stop the run after that many ops (native engine, fast loop without checkpoints),
+    with TerminationCause.OpBudgetExhausted and the resume_ip in the termination-statistics
+    @param lazy_load: if true, the python loops run on a lazily-read memory (Reader(lazy=True)) - the program's
+    data is read and decoded a block at a time, on its first access: a fast start for the big programs whose runs
+    touch a small part of them (the native engine loads the whole program anyway)
     @return: the run's termination-statistics
     """
+    checkpointing = checkpoint_every_ops > 0 or resume_from is not None
+    native = not show_trace and _is_native_engine_usable()
+    if sample_every_ops > 0 and not native:
+        raise FlipJumpRuntimeException('the sampling profiler needs the native engine (and no tracing)')
+    if coverage and not native:
+        raise FlipJumpRuntimeException('the execution coverage needs the native engine (and no tracing)')
+    watchpoints = list(watchpoints)
+    if watchpoints and not native:
+        raise FlipJumpRuntimeException('the watchpoints need the native engine (and no tracing)')
+    if trace_path is not None and not native:
+        raise FlipJumpRuntimeException('the execution trace file needs the native engine (and no tracing)')
+    if on_progress is not None and not native:
+        raise FlipJumpRuntimeException('the progress reports need the native engine (and no tracing)')
+    if progress_every_seconds <= 0:
+        raise FlipJumpRuntimeException(f'the progress interval must be positive (got {progress_every_seconds})')
+    if max_ops > 0 and (not native or profile or breakpoint_handler is not None or checkpointing):
+        raise FlipJumpRuntimeException(
+            'the op limit needs the native engine, and the fast loop (no tracing, profiling, breakpoints '
+            'or checkpoints)'
+        )
+    if checkpointing and (not native or profile or breakpoint_handler is not None):
+        raise FlipJumpRuntimeException(
+            'checkpoints need the native engine, and the fast loop (no tracing, profiling or breakpoints)'
+        )
+    image = None
     with PrintTimer('  loading memory:  ', print_time=print_time):
-        mem = fjm_reader.Reader(fjm_path)
+        if cache_image and native:
+            mem, image = _cached_program_image(fjm_path, garbage_handling, flat_max_words)
+        elif lazy_load and not native:
+            mem = fjm_reader.Reader(fjm_path, garbage_handling=garbage_handling, lazy=True)
+        else:
+            mem = fjm_reader.Reader(fjm_path, garbage_handling=garbage_handling, keep_raw_data=True)
+            if not native:
+                # the python loops run on the reader's memory dictionary (a list-backed one for the fast loop)
+                mem.load_memory(dense=not (profile or show_trace or breakpoint_handler is not None))
     mem.assert_runnable()  # a program must hold its first op at address 0 (both engines)
 
     if io_device is None:
@@ -202,12 +358,48 @@ def run(
     statistics = RunStatistics(mem.memory_width, last_ops_debugging_list_length)
 
     try:
+        if checkpointing:
+            if image is None:  # the checkpoints save the pages that differ from the program image
+                image = _fjcore.ProgramImage(_load_native_memory(mem, flat_max_words))
+            return _run_native_checkpointed(
+                image,
+                mem,
+                io_device,
+                statistics,
+                _fjm_fingerprint(fjm_path),
+                checkpoint_every_ops,
+                checkpoint_path if checkpoint_path is not None else Path(f'{fjm_path}.checkpoint'),
+                resume_from,
+                sample_every_ops,
+                coverage,
+                watchpoints,
+                on_watch,
+                trace_path,
+                predecode,
+                on_progress,
+                progress_every_seconds,
+            )
+        if native:
+            core = image.new_memory() if image is not None else _load_native_memory(mem, flat_max_words)
+            core.set_watchpoints(watchpoints)
+            if predecode:
+                core.set_predecode(True)
+            with _observing(
+                core,
+                mem.memory_width,
+                statistics,
+                sample_every_ops,
+                coverage,
+                trace_path,
+                on_progress,
+                progress_every_seconds,
+            ):
+                if profile or breakpoint_handler is not None:
+                    return _run_native_featured(core, mem, io_device, statistics, breakpoint_handler, on_watch)
+                return _run_native(core, mem, io_device, statistics, on_watch, max(max_ops, 0))
+        io_device.attach_memory(ReaderDeviceMemory(mem))
         if profile or show_trace or breakpoint_handler is not None:
-            io_device.attach_memory(ReaderDeviceMemory(mem))
             return _run_featured(mem, io_device, statistics, breakpoint_handler, show_trace)
-        if _is_native_engine_usable(mem):
-            return _run_native(mem, io_device, statistics, flat_max_words)
-        io_device.attach_memory(ReaderDeviceMemory(mem))
         return _run_fast(mem, io_device, statistics)
 
     except FlipJumpRuntimeMemoryException as mem_e:
@@ -224,79 +416,736 @@ def run(
         ) from unknown_exception
 
 
-def _is_native_engine_usable(mem: fjm_reader.Reader) -> bool:
+def run_many(
+    jobs: Iterable[Union[Path, Tuple[Path, Dict[str, Any]]]],
+    *,
+    workers: Optional[int] = None,
+) -> List[TerminationStatistics]:
+    """
+    run a batch of .fjm files on a thread pool, each by run().
+    the native engine releases the GIL while running (it takes it back only for the IO callbacks
+    and the periodic signal checks), so the runs scale across the cores. runs on the python loops
+    (FLIPJUMP_NO_NATIVE, tracing) are still correct, but serialized by the GIL.
+    every run must have its own io_device (they are called from the worker threads).
+    @param jobs: the runs - each is an fjm path, or an (fjm_path, run()-keyword-arguments) pair
+    @param workers: the number of worker threads (default: the ThreadPoolExecutor default)
+    @raise FlipJumpException: the first failing run's exception (in jobs order)
+    @return: the runs' termination-statistics, in jobs order
+    """
+    job_list = [(job, {}) if isinstance(job, Path) else job for job in jobs]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fjm_run') as executor:
+        futures = [executor.submit(run, fjm_path, **run_kwargs) for fjm_path, run_kwargs in job_list]
+        return [future.result() for future in futures]
+
+
+def _is_native_engine_usable() -> bool:
+    """
+    is the native (C) engine available (and not disabled)? it runs every program
+    (it implements every garbage-handling mode - the lenient ones report each garbage word
+    back through a python callback, once, like the Reader does.)
+    """
+    return _fjcore is not None and environ.get('FLIPJUMP_NO_NATIVE') != '1'
+
+
+def _native_garbage_callback(garbage_handling: GarbageHandling) -> Optional[Callable[[int], None]]:
+    """
+    the _fjcore garbage callback for the garbage-handling mode: called with the bit-address
+    of each garbage word the first time the program touches it. None when there is nothing
+    to report (Stop terminates inside the engine; Continue is silent).
+    """
+    if garbage_handling in (GarbageHandling.Stop, GarbageHandling.Continue):
+        return None
+    return lambda memory_address: report_garbage_read(garbage_handling, memory_address, _new_garbage_val())
+
+
+def _native_byte_io(io_device: IODevice) -> Dict[str, Any]:
     """
-    is the native (C) engine available and able to run this program?
-    (it implements the Stop garbage-handling only - the default of fjm_run.run.)
+    the _fjcore byte-level IO arguments: the device's read_bytes/write_bytes - only those it
+    overrides (the IODevice defaults just forward to the per-bit calls, which the engine
+    can make itself).
     """
-    return (
-        _fjcore is not None
-        and environ.get('FLIPJUMP_NO_NATIVE') != '1'
-        and mem.garbage_handling == GarbageHandling.Stop
+    byte_io: Dict[str, Any] = {}
+    if type(io_device).read_bytes is not IODevice.read_bytes:
+        byte_io['read_bytes'] = io_device.read_bytes
+    if type(io_device).write_bytes is not IODevice.write_bytes:
+        byte_io['write_bytes'] = io_device.write_bytes
+        byte_io['write_batch_size'] = io_device.write_bytes_batch_size
+    return byte_io
+
+
+def _load_native_memory(mem: fjm_reader.Reader, flat_max_words: Optional[int]):  # type: ignore[no-untyped-def]
+    """
+    load the program into a new _fjcore.Memory, straight from the reader's raw segment table and
+    data bytes (read with keep_raw_data) - the words are decoded (and the relative jumps rebuilt)
+    in C, into the final flat/paged storage. a mapped-version file is mapped by the engine itself
+    (map_fjm; POSIX only - elsewhere its data is copied to a pool first). the raw data is dropped
+    from the reader afterwards.
+    """
+    assert _fjcore is not None
+    assert mem.raw_segments is not None, 'read the .fjm with keep_raw_data'
+    core = _fjcore.Memory(
+        mem.memory_width,
+        garbage_stop=mem.garbage_handling == GarbageHandling.Stop,
+        flat_max_words=flat_max_words if flat_max_words else 0,
     )
+    if mem.mapped_data is not None and hasattr(core, 'map_fjm'):
+        with open(mem.input_file, 'rb') as fjm_file:
+            core.map_fjm(fjm_file.fileno(), mem.raw_segments)
+    else:
+        mem.unmap_raw_data()
+        assert mem.raw_data is not None
+        core.load_fjm(mem.raw_segments, mem.raw_data, mem.has_relative_jumps)
+    mem.release_raw_data()
+    return core
 
 
-def _run_native(
+@lru_cache(maxsize=_PROGRAM_IMAGE_CACHE_SIZE)
+def _load_program_image(  # type: ignore[no-untyped-def]
+    fjm_path: Path,
+    garbage_handling: GarbageHandling,
+    flat_max_words: Optional[int],
+    _file_version: Tuple[int, int],
+    _storage_environment: Tuple[Optional[str], Optional[str]],
+):
+    """
+    read the .fjm file into a new _fjcore.ProgramImage (cached by all the arguments - the file's
+    (mtime, size) and the storage-mode environment variables included).
+    @return: the reader (its header and segments - the raw data is dropped), and the image
+    """
+    assert _fjcore is not None
+    mem = fjm_reader.Reader(fjm_path, garbage_handling=garbage_handling, keep_raw_data=True)
+    mem.assert_runnable()
+    return mem, _fjcore.ProgramImage(_load_native_memory(mem, flat_max_words))
+
+
+def _cached_program_image(  # type: ignore[no-untyped-def]
+    fjm_path: Path, garbage_handling: GarbageHandling, flat_max_words: Optional[int]
+):
+    """
+    the cached program image of the .fjm file (loaded on the first request, and again whenever the file changes).
+    @return: the reader (its header and segments), and the _fjcore.ProgramImage
+    """
+    resolved_path = fjm_path.resolve()
+    file_stat = resolved_path.stat()
+    return _load_program_image(
+        resolved_path,
+        garbage_handling,
+        flat_max_words,
+        (file_stat.st_mtime_ns, file_stat.st_size),
+        (environ.get('FLIPJUMP_NO_FLAT'), environ.get('FLIPJUMP_FLAT_MAX_WORDS')),
+    )
+
+
+def clear_program_image_cache() -> None:
+    """
+    drop the cached program images (of run(cache_image=True)), and free their memory.
+    """
+    _load_program_image.cache_clear()
+
+
+def _native_termination(
+    statistics: RunStatistics, cause: int, error_bit_address: Optional[int]
+) -> TerminationStatistics:
+    """
+    the TerminationStatistics of a native run that ended with the _fjcore termination cause.
+    """
+    assert _fjcore is not None
+    if cause == _fjcore.TERM_LOOPING:
+        return TerminationStatistics(statistics, TerminationCause.Looping)
+    if cause == _fjcore.TERM_EOF:
+        return TerminationStatistics(statistics, TerminationCause.EOF)
+    if cause == _fjcore.TERM_NULL_IP:
+        return TerminationStatistics(statistics, TerminationCause.NullIP)
+    return TerminationStatistics(
+        statistics, TerminationCause.RuntimeMemoryError, memory_error_address=error_bit_address
+    )
+
+
+def _native_watch_stop(  # type: ignore[no-untyped-def]
+    core, statistics: RunStatistics, cause: int, on_watch: Optional[Callable[[WatchHit], bool]]
+) -> Optional[TerminationStatistics]:
+    """
+    report the last native run's watched flip (if it had one) to on_watch.
+    @return: the Watchpoint termination-statistics, if the run stopped at a watched flip (TERM_WATCH) and
+    should stay stopped (there's no on_watch, or it returned true); else None
+    """
+    assert _fjcore is not None
+    hit_fields = core.last_watch_hit
+    if hit_fields is None:
+        return None
+    watch_hit = WatchHit(statistics.op_counter, *hit_fields)
+    if on_watch is not None and not on_watch(watch_hit):
+        return None
+    if cause != _fjcore.TERM_WATCH:
+        return None  # the op terminated the run too
+    return TerminationStatistics(
+        statistics, TerminationCause.Watchpoint, resume_ip=core.last_run_ip, watch_hit=watch_hit
+    )
+
+
+@contextmanager
+def _observing(  # type: ignore[no-untyped-def]
+    core,
+    memory_width: int,
+    statistics: RunStatistics,
+    sample_every_ops: int,
+    coverage: bool,
+    trace_path: Optional[Path] = None,
+    on_progress: Optional[Callable[[RunProgress], None]] = None,
+    progress_every_seconds: float = 1.0,
+) -> Iterator[None]:
+    """
+    turn on the native run's sampling profiler (if sample_every_ops is positive) and execution
+    coverage, and collect their results into statistics.samples / statistics.coverage when the run
+    ends (however it ends). the results are created up-front and filled in-place, so a
+    TerminationStatistics built before the collection shares them.
+    with trace_path, the run's execution trace is streamed to that file (closed when the run ends).
+    with on_progress, the run reports its RunProgress every progress_every_seconds.
+    """
+    if sample_every_ops > 0:
+        statistics.samples = {}
+        core.set_sampling(sample_every_ops)
+    if coverage:
+        statistics.coverage = ExecutionCoverage(memory_width)
+        core.set_coverage(True)
+    trace_file = None
+    if trace_path is not None:
+        trace_file = open(trace_path, 'wb')
+        write_trace_header(trace_file, memory_width)
+        core.set_trace(trace_file.write)
+    if on_progress is not None:
+        core.set_progress(_progress_reporter(statistics, on_progress), progress_every_seconds)
+    try:
+        yield
+    finally:
+        if statistics.samples is not None:
+            statistics.samples.update(core.take_samples())
+        if statistics.coverage is not None:
+            statistics.coverage.add(*core.take_coverage())
+        if trace_file is not None:
+            core.set_trace(None)
+            trace_file.close()
+        if on_progress is not None:
+            core.set_progress(None, 0)
+
+
+def _progress_reporter(
+    statistics: RunStatistics, on_progress: Callable[[RunProgress], None]
+) -> Callable[[int, int, float], None]:
+    """
+    @return: the native progress callback - it gets the current run's (ops, ip, paused_seconds), and
+    calls on_progress with the whole run's RunProgress (statistics holds the finished slices' counts).
+    """
+    last_op_counter, last_time = statistics.op_counter, time()
+
+    def report(ops: int, ip: int, paused_seconds: float) -> None:
+        nonlocal last_op_counter, last_time
+        op_counter = statistics.op_counter + ops
+        now = time()
+        ops_per_second = (op_counter - last_op_counter) / max(now - last_time, 1e-9)
+        last_op_counter, last_time = op_counter, now
+        on_progress(
+            RunProgress(
+                op_counter=op_counter,
+                ip=ip,
+                ops_per_second=ops_per_second,
+                run_time=statistics.get_run_time() - paused_seconds,
+                paused_seconds=statistics.pause_timer.paused_time + paused_seconds,
+            )
+        )
+
+    return report
+
+
+def _run_native(  # type: ignore[no-untyped-def]
+    core,
     mem: fjm_reader.Reader,
     io_device: IODevice,
     statistics: RunStatistics,
-    flat_max_words: Optional[int] = None,
+    on_watch: Optional[Callable[[WatchHit], bool]],
+    max_ops: int = 0,
 ) -> TerminationStatistics:
     """
-    run with the native (C) engine: load the parsed program into a _fjcore.Memory and
-    execute the run-loop in C. behaves exactly like the python fast loop.
+    run with the native (C) engine: execute the run-loop in C over the loaded _fjcore.Memory.
+    behaves exactly like the python fast loop. the run is resumed after the watchpoint hits that
+    on_watch lets pass, and stopped after max_ops ops (if positive).
     """
     assert _fjcore is not None
-    core = _fjcore.Memory(mem.memory_width, flat_max_words=flat_max_words if flat_max_words else 0)
-    for memory_segment in mem.memory_segments:
-        core.add_segment(memory_segment.segment_start, memory_segment.segment_length)
-
-    # bulk-load the parsed memory words, grouped into contiguous runs
-    run_start: Optional[int] = None
-    next_address = 0
-    run_values: List[int] = []
-    for address in sorted(mem.memory):
-        if run_start is None or address != next_address:
-            if run_start is not None:
-                core.set_words(run_start, run_values)
-            run_start, run_values = address, []
-        run_values.append(mem.memory[address])
-        next_address = address + 1
-    if run_start is not None:
-        core.set_words(run_start, run_values)
+    io_device.attach_memory(NativeDeviceMemory(core, mem.memory_width))
+    ip = 0
+    while True:
+        if max_ops and statistics.op_counter >= max_ops:  # a watchpoint hit used up the budget
+            return TerminationStatistics(statistics, TerminationCause.OpBudgetExhausted, resume_ip=ip)
+        cause, error_bit_address = _run_native_slice(
+            core, mem, io_device, statistics, start_ip=ip, max_ops=max_ops - statistics.op_counter if max_ops else 0
+        )
+        watch_stop = _native_watch_stop(core, statistics, cause, on_watch)
+        if cause == _fjcore.TERM_OP_BUDGET:
+            return TerminationStatistics(statistics, TerminationCause.OpBudgetExhausted, resume_ip=core.last_run_ip)
+        if cause != _fjcore.TERM_WATCH:
+            return _native_termination(statistics, cause, error_bit_address)
+        if watch_stop is not None:
+            return watch_stop
+        ip = core.last_run_ip
+
+
+def _fjm_fingerprint(fjm_path: Path) -> Tuple[int, int]:
+    """
+    @return: the .fjm file's (size, crc32) - a checkpoint is resumed only by the program it was saved from
+    """
+    file_data = fjm_path.read_bytes()
+    return len(file_data), zlib.crc32(file_data)
+
+
+def _write_checkpoint(  # type: ignore[no-untyped-def]
+    core, checkpoint_path: Path, fingerprint: Tuple[int, int], op_counter: int
+) -> None:
+    """
+    save the memory snapshot of the paused run (and its op count) to the checkpoint file.
+    written to a temporary file first, then renamed over the checkpoint - a crash mid-write
+    leaves the previous checkpoint intact.
+    """
+    temporary_path = checkpoint_path.with_name(checkpoint_path.name + '.tmp')
+    with open(temporary_path, 'wb') as checkpoint_file:
+        checkpoint_file.write(_CHECKPOINT_HEADER.pack(_CHECKPOINT_MAGIC, *fingerprint))
+        checkpoint_file.write(core.snapshot(op_counter))
+        checkpoint_file.flush()
+        fsync(checkpoint_file.fileno())
+    replace(temporary_path, checkpoint_path)
+
+
+def _restore_checkpoint(  # type: ignore[no-untyped-def]
+    core, checkpoint_path: Path, fingerprint: Tuple[int, int]
+) -> Tuple[int, int]:
+    """
+    load the checkpoint file into the fresh memory.
+    @raise FlipJumpRuntimeException: if it isn't a checkpoint of this program
+    @return: the ip to resume from, and the op count so far
+    """
+    checkpoint_data = checkpoint_path.read_bytes()
+    header_size = _CHECKPOINT_HEADER.size
+    if len(checkpoint_data) < header_size:
+        raise FlipJumpRuntimeException(f'{checkpoint_path} is not a checkpoint file')
+    magic, *checkpoint_fingerprint = _CHECKPOINT_HEADER.unpack(checkpoint_data[:header_size])
+    if magic != _CHECKPOINT_MAGIC:
+        raise FlipJumpRuntimeException(f'{checkpoint_path} is not a checkpoint file')
+    if tuple(checkpoint_fingerprint) != fingerprint:
+        raise FlipJumpRuntimeException(f'{checkpoint_path} is a checkpoint of a different program')
+    try:
+        ip, op_counter = core.restore(checkpoint_data[header_size:])
+    except ValueError as value_error:
+        raise FlipJumpRuntimeException(f'bad checkpoint file {checkpoint_path}: {value_error}') from value_error
+    return ip, op_counter
+
 
+def _run_native_checkpointed(  # type: ignore[no-untyped-def]
+    image,
+    mem: fjm_reader.Reader,
+    io_device: IODevice,
+    statistics: RunStatistics,
+    fingerprint: Tuple[int, int],
+    checkpoint_every_ops: int,
+    checkpoint_path: Path,
+    resume_from: Optional[Path],
+    sample_every_ops: int,
+    coverage: bool,
+    watchpoints: List[Tuple[int, int]],
+    on_watch: Optional[Callable[[WatchHit], bool]],
+    trace_path: Optional[Path],
+    predecode: bool,
+    on_progress: Optional[Callable[[RunProgress], None]],
+    progress_every_seconds: float,
+) -> TerminationStatistics:
+    """
+    run on the native engine in slices of checkpoint_every_ops ops (one slice when 0), saving a
+    checkpoint between them. resumes from the resume_from checkpoint, if given.
+    """
+    assert _fjcore is not None
+    core = image.new_memory()
+    core.set_watchpoints(watchpoints)
+    if predecode:
+        core.set_predecode(True)
     io_device.attach_memory(NativeDeviceMemory(core, mem.memory_width))
+    ip = 0
+    if resume_from is not None:
+        ip, statistics.op_counter = _restore_checkpoint(core, resume_from, fingerprint)
+
+    with _observing(
+        core,
+        mem.memory_width,
+        statistics,
+        sample_every_ops,
+        coverage,
+        trace_path,
+        on_progress,
+        progress_every_seconds,
+    ):
+        next_checkpoint = statistics.op_counter + checkpoint_every_ops
+        while True:
+            cause, error_bit_address = _run_native_slice(
+                core,
+                mem,
+                io_device,
+                statistics,
+                start_ip=ip,
+                max_ops=next_checkpoint - statistics.op_counter if checkpoint_every_ops else 0,
+            )
+            watch_stop = _native_watch_stop(core, statistics, cause, on_watch)
+            if cause not in (_fjcore.TERM_OP_BUDGET, _fjcore.TERM_WATCH):
+                return _native_termination(statistics, cause, error_bit_address)
+            if watch_stop is not None:
+                return watch_stop
+            ip = core.last_run_ip
+            if not checkpoint_every_ops or statistics.op_counter < next_checkpoint:
+                continue  # a watchpoint hit stopped the slice before its checkpoint - resume it
+            next_checkpoint += checkpoint_every_ops
+            with statistics.pause_timer:  # saving the checkpoint isn't the program's run time
+                _write_checkpoint(core, checkpoint_path, fingerprint, statistics.op_counter)
 
+
+def _run_native_slice(  # type: ignore[no-untyped-def]
+    core, mem: fjm_reader.Reader, io_device: IODevice, statistics: RunStatistics, *, start_ip: int = 0, max_ops: int = 0
+) -> Tuple[int, Optional[int]]:
+    """
+    one fast-loop run of the native engine from start_ip, of at most max_ops ops (0 = until it terminates).
+    accumulates into the statistics.
+    @return: the _fjcore termination cause, and the error bit-address (of a memory error)
+    """
     last_ops = statistics.last_ops_addresses
     statistics.detailed_statistics = False
+    ops_before = statistics.op_counter
     try:
-        cause, op_count, error_bit_address, native_last_ops, paused_seconds = core.run(
+        cause, _, error_bit_address, native_last_ops, _ = core.run(
             io_device.read_bit,
             io_device.write_bit,
             IOReadOnEOF,
             last_ops_length=last_ops.maxlen if last_ops is not None and last_ops.maxlen else 0,
+            start_ip=start_ip,
+            garbage_callback=_native_garbage_callback(mem.garbage_handling),
+            max_ops=max_ops,
+            **_native_byte_io(io_device),
         )
     finally:
         # keep op_counter, the IO-paused time and the storage mode valid on the exception
         # paths too (Ctrl+C, IO-device errors)
-        statistics.op_counter = core.last_run_op_count
+        statistics.op_counter = ops_before + core.last_run_op_count
         statistics.pause_timer.paused_time += core.last_run_paused_seconds
         statistics.storage_mode = core.storage_mode
         statistics.speculation_stats = core.speculation_stats
 
-    statistics.op_counter = op_count
     if last_ops is not None:
         last_ops.extend(native_last_ops)
+    return cause, error_bit_address
 
-    if cause == _fjcore.TERM_LOOPING:
-        return TerminationStatistics(statistics, TerminationCause.Looping)
-    if cause == _fjcore.TERM_EOF:
-        return TerminationStatistics(statistics, TerminationCause.EOF)
-    if cause == _fjcore.TERM_NULL_IP:
-        return TerminationStatistics(statistics, TerminationCause.NullIP)
-    return TerminationStatistics(
-        statistics, TerminationCause.RuntimeMemoryError, memory_error_address=error_bit_address
+
+def run_in_slices(
+    fjm_path: Path,
+    slice_ops: int,
+    *,
+    io_device: Optional[IODevice] = None,
+    last_ops_debugging_list_length: Optional[int] = None,
+    flat_max_words: Optional[int] = None,
+    garbage_handling: GarbageHandling = GarbageHandling.Stop,
+) -> Generator[TerminationStatistics, None, None]:
+    """
+    run a .fjm file on the native engine in slices of at most slice_ops ops each.
+    after every slice the run pauses and yields its statistics so far (op_counter counts all the
+    slices) - with TerminationCause.OpBudgetExhausted and the resume_ip while the program still
+    runs, and with the real termination cause last. the run continues when the next statistics
+    are requested; the consumer may stop iterating at any point (e.g. when a quota is used up),
+    or interleave the slices of several programs.
+    @param fjm_path: the path to the .fjm file
+    @param slice_ops: the op budget of each slice (positive)
+    @param io_device:[in,out]: the device handling input/output
+    @param last_ops_debugging_list_length: The length of the last-ops list
+    @param flat_max_words: the native engine's flat-storage window, in words (see run())
+    @param garbage_handling: what to do when the program touches memory outside any segment
+    @raise FlipJumpRuntimeException: if the native engine isn't available
+    @return: an iterator over the statistics after each slice
+    """
+    if slice_ops <= 0:
+        raise FlipJumpRuntimeException(f'slice_ops must be positive, got {slice_ops}')
+    mem = fjm_reader.Reader(fjm_path, garbage_handling=garbage_handling, keep_raw_data=True)
+    mem.assert_runnable()
+    if not _is_native_engine_usable():
+        raise FlipJumpRuntimeException(
+            'running in slices needs the native engine (build it with `python build_fjcore.py`, '
+            'and make sure FLIPJUMP_NO_NATIVE is not set)'
+        )
+
+    if io_device is None:
+        io_device = BrokenIO()
+
+    statistics = RunStatistics(mem.memory_width, last_ops_debugging_list_length)
+    core = _load_native_memory(mem, flat_max_words)
+    io_device.attach_memory(NativeDeviceMemory(core, mem.memory_width))
+    assert _fjcore is not None
+
+    ip = 0
+    while True:
+        try:
+            cause, error_bit_address = _run_native_slice(
+                core, mem, io_device, statistics, start_ip=ip, max_ops=slice_ops
+            )
+        except KeyboardInterrupt:
+            yield TerminationStatistics(statistics, TerminationCause.KeyboardInterrupt)
+            return
+        except FlipJumpException:
+            raise
+        except Exception as unknown_exception:
+            raise FlipJumpRuntimeException(
+                "Unknown exception during running an .fjm file, please report this bug"
+            ) from unknown_exception
+
+        if cause != _fjcore.TERM_OP_BUDGET:
+            yield _native_termination(statistics, cause, error_bit_address)
+            return
+        ip = core.last_run_ip
+        with statistics.pause_timer:  # the time between the slices isn't the program's run time
+            yield TerminationStatistics(statistics, TerminationCause.OpBudgetExhausted, resume_ip=ip)
+
+
+def preinit(
+    fjm_path: Path,
+    output_fjm_path: Path,
+    *,
+    stop_address: Optional[int] = None,
+    flat_max_words: Optional[int] = None,
+) -> int:
+    """
+    pre-initialize a program: run it on the native engine up to its first IO op (or up to
+    stop_address - e.g. a marker label's address), and write its memory at that point to a new
+    .fjm file that starts right there - so its runs skip the deterministic startup (stl init,
+    table builds...).
+    the new file keeps the program's segments (the zero-filled parts stay reserved), version and
+    flags. its first op (at address 0) is rewritten to jump to the stop address: its runs execute
+    one op more than the skipped startup, and start with word 0 (the flip target of ";x" ops) cleared.
+    @param fjm_path: the path to the .fjm file
+    @param output_fjm_path:[out]: the path of the pre-initialized .fjm file
+    @param stop_address: stop the startup before executing the op at this address (if not reaching an
+    IO op first)
+    @param flat_max_words: the native engine's flat-storage window, in words (see run())
+    @raise FlipJumpRuntimeException: if the native engine isn't available, or if the program
+    terminates before its stop (e.g. touches memory outside its segments)
+    @return: the number of startup ops executed (skipped by the runs of the new file)
+    """
+    mem = fjm_reader.Reader(fjm_path, keep_raw_data=True)
+    mem.assert_runnable()
+    if not _is_native_engine_usable():
+        raise FlipJumpRuntimeException(
+            'pre-initialization needs the native engine (build it with `python build_fjcore.py`, '
+            'and make sure FLIPJUMP_NO_NATIVE is not set)'
+        )
+    assert _fjcore is not None
+
+    core = _load_native_memory(mem, flat_max_words)
+    if stop_address is not None:
+        core.set_breakpoints((stop_address,))
+    broken_io = BrokenIO()  # never called - the run stops before its first IO op
+    cause, startup_ops, error_bit_address, _, _ = core.run(
+        broken_io.read_bit, broken_io.write_bit, IOReadOnEOF, featured=True, break_on_io=True
     )
+    if cause != _fjcore.TERM_BREAK:
+        termination = _native_termination(RunStatistics(mem.memory_width, None), cause, error_bit_address)
+        raise FlipJumpRuntimeException(
+            f'the program terminated during its startup ({termination.termination_cause.name}, '
+            f'after {startup_ops} ops) - nothing to pre-initialize'
+        )
+    if startup_ops == 0:
+        raise FlipJumpRuntimeException('the program stops at its first op - nothing to pre-initialize')
+
+    _write_preinit_fjm(core, mem, output_fjm_path, core.last_run_ip)
+    return int(startup_ops)
+
+
+def _native_memory_chunks(core) -> List[Tuple[int, List[int]]]:  # type: ignore[no-untyped-def]
+    """
+    @return: the stored words of the native memory, as (start word-address, words) chunks sorted by
+    address (read from its snapshot). the words not in any chunk are zero.
+    """
+    snapshot = core.snapshot()
+    header = _SNAPSHOT_HEADER.unpack_from(snapshot)
+    flat_count, flat_chunk_count, page_count = header[2], header[10], header[11]
+    offset = _SNAPSHOT_HEADER.size
+
+    chunks: List[Tuple[int, List[int]]] = []
+    for chunk_number in range(flat_chunk_count + page_count):
+        (index,) = struct.unpack_from('<Q', snapshot, offset)
+        start = index * _SNAPSHOT_PAGE_WORDS
+        is_flat_chunk = chunk_number < flat_chunk_count
+        words_count = min(_SNAPSHOT_PAGE_WORDS, flat_count - start) if is_flat_chunk else _SNAPSHOT_PAGE_WORDS
+        words = list(struct.unpack_from(f'<{words_count}Q', snapshot, offset + 8))
+        offset += 8 * (1 + words_count)
+        if not is_flat_chunk and start < flat_count:
+            # the flat array holds the words below flat_count - the page's copies of them are stale
+            stale_words = flat_count - start
+            words, start = words[stale_words:], flat_count
+        if words:
+            chunks.append((start, words))
+    return sorted(chunks)
+
+
+def _segment_data_runs(
+    chunks: List[Tuple[int, List[int]]], segment_start: int, segment_end: int
+) -> List[Tuple[int, List[int]]]:
+    """
+    @return: the contiguous runs of stored words in [segment_start, segment_end), as
+    (start word-address, words) - with their zero ops at both ends trimmed.
+    """
+    runs: List[Tuple[int, List[int]]] = []
+    for chunk_start, words in chunks:
+        start, end = max(chunk_start, segment_start), min(chunk_start + len(words), segment_end)
+        if start >= end:
+            continue
+        clip_start, clip_end = start - chunk_start, end - chunk_start
+        clipped = words[clip_start:clip_end]
+        if runs and runs[-1][0] + len(runs[-1][1]) == start:
+            runs[-1][1].extend(clipped)
+        else:
+            runs.append((start, clipped))
+
+    trimmed_runs = []
+    for start, words in runs:  # every start/end is even - the segments and the chunks are 2-words aligned
+        first, last = 0, len(words)
+        while first < last and words[first] == words[first + 1] == 0:
+            first += 2
+        while last > first and words[last - 2] == words[last - 1] == 0:
+            last -= 2
+        if first < last:
+            trimmed_runs.append((start + first, words[first:last]))
+    return trimmed_runs
+
+
+def _write_preinit_fjm(  # type: ignore[no-untyped-def]
+    core, mem: fjm_reader.Reader, output_fjm_path: Path, resume_ip: int
+) -> None:
+    """
+    write the paused program's memory to a new .fjm (the original's segments - each split to its
+    stored data runs and reserved zeros), whose first op jumps to resume_ip.
+    """
+    chunks = _native_memory_chunks(core)
+    first_op_words = chunks[0][1]
+    assert chunks[0][0] == 0 and len(first_op_words) >= 2, 'the first op is always stored (assert_runnable)'
+    first_op_words[0], first_op_words[1] = 0, resume_ip  # ;resume_ip
+
+    fjm_writer = Writer(output_fjm_path, mem.memory_width, mem.version, flags=mem.flags, chunk_words=mem.chunk_words)
+    for segment in sorted(mem.memory_segments, key=lambda memory_segment: memory_segment.segment_start):
+        segment_start, segment_end = segment.segment_start, segment.segment_start + segment.segment_length
+        address = segment_start
+        for run_start, words in _segment_data_runs(chunks, segment_start, segment_end):
+            if run_start > address:
+                fjm_writer.add_segment(address, run_start - address, 0, 0)
+            fjm_writer.add_segment(run_start, len(words), fjm_writer.add_data(words), len(words))
+            address = run_start + len(words)
+        if segment_end > address:
+            fjm_writer.add_segment(address, segment_end - address, 0, 0)
+    fjm_writer.write_to_file()
+
+
+class _NativeDebuggerMemory:
+    """
+    the debugger's view of the native engine's memory - reads words like fjm_reader.Reader.get_word
+    (unaligned reads included; under GarbageHandling.Stop, out-of-segment words raise).
+    """
+
+    def __init__(self, core, mem: fjm_reader.Reader):  # type: ignore[no-untyped-def]
+        self._core = core
+        self._segments = mem.memory_segments
+        self._garbage_stop = mem.garbage_handling == GarbageHandling.Stop
+        self.memory_width = mem.memory_width
+
+    def _read_word(self, word_address: int) -> int:
+        word_address &= (1 << self.memory_width) - 1
+        if self._garbage_stop and not any(
+            segment.segment_start <= word_address < segment.segment_start + segment.segment_length
+            for segment in self._segments
+        ):
+            memory_address = word_address << (self.memory_width.bit_length() - 1)
+            raise FlipJumpRuntimeMemoryException(
+                f'Reading garbage word at mem[{hex(memory_address)[2:]}]', memory_address
+            )
+        return int(self._core.get_word(word_address))
+
+    def get_word(self, bit_address: int) -> int:
+        w = self.memory_width
+        word_address, bit_offset = bit_address >> (w.bit_length() - 1), bit_address & (w - 1)
+        if bit_offset == 0:
+            return self._read_word(word_address)
+        if word_address == (1 << w) - 1:
+            raise FlipJumpRuntimeMemoryException('Accessed outside of memory (beyond the last bit).', bit_address)
+        lsw, msw = self._read_word(word_address), self._read_word(word_address + 1)
+        return ((lsw >> bit_offset) | (msw << (w - bit_offset))) & ((1 << w) - 1)
+
+
+def _run_native_featured(  # type: ignore[no-untyped-def]
+    core,
+    mem: fjm_reader.Reader,
+    io_device: IODevice,
+    statistics: RunStatistics,
+    breakpoint_handler: Optional[BreakpointHandler],
+    on_watch: Optional[Callable[[WatchHit], bool]],
+) -> TerminationStatistics:
+    """
+    the featured loop on the native engine: C keeps the flip/jump counters and checks the
+    breakpoints (addresses, and the handler's next_break op-count), and returns here only
+    when one fires - the debugger prompt runs, and the run resumes at the break address.
+    behaves exactly like the python featured loop (without tracing). the run is resumed after
+    the watchpoint hits that on_watch lets pass.
+    """
+    assert _fjcore is not None
+    io_device.attach_memory(NativeDeviceMemory(core, mem.memory_width))
+    debugger_memory = _NativeDebuggerMemory(core, mem)
+    if breakpoint_handler is not None:
+        core.set_breakpoints(breakpoint_handler.breakpoints)
+
+    last_ops = statistics.last_ops_addresses
+    garbage_callback = _native_garbage_callback(mem.garbage_handling)
+    byte_io = _native_byte_io(io_device)
+    ip = 0
+    resuming = False
+    while True:
+        break_after_ops = 0
+        if breakpoint_handler is not None and breakpoint_handler.next_break is not None:
+            break_after_ops = max(breakpoint_handler.next_break - statistics.op_counter, 0)
+        try:
+            cause, _, error_bit_address, native_last_ops, _ = core.run(
+                io_device.read_bit,
+                io_device.write_bit,
+                IOReadOnEOF,
+                last_ops_length=last_ops.maxlen if last_ops is not None and last_ops.maxlen else 0,
+                start_ip=ip,
+                garbage_callback=garbage_callback,
+                featured=True,
+                break_after_ops=break_after_ops,
+                resuming=resuming,
+                **byte_io,
+            )
+        finally:
+            # accumulate over the resumed runs - also on the exception paths (Ctrl+C, IO-device errors)
+            statistics.op_counter += core.last_run_op_count
+            statistics.flip_counter += core.last_run_flip_count
+            statistics.jump_counter += core.last_run_jump_count
+            statistics.pause_timer.paused_time += core.last_run_paused_seconds
+            statistics.storage_mode = core.storage_mode
+        if last_ops is not None:
+            last_ops.extend(native_last_ops)
+
+        watch_stop = _native_watch_stop(core, statistics, cause, on_watch)
+        if cause == _fjcore.TERM_WATCH:
+            if watch_stop is not None:
+                return watch_stop
+            ip = core.last_run_ip
+            resuming = False  # the next op's breakpoints weren't checked yet
+            continue
+        if cause != _fjcore.TERM_BREAK:
+            return _native_termination(statistics, cause, error_bit_address)
+
+        assert breakpoint_handler is not None
+        ip = core.last_run_ip
+        breakpoint_handler = handle_breakpoint(breakpoint_handler, ip, debugger_memory, statistics)
+        if breakpoint_handler is None:
+            core.set_breakpoints(())
+        resuming = True
 
 
 def _run_featured(
@@ -357,8 +1206,13 @@ def _run_fast(  # noqa: C901
     the IO/termination checks are inlined into the loop, and the per-op flip/jump counters
     are skipped (op_counter is still maintained). last-ops tracking, when requested, costs
     one predictable branch + one deque-append per op (~10%).
+    on a DenseMemory, the words of the contiguous segments from address 0 are indexed in its list
+    (no hashing); the other words miss it (IndexError) like they miss the memory dictionary (KeyError).
     """
-    memory = mem.memory
+    memory: Union[List[int], MutableMapping[int, int]] = mem.memory
+    missing_word: Type[LookupError] = KeyError
+    if isinstance(memory, fjm_reader.DenseMemory):
+        memory, missing_word = memory.words, IndexError
     w = mem.memory_width
     ww = w.bit_length() - 1  # log2(w)
     dw = 2 * w
@@ -369,6 +1223,7 @@ def _run_fast(  # noqa: C901
 
     get_word = mem.get_word
     read_missing_word = mem._get_memory_word
+    write_word = mem._set_memory_word
     write_bit = mem.write_bit
     io_write_bit = io_device.write_bit
     io_read_bit = io_device.read_bit
@@ -393,7 +1248,7 @@ def _run_fast(  # noqa: C901
                 word_address = ip >> ww
                 try:
                     flip_address = memory[word_address]
-                except KeyError:
+                except missing_word:
                     flip_address = read_missing_word(word_address)
 
             # handle IO (both checks fail after a single comparison for almost all ops)
@@ -412,10 +1267,9 @@ def _run_fast(  # noqa: C901
             # FLIP!
             flip_word_address = flip_address >> ww
             try:
-                flip_word_value = memory[flip_word_address]
-            except KeyError:
-                flip_word_value = read_missing_word(flip_word_address)
-            memory[flip_word_address] = flip_word_value ^ (1 << (flip_address & bit_mask))
+                memory[flip_word_address] ^= 1 << (flip_address & bit_mask)
+            except missing_word:
+                write_word(flip_word_address, read_missing_word(flip_word_address) ^ (1 << (flip_address & bit_mask)))
 
             # read jump word (after the flip - the flip may modify it)
             if bit_offset:
@@ -424,7 +1278,7 @@ def _run_fast(  # noqa: C901
                 jump_word_address = (ip >> ww) + 1
                 try:
                     jump_address = memory[jump_word_address]
-                except KeyError:
+                except missing_word:
                     jump_address = read_missing_word(jump_word_address)
             ops += 1
 
@@ -46,6 +46,21 @@ class FixedIO(IODevice):
             self.current_output_byte = 0
             self.bits_to_write_in_output_byte = 0
 
+    def read_bytes(self, n: int) -> bytes:
+        if 0 != self.bits_to_read_in_input_byte:
+            return super().read_bytes(n)
+        if not self.remaining_input:
+            raise IOReadOnEOF("Read an empty input on fixed IO (EOF)")
+
+        read_bytes, self.remaining_input = self.remaining_input[:n], self.remaining_input[n:]
+        return read_bytes
+
+    def write_bytes(self, data: bytes) -> None:
+        if 0 != self.bits_to_write_in_output_byte:
+            super().write_bytes(data)
+            return
+        self._output += data
+
     def get_output(self, *, allow_incomplete_output: bool = False) -> bytes:
         """
         @raise IncompleteOutput when the number of outputted bits can't be divided by 8
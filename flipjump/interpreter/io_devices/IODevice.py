@@ -2,6 +2,9 @@
 the abstract IO device interface.
 defines the bit-level read/write contract every io-device implements, so the
 interpreter can stay agnostic of where its input/output actually goes.
+devices may also override the byte-level read_bytes/write_bytes - the native engine then
+assembles the bits into bytes itself, and calls the device once per byte (input) or per
+batch of bytes (output) instead of once per bit.
 """
 
 from abc import ABC, abstractmethod
@@ -14,6 +17,11 @@ class IODevice(ABC):
     abstract IO device
     """
 
+    # the most output bytes the native engine buffers before calling write_bytes. a device whose
+    # output commands read the program memory sets 1, so each command still sees the memory as
+    # it was when the command's last byte was output.
+    write_bytes_batch_size: int = 4096
+
     def attach_memory(self, device_memory: DeviceMemory) -> None:
         """
         called by the interpreter right before the run-loop starts, with the device<->memory
@@ -29,6 +37,26 @@ class IODevice(ABC):
     def write_bit(self, bit: bool) -> None:
         pass
 
+    def read_bytes(self, n: int) -> bytes:
+        """
+        the byte-level input: read up to n (at least 1) input bytes; each byte is consumed
+        lsb-first, like 8 read_bit calls. the default assembles one byte out of read_bit.
+        @raise IOReadOnEOF when there is no more input
+        """
+        value = 0
+        for i in range(8):
+            value |= self.read_bit() << i
+        return bytes((value,))
+
+    def write_bytes(self, data: bytes) -> None:
+        """
+        the byte-level output: write whole bytes, each lsb-first, like 8 write_bit calls.
+        the default forwards them to write_bit.
+        """
+        for byte in data:
+            for i in range(8):
+                self.write_bit((byte >> i) & 1 == 1)
+
     @abstractmethod
     def get_output(self, *, allow_incomplete_output: bool = False) -> bytes:
         pass
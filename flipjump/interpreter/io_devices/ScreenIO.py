@@ -74,6 +74,10 @@ def encode_png(width: int, height: int, rgb_rows: bytes) -> bytes:
 class InMemoryScreen(IODevice):
     """see the module docstring for the command stream and the memory layout contracts."""
 
+    # update_screen/update_rectangle/set_palette read the program memory when their last byte
+    # arrives - so each output byte is handed over right away.
+    write_bytes_batch_size = 1
+
     def __init__(self, *, frames_dir: Optional[Path] = None):
         self.frames_dir = frames_dir
         self.device_memory: Optional[DeviceMemory] = None
@@ -105,6 +109,13 @@ class InMemoryScreen(IODevice):
             byte, self._current_byte, self._bits_count = self._current_byte, 0, 0
             self._handle_byte(byte)
 
+    def write_bytes(self, data: bytes) -> None:
+        if self._bits_count:
+            super().write_bytes(data)
+            return
+        for byte in data:
+            self._handle_byte(byte)
+
     def read_bit(self) -> bool:
         raise IOReadOnEOF('the screen device has no input - use a device that also reads input (e.g. --io pc)')
 
@@ -56,6 +56,25 @@ class StandardIO(IODevice):
             self.current_output_byte = 0
             self.bits_to_write_in_output_byte = 0
 
+    def read_bytes(self, n: int) -> bytes:
+        if 0 != self.bits_to_read_in_input_byte:
+            return super().read_bytes(n)
+        read_bytes = stdin.read(1).encode(encoding=IO_BYTES_ENCODING)
+        if 0 == len(read_bytes):
+            raise IOReadOnEOF("Read an empty input on standard IO (EOF)")
+        return read_bytes[:1]  # like read_bit: a multi-byte encoded character keeps its first byte
+
+    def write_bytes(self, data: bytes) -> None:
+        if 0 != self.bits_to_write_in_output_byte:
+            super().write_bytes(data)
+            return
+        if self.output_verbose:
+            # decoded byte by byte, exactly like write_bit (a whole-batch decode would
+            # also interpret escape sequences spanning several bytes)
+            stdout.write(''.join(bytes((byte,)).decode(encoding=IO_BYTES_ENCODING) for byte in data))
+            stdout.flush()
+        self._output += data
+
     def get_output(self, *, allow_incomplete_output: bool = False) -> bytes:
         if not allow_incomplete_output and 0 != self.bits_to_write_in_output_byte:
             raise IncompleteOutput(
@@ -190,6 +190,7 @@ class PcIO(IODevice):
     def __init__(self, screen: InMemoryScreen, keyboard: KeyboardIO):
         self._screen = screen
         self._keyboard = keyboard
+        self.write_bytes_batch_size = screen.write_bytes_batch_size
 
     @classmethod
     def interactive(cls) -> 'PcIO':
@@ -213,5 +214,8 @@ class PcIO(IODevice):
     def write_bit(self, bit: bool) -> None:
         self._screen.write_bit(bit)
 
+    def write_bytes(self, data: bytes) -> None:
+        self._screen.write_bytes(data)
+
     def get_output(self, *, allow_incomplete_output: bool = False) -> bytes:
         return self._screen.get_output(allow_incomplete_output=allow_incomplete_output)
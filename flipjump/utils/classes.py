@@ -1,16 +1,20 @@
 """
 shared helper classes.
 the TerminationCause enum (why a run ended), the PrintTimer context-manager for timing and
-printing code-stage durations, and RunStatistics for collecting execution metrics during a
-run.
+printing code-stage durations, RunStatistics for collecting execution metrics during a
+run, and RunProgress - a live progress report of a long native run.
 """
 
 from __future__ import annotations
 
+import dataclasses
 from collections import deque
 from enum import IntEnum
 from time import time
-from typing import Optional, Deque, Dict
+from typing import Optional, Deque, Dict, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from flipjump.interpreter.debugging.coverage import ExecutionCoverage
 
 
 class TerminationCause(IntEnum):
@@ -28,6 +32,10 @@ class TerminationCause(IntEnum):
     RuntimeMemoryError = 5
     # Finished by keyboard interrupt from the user
     KeyboardInterrupt = 6
+    # Paused after executing its op budget (fjm_run.run_in_slices) - the program is still running
+    OpBudgetExhausted = 7
+    # Stopped right after an op flipped a watched bit (fjm_run.run(watchpoints=...)) - the program is still running
+    Watchpoint = 8
 
     def __str__(self) -> str:
         return [
@@ -38,6 +46,8 @@ class TerminationCause(IntEnum):
             'unaligned-op',
             'runtime-memory-error',
             "keyboard-interrupt",
+            'op-budget-exhausted',
+            'watchpoint',
         ][self.value]
 
 
@@ -63,6 +73,28 @@ class PrintTimer:
             print(f'{time() - self.start_time:.3f}s')
 
 
+@dataclasses.dataclass(frozen=True)
+class RunProgress:
+    """
+    a progress report of a running program (fjm_run.run(on_progress=...)).
+    """
+
+    op_counter: int  # the run's op count so far
+    ip: int  # the next op
+    ops_per_second: float  # the run's speed since the previous report (or its start)
+    run_time: float  # the run's time so far, without the IO-paused time
+    paused_seconds: float  # the time the run waited on IO so far
+
+    def describe(self) -> str:
+        """
+        @return: a one-line status (for fj --progress)
+        """
+        return (
+            f'{self.op_counter:,} ops  {self.ops_per_second / 1e6:,.2f}M ops/s  ip={hex(self.ip)}  '
+            f'run {self.run_time:.1f}s  io-paused {self.paused_seconds:.1f}s'
+        )
+
+
 class RunStatistics:
     """
     maintains times and counters of the current run.
@@ -97,6 +129,10 @@ class RunStatistics:
         # dict(ops, first_executions, misses) when the native engine measured jump-target
         # speculation (FLIPJUMP_MEASURE_SPECULATION=1); None otherwise.
         self.speculation_stats: Optional[Dict[str, int]] = None
+        # {ip: samples} of the sampling profiler (run(sample_every_ops=N)), filled when the run ends; None otherwise.
+        self.samples: Optional[Dict[int, int]] = None
+        # the executed ops (run(coverage=True)), filled when the run ends; None otherwise.
+        self.coverage: Optional[ExecutionCoverage] = None
 
         self.last_ops_addresses: Optional[Deque[int]] = None
         if last_ops_debugging_list_length is not None:
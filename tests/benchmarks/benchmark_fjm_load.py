@@ -0,0 +1,127 @@
+"""
+The .fjm load benchmark.
+
+Times writing and loading a big generated program - one segment of WORDS words at address 0 (an op
+that loops, then a data table), w=64 - in each .fjm version, by each loader:
+- dict: Reader(path) - the memory dictionary (the python featured loops)
+- dense: Reader(path, keep_raw_data=True).load_memory(dense=True) - the python fast loop
+- native: the native engine's loader (if built)
+- lazy: Reader(path, lazy=True), and a read of the first op (its block is loaded)
+
+The table is pseudo-random (it doesn't compress), or the words of real w=64 programs (--table-from; repeated
+if they're too short - e.g. --table-from tests/compiled/*/*.fjm).
+The compressed versions are written with --lzma-preset (0 by default), on --workers threads.
+
+Usage:
+    python tests/benchmarks/benchmark_fjm_load.py [--words N] [--runs N] [--versions 1 2 3 4 5] [--loaders ...]
+                                                  [--table-from FJM...] [--lzma-preset N] [--workers N]
+"""
+
+import argparse
+import gc
+import sys
+import tempfile
+from pathlib import Path
+from time import time
+from typing import Callable, Dict, List
+
+REPO_ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from flipjump.fjm.fjm_consts import FJMVersion  # noqa: E402
+from flipjump.fjm.fjm_reader import Reader  # noqa: E402
+from flipjump.fjm.fjm_writer import Writer  # noqa: E402
+from flipjump.interpreter import fjm_run  # noqa: E402
+
+MEMORY_WIDTH = 64
+
+
+def generate_table(words: int, table_from: List[Path]) -> List[int]:
+    """the table: pseudo-random words (the jumps are far from their ops), or the programs' words (repeated)."""
+    if not table_from:
+        word_mask = (1 << MEMORY_WIDTH) - 1
+        return [(i * 0x9E3779B97F4A7C15) & word_mask for i in range(words)]
+    program_words: List[int] = []
+    for fjm_path in table_from:
+        reader = Reader(fjm_path)
+        if reader.memory_width == MEMORY_WIDTH:
+            program_words += reader.get_memory().values()
+        if len(program_words) >= words:
+            break
+    return (program_words * (words // len(program_words) + 1))[:words]
+
+
+def generate_fjm(fjm_path: Path, version: FJMVersion, table: List[int], lzma_preset: int, workers: int) -> float:
+    """
+    write a looping first op, then the table.
+    @return: the writing time
+    """
+    writer = Writer(fjm_path, MEMORY_WIDTH, version, lzma_preset=lzma_preset, workers=workers)
+    writer.add_simple_segment_with_data(0, [2 * MEMORY_WIDTH, 0] + table)
+    start_time = time()
+    writer.write_to_file()
+    return time() - start_time
+
+
+def load_dict(fjm_path: Path, workers: int) -> None:
+    Reader(fjm_path, workers=workers)
+
+
+def load_dense(fjm_path: Path, workers: int) -> None:
+    Reader(fjm_path, keep_raw_data=True, workers=workers).load_memory(dense=True)
+
+
+def load_native(fjm_path: Path, workers: int) -> None:
+    fjm_run._load_native_memory(Reader(fjm_path, keep_raw_data=True, workers=workers), None)
+
+
+def load_lazy(fjm_path: Path, workers: int) -> None:
+    Reader(fjm_path, lazy=True).get_word(0)
+
+
+LOADERS: Dict[str, Callable[[Path, int], None]] = {
+    'dict': load_dict,
+    'dense': load_dense,
+    'native': load_native,
+    'lazy': load_lazy,
+}
+
+
+def benchmark(fjm_path: Path, loader_names: List[str], runs: int, workers: int) -> None:
+    for loader_name in loader_names:
+        if loader_name == 'native' and not fjm_run._is_native_engine_usable():
+            continue
+        durations = []
+        for _ in range(runs):
+            gc.collect()
+            start_time = time()
+            LOADERS[loader_name](fjm_path, workers)
+            durations.append(time() - start_time)
+        print(f'  {loader_name:8}: {min(durations):7.3f}s  (best of {runs})')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='FlipJump .fjm load benchmark')
+    parser.add_argument('--words', type=int, default=1 << 24, help='the words of the program (default 16M)')
+    parser.add_argument('--runs', type=int, default=3, help='runs per loader (the minimum is reported)')
+    parser.add_argument(
+        '--versions', type=int, nargs='+', default=[1, 2, 3, 4, 5], choices=[v.value for v in FJMVersion]
+    )
+    parser.add_argument('--loaders', nargs='+', default=list(LOADERS), choices=list(LOADERS))
+    parser.add_argument('--table-from', type=Path, nargs='+', default=[], help="fill the table with these .fjm words")
+    parser.add_argument('--lzma-preset', type=int, default=0, choices=range(10), help='the lzma preset (default 0)')
+    parser.add_argument('--workers', type=int, default=1, help='the (de)compression threads (default 1)')
+    args = parser.parse_args()
+
+    table = generate_table(args.words - 2, args.table_from)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for version in map(FJMVersion, args.versions):
+            fjm_path = Path(temp_dir) / f'v{version.value}.fjm'
+            write_time = generate_fjm(fjm_path, version, table, args.lzma_preset, args.workers)
+            print(f'{version.name} ({fjm_path.stat().st_size / 2 ** 20:.1f}MB, written in {write_time:.2f}s):')
+            benchmark(fjm_path, args.loaders, args.runs, args.workers)
+            fjm_path.unlink()
+
+
+if __name__ == '__main__':
+    main()
@@ -6,7 +6,7 @@ every interpreter change is measured against the recorded baseline in
 tests/benchmark_results.md.
 
 Usage:
-    python tests/benchmark_interpreter.py [n=10000] [--w 32 64] [--fast]
+    python tests/benchmark_interpreter.py [n=10000] [--w 32 64] [--fast] [--trace-file PATH]
 
 The compiled .fjm files are cached under tests/compiled/benchmark/ (keyed by width),
 so only the first invocation pays the assemble time.
@@ -16,6 +16,7 @@ import argparse
 import sys
 from pathlib import Path
 from time import time
+from typing import Optional
 
 REPO_ROOT = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(REPO_ROOT))
@@ -43,7 +44,7 @@ def get_benchmark_fjm(program: str, memory_width: int) -> Path:
     return fjm_path
 
 
-def benchmark(program: str, memory_width: int, n: int) -> None:
+def benchmark(program: str, memory_width: int, n: int, trace_path: Optional[Path] = None) -> None:
     fjm_path = get_benchmark_fjm(program, memory_width)
     io_device = FixedIO(f'{n}\n'.encode() if program == 'sieve' else b'')
 
@@ -53,6 +54,7 @@ def benchmark(program: str, memory_width: int, n: int) -> None:
         io_device=io_device,
         print_time=False,
         last_ops_debugging_list_length=None,
+        trace_path=trace_path,
     )
     wall_time = time() - start_time
 
@@ -79,10 +81,16 @@ def main() -> None:
         help="the benchmark program: 'sieve' (sparse, half-address-space segment - the paged"
         " path) or 'loop' (compact memory - the flat-storage path)",
     )
+    parser.add_argument(
+        '--trace-file',
+        metavar='PATH',
+        default=None,
+        help='save the execution trace to PATH (measures the traced run-loop)',
+    )
     args = parser.parse_args()
 
     for memory_width in args.w:
-        benchmark(args.program, memory_width, args.n)
+        benchmark(args.program, memory_width, args.n, Path(args.trace_file) if args.trace_file else None)
 
 
 if __name__ == '__main__':
@@ -191,4 +191,5 @@ def test_run(run_args: RunTestArgs) -> None:
         debugging_file=run_args.debugging_file_path,
         print_time=True,
         last_ops_debugging_list_length=run_args.debug_info_length,
+        cache_image=True,
     )
@@ -0,0 +1,90 @@
+"""
+unit-tests for the batch runner (flipjump/interpreter/batch_run.py): reading the jobs table, the job
+statuses (passed, failed, the op and time limits, errors), and the results' order on the process pool.
+"""
+
+from pathlib import Path
+from time import time
+from typing import List
+
+import pytest
+
+from flipjump.fjm.fjm_consts import FJMVersion
+from flipjump.fjm.fjm_writer import Writer
+from flipjump.interpreter.batch_run import (
+    ERROR,
+    FAILED,
+    OP_LIMIT,
+    PASSED,
+    TIME_LIMIT,
+    BatchJob,
+    BatchResult,
+    read_jobs,
+    run_batch,
+)
+from flipjump.utils.exceptions import FlipJumpRuntimeException
+from tests.unit.unit_utils import HELLO_NO_STL, HELLO_WORLD_OUTPUT, assemble_to_path, native_engine_required
+
+
+def _hello_jobs(tmp_path: Path) -> List[BatchJob]:
+    fjm_path = assemble_to_path(HELLO_NO_STL.read_text(), tmp_path)
+    (tmp_path / 'hello.out').write_bytes(HELLO_WORLD_OUTPUT)
+    (tmp_path / 'other.out').write_bytes(b'Goodbye')
+    (tmp_path / 'jobs.csv').write_text(
+        f'hello, {fjm_path.name}, , hello.out, False, True\n'
+        f'\n'
+        f'other, {fjm_path.name}, , other.out\n'
+        f'missing, missing.fjm, , hello.out\n'
+    )
+    return read_jobs(tmp_path / 'jobs.csv', tmp_path)
+
+
+def test_read_jobs_resolves_the_paths_from_the_root(tmp_path: Path) -> None:
+    jobs = _hello_jobs(tmp_path)
+    assert jobs[0] == BatchJob('hello', tmp_path / 'out.fjm', None, tmp_path / 'hello.out', False, True)
+    assert [job.name for job in jobs] == ['hello', 'other', 'missing']
+
+    (tmp_path / 'bad.csv').write_text('hello, out.fjm, , hello.out, maybe, False\n')
+    with pytest.raises(FlipJumpRuntimeException):
+        read_jobs(tmp_path / 'bad.csv')
+
+
+@native_engine_required
+def test_run_batch_reports_every_job_in_order(tmp_path: Path) -> None:
+    jobs = _hello_jobs(tmp_path)
+    results = list(run_batch(jobs))
+    assert results[:2] == [
+        BatchResult('hello', PASSED, 'looping', 106, True),
+        BatchResult('other', FAILED, 'looping', 106, False),
+    ]
+    assert results[2].status == ERROR and results[2].error is not None
+
+    assert list(run_batch(jobs, workers=2)) == results
+    assert [result.status for result in run_batch(jobs, max_ops=50)] == [OP_LIMIT, OP_LIMIT, ERROR]
+    assert list(run_batch(jobs, max_ops=50))[0] == BatchResult('hello', OP_LIMIT, 'op-budget-exhausted', 50)
+
+
+def _cycle_fjm(tmp_path: Path) -> Path:
+    # w=32: ops 1 (at bit 4w) and 2 (at bit 6w) jump to each other - the run never ends by itself
+    fjm_path = tmp_path / 'cycle.fjm'
+    writer = Writer(fjm_path, 32, FJMVersion.NormalVersion)
+    writer.add_simple_segment_with_data(0, [8 * 32, 4 * 32, 0, 0, 8 * 32 + 1, 6 * 32, 8 * 32 + 2, 4 * 32, 0, 0])
+    writer.write_to_file()
+    return fjm_path
+
+
+@native_engine_required
+def test_run_batch_stops_a_job_at_its_time_limit(tmp_path: Path) -> None:
+    (result,) = run_batch([BatchJob('cycle', _cycle_fjm(tmp_path))], time_limit=0.05)
+    assert result.status == TIME_LIMIT and result.op_counter > 0
+
+
+@native_engine_required
+def test_run_batch_runs_a_job_on_every_worker(tmp_path: Path) -> None:
+    fjm_path = _cycle_fjm(tmp_path)
+    workers, time_limit = 4, 0.5
+    jobs = [BatchJob(f'cycle{i}', fjm_path) for i in range(workers)]
+    start_time = time()
+    results = list(run_batch(jobs, workers=workers, time_limit=time_limit))
+    assert [result.status for result in results] == [TIME_LIMIT] * workers
+    assert time() - start_time < workers * time_limit / 2  # in parallel, not one worker after another
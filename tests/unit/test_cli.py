@@ -1,19 +1,23 @@
 """
 unit-tests for the command-line interface (flipjump/flipjump_cli.py).
 
-drives the public assemble_run_according_to_cmd_line_args entry-point with argument lists,
-and checks get_version's defaulting/validation logic.
+drives the public assemble_run_according_to_cmd_line_args entry-point with argument lists
+(assemble / --chunk_words / --codec / run / --predecode / --progress / --preinit / --sample-every / --coverage /
+--watch / --trace-file, and the `fj trace`, `fj batch` and `fj fjm-bench` commands), and checks get_version's
+defaulting/validation logic.
 """
 
+import json
 from pathlib import Path
+from typing import List
 
 import pytest
 
-from flipjump import assemble_run_according_to_cmd_line_args
+from flipjump import assemble_run_according_to_cmd_line_args, run_test_output
 from flipjump.fjm.fjm_consts import FJMVersion
 from flipjump.fjm.fjm_reader import Reader
 from flipjump.flipjump_cli import get_version, parse_arguments
-from tests.unit.unit_utils import HELLO_NO_STL, assemble_to_path
+from tests.unit.unit_utils import HELLO_NO_STL, HELLO_WORLD_OUTPUT, assemble_to_path
 
 
 def _write_hello(tmp_path: Path) -> Path:
@@ -32,6 +36,49 @@ def test_cli_assemble_only(tmp_path: Path) -> None:
     assert Reader(out_path).memory_width == 32
 
 
+def test_cli_chunk_words_sets_the_indexed_versions_chunks(tmp_path: Path) -> None:
+    fj_path = _write_hello(tmp_path)
+    out_path = tmp_path / 'out.fjm'
+    assemble_run_according_to_cmd_line_args(
+        cmd_line_args=['--asm', '-o', str(out_path), '--no_stl', '-v', '5', '--chunk_words', '64', '-s', str(fj_path)]
+    )
+    reader = Reader(out_path)
+    assert reader.version == FJMVersion.IndexedVersion and reader.chunk_words == 64 and reader.chunk_count > 1
+
+    with pytest.raises(SystemExit):
+        assemble_run_according_to_cmd_line_args(
+            cmd_line_args=['--asm', '-o', str(out_path), '--no_stl', '-v', '5', '--chunk_words', '63', str(fj_path)]
+        )
+
+
+def test_cli_codec_sets_the_indexed_versions_codec(tmp_path: Path) -> None:
+    fj_path = _write_hello(tmp_path)
+    out_paths = {codec: tmp_path / f'{codec}.fjm' for codec in ('zlib', 'raw')}
+    for codec, out_path in out_paths.items():
+        assemble_run_according_to_cmd_line_args(
+            cmd_line_args=['--asm', '-o', str(out_path), '--no_stl', '-v', '5', '--codec', codec, '-s', str(fj_path)]
+        )
+    assert out_paths['zlib'].stat().st_size < out_paths['raw'].stat().st_size
+    assert Reader(out_paths['zlib']).get_memory() == Reader(out_paths['raw']).get_memory()
+
+    with pytest.raises(SystemExit):
+        parse_arguments(cmd_line_args=['--codec', 'zstd', str(fj_path)])
+
+
+def test_cli_fjm_bench_prints_a_line_per_codec(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    fjm_path = assemble_to_path(HELLO_NO_STL.read_text(), tmp_path)
+    assemble_run_according_to_cmd_line_args(
+        cmd_line_args=['fjm-bench', str(fjm_path), '--codecs', 'raw', 'rle', 'zlib', '--runs', '1']
+    )
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith(f'{fjm_path}: ') and lines[1].split() == ['codec', 'size', 'ratio', 'write', 'load']
+    assert [line.split()[0] for line in lines[2:]] == ['raw', 'rle', 'zlib']
+    assert int(lines[4].split()[1]) < int(lines[2].split()[1])
+
+    with pytest.raises(SystemExit):
+        assemble_run_according_to_cmd_line_args(cmd_line_args=['fjm-bench', str(fjm_path), '--chunk_words', '3'])
+
+
 def test_cli_run_only(tmp_path: Path) -> None:
     fjm_path = assemble_to_path(HELLO_NO_STL.read_text(), tmp_path)
     assemble_run_according_to_cmd_line_args(cmd_line_args=['--run', '-s', str(fjm_path)])
@@ -59,6 +106,14 @@ def test_cli_non_silent_run_reports_flat_memory(tmp_path: Path, capsys: pytest.C
     assert 'flat memory' in capsys.readouterr().out
 
 
+@native_engine_required
+def test_cli_predecode_flag_runs_the_program(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    fjm_path = assemble_to_path(HELLO_NO_STL.read_text(), tmp_path, memory_width=32)
+    assemble_run_according_to_cmd_line_args(cmd_line_args=['--run', '--predecode', str(fjm_path)])
+    output = capsys.readouterr().out
+    assert 'Finished by looping' in output and 'flat memory' in output
+
+
 def test_cli_mutually_exclusive_asm_run(tmp_path: Path) -> None:
     fj_path = _write_hello(tmp_path)
     with pytest.raises(SystemExit):
@@ -138,3 +193,120 @@ def test_cli_no_output_flag_is_gone(tmp_path: Path) -> None:
     fjm_path = assemble_to_path(HELLO_NO_STL.read_text(), tmp_path)
     with pytest.raises(SystemExit):
         assemble_run_according_to_cmd_line_args(cmd_line_args=['--run', '-s', '--no_output', str(fjm_path)])
+
+
+@native_engine_required
+@pytest.mark.parametrize('label_arguments', [[], ['--preinit-label', 'IO']])
+def test_cli_preinit_saves_a_runnable_program(tmp_path: Path, label_arguments: List[str]) -> None:
+    fjm_path = assemble_to_path(HELLO_NO_STL.read_text(), tmp_path, with_debug=True)
+    preinit_path = tmp_path / 'preinit.fjm'
+    debug_arguments = ['-d', str(tmp_path / 'debug.fjd')] if label_arguments else []
+    assemble_run_according_to_cmd_line_args(
+        cmd_line_args=['--run', '-s', str(fjm_path), '--preinit', str(preinit_path), *debug_arguments, *label_arguments]
+    )
+    assert run_test_output(preinit_path, b'', HELLO_WORLD_OUTPUT, print_time=False, print_termination=False)
+
+
+@native_engine_required
+def test_cli_sampling_saves_the_collapsed_stacks(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    fjm_path = assemble_to_path(HELLO_NO_STL.read_text(), tmp_path, with_debug=True)
+    stacks_path = tmp_path / 'stacks.txt'
+    assemble_run_according_to_cmd_line_args(
+        cmd_line_args=[
+            '--run',
+            str(fjm_path),
+            '-d',
+            str(tmp_path / 'debug.fjd'),
+            '--sample-every',
+            '1',
+            '--sample-stacks',
+            str(stacks_path),
+        ]
+    )
+    assert 'The hottest macros' in capsys.readouterr().out
+    stacks = dict(line.rsplit(' ', 1) for line in stacks_path.read_text().splitlines())
+    assert int(stacks['output(1);output_bit(1)']) == 13 * 8 - 1  # every output op, but the first (on code_start)
+
+
+@native_engine_required
+def test_cli_coverage_saves_the_report(tmp_path: Path) -> None:
+    fjm_path = assemble_to_path(HELLO_NO_STL.read_text(), tmp_path, with_debug=True)
+    coverage_path = tmp_path / 'coverage.txt'
+    assemble_run_according_to_cmd_line_args(
+        cmd_line_args=[
+            '--run',
+            '-s',
+            str(fjm_path),
+            '-d',
+            str(tmp_path / 'debug.fjd'),
+            '--coverage',
+            str(coverage_path),
+        ]
+    )
+    report = coverage_path.read_text().splitlines()
+    assert report[0].startswith("106 of the program's 107 ops were executed")  # all but the IO op
+    assert '  100.00%  103 / 103  output(1)' in report  # every output op, but the first (on code_start)
+
+
+@native_engine_required
+def test_cli_watch_prints_every_watched_flip(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    fjm_path = assemble_to_path(HELLO_NO_STL.read_text(), tmp_path, with_debug=True)
+    debug_args = ['-d', str(tmp_path / 'debug.fjd')]
+    assemble_run_according_to_cmd_line_args(
+        cmd_line_args=['--run', '-s', str(fjm_path), *debug_args, '--watch', 'IO:1']
+    )
+    assert capsys.readouterr().out.count('Watchpoint hit after') == len(HELLO_WORLD_OUTPUT) * 8  # every output bit
+
+    with pytest.raises(SystemExit):
+        assemble_run_according_to_cmd_line_args(cmd_line_args=['--run', '-s', str(fjm_path), '--watch-break'])
+
+
+@native_engine_required
+def test_cli_progress_prints_no_status_line_for_a_short_run(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    fjm_path = assemble_to_path(HELLO_NO_STL.read_text(), tmp_path)
+    assert parse_arguments(cmd_line_args=['--run', str(fjm_path), '--progress'])[0].progress
+    assemble_run_according_to_cmd_line_args(cmd_line_args=['--run', '-s', str(fjm_path), '--progress'])
+    assert capsys.readouterr().err == ''  # a run shorter than a second has no status line to end
+
+
+@native_engine_required
+def test_cli_batch_prints_a_json_line_per_job(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    fjm_path = assemble_to_path(HELLO_NO_STL.read_text(), tmp_path)
+    (tmp_path / 'hello.out').write_bytes(HELLO_WORLD_OUTPUT)
+    jobs_path = tmp_path / 'jobs.csv'
+    jobs_path.write_text(f'hello, {fjm_path}, , {tmp_path / "hello.out"}\n')
+    assemble_run_according_to_cmd_line_args(cmd_line_args=['batch', str(jobs_path), '-j', '2'])
+    captured = capsys.readouterr()
+    assert [json.loads(line)['status'] for line in captured.out.splitlines()] == ['passed']
+    assert captured.err == '1 jobs: 1 passed\n'
+
+    results_path = tmp_path / 'results.jsonl'
+    with pytest.raises(SystemExit):
+        assemble_run_according_to_cmd_line_args(
+            cmd_line_args=['batch', str(jobs_path), '--max-ops', '10', '-o', str(results_path)]
+        )
+    assert json.loads(results_path.read_text())['status'] == 'op-limit'
+
+
+@native_engine_required
+def test_cli_trace_file_is_decoded_by_fj_trace(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    fjm_path = assemble_to_path(HELLO_NO_STL.read_text(), tmp_path, with_debug=True)
+    debug_args = ['-d', str(tmp_path / 'debug.fjd')]
+    trace_path = tmp_path / 'run.trace'
+    assemble_run_according_to_cmd_line_args(
+        cmd_line_args=['--run', '-s', str(fjm_path), *debug_args, '--trace-file', str(trace_path)]
+    )
+    capsys.readouterr()
+
+    assemble_run_according_to_cmd_line_args(cmd_line_args=['trace', str(trace_path), *debug_args, '--head', '3'])
+    assert capsys.readouterr().out.splitlines() == [
+        '[startup]',
+        '      0:   0; 100',
+        '[startup -> code_start]',
+        '    100:   80; 180',
+        '[output(1) -> output_bit(1)]',
+        '    180:   80; 200',
+    ]
+
+    with pytest.raises(SystemExit):
+        assemble_run_according_to_cmd_line_args(cmd_line_args=['trace', str(fjm_path)])
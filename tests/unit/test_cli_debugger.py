@@ -1,20 +1,21 @@
 """
 unit-tests for the CLI debugger: the terminal command prompt (show_message / ask_for_command)
 and an end-to-end breakpoint session (break -> read memory -> step -> continue, and the
-exit/EOF -> keyboard-interrupt path) driven through scripted stdin lines.
+exit/EOF -> keyboard-interrupt path) driven through scripted stdin lines - which must break
+at the same ops, with the same statistics, on the native featured loop and the python one.
 """
 
 from pathlib import Path
-from typing import Iterator, List
+from typing import Any, Iterator, List, Tuple
 
 import pytest
 
 from flipjump.interpreter import fjm_run
 from flipjump.interpreter.debugging import user_queries
-from flipjump.interpreter.debugging.breakpoints import get_breakpoint_handler
+from flipjump.interpreter.debugging.breakpoints import get_breakpoint_handler, handle_breakpoint
 from flipjump.interpreter.io_devices.FixedIO import FixedIO
-from flipjump.utils.classes import TerminationCause
-from tests.unit.unit_utils import assemble_to_path
+from flipjump.utils.classes import RunStatistics, TerminationCause
+from tests.unit.unit_utils import assemble_to_path, native_engine_required
 
 LOOP_PROGRAM = """
 stl.startup
@@ -118,3 +119,64 @@ class TestDebuggerEndToEnd:
     def test_explicit_exit_is_a_keyboard_interrupt(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
         statistics, _ = self.run_with_breakpoint(tmp_path, monkeypatch, ['exit'])
         assert statistics.termination_cause == TerminationCause.KeyboardInterrupt
+
+
+OUTPUT_THEN_LOOP_PROGRAM = """
+stl.startup
+stl.output "Hi"
+flipper+dbit;
+my_loop_label:
+;my_loop_label
+
+flipper: hex.hex 0
+"""
+
+
+def debug_session(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, fjm_path: Path) -> Tuple[Any, ...]:
+    """break at op 5, step, skip 7, read, continue to the loop label, continue to the end."""
+    breaks: List[Tuple[int, int, int]] = []
+
+    def recording_handle_breakpoint(handler: Any, ip: int, mem: Any, statistics: RunStatistics) -> Any:
+        breaks.append((ip, statistics.op_counter, mem.get_word(ip)))
+        return handle_breakpoint(handler, ip, mem, statistics)
+
+    monkeypatch.setattr(fjm_run, 'handle_breakpoint', recording_handle_breakpoint)
+    breakpoint_handler = get_breakpoint_handler(tmp_path / 'debug.fjd', None, None, {'my_loop_label'})
+    breakpoint_handler.next_break = 5
+    feed_answers(monkeypatch, ['s', 'skip 7', 'read 0', 'c', 'c'])
+    io_device = FixedIO(b'')
+    statistics = fjm_run.run(
+        fjm_path,
+        io_device=io_device,
+        print_time=False,
+        breakpoint_handler=breakpoint_handler,
+        last_ops_debugging_list_length=4,
+    )
+    assert statistics.last_ops_addresses is not None
+    return (
+        breaks,
+        statistics.termination_cause,
+        statistics.op_counter,
+        statistics.flip_counter,
+        statistics.jump_counter,
+        list(statistics.last_ops_addresses),
+        io_device.get_output(),
+    )
+
+
+@native_engine_required
+def test_native_debugger_session_matches_the_python_featured_loop(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    fjm_path = assemble_to_path(OUTPUT_THEN_LOOP_PROGRAM, tmp_path, use_stl=True, with_debug=True)
+
+    native_session = debug_session(tmp_path, monkeypatch, fjm_path)
+    monkeypatch.setattr(fjm_run, '_fjcore', None)
+    python_session = debug_session(tmp_path, monkeypatch, fjm_path)
+
+    assert native_session == python_session
+    breaks = native_session[0]
+    assert [op_counter for _, op_counter, _ in breaks[:3]] == [5, 6, 13]
+    assert len(breaks) == 4
+    assert native_session[1] == TerminationCause.Looping
+    assert native_session[-1] == b'Hi'
@@ -0,0 +1,72 @@
+"""
+unit-tests for the execution coverage (flipjump/interpreter/debugging/coverage.py): the
+ExecutionCoverage bitmap (membership, merging runs), the program's op addresses, and the
+per-macro coverage folding and its report.
+"""
+
+from pathlib import Path
+from typing import Dict
+
+from flipjump.interpreter.debugging.coverage import (
+    ExecutionCoverage,
+    coverage_report,
+    macro_coverage,
+    program_op_addresses,
+)
+from tests.unit.unit_utils import HELLO_NO_STL, assemble_to_path
+
+OP_SIZE = 2 * 32
+
+LABELS: Dict[str, int] = {
+    'f1:l3:startup---:start:': 0,
+    'f1:l5:print(1)---s1:l9:rep0:output_bit(1)---:start:': 2 * OP_SIZE,
+    'f1:l5:print(1)---s1:l9:rep1:output_bit(1)---:start:': 3 * OP_SIZE,
+    'f1:l7:unused(1)---:start:': 4 * OP_SIZE,
+    'end': 6 * OP_SIZE,
+}
+OPS = [op_index * OP_SIZE for op_index in range(7)]
+
+
+def test_execution_coverage_bitmap_and_other_addresses() -> None:
+    coverage = ExecutionCoverage(32, bytes([0b101]), [OP_SIZE + 1])
+    assert 0 in coverage and 2 * OP_SIZE in coverage and OP_SIZE + 1 in coverage
+    assert OP_SIZE not in coverage and 1 not in coverage and 100 * OP_SIZE not in coverage
+    assert coverage.addresses() == [0, OP_SIZE + 1, 2 * OP_SIZE]
+    assert len(coverage) == 3
+
+
+def test_execution_coverage_merges_runs() -> None:
+    coverage = ExecutionCoverage(32, bytes([0b1]))
+    coverage.update(ExecutionCoverage(32, bytes([0b10, 0b1]), [5]))
+    assert coverage.bitmap == bytearray([0b11, 0b1])
+    assert coverage.addresses() == [0, 5, OP_SIZE, 8 * OP_SIZE]
+
+
+def test_program_op_addresses(tmp_path: Path) -> None:
+    fjm_path = assemble_to_path(HELLO_NO_STL.read_text(), tmp_path, memory_width=32)
+    op_addresses = program_op_addresses(fjm_path)
+    assert op_addresses[:3] == [0, OP_SIZE, 2 * OP_SIZE]
+    assert all(address % OP_SIZE == 0 for address in op_addresses)
+
+
+def test_macro_coverage_includes_the_nested_macro_calls() -> None:
+    coverage = ExecutionCoverage(32, bytes([0b1001101]))  # ops 0, 2, 3, 6
+    assert macro_coverage(coverage, LABELS, OPS) == {
+        'startup': (1, 2),
+        'print(1)': (2, 2),
+        'output_bit(1)': (2, 2),
+        'unused(1)': (0, 2),
+    }
+
+
+def test_coverage_report_lists_the_least_covered_macros_first() -> None:
+    coverage = ExecutionCoverage(32, bytes([0b1001101]))
+    assert coverage_report(coverage, LABELS, OPS).splitlines() == [
+        "4 of the program's 7 ops were executed (57.14%).",
+        '',
+        'The macros coverage (executed / all ops, including their nested macro calls):',
+        '    0.00%  0 / 2  unused(1)',
+        '   50.00%  1 / 2  startup',
+        '  100.00%  2 / 2  output_bit(1)',
+        '  100.00%  2 / 2  print(1)',
+    ]
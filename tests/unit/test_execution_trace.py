@@ -0,0 +1,80 @@
+"""
+unit-tests for the execution trace's reader (flipjump/interpreter/debugging/execution_trace.py):
+decoding hand-built trace files (the varint deltas, the chunks, the 2^64 wrap-around), rejecting
+the files that aren't traces or are cut, and the show_trace-like lines with their label frames.
+"""
+
+import struct
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+from flipjump.interpreter.debugging.execution_trace import TraceRecord, read_trace, trace_lines, write_trace_header
+from flipjump.utils.exceptions import FlipJumpRuntimeException
+
+W = 64
+DW = 2 * W
+
+
+def _write_trace(path: Path, chunks: List[bytes]) -> Path:
+    with open(path, 'wb') as trace_file:
+        write_trace_header(trace_file, W)
+        for chunk in chunks:
+            trace_file.write(chunk)
+    return path
+
+
+def _chunk(first_ip: int, records: bytes) -> bytes:
+    return struct.pack('<IQ', len(records), first_ip) + records
+
+
+def test_read_trace_decodes_the_deltas_across_chunks(tmp_path: Path) -> None:
+    trace_path = _write_trace(
+        tmp_path / 'run.trace',
+        [
+            # flip 0x180 (+0x180), jump ip+2w (+0); then flip 0x181 (+1), jump 0 (-(0x100+2w) = -0x180)
+            _chunk(0x80, bytes([0x80, 0x06, 0x00, 0x02, 0xFF, 0x05])),
+            # the flip delta restarts: flip 5 (+5), jump 2^64-2w (wraps: -2w-(0x40+2w) = -0x140)
+            _chunk(0x40, bytes([0x0A, 0xFF, 0x04])),
+        ],
+    )
+    assert list(read_trace(trace_path)) == [
+        TraceRecord(0x80, 0x180, 0x80 + DW),
+        TraceRecord(0x80 + DW, 0x181, 0),
+        TraceRecord(0x40, 5, (1 << 64) - DW),
+    ]
+
+
+def test_read_trace_rejects_other_files_and_cut_traces(tmp_path: Path) -> None:
+    not_a_trace = tmp_path / 'other.bin'
+    not_a_trace.write_bytes(b'FJTRACE0' + bytes(8))
+    with pytest.raises(FlipJumpRuntimeException):
+        list(read_trace(not_a_trace))
+
+    cut_trace = _write_trace(tmp_path / 'cut.trace', [_chunk(0, bytes([0, 0])), _chunk(0, bytes([0, 0, 0, 0]))[:-1]])
+    records = read_trace(cut_trace)
+    assert next(records) == TraceRecord(0, 0, DW)  # the whole chunks are decoded first
+    with pytest.raises(FlipJumpRuntimeException):
+        next(records)
+
+    cut_record = _write_trace(tmp_path / 'cut_record.trace', [_chunk(0, bytes([0, 0x80]))])
+    with pytest.raises(FlipJumpRuntimeException):
+        list(read_trace(cut_record))
+
+
+def test_trace_lines_show_the_label_frames_when_they_change() -> None:
+    labels: Dict[str, int] = {
+        'f1:l1:print(1)---s1:l2:rep0:bit(1)---:start:': 0,
+        'f1:l1:print(1)---s1:l2:rep1:bit(1)---:start:': DW,
+        'end': 2 * DW,
+    }
+    records = [TraceRecord(0, 0x80, DW), TraceRecord(DW, 0x81, 2 * DW), TraceRecord(2 * DW, 0, 2 * DW)]
+    assert list(trace_lines(iter(records), labels)) == [
+        '[print(1) -> bit(1)]',
+        '      0:   80; 80',
+        '     80:   81; 100',
+        '[end]',
+        '    100:   0; 100',
+    ]
+    assert list(trace_lines(iter(records[:1]), {})) == ['      0:   80; 80']
@@ -5,7 +5,8 @@ the interpreter has three engines: the featured loop (trace / breakpoints / full
 selected with profile=True), the pure-python fast loop, and the native (C) engine. these
 tests pin all engines to identical behavior - same output, same termination cause, same
 op-counts - over programs covering every interpreter path: output, input+EOF, unaligned ops,
-zeros-boundary segments, runtime memory errors, and each termination cause.
+zeros-boundary segments, runtime memory errors, and each termination cause - and pins
+the byte-level device interface to the per-bit one.
 """
 
 from pathlib import Path
@@ -14,10 +15,12 @@ from typing import Optional, Tuple
 import pytest
 
 from flipjump.fjm.fjm_consts import FJMVersion
+from flipjump.fjm.fjm_reader import GarbageHandling
 from flipjump.fjm.fjm_writer import Writer
 from flipjump.interpreter import fjm_run
 from flipjump.interpreter.fjm_run import TerminationStatistics
 from flipjump.interpreter.io_devices.FixedIO import FixedIO
+from flipjump.interpreter.io_devices.IODevice import IODevice
 from flipjump.utils.classes import TerminationCause
 from tests.unit.unit_utils import (
     CAT_PROGRAM,
@@ -171,3 +174,55 @@ def test_eof_op_counting_matches_featured_loop(tmp_path: Path, engine: str, last
     assert fast_stats.termination_cause == TerminationCause.EOF
     assert featured_stats.termination_cause == TerminationCause.EOF
     assert fast_stats.op_counter == featured_stats.op_counter
+
+
+# a w=16 program flipping the out-of-segment word 0x400 twice - inside the gap between its
+# code and a far segment (so the native engine's flat window covers the garbage word).
+GARBAGE_TOUCHING_PROGRAM = MINIMAL_STARTUP + '''
+startup
+0x4000;second
+second: 0x4001;end
+end: ;end
+
+segment 0x8000
+;0
+'''
+
+
+@pytest.mark.parametrize(
+    'garbage_handling,expected_warnings',
+    [(GarbageHandling.Continue, 0), (GarbageHandling.OnlyWarning, 1)],
+)
+def test_lenient_garbage_handling_modes(
+    tmp_path: Path,
+    engine: str,
+    capsys: pytest.CaptureFixture[str],
+    garbage_handling: GarbageHandling,
+    expected_warnings: int,
+) -> None:
+    fjm_path = assemble_to_path(GARBAGE_TOUCHING_PROGRAM, tmp_path, memory_width=16)
+
+    statistics = fjm_run.run(fjm_path, io_device=FixedIO(b''), garbage_handling=garbage_handling)
+
+    assert statistics.termination_cause == TerminationCause.Looping
+    assert statistics.op_counter == 4
+    assert capsys.readouterr().out.count('Warning:  Reading garbage word at mem[4000] = 0') == expected_warnings
+
+
+class PerBitFixedIO(FixedIO):
+    """FixedIO without its byte-level interface - the engines use read_bit/write_bit only."""
+
+    read_bytes = IODevice.read_bytes
+    write_bytes = IODevice.write_bytes
+
+
+@pytest.mark.parametrize('program_id, fixed_input', [('cat', b'byte-level!'), ('hello', b'')])
+def test_byte_level_io_matches_per_bit_io(tmp_path: Path, engine: str, program_id: str, fixed_input: bytes) -> None:
+    fjm_path = _build_program(program_id, tmp_path)
+    byte_io, bit_io = FixedIO(fixed_input), PerBitFixedIO(fixed_input)
+    byte_stats = fjm_run.run(fjm_path, io_device=byte_io, print_time=False)
+    bit_stats = fjm_run.run(fjm_path, io_device=bit_io, print_time=False)
+
+    assert byte_io.get_output() == bit_io.get_output() == (fixed_input or HELLO_WORLD_OUTPUT)
+    assert byte_stats.termination_cause == bit_stats.termination_cause
+    assert byte_stats.op_counter == bit_stats.op_counter
@@ -2,7 +2,9 @@
 unit-tests for the .fjm file-format Writer and Reader.
 
 covers round-trips across all versions and memory-widths, the relative-jump transparency
-(v2/v3), unaligned/zeros-boundary reads, the garbage-handling modes, writer validation,
+(v2/v3/v5), the raw-data mode (keep_raw_data), the mapped version's layout (v4), the indexed version's
+chunks (v5) and their codecs, the bulk decoding (with and without numpy), the DenseMemory's list and blocks,
+the lazy reader's LazyMemory blocks, unaligned/zeros-boundary reads, the garbage-handling modes, writer validation,
 and reading corrupt files.
 """
 
@@ -12,9 +14,11 @@ from typing import List
 
 import pytest
 
-from flipjump.fjm.fjm_consts import FJ_MAGIC, FJMVersion
-from flipjump.fjm.fjm_reader import GarbageHandling, Reader
+from flipjump.fjm.fjm_consts import FJ_MAGIC, ChunkCodec, FJMVersion, _mapped_page_size
+from flipjump.fjm import fjm_reader
+from flipjump.fjm.fjm_reader import DenseMemory, GarbageHandling, LazyMemory, Reader
 from flipjump.fjm.fjm_writer import Writer
+from flipjump.interpreter.io_devices.device_memory import ReaderDeviceMemory
 from flipjump.utils.exceptions import (
     FlipJumpReadFjmException,
     FlipJumpRuntimeMemoryException,
@@ -22,6 +26,7 @@ from flipjump.utils.exceptions import (
 )
 
 ALL_VERSIONS = list(FJMVersion)
+DATA_POOL_VERSIONS = [version for version in FJMVersion if version != FJMVersion.MappedVersion]
 ALL_WIDTHS = [8, 16, 32, 64]
 
 
@@ -48,6 +53,18 @@ def test_round_trip(tmp_path: Path, version: FJMVersion, memory_width: int) -> N
     assert memory[1] == 20
 
 
+@pytest.mark.parametrize('version', ALL_VERSIONS)
+@pytest.mark.parametrize('memory_width', ALL_WIDTHS)
+def test_read_memory_width_reads_only_the_header(tmp_path: Path, version: FJMVersion, memory_width: int) -> None:
+    fjm_path = _write(tmp_path, memory_width, version, 0, [10, 20])
+    fjm_path.write_bytes(fjm_path.read_bytes()[: 2 + 2 + 8 + 8])  # the base header, without the rest
+    assert fjm_reader.read_memory_width(fjm_path) == memory_width
+
+    fjm_path.write_bytes(b'FJ')
+    with pytest.raises(FlipJumpReadFjmException):
+        fjm_reader.read_memory_width(fjm_path)
+
+
 @pytest.mark.parametrize('version', ALL_VERSIONS)
 def test_relative_jump_value_is_transparent(tmp_path: Path, version: FJMVersion) -> None:
     # the jump-word (odd index) of a non-zero-offset segment must read back as its absolute
@@ -147,6 +164,269 @@ def test_add_segment_length_less_than_data_raises(tmp_path: Path) -> None:
         writer.add_segment(0, 2, data_start, 4)
 
 
+@pytest.mark.parametrize('version', DATA_POOL_VERSIONS)
+def test_keep_raw_data_defers_the_memory_dictionary(tmp_path: Path, version: FJMVersion) -> None:
+    fjm_path = _write(tmp_path, 16, version, 2, [10, 20, 30, 40])
+    reader = Reader(fjm_path, keep_raw_data=True)
+    assert reader.raw_segments == [(2, 4, 0, 4)]
+    assert reader.raw_data is not None and len(reader.raw_data) == 4 * 2
+    assert reader.has_relative_jumps == (
+        version in (FJMVersion.RelativeJumpVersion, FJMVersion.CompressedVersion, FJMVersion.IndexedVersion)
+    )
+
+    reader.load_memory()
+    assert reader.raw_data is None
+    assert reader.get_memory() == Reader(fjm_path).get_memory()
+
+
+@pytest.mark.parametrize('memory_width', ALL_WIDTHS)
+def test_mapped_version_aligns_every_segments_data(tmp_path: Path, memory_width: int) -> None:
+    fjm_path = tmp_path / 'out.fjm'
+    writer = Writer(fjm_path, memory_width, FJMVersion.MappedVersion)
+    shared_data_start = writer.add_data([1, 2, 3, 4])
+    writer.add_segment(0, 4, shared_data_start, 4)
+    writer.add_segment(100, 2, shared_data_start, 2)  # the data may be shared - it's stored per segment
+    writer.add_segment(200, 6, writer.add_data([]), 0)
+    writer.write_to_file()
+
+    reader = Reader(fjm_path, keep_raw_data=True)
+    assert reader.raw_data is None and reader.mapped_data is not None
+    assert reader.raw_segments is not None and [segment[3] for segment in reader.raw_segments] == [4, 2, 0]
+    for segment_start, _, data_offset, data_length in reader.raw_segments[:2]:
+        assert data_offset % _mapped_page_size == segment_start * memory_width // 8 % _mapped_page_size
+
+    reader.load_memory()
+    assert reader.mapped_data is None
+    assert reader.get_memory() == Reader(fjm_path).get_memory()
+    assert [reader.get_word(address * memory_width) for address in (0, 1, 2, 3, 100, 101, 205)] == [1, 2, 3, 4, 1, 2, 0]
+
+
+@pytest.mark.parametrize('version', ALL_VERSIONS)
+def test_segment_data_words_are_absolute(tmp_path: Path, version: FJMVersion) -> None:
+    fjm_path = tmp_path / 'out.fjm'
+    writer = Writer(fjm_path, 16, version)
+    writer.add_segment(2, 6, writer.add_data([10, 20, 30, 40]), 4)
+    writer.add_simple_segment_with_data(100, [50, 60])
+    writer.write_to_file()
+
+    reader = Reader(fjm_path, keep_raw_data=True)
+    assert [reader.segment_data_words(index) for index in range(2)] == [[10, 20, 30, 40], [50, 60]]
+    reader.unmap_raw_data()
+    assert reader.segment_data_words(1) == [50, 60]
+    reader.load_memory()
+    with pytest.raises(ValueError):
+        reader.segment_data_words(0)
+
+
+def test_mapped_version_unmaps_into_a_data_pool(tmp_path: Path) -> None:
+    reader = Reader(_write(tmp_path, 16, FJMVersion.MappedVersion, 2, [10, 20, 30, 40]), keep_raw_data=True)
+    reader.unmap_raw_data()
+    assert reader.mapped_data is None and not reader.has_relative_jumps
+    assert reader.raw_segments == [(2, 4, 0, 4)]
+    assert reader.raw_data == struct.pack('<4H', 10, 20, 30, 40)
+
+
+def test_mapped_version_data_beyond_the_file_raises(tmp_path: Path) -> None:
+    fjm_path = _write(tmp_path, 16, FJMVersion.MappedVersion, 0, [10, 20])
+    fjm_path.write_bytes(fjm_path.read_bytes()[:-2])
+    with pytest.raises(FlipJumpReadFjmException):
+        Reader(fjm_path)
+
+
+def test_indexed_version_compresses_every_chunk_on_its_own(tmp_path: Path) -> None:
+    fjm_path = tmp_path / 'out.fjm'
+    writer = Writer(fjm_path, 16, FJMVersion.IndexedVersion, chunk_words=64)
+    writer.add_segment(0, 200, writer.add_data([1, 0] * 64 + [2, 6]), 130)  # 2 compressible chunks, and a short one
+    writer.add_segment(300, 2, writer.add_data([]), 0)
+    writer.add_segment(400, 4, writer.add_data([5, 6, 7, 8]), 4)
+    writer.write_to_file()
+    chunks = writer._compressed_chunks('H')[1]
+    assert [codec for codec, _ in chunks] == [ChunkCodec.Lzma, ChunkCodec.Lzma, ChunkCodec.Raw, ChunkCodec.Raw]
+
+    reader = Reader(fjm_path, keep_raw_data=True)
+    assert (reader.chunk_words, reader.chunk_count) == (64, 4)
+    assert reader.raw_segments == [(0, 200, 0, 130), (300, 2, 130, 0), (400, 4, 130, 4)]
+    reader.load_memory()
+    assert [reader.get_word(address * 16) for address in (0, 1, 127, 128, 129, 400, 401, 403)] == [
+        1,
+        0,
+        0,
+        2,
+        6,
+        5,
+        6,
+        8,
+    ]
+
+
+def test_indexed_version_chunks_are_the_same_on_a_thread_pool(tmp_path: Path) -> None:
+    data = [(i * 0x9E3779B97F4A7C15 >> 48) & 0xFFFF if i % 3 else 0 for i in range(1000)]
+    fjm_paths = []
+    for workers in (1, 3):
+        fjm_paths.append(tmp_path / f'workers_{workers}.fjm')
+        writer = Writer(fjm_paths[-1], 16, FJMVersion.IndexedVersion, chunk_words=100, workers=workers)
+        writer.add_simple_segment_with_data(0, list(data))
+        writer.write_to_file()
+    assert fjm_paths[0].read_bytes() == fjm_paths[1].read_bytes()
+
+    memory = Reader(fjm_paths[0], workers=3).get_memory()
+    assert [memory[address] for address in range(1000)] == data
+
+    with pytest.raises(FlipJumpWriteFjmException):
+        Writer(tmp_path / 'bad.fjm', 16, FJMVersion.IndexedVersion, chunk_words=99)
+
+
+def test_indexed_version_damaged_chunk_raises(tmp_path: Path) -> None:
+    fjm_path = _write(tmp_path, 16, FJMVersion.IndexedVersion, 0, [0] * 100)
+    fjm_path.write_bytes(fjm_path.read_bytes()[:-1])
+    with pytest.raises(FlipJumpReadFjmException):
+        Reader(fjm_path)
+    with pytest.raises(FlipJumpReadFjmException):
+        Reader(fjm_path, lazy=True)
+
+
+@pytest.mark.parametrize('codec', list(ChunkCodec))
+@pytest.mark.parametrize('memory_width', ALL_WIDTHS)
+def test_indexed_version_codec_round_trip(tmp_path: Path, codec: ChunkCodec, memory_width: int) -> None:
+    word_mask = (1 << memory_width) - 1
+    random_words = [(i * 0x9E3779B97F4A7C15) & word_mask for i in range(60)]
+    next_op_jumps = [word for address in range(120, 160, 2) for word in (3, (address + 2) * memory_width & word_mask)]
+    data = [0] * 60 + random_words + next_op_jumps
+    fjm_path = tmp_path / 'out.fjm'
+    writer = Writer(fjm_path, memory_width, FJMVersion.IndexedVersion, chunk_words=32, codec=codec)
+    writer.add_segment(0, 200, writer.add_data(data), len(data))
+    writer.write_to_file()
+    word_format = {8: 'B', 16: 'H', 32: 'L', 64: 'Q'}[memory_width]
+    assert {chunk_codec for chunk_codec, _ in writer._compressed_chunks(word_format)[1]} <= {codec, ChunkCodec.Raw}
+
+    assert Reader(fjm_path).get_memory() == dict(enumerate(data + [0] * 40))
+    lazy_memory = Reader(fjm_path, lazy=True).memory
+    assert [lazy_memory[address] for address in range(len(data))] == data
+
+
+def test_indexed_version_segment_codecs(tmp_path: Path) -> None:
+    fjm_path = tmp_path / 'out.fjm'
+    writer = Writer(fjm_path, 16, FJMVersion.IndexedVersion, chunk_words=64, codec=ChunkCodec.Zlib)
+    writer.add_simple_segment_with_data(0, [0] * 128)
+    next_op_jumps = [word for address in range(200, 264, 2) for word in (0, (address + 2) * 16)]
+    writer.add_simple_segment_with_data(200, next_op_jumps, codec=ChunkCodec.Rle)  # a run in the relative form
+    writer.add_simple_segment_with_data(300, [1, 2, 3, 4], codec=ChunkCodec.Bz2)  # doesn't get smaller
+    writer.write_to_file()
+    chunks = writer._compressed_chunks('H')[1]
+    assert [codec for codec, _ in chunks] == [ChunkCodec.Zlib, ChunkCodec.Zlib, ChunkCodec.Rle, ChunkCodec.Raw]
+    memory = Reader(fjm_path).get_memory()
+    assert [memory[address] for address in (0, 127, 200, 263, 300, 301, 302, 303)] == [0, 0, 0, 264 * 16, 1, 2, 3, 4]
+
+    with pytest.raises(FlipJumpWriteFjmException):
+        Writer(fjm_path, 16, FJMVersion.IndexedVersion, codec=5)  # type: ignore[arg-type]
+    with pytest.raises(FlipJumpWriteFjmException):
+        writer.add_simple_segment_with_data(400, [1, 2], codec=5)  # type: ignore[arg-type]
+
+
+@pytest.mark.parametrize('version', ALL_VERSIONS)
+def test_lazy_memory_loads_a_block_on_its_first_access(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, version: FJMVersion
+) -> None:
+    monkeypatch.setattr(fjm_reader, '_lazy_block_words', 4)
+    fjm_path = tmp_path / 'out.fjm'
+    writer = Writer(fjm_path, 16, version, chunk_words=4)
+    writer.add_segment(0, 2000, writer.add_data(list(range(1, 11))), 10)
+    writer.add_segment(3000, 4, writer.add_data([7, 8]), 2)
+    writer.write_to_file()
+
+    reader = Reader(fjm_path, lazy=True)
+    assert isinstance(reader.memory, LazyMemory) and len(reader.memory) == 0
+    assert reader.get_word(5 * 16) == 6 and sorted(reader.memory) == [4, 5, 6, 7]
+    reader.memory[9] = 100  # written before its block is loaded
+    assert ReaderDeviceMemory(reader).read_word(8) == 9 and reader.memory[9] == 100
+    assert 3001 in reader.memory and reader.memory.get(2500) is None and 2500 not in reader.memory
+    assert reader.get_word(1500 * 16) == 0 and reader.zeros_boundaries == [(10, 2000), (3002, 3004)]
+    with pytest.raises(FlipJumpRuntimeMemoryException):
+        reader.get_word(2500 * 16)
+
+    expected_memory = Reader(fjm_path).get_memory()
+    expected_memory.update({9: 100, 1500: 0})
+    del expected_memory[3002], expected_memory[3003]  # the small reserves are zeroed lazily too
+    assert reader.get_memory() == expected_memory
+
+
+def test_lazy_reader_rejects_a_changed_file(tmp_path: Path) -> None:
+    fjm_path = _write(tmp_path, 16, FJMVersion.IndexedVersion, 0, [1, 2, 3, 4])
+    reader = Reader(fjm_path, lazy=True)
+    _write(tmp_path, 16, FJMVersion.IndexedVersion, 0, [1, 2, 3, 4, 5, 6])
+    with pytest.raises(FlipJumpReadFjmException):
+        reader.get_word(0)
+    with pytest.raises(ValueError):
+        Reader(fjm_path, keep_raw_data=True, lazy=True)
+
+
+@pytest.mark.parametrize('version', ALL_VERSIONS)
+def test_dense_memory_matches_the_memory_dictionary(tmp_path: Path, version: FJMVersion) -> None:
+    fjm_path = tmp_path / 'out.fjm'
+    writer = Writer(fjm_path, 16, version)
+    writer.add_segment(0, 2000, writer.add_data([1, 2, 3, 4]), 4)  # a big reserve, in the list too
+    writer.add_segment(2000, 2, writer.add_data([5, 6]), 2)
+    writer.add_segment(3000, 4, writer.add_data([7, 8]), 2)  # after a gap - a block, and a far reserve
+    writer.write_to_file()
+
+    reader = Reader(fjm_path, keep_raw_data=True)
+    reader.load_memory(dense=True)
+    assert isinstance(reader.memory, DenseMemory)
+    assert len(reader.memory.words) == 2002 and reader.memory.blocks == [(3000, [7, 8])]
+    assert set(reader.memory.far) == {3002, 3003}
+    dict_reader = Reader(fjm_path)
+    assert all(reader.memory[address] == value for address, value in dict_reader.memory.items())
+    assert not any(reader.memory[address] for address in reader.memory if address not in dict_reader.memory)
+    assert reader.get_word(1500 * 16) == 0 and 1500 in reader.memory and 2500 not in reader.memory
+
+    reader.memory[2500] = 9
+    reader.memory[1] = 10
+    reader.memory[3001] = 11
+    assert reader.memory.far[2500] == 9 and reader.memory.words[1] == 10 and reader.memory.blocks[0][1][1] == 11
+    assert len(reader.memory) == 2002 + 2 + 3
+    with pytest.raises(KeyError):
+        del reader.memory[1]
+    with pytest.raises(KeyError):
+        del reader.memory[3000]
+
+
+def test_dense_memory_lists_a_too_big_first_segments_data(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(fjm_reader, '_dense_memory_max_words', 1000)
+    fjm_path = tmp_path / 'out.fjm'
+    writer = Writer(fjm_path, 16, FJMVersion.NormalVersion)
+    writer.add_segment(0, 4000, writer.add_data([1, 2, 3, 4]), 4)
+    writer.write_to_file()
+
+    reader = Reader(fjm_path, keep_raw_data=True)
+    reader.load_memory(dense=True)
+    assert isinstance(reader.memory, DenseMemory)
+    assert reader.memory.words == [1, 2, 3, 4] and reader.zeros_boundaries == [(4, 4000)]
+    assert reader.get_word(3999 * 16) == 0
+
+
+@pytest.mark.parametrize('with_numpy', [False, True])
+@pytest.mark.parametrize('version', DATA_POOL_VERSIONS + [FJMVersion.MappedVersion])
+def test_bulk_decoding_rebuilds_the_words(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, version: FJMVersion, with_numpy: bool
+) -> None:
+    if with_numpy:
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(fjm_reader, 'numpy', None)
+    word_mask = (1 << 64) - 1
+    data = [(i * 0x9E3779B97F4A7C15) & word_mask for i in range(1000)]  # jumps below and above their addresses
+    segment_start = (1 << 63) - 10  # the relative jumps wrap around the address space
+    fjm_path = _write(tmp_path, 64, version, segment_start, data)
+    memory = Reader(fjm_path).get_memory()
+    assert [memory[segment_start + i] for i in range(1000)] == data
+
+
+def test_dense_memory_needs_a_segment_at_address_zero(tmp_path: Path) -> None:
+    reader = Reader(_write(tmp_path, 16, FJMVersion.NormalVersion, 2, [10, 20, 30, 40]), keep_raw_data=True)
+    reader.load_memory(dense=True)
+    assert not isinstance(reader.memory, DenseMemory)
+
+
 def test_add_segment_overlapping_raises(tmp_path: Path) -> None:
     writer = Writer(tmp_path / 'x.fjm', 16, FJMVersion.NormalVersion)
     writer.add_simple_segment_with_data(0, [0, 0, 0, 0])
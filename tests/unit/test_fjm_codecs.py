@@ -0,0 +1,76 @@
+"""
+unit-tests for the indexed version's chunk codecs (flipjump/fjm/fjm_codecs.py): the round-trips of every
+codec, the run-length encoding's records, and the damaged data of every codec.
+"""
+
+import struct
+
+import pytest
+
+from flipjump.fjm.fjm_codecs import compress_chunk, decompress_chunk, rle_decode, rle_encode
+from flipjump.fjm.fjm_consts import ChunkCodec
+from flipjump.utils.exceptions import FlipJumpReadFjmException, FlipJumpWriteFjmException
+
+# w=16 ops: a zeroed table, an op repeated 3 times, 2 different ops, and a repeated op pair (not a run)
+OPS = [(0, 0)] * 100 + [(0x10, 0xFFE0)] * 3 + [(1, 2), (3, 4)] + [(5, 6), (5, 6)]
+DATA = b''.join(struct.pack('<2H', *op) for op in OPS)
+
+
+def _rle_header(count: int, is_run: bool) -> bytes:
+    return struct.pack('<L', (count << 1) | is_run)
+
+
+def test_rle_encodes_the_runs_of_3_ops_and_up() -> None:
+    assert rle_encode(DATA, 4) == (
+        _rle_header(100, True)
+        + bytes(4)
+        + _rle_header(3, True)
+        + struct.pack('<2H', 0x10, 0xFFE0)
+        + _rle_header(4, False)
+        + DATA[-16:]
+    )
+    assert rle_decode(rle_encode(DATA, 4), 4, len(DATA)) == DATA
+
+    # the last word isn't a full op - it follows the records
+    assert rle_encode(DATA + b'\x07\x00', 4)[-6:] == DATA[-4:] + b'\x07\x00'
+    assert rle_decode(rle_encode(DATA + b'\x07\x00', 4), 4, len(DATA) + 2) == DATA + b'\x07\x00'
+    assert rle_encode(b'', 4) == b'' and rle_decode(b'', 4, 0) == b''
+
+
+@pytest.mark.parametrize(
+    'damaged_data, data_size',
+    [
+        (_rle_header(101, True) + bytes(4), 100 * 4),  # more ops than the data's size
+        (_rle_header(0, True) + bytes(4), 100 * 4),  # an empty record
+        (_rle_header(100, True) + bytes(2), 100 * 4),  # a cut op
+        (_rle_header(100, True) + bytes(4) + b'\x00\x00', 101 * 4),  # a cut header
+        (_rle_header(100, True) + bytes(4), 101 * 4),  # ends before the data's size
+        (_rle_header(100, True) + bytes(4) + b'\x00', 100 * 4),  # a byte after the records
+    ],
+)
+def test_rle_decode_of_damaged_data_raises(damaged_data: bytes, data_size: int) -> None:
+    with pytest.raises(FlipJumpReadFjmException):
+        rle_decode(damaged_data, 4, data_size)
+
+
+@pytest.mark.parametrize('codec', list(ChunkCodec))
+@pytest.mark.parametrize('memory_width', [8, 16, 32, 64])
+def test_codec_round_trip(codec: ChunkCodec, memory_width: int) -> None:
+    data = DATA * (memory_width // 8)
+    compressed_data = compress_chunk(codec, data, memory_width, 0)
+    assert codec == ChunkCodec.Raw or len(compressed_data) < len(data)
+    assert decompress_chunk(codec, compressed_data, memory_width, len(data)) == data
+
+
+@pytest.mark.parametrize('codec', [ChunkCodec.Lzma, ChunkCodec.Zlib, ChunkCodec.Bz2, ChunkCodec.Rle])
+def test_damaged_chunk_raises(codec: ChunkCodec) -> None:
+    compressed_data = compress_chunk(codec, DATA, 16, 0)
+    with pytest.raises(FlipJumpReadFjmException):
+        decompress_chunk(codec, compressed_data[:-3], 16, len(DATA))
+
+
+def test_unsupported_codec_raises() -> None:
+    with pytest.raises(FlipJumpWriteFjmException):
+        compress_chunk(7, DATA, 16, 0)  # type: ignore[arg-type]
+    with pytest.raises(FlipJumpReadFjmException):
+        decompress_chunk(7, DATA, 16, len(DATA))
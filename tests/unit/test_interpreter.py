@@ -2,19 +2,29 @@
 unit-tests for the interpreter run-loop (flipjump/interpreter/fjm_run.py).
 
 covers a real output program, each termination cause (Looping / NullIP / RuntimeMemoryError
-/ EOF), the input path (via a hand-built .fjm and via the stl cat program), and the
-last-ops debugging deque.
+/ EOF), the input path (via a hand-built .fjm and via the stl cat program), the
+last-ops debugging deque, the op-budgeted slices of run_in_slices, the run_many batches,
+the program images of cache_image, the checkpoints of checkpoint_every_ops / resume_from,
+the pre-initialized programs of preinit, the ip samples of sample_every_ops, the executed
+ops of coverage, the watchpoint hits of watchpoints / on_watch, the trace file of trace_path, the
+pre-decoded runs of predecode, and the python loops' lazily-read memory of lazy_load.
 """
 
 from pathlib import Path
+from typing import Any, Dict, List
 
 import pytest
 
 from flipjump.fjm.fjm_consts import FJMVersion
+from flipjump.fjm.fjm_reader import Reader
 from flipjump.fjm.fjm_writer import Writer
 from flipjump.interpreter import fjm_run
+from flipjump.interpreter.debugging.execution_trace import read_trace, trace_lines
+from flipjump.interpreter.debugging.watchpoints import WatchHit
 from flipjump.interpreter.io_devices.FixedIO import FixedIO
-from flipjump.utils.classes import TerminationCause
+from flipjump.utils.classes import RunProgress, TerminationCause
+from flipjump.utils.exceptions import FlipJumpRuntimeException
+from flipjump.utils.functions import load_debugging_labels
 from flipjump import assemble_and_run
 from tests.unit.unit_utils import (
     CAT_PROGRAM,
@@ -104,3 +114,383 @@ def test_python_run_storage_mode_is_none(tmp_path: Path, monkeypatch: pytest.Mon
     monkeypatch.setenv('FLIPJUMP_NO_NATIVE', '1')
     statistics, _ = run_source(INFINITE_LOOP_PROGRAM, tmp_path, memory_width=32)
     assert statistics.storage_mode is None
+
+
+@pytest.mark.parametrize('profile', [False, True])
+def test_lazy_load_runs_the_python_loops(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, profile: bool) -> None:
+    monkeypatch.setenv('FLIPJUMP_NO_NATIVE', '1')
+    fjm_path = assemble_to_path(HELLO_NO_STL.read_text(), tmp_path, fjm_version=FJMVersion.IndexedVersion)
+    io_device = FixedIO(b'')
+    statistics = fjm_run.run(fjm_path, io_device=io_device, profile=profile, lazy_load=True)
+    assert statistics.termination_cause == TerminationCause.Looping
+    assert io_device.get_output(allow_incomplete_output=True) == HELLO_WORLD_OUTPUT
+
+
+@native_engine_required
+@pytest.mark.parametrize('no_flat', ['0', '1'])
+def test_run_in_slices_matches_a_whole_run(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, no_flat: str) -> None:
+    monkeypatch.setenv('FLIPJUMP_NO_FLAT', no_flat)
+    fjm_path = assemble_to_path(CAT_PROGRAM.read_text(), tmp_path, use_stl=True)
+    whole_io, sliced_io = FixedIO(b'time-sliced'), FixedIO(b'time-sliced')
+    whole = fjm_run.run(fjm_path, io_device=whole_io, last_ops_debugging_list_length=5)
+
+    slices = list(fjm_run.run_in_slices(fjm_path, 100, io_device=sliced_io, last_ops_debugging_list_length=5))
+
+    assert len(slices) == whole.op_counter // 100 + 1
+    for i, paused in enumerate(slices[:-1], start=1):
+        assert paused.termination_cause == TerminationCause.OpBudgetExhausted
+        assert paused.op_counter == 100 * i
+        assert paused.resume_ip is not None
+    final = slices[-1]
+    assert final.termination_cause == whole.termination_cause == TerminationCause.EOF
+    assert final.op_counter == whole.op_counter
+    assert final.last_ops_addresses == whole.last_ops_addresses
+    assert sliced_io.get_output() == whole_io.get_output() == b'time-sliced'
+
+
+@native_engine_required
+def test_run_in_slices_pauses_between_slices(tmp_path: Path) -> None:
+    fjm_path = assemble_to_path(INFINITE_LOOP_PROGRAM, tmp_path)
+    slices = fjm_run.run_in_slices(fjm_path, 1)
+    first = next(slices)
+    assert first.termination_cause == TerminationCause.OpBudgetExhausted
+    assert first.op_counter == 1
+    assert next(slices).op_counter == 2
+    slices.close()  # the consumer may abandon the run at any slice
+
+
+def test_run_in_slices_requires_the_native_engine(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv('FLIPJUMP_NO_NATIVE', '1')
+    fjm_path = assemble_to_path(INFINITE_LOOP_PROGRAM, tmp_path)
+    with pytest.raises(FlipJumpRuntimeException):
+        next(fjm_run.run_in_slices(fjm_path, 1000))
+
+
+@pytest.mark.parametrize('no_native', ['0', '1'])
+def test_run_many_matches_sequential_runs(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, no_native: str) -> None:
+    monkeypatch.setenv('FLIPJUMP_NO_NATIVE', no_native)
+    (tmp_path / 'cat').mkdir()
+    (tmp_path / 'loop').mkdir()
+    cat_path = assemble_to_path(CAT_PROGRAM.read_text(), tmp_path / 'cat', use_stl=True)
+    loop_path = assemble_to_path(INFINITE_LOOP_PROGRAM, tmp_path / 'loop')
+    inputs = [b'first', b'second', b'third']
+    io_devices = [FixedIO(fixed_input) for fixed_input in inputs]
+
+    results = fjm_run.run_many(
+        [(cat_path, {'io_device': io_device}) for io_device in io_devices] + [loop_path], workers=2
+    )
+
+    assert [statistics.termination_cause for statistics in results] == [TerminationCause.EOF] * 3 + [
+        TerminationCause.Looping
+    ]
+    assert [io_device.get_output() for io_device in io_devices] == inputs
+    sequential = fjm_run.run(cat_path, io_device=FixedIO(b'first'))
+    assert results[0].op_counter == sequential.op_counter
+
+
+@native_engine_required
+def test_cache_image_reuses_the_program_until_the_file_changes(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv('FLIPJUMP_NO_NATIVE', raising=False)
+    fjm_run.clear_program_image_cache()
+    fjm_path = assemble_to_path(CAT_PROGRAM.read_text(), tmp_path, use_stl=True)
+    outputs = []
+    for fixed_input in (b'one', b'two', b'three'):
+        io_device = FixedIO(fixed_input)
+        statistics = fjm_run.run(fjm_path, io_device=io_device, cache_image=True)
+        assert statistics.termination_cause == TerminationCause.EOF
+        outputs.append(io_device.get_output())
+    assert outputs == [b'one', b'two', b'three']
+    assert fjm_run._load_program_image.cache_info().misses == 1
+
+    assemble_to_path(HELLO_NO_STL.read_text(), tmp_path)  # rewrites the same .fjm file
+    io_device = FixedIO(b'')
+    fjm_run.run(fjm_path, io_device=io_device, cache_image=True)
+    assert io_device.get_output(allow_incomplete_output=True) == HELLO_WORLD_OUTPUT
+    assert fjm_run._load_program_image.cache_info().misses == 2
+    fjm_run.clear_program_image_cache()
+
+
+@native_engine_required
+def test_checkpointed_run_resumes_from_its_last_checkpoint(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv('FLIPJUMP_NO_NATIVE', raising=False)
+    fjm_path = assemble_to_path(HELLO_NO_STL.read_text(), tmp_path)
+    checkpoint_path = tmp_path / 'hello.checkpoint'
+    io_device = FixedIO(b'')
+    whole = fjm_run.run(fjm_path, io_device=io_device, checkpoint_every_ops=100, checkpoint_path=checkpoint_path)
+    assert whole.termination_cause == TerminationCause.Looping
+    assert io_device.get_output(allow_incomplete_output=True) == HELLO_WORLD_OUTPUT
+
+    resumed_outputs = []
+    for _ in range(2):  # every resume forks the same saved state
+        resumed_io = FixedIO(b'')
+        resumed = fjm_run.run(fjm_path, io_device=resumed_io, resume_from=checkpoint_path)
+        assert resumed.termination_cause == TerminationCause.Looping
+        assert resumed.op_counter == whole.op_counter
+        resumed_outputs.append(resumed_io.get_output(allow_incomplete_output=True))
+    assert resumed_outputs[0] == resumed_outputs[1]
+    assert len(resumed_outputs[0]) < len(HELLO_WORLD_OUTPUT)  # the output before the checkpoint isn't repeated
+
+
+@native_engine_required
+def test_resume_from_rejects_a_checkpoint_of_another_program(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv('FLIPJUMP_NO_NATIVE', raising=False)
+    (tmp_path / 'hello').mkdir()
+    (tmp_path / 'loop').mkdir()
+    hello_path = assemble_to_path(HELLO_NO_STL.read_text(), tmp_path / 'hello')
+    loop_path = assemble_to_path(INFINITE_LOOP_PROGRAM, tmp_path / 'loop')
+    checkpoint_path = tmp_path / 'hello.checkpoint'
+    fjm_run.run(hello_path, io_device=FixedIO(b''), checkpoint_every_ops=100, checkpoint_path=checkpoint_path)
+
+    with pytest.raises(FlipJumpRuntimeException):
+        fjm_run.run(loop_path, io_device=FixedIO(b''), resume_from=checkpoint_path)
+    with pytest.raises(FlipJumpRuntimeException):
+        fjm_run.run(hello_path, io_device=FixedIO(b''), resume_from=checkpoint_path, profile=True)
+
+
+# a startup (flipping two bits of data) before the first output
+PREINIT_PROGRAM = MINIMAL_STARTUP + '''
+def output_bit bit < IO {
+    IO + bit;
+}
+    startup
+    data + 1;
+  half_started:
+    data + 3;
+    rep(8, i) output_bit ((0x41 >> i) & 1)
+  loop:
+    ;loop
+  data:
+    ;0
+'''
+
+
+@native_engine_required
+@pytest.mark.parametrize(
+    'fjm_version',
+    [FJMVersion.NormalVersion, FJMVersion.CompressedVersion, FJMVersion.MappedVersion, FJMVersion.IndexedVersion],
+)
+def test_preinit_skips_the_startup(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, fjm_version: FJMVersion) -> None:
+    monkeypatch.delenv('FLIPJUMP_NO_NATIVE', raising=False)
+    fjm_path = assemble_to_path(PREINIT_PROGRAM, tmp_path, fjm_version=fjm_version, with_debug=True)
+    data_address = load_debugging_labels(tmp_path / 'debug.fjd')['data']
+    preinit_path = tmp_path / 'preinit.fjm'
+    assert fjm_run.preinit(fjm_path, preinit_path) == 3  # the first op, and the two flips
+
+    preinit_reader = Reader(preinit_path)
+    assert preinit_reader.version == fjm_version
+    assert preinit_reader.get_word(data_address) == 0b1010
+    statistics = fjm_run.run(fjm_path, io_device=FixedIO(b''))
+    io_device = FixedIO(b'')
+    preinit_statistics = fjm_run.run(preinit_path, io_device=io_device)
+    assert preinit_statistics.termination_cause == TerminationCause.Looping
+    assert preinit_statistics.op_counter == statistics.op_counter - 3 + 1  # + the jump to the stop address
+    assert io_device.get_output() == b'A'
+
+
+@native_engine_required
+def test_preinit_stops_at_the_stop_address(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv('FLIPJUMP_NO_NATIVE', raising=False)
+    fjm_path = assemble_to_path(PREINIT_PROGRAM, tmp_path, with_debug=True)
+    labels = load_debugging_labels(tmp_path / 'debug.fjd')
+    preinit_path = tmp_path / 'preinit.fjm'
+    assert fjm_run.preinit(fjm_path, preinit_path, stop_address=labels['half_started']) == 2
+    assert Reader(preinit_path).get_word(labels['data']) == 0b0010
+
+    io_device = FixedIO(b'')
+    fjm_run.run(preinit_path, io_device=io_device)
+    assert io_device.get_output() == b'A'
+
+
+@native_engine_required
+def test_preinit_of_a_program_without_io_raises(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv('FLIPJUMP_NO_NATIVE', raising=False)
+    fjm_path = assemble_to_path(INFINITE_LOOP_PROGRAM, tmp_path)
+    with pytest.raises(FlipJumpRuntimeException):
+        fjm_run.preinit(fjm_path, tmp_path / 'preinit.fjm')
+    assert not (tmp_path / 'preinit.fjm').exists()
+
+
+@native_engine_required
+@pytest.mark.parametrize(
+    'run_kwargs', [{}, {'profile': True}, {'checkpoint_every_ops': 25}], ids=['fast', 'featured', 'checkpointed']
+)
+def test_sampled_run_returns_the_ip_histogram(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, run_kwargs: Dict[str, Any]
+) -> None:
+    monkeypatch.delenv('FLIPJUMP_NO_NATIVE', raising=False)
+    fjm_path = assemble_to_path(HELLO_NO_STL.read_text(), tmp_path)
+    assert fjm_run.run(fjm_path, io_device=FixedIO(b'')).samples is None
+
+    statistics = fjm_run.run(fjm_path, io_device=FixedIO(b''), sample_every_ops=10, **run_kwargs)
+    assert statistics.samples is not None
+    assert sum(statistics.samples.values()) == (statistics.op_counter - 1) // 10  # before each 10th op, but the first
+    assert statistics.samples == fjm_run.run(fjm_path, io_device=FixedIO(b''), sample_every_ops=10).samples
+
+
+def test_sampling_requires_the_native_engine(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    fjm_path = assemble_to_path(HELLO_NO_STL.read_text(), tmp_path)
+    with pytest.raises(FlipJumpRuntimeException):
+        fjm_run.run(fjm_path, io_device=FixedIO(b''), sample_every_ops=10, show_trace=True)
+    monkeypatch.setenv('FLIPJUMP_NO_NATIVE', '1')
+    with pytest.raises(FlipJumpRuntimeException):
+        fjm_run.run(fjm_path, io_device=FixedIO(b''), sample_every_ops=10)
+
+
+@native_engine_required
+@pytest.mark.parametrize(
+    'run_kwargs', [{}, {'profile': True}, {'checkpoint_every_ops': 25}], ids=['fast', 'featured', 'checkpointed']
+)
+def test_covered_run_returns_the_executed_ops(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, run_kwargs: Dict[str, Any]
+) -> None:
+    monkeypatch.delenv('FLIPJUMP_NO_NATIVE', raising=False)
+    fjm_path = assemble_to_path(HELLO_NO_STL.read_text(), tmp_path)
+    assert fjm_run.run(fjm_path, io_device=FixedIO(b'')).coverage is None
+
+    statistics = fjm_run.run(fjm_path, io_device=FixedIO(b''), last_ops_debugging_list_length=200, coverage=True)
+    assert statistics.coverage is not None and statistics.last_ops_addresses is not None
+    assert statistics.coverage.addresses() == sorted(set(statistics.last_ops_addresses))
+    other_statistics = fjm_run.run(fjm_path, io_device=FixedIO(b''), coverage=True, **run_kwargs)
+    assert other_statistics.coverage is not None
+    assert other_statistics.coverage.addresses() == statistics.coverage.addresses()
+
+
+@native_engine_required
+@pytest.mark.parametrize(
+    'run_kwargs', [{}, {'profile': True}, {'checkpoint_every_ops': 25}], ids=['fast', 'featured', 'checkpointed']
+)
+def test_watchpoints_log_or_stop_at_the_watched_flips(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, run_kwargs: Dict[str, Any]
+) -> None:
+    monkeypatch.delenv('FLIPJUMP_NO_NATIVE', raising=False)
+    fjm_path = assemble_to_path(HELLO_NO_STL.read_text(), tmp_path, memory_width=64)
+    output_bits = (2 * 64, 2 * 64 + 2)  # every output op flips one of them
+    hits: List[WatchHit] = []
+
+    def log_hit(watch_hit: WatchHit) -> bool:
+        hits.append(watch_hit)
+        return False
+
+    io_device = FixedIO(b'')
+    statistics = fjm_run.run(fjm_path, io_device=io_device, watchpoints=[output_bits], on_watch=log_hit, **run_kwargs)
+    assert statistics.termination_cause == TerminationCause.Looping
+    assert io_device.get_output() == HELLO_WORLD_OUTPUT
+    output_bits_written = sum((hit.bit_address - 2 * 64) << i for i, hit in enumerate(hits))  # lsb first
+    assert output_bits_written.to_bytes(len(hits) // 8, 'little') == HELLO_WORLD_OUTPUT
+    assert all(
+        hit.word_address == 2 * 64 and hit.old_word ^ hit.new_word == 1 << (hit.bit_address % 64) for hit in hits
+    )
+    assert [hit.op_counter for hit in hits] == sorted({hit.op_counter for hit in hits})
+
+    statistics = fjm_run.run(fjm_path, io_device=FixedIO(b''), watchpoints=[output_bits], **run_kwargs)
+    assert statistics.termination_cause == TerminationCause.Watchpoint
+    assert statistics.watch_hit == hits[0]
+    assert statistics.op_counter == hits[0].op_counter
+    assert statistics.resume_ip is not None
+
+
+def test_watchpoints_require_the_native_engine(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    fjm_path = assemble_to_path(HELLO_NO_STL.read_text(), tmp_path)
+    with pytest.raises(FlipJumpRuntimeException):
+        fjm_run.run(fjm_path, io_device=FixedIO(b''), watchpoints=[(128, 130)], show_trace=True)
+    monkeypatch.setenv('FLIPJUMP_NO_NATIVE', '1')
+    with pytest.raises(FlipJumpRuntimeException):
+        fjm_run.run(fjm_path, io_device=FixedIO(b''), watchpoints=[(128, 130)])
+
+
+@native_engine_required
+@pytest.mark.parametrize(
+    'run_kwargs', [{}, {'profile': True}, {'checkpoint_every_ops': 25}], ids=['fast', 'featured', 'checkpointed']
+)
+def test_trace_file_holds_the_ops_show_trace_prints(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str], run_kwargs: Dict[str, Any]
+) -> None:
+    monkeypatch.delenv('FLIPJUMP_NO_NATIVE', raising=False)
+    fjm_path = assemble_to_path(HELLO_NO_STL.read_text(), tmp_path)
+    capsys.readouterr()
+    fjm_run.run(fjm_path, io_device=FixedIO(b''), show_trace=True)
+    shown_trace = capsys.readouterr().out.splitlines()
+
+    trace_path = tmp_path / 'run.trace'
+    statistics = fjm_run.run(fjm_path, io_device=FixedIO(b''), trace_path=trace_path, **run_kwargs)
+    assert list(trace_lines(read_trace(trace_path), {})) == shown_trace
+    assert len(shown_trace) == statistics.op_counter
+
+
+def test_trace_file_requires_the_native_engine(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    fjm_path = assemble_to_path(HELLO_NO_STL.read_text(), tmp_path)
+    with pytest.raises(FlipJumpRuntimeException):
+        fjm_run.run(fjm_path, io_device=FixedIO(b''), trace_path=tmp_path / 'run.trace', show_trace=True)
+    monkeypatch.setenv('FLIPJUMP_NO_NATIVE', '1')
+    with pytest.raises(FlipJumpRuntimeException):
+        fjm_run.run(fjm_path, io_device=FixedIO(b''), trace_path=tmp_path / 'run.trace')
+
+
+@native_engine_required
+@pytest.mark.parametrize(
+    'run_kwargs', [{}, {'profile': True}, {'checkpoint_every_ops': 100_000}], ids=['fast', 'featured', 'checkpointed']
+)
+def test_progress_reports_the_whole_run(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, run_kwargs: Dict[str, Any]
+) -> None:
+    monkeypatch.delenv('FLIPJUMP_NO_NATIVE', raising=False)
+    # w=32: ops 1 (at bit 4w) and 2 (at bit 6w) jump to each other - the run never ends by itself.
+    # op 1 outputs a 0 bit, so the reports also come while the engine holds buffered output
+    fjm_path = tmp_path / 'cycle.fjm'
+    writer = Writer(fjm_path, 32, FJMVersion.NormalVersion)
+    writer.add_simple_segment_with_data(0, [8 * 32, 4 * 32, 0, 0, 2 * 32, 6 * 32, 8 * 32 + 2, 4 * 32, 0, 0])
+    writer.write_to_file()
+    reports: List[RunProgress] = []
+
+    def on_progress(progress: RunProgress) -> None:
+        reports.append(progress)
+        if len(reports) == 3:
+            raise KeyboardInterrupt  # like a Ctrl+C, it ends the run
+
+    statistics = fjm_run.run(
+        fjm_path, io_device=FixedIO(b''), on_progress=on_progress, progress_every_seconds=1e-9, **run_kwargs
+    )
+    assert statistics.termination_cause == TerminationCause.KeyboardInterrupt
+    op_counters = [progress.op_counter for progress in reports]
+    assert op_counters == sorted(set(op_counters)) and op_counters[-1] <= statistics.op_counter
+    assert op_counters[-1] >= 300_000  # the checkpointed slices (of 100k ops) are summed
+    assert all(progress.ip in (4 * 32, 6 * 32) and progress.ops_per_second > 0 for progress in reports)
+    assert reports[0].describe().startswith(f'{reports[0].op_counter:,} ops  ')
+
+
+@native_engine_required
+def test_max_ops_stops_the_run_and_resumes_in_slices(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv('FLIPJUMP_NO_NATIVE', raising=False)
+    fjm_path = assemble_to_path(HELLO_NO_STL.read_text(), tmp_path)
+    statistics = fjm_run.run(fjm_path, io_device=FixedIO(b''), max_ops=50)
+    assert (statistics.termination_cause, statistics.op_counter) == (TerminationCause.OpBudgetExhausted, 50)
+    assert statistics.resume_ip == list(fjm_run.run_in_slices(fjm_path, 50, io_device=FixedIO(b'')))[0].resume_ip
+    assert fjm_run.run(fjm_path, io_device=FixedIO(b''), max_ops=10**6).termination_cause == TerminationCause.Looping
+    with pytest.raises(FlipJumpRuntimeException):
+        fjm_run.run(fjm_path, io_device=FixedIO(b''), max_ops=50, profile=True)
+
+
+def test_progress_requires_the_native_engine(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    fjm_path = assemble_to_path(HELLO_NO_STL.read_text(), tmp_path)
+    with pytest.raises(FlipJumpRuntimeException):
+        fjm_run.run(fjm_path, io_device=FixedIO(b''), on_progress=print, show_trace=True)
+    monkeypatch.setenv('FLIPJUMP_NO_NATIVE', '1')
+    with pytest.raises(FlipJumpRuntimeException):
+        fjm_run.run(fjm_path, io_device=FixedIO(b''), on_progress=print)
+
+
+@native_engine_required
+@pytest.mark.parametrize('run_kwargs', [{}, {'checkpoint_every_ops': 1000}], ids=['fast', 'checkpointed'])
+def test_predecoded_run_matches_a_plain_run(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, run_kwargs: Dict[str, Any]
+) -> None:
+    monkeypatch.delenv('FLIPJUMP_NO_NATIVE', raising=False)
+    fjm_path = assemble_to_path(CAT_PROGRAM.read_text(), tmp_path, use_stl=True)
+    plain_io, predecoded_io = FixedIO(b'pre-decoded'), FixedIO(b'pre-decoded')
+    plain = fjm_run.run(fjm_path, io_device=plain_io, last_ops_debugging_list_length=None)
+    predecoded = fjm_run.run(
+        fjm_path, io_device=predecoded_io, last_ops_debugging_list_length=None, predecode=True, **run_kwargs
+    )
+    assert predecoded.termination_cause == plain.termination_cause == TerminationCause.EOF
+    assert predecoded.op_counter == plain.op_counter
+    assert predecoded_io.get_output() == plain_io.get_output() == b'pre-decoded'
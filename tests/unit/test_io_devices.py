@@ -2,7 +2,8 @@
 unit-tests for the IO devices (flipjump/interpreter/io_devices/).
 
 covers FixedIO's LSB-first bit ordering, output assembly, EOF and incomplete-output
-errors, BrokenIO raising on any access, and the --io mode selector (the non-windowed
+errors, the byte-level read_bytes/write_bytes (and their per-bit IODevice defaults),
+BrokenIO raising on any access, and the --io mode selector (the non-windowed
 paths - the windowed `pc` device is in test_screen_window.py).
 """
 
@@ -10,6 +11,7 @@ import pytest
 
 from flipjump.interpreter.io_devices.BrokenIO import BrokenIO
 from flipjump.interpreter.io_devices.FixedIO import FixedIO
+from flipjump.interpreter.io_devices.IODevice import IODevice
 from flipjump.interpreter.io_devices.StandardIO import StandardIO
 from flipjump.interpreter.io_devices.cli_devices import make_io_device
 from flipjump.utils.exceptions import BrokenIOUsed, IncompleteOutput, IODeviceException, IOReadOnEOF
@@ -62,6 +64,36 @@ def test_fixed_io_incomplete_output_allowed() -> None:
     assert device.get_output(allow_incomplete_output=True) == b''
 
 
+def test_fixed_io_byte_level_round_trip() -> None:
+    device = FixedIO(b'abc')
+    assert device.read_bytes(2) == b'ab'
+    assert device.read_bytes(5) == b'c'
+    with pytest.raises(IOReadOnEOF):
+        device.read_bytes(1)
+    device.write_bytes(b'xy')
+    assert device.get_output() == b'xy'
+
+
+def test_fixed_io_byte_level_continues_a_partial_byte() -> None:
+    device = FixedIO(b'\x0f\xf0')
+    assert [device.read_bit() for _ in range(4)] == [True] * 4
+    assert device.read_bytes(2) == b'\x00'  # the rest of 0x0f, then the low half of 0xf0
+    for bit in [True, False, False, False]:
+        device.write_bit(bit)
+    device.write_bytes(b'\x04')
+    assert device.get_output(allow_incomplete_output=True) == b'\x41'
+    assert device.bits_to_write_in_output_byte == 4
+
+
+def test_io_device_byte_level_defaults_go_through_the_bit_calls() -> None:
+    device = FixedIO(b'A')
+    assert IODevice.read_bytes(device, 3) == b'A'
+    IODevice.write_bytes(device, b'Hi')
+    assert device.get_output() == b'Hi'
+    with pytest.raises(BrokenIOUsed):
+        IODevice.write_bytes(BrokenIO(), b'!')
+
+
 def test_broken_io_raises_on_any_access() -> None:
     with pytest.raises(BrokenIOUsed):
         BrokenIO().read_bit()
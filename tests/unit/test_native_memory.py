@@ -8,10 +8,26 @@ words actually touched, not with the declared segment sizes.
 
 also pins the flat-storage mode selection: the configurable span limit (constructor
 parameter / FLIPJUMP_FLAT_MAX_WORDS env var / 2^23-word default), the paged fallback on a
-failed flat-array allocation, and the storage_mode observability ('flat'/'paged').
+failed flat-array allocation, the huge flat windows (only their touched pages are resident, and
+their gaps still hold the garbage sentinel), and the storage_mode observability ('flat'/'paged'), and the
+continue-mode (lenient garbage-handling) reporting of each touched garbage word, once,
+that a run releases the GIL (other threads run python meanwhile, but can't touch its memory),
+the whole-program loader (load_fjm) - equal to loading word by word, in every storage mode - and its
+mapped-version twin (map_fjm - the w=64 flat pages map the file in place, copy-on-write),
+the ProgramImage clones (independent, sharing the image's pages until they touch them),
+the snapshots (a clone's snapshot holds only what differs from its image; restore validates it),
+the sampling profiler's ip histogram (every Nth op, in every run-loop, and across resumed runs),
+the execution-coverage bitmap, the write watchpoints (a watched flip stops every run-loop right
+after its op, with the word before and after it), the execution trace (every run-loop records
+every op, handing over its full chunks and each run's last one), and the pre-decoding tier (its
+blocks run exactly like the ops they were decoded from - also when the program or the API rewrites
+them, under op budgets and with the sampler).
 """
 
-from typing import Any
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List
 
 import pytest
 
@@ -20,9 +36,16 @@ try:
 except ImportError:
     _fjcore = None
 
+from flipjump.fjm.fjm_consts import FJMVersion
+from flipjump.fjm.fjm_reader import Reader
+from flipjump.fjm.fjm_writer import Writer
+from flipjump.interpreter.debugging.execution_trace import TraceRecord, read_trace, write_trace_header
 from flipjump.utils.exceptions import IOReadOnEOF
 
 pytestmark = pytest.mark.skipif(_fjcore is None, reason='the native engine (_fjcore) is not built')
+map_fjm_required = pytest.mark.skipif(
+    _fjcore is None or not hasattr(_fjcore.Memory, 'map_fjm'), reason='map_fjm is POSIX only'
+)
 
 
 @pytest.fixture(autouse=True)
@@ -31,6 +54,7 @@ def clean_flat_mode_env(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.delenv('FLIPJUMP_NO_FLAT', raising=False)
     monkeypatch.delenv('FLIPJUMP_FLAT_MAX_WORDS', raising=False)
     monkeypatch.delenv('FLIPJUMP_TEST_FLAT_ALLOC_FAIL', raising=False)
+    monkeypatch.delenv('FLIPJUMP_PREDECODE', raising=False)
 
 
 def _unexpected_io(*args: object) -> bool:
@@ -372,6 +396,55 @@ def test_w64_api_write_to_a_gap_survives_the_flat_build() -> None:
     assert memory.get_word(9) == 0x78
 
 
+# a 2^30-word flat window (8GB if dense): the op at address 0, a data table at the window's top
+FAR_TABLE = (1 << 30) - 8
+
+
+def _far_table_memory(first_op: List[int], **kwargs: Any) -> Any:
+    memory = _fjcore.Memory(64, flat_max_words=1 << 30, **kwargs)
+    memory.add_segment(0, 8)
+    memory.add_segment(FAR_TABLE, 8)
+    memory.set_words(0, first_op)
+    return memory
+
+
+def _resident_bytes() -> int:
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/statm'), reason='reads the resident memory size from /proc')
+def test_a_huge_flat_window_costs_only_its_touched_pages() -> None:
+    memory = _far_table_memory([FAR_TABLE * 64, 0])  # flip bit 0 of the table's first word, loop
+    resident_bytes = _resident_bytes()
+    _run_to_looping(memory)
+    assert memory.storage_mode == 'flat'
+    assert memory.get_word(FAR_TABLE) == 1
+    clone = _fjcore.ProgramImage(memory).new_memory()
+    assert clone.storage_mode == 'flat'
+    assert clone.get_word(FAR_TABLE) == 1
+    assert _resident_bytes() - resident_bytes < 64 << 20  # neither window is resident
+
+
+@pytest.mark.parametrize('gap_word', [16, 1 << 29])  # a filled gap word, a mapped one (linux)
+def test_a_huge_flat_windows_gap_touch_is_a_memory_error(gap_word: int) -> None:
+    memory = _far_table_memory([gap_word * 64, 0])
+    cause, _, error_address, _, _ = memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF)
+    assert memory.storage_mode == 'flat'
+    assert cause == _fjcore.TERM_MEMORY_ERROR
+    assert error_address == gap_word * 64
+
+
+def test_continue_mode_materializes_a_huge_flat_windows_gap_word() -> None:
+    memory = _far_table_memory([(1 << 29) * 64 + 3, 0], garbage_stop=False)
+    reported: List[int] = []
+    cause, op_count, _, _, _ = memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF, garbage_callback=reported.append)
+    assert (cause, op_count) == (_fjcore.TERM_LOOPING, 1)
+    assert reported == [(1 << 29) * 64]
+    assert memory.get_word(1 << 29) == 0b1000
+    assert _fjcore.ProgramImage(memory).new_memory().get_word(1 << 29) == 0b1000
+
+
 # ------------------------------------------ hybrid storage (low flat window + paged far)
 
 FAR = 1 << 26  # a word address far above the default 2^23-word flat window (w=32: < 2^27)
@@ -465,3 +538,755 @@ def test_hybrid_device_pokes_route_correctly() -> None:
     assert memory.get_word(3) == 7
     assert memory.get_word(9) == 5
     assert memory.get_word(FAR + 2) == 9
+
+
+# ------------------------------------------ continue-mode (the lenient garbage-handling modes)
+
+
+def _gap_flipping_memory(width: int, **kwargs: Any) -> Any:
+    """two segments around the gap words 8..15; the program flips gap word 9 twice, then loops."""
+    memory = _fjcore.Memory(width, garbage_stop=False, **kwargs)
+    memory.add_segment(0, 8)
+    memory.add_segment(16, 8)
+    # ips 4w/6w (not 2w): aligned ips inside the input range (3w+#w-2w, 3w+#w] would trigger IO
+    memory.set_words(0, [9 * width, 4 * width])  # ip=0:  flip bit 0 of gap word 9
+    memory.set_words(4, [9 * width + 1, 6 * width])  # ip=4w: flip bit 1 of gap word 9
+    memory.set_words(6, [16 * width, 6 * width])  # ip=6w: flip bit 0 of word 16, loop
+    return memory
+
+
+@pytest.mark.parametrize('width', [32, 64])
+@pytest.mark.parametrize('storage_mode', ['flat', 'paged'])
+def test_continue_mode_reports_each_garbage_word_once(
+    monkeypatch: pytest.MonkeyPatch, width: int, storage_mode: str
+) -> None:
+    if storage_mode == 'paged':
+        monkeypatch.setenv('FLIPJUMP_NO_FLAT', '1')
+    memory = _gap_flipping_memory(width)
+    reported: List[int] = []
+    cause, op_count, _, _, _ = memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF, garbage_callback=reported.append)
+    assert memory.storage_mode == storage_mode
+    assert cause == _fjcore.TERM_LOOPING
+    assert op_count == 3
+    assert reported == [9 * width]
+    assert memory.get_word(9) == 0b11
+
+
+def test_continue_mode_runs_silently_without_a_callback() -> None:
+    memory = _gap_flipping_memory(32)
+    cause, op_count, _, _, _ = memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF)
+    assert cause == _fjcore.TERM_LOOPING
+    assert op_count == 3
+    assert memory.get_word(9) == 0b11
+
+
+def test_continue_mode_api_written_gap_word_is_not_garbage() -> None:
+    # like the python Reader's memory dict: a device/API-written word is real memory
+    memory = _gap_flipping_memory(32)
+    memory.set_word(9, 0x40)
+    reported: List[int] = []
+    memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF, garbage_callback=reported.append)
+    assert memory.storage_mode == 'flat'
+    assert reported == []
+    assert memory.get_word(9) == 0x43
+
+
+def test_continue_mode_w64_materialized_word_holding_the_magic_stays_data() -> None:
+    # a materialized gap word that the program turns into the magic fill value is still data
+    magic = _fjcore.FLAT_GARBAGE_MAGIC
+    memory = _fjcore.Memory(64, garbage_stop=False)
+    memory.add_segment(0, 8)
+    memory.add_segment(16, 8)
+    memory.set_word(9, magic ^ 1)
+    memory.set_words(0, [9 * 64, 256])  # ip=0:   flip bit 0 of gap word 9 -> the magic value
+    memory.set_words(4, [9 * 64 + 1, 384])  # ip=256: flip bit 1 of it
+    memory.set_words(6, [16 * 64, 384])  # ip=384: flip bit 0 of word 16, loop
+    reported: List[int] = []
+    cause, op_count, _, _, _ = memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF, garbage_callback=reported.append)
+    assert cause == _fjcore.TERM_LOOPING
+    assert op_count == 3
+    assert reported == []
+    assert memory.get_word(9) == magic ^ 0b10
+
+
+def test_continue_mode_callback_exception_propagates() -> None:
+    def failing_callback(bit_address: int) -> None:
+        raise KeyError(bit_address)
+
+    memory = _gap_flipping_memory(32)
+    with pytest.raises(KeyError):
+        memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF, garbage_callback=failing_callback)
+    assert memory.last_run_op_count == 0
+
+
+def _three_op_memory() -> Any:
+    """a w=32 chain of ops at 0, 4w, 8w: each flips a bit of word 12, the last one loops."""
+    memory = _fjcore.Memory(32)
+    memory.add_segment(0, 16)
+    memory.set_words(0, [12 * 32, 4 * 32])
+    memory.set_words(4, [12 * 32 + 1, 8 * 32])
+    memory.set_words(8, [12 * 32 + 2, 8 * 32])
+    return memory
+
+
+def test_featured_run_breaks_on_an_address_and_resumes() -> None:
+    memory = _three_op_memory()
+    memory.set_breakpoints([4 * 32])
+    cause, op_count, _, _, _ = memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF, featured=True)
+    assert cause == _fjcore.TERM_BREAK
+    assert op_count == 1
+    assert memory.last_run_ip == 4 * 32
+    assert (memory.last_run_flip_count, memory.last_run_jump_count) == (1, 1)
+
+    # resuming executes the op it broke on, instead of breaking on it again
+    cause, op_count, _, _, _ = memory.run(
+        _unexpected_io, _unexpected_io, IOReadOnEOF, start_ip=4 * 32, featured=True, resuming=True
+    )
+    assert cause == _fjcore.TERM_LOOPING
+    assert op_count == 2
+    assert (memory.last_run_flip_count, memory.last_run_jump_count) == (2, 2)
+    assert memory.get_word(12) == 0b111
+
+
+def test_featured_run_breaks_after_an_op_count() -> None:
+    memory = _three_op_memory()
+    cause, op_count, _, last_ops, _ = memory.run(
+        _unexpected_io, _unexpected_io, IOReadOnEOF, featured=True, break_after_ops=2, last_ops_length=4
+    )
+    assert cause == _fjcore.TERM_BREAK
+    assert op_count == 2
+    assert memory.last_run_ip == 8 * 32
+    assert list(last_ops) == [0, 4 * 32, 8 * 32]  # like the python loop: the break op is recorded
+    assert memory.get_word(12) == 0b11
+
+
+def _outputting_memory(output: bytes, extra_bits: List[bool]) -> Any:
+    """a w=32 program outputting the bytes (lsb-first) and then the extra bits, then looping."""
+    bits = [(byte >> i) & 1 == 1 for byte in output for i in range(8)] + extra_bits
+    memory = _fjcore.Memory(32)
+    first_op_word = 8  # ips from 8w on are clear of the input range
+    memory.add_segment(0, first_op_word + 2 * len(bits) + 2)
+    memory.set_words(0, [1, first_op_word * 32])  # a harmless flip of word 0, then jump over the io words
+    for k, bit in enumerate(bits):
+        memory.set_words(first_op_word + 2 * k, [64 + bit, (first_op_word + 2 * k + 2) * 32])
+    loop_word = first_op_word + 2 * len(bits)
+    memory.set_words(loop_word, [1, loop_word * 32])
+    return memory
+
+
+class _RecordedOutput:
+    def __init__(self) -> None:
+        self.calls: List[Any] = []
+
+    def write_bit(self, bit: bool) -> None:
+        self.calls.append(bit)
+
+    def write_bytes(self, data: bytes) -> None:
+        self.calls.append(data)
+
+
+def test_byte_level_output_is_batched_and_a_trailing_partial_byte_goes_per_bit() -> None:
+    memory = _outputting_memory(b'Hello', [True, False, True])
+    recorded = _RecordedOutput()
+    cause, _, _, _, _ = memory.run(_unexpected_io, recorded.write_bit, IOReadOnEOF, write_bytes=recorded.write_bytes)
+    assert cause == _fjcore.TERM_LOOPING
+    assert recorded.calls == [b'Hello', True, False, True]
+
+
+def test_byte_level_output_batch_size_bounds_each_call() -> None:
+    memory = _outputting_memory(b'Hello', [])
+    recorded = _RecordedOutput()
+    memory.run(_unexpected_io, recorded.write_bit, IOReadOnEOF, write_bytes=recorded.write_bytes, write_batch_size=2)
+    assert recorded.calls == [b'He', b'll', b'o']
+
+
+def test_byte_level_output_resumes_mid_byte_per_bit() -> None:
+    # a break 3 output bits into a byte hands those bits to write_bit; the byte is finished
+    # per-bit, and batching resumes on the next byte boundary
+    memory = _outputting_memory(b'\x05\x06', [])
+    recorded = _RecordedOutput()
+    cause, _, _, _, _ = memory.run(
+        _unexpected_io,
+        recorded.write_bit,
+        IOReadOnEOF,
+        featured=True,
+        break_after_ops=4,
+        write_bytes=recorded.write_bytes,
+    )
+    assert cause == _fjcore.TERM_BREAK
+    assert recorded.calls == [True, False, True]
+
+    memory.run(
+        _unexpected_io,
+        recorded.write_bit,
+        IOReadOnEOF,
+        start_ip=memory.last_run_ip,
+        featured=True,
+        resuming=True,
+        write_bytes=recorded.write_bytes,
+    )
+    assert recorded.calls == [True, False, True, False, False, False, False, False, b'\x06']
+
+
+def test_byte_level_output_write_bytes_exception_propagates() -> None:
+    def failing_write_bytes(data: bytes) -> None:
+        raise KeyError(data)
+
+    memory = _outputting_memory(b'Hi', [])
+    with pytest.raises(KeyError):
+        memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF, write_bytes=failing_write_bytes)
+
+
+@pytest.mark.parametrize('storage_mode', ['flat', 'paged'])
+@pytest.mark.parametrize('last_ops_length', [0, 4])
+def test_max_ops_stops_a_run_and_it_resumes(
+    monkeypatch: pytest.MonkeyPatch, storage_mode: str, last_ops_length: int
+) -> None:
+    if storage_mode == 'paged':
+        monkeypatch.setenv('FLIPJUMP_NO_FLAT', '1')
+    memory = _three_op_memory()
+    cause, op_count, _, _, _ = memory.run(
+        _unexpected_io, _unexpected_io, IOReadOnEOF, max_ops=2, last_ops_length=last_ops_length
+    )
+    assert memory.storage_mode == storage_mode
+    assert (cause, op_count) == (_fjcore.TERM_OP_BUDGET, 2)
+    assert memory.last_run_ip == 8 * 32  # the next op to run
+    assert memory.get_word(12) == 0b11
+
+    cause, op_count, _, _, _ = memory.run(
+        _unexpected_io, _unexpected_io, IOReadOnEOF, start_ip=memory.last_run_ip, max_ops=2
+    )
+    assert (cause, op_count) == (_fjcore.TERM_LOOPING, 1)
+    assert memory.get_word(12) == 0b111
+
+
+def test_max_ops_in_the_featured_loop_leaves_the_next_op_untouched() -> None:
+    memory = _three_op_memory()
+    cause, op_count, _, last_ops, _ = memory.run(
+        _unexpected_io, _unexpected_io, IOReadOnEOF, featured=True, max_ops=1, last_ops_length=4
+    )
+    assert (cause, op_count) == (_fjcore.TERM_OP_BUDGET, 1)
+    assert list(last_ops) == [0]
+    assert memory.last_run_ip == 4 * 32
+
+
+def _cycling_memory() -> Any:
+    """a w=32 memory whose ops 1 (address 4w) and 2 (address 6w) jump to each other - it never terminates."""
+    memory = _fjcore.Memory(32)
+    memory.add_segment(0, 12)
+    memory.set_words(0, [8 * 32, 4 * 32, 0, 0, 8 * 32 + 1, 6 * 32, 8 * 32 + 2, 4 * 32])
+    return memory
+
+
+def test_run_releases_the_gil_and_guards_its_memory_from_other_threads() -> None:
+    memory = _cycling_memory()
+    results: List[Any] = []
+    runner = threading.Thread(
+        target=lambda: results.append(memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF, max_ops=100_000_000))
+    )
+    runner.start()
+    # this thread runs python while the run is inside its loop - only possible without the GIL
+    guarded = False
+    while runner.is_alive() and not guarded:
+        try:
+            memory.get_word(8)
+        except RuntimeError:
+            guarded = True
+    runner.join()
+    assert guarded
+    assert results[0][:2] == (_fjcore.TERM_OP_BUDGET, 100_000_000)
+    assert memory.get_word(8) == 0b101  # op 0, then 50M x op 1 and 50M-1 x op 2
+
+
+def _relative_jumps_data(width: int, segment_start: int, words: List[int]) -> bytes:
+    """the data-pool bytes of words, their jump words stored relative to their own bit-address."""
+    mask = (1 << width) - 1
+    relative = [word if i % 2 == 0 else (word - (segment_start + i) * width) & mask for i, word in enumerate(words)]
+    return b''.join(word.to_bytes(width // 8, 'little') for word in relative)
+
+
+@pytest.mark.parametrize('width', [8, 16, 32, 64])
+@pytest.mark.parametrize('flat_max_words', [0, 3])
+def test_load_fjm_matches_word_by_word_loading(width: int, flat_max_words: int) -> None:
+    words = [(0x1234567890ABCDEF >> i) & ((1 << width) - 1) for i in range(6)]
+    memory = _fjcore.Memory(width, flat_max_words=flat_max_words)
+    memory.load_fjm([(0, 4, 0, 2), (4, 6, 2, 4)], b''.join(w.to_bytes(width // 8, 'little') for w in words), False)
+    assert memory.storage_mode == ('hybrid' if flat_max_words else 'flat')
+    assert [memory.get_word(i) for i in range(10)] == words[:2] + [0, 0] + words[2:] + [0, 0]
+
+    relative = _fjcore.Memory(width, flat_max_words=flat_max_words)
+    relative.load_fjm([(0, 2, 0, 0), (4, 4, 0, 4)], _relative_jumps_data(width, 4, words[:4]), True)
+    assert [relative.get_word(i) for i in range(4, 8)] == words[:4]
+
+
+def test_load_fjm_rejects_a_bad_segment_table() -> None:
+    with pytest.raises(ValueError):
+        _fjcore.Memory(16).load_fjm([(0, 4, 0, 3)], bytes(8), False)  # not whole ops
+    with pytest.raises(ValueError):
+        _fjcore.Memory(16).load_fjm([(0, 4, 2, 4)], bytes(8), False)  # beyond the data pool
+    with pytest.raises(ValueError):
+        _fjcore.Memory(16).load_fjm([(0, 4, 0, 4)], bytes(7), False)  # a partial word
+
+
+def test_load_fjm_runs_like_set_words() -> None:
+    memory = _fjcore.Memory(32)
+    memory.load_fjm([(0, 8, 0, 2)], (128).to_bytes(4, 'little') + (0).to_bytes(4, 'little'), False)
+    _run_to_looping(memory)
+    assert memory.get_word(4) == 1
+
+
+def _map_fjm(fjm_path: Path, width: int, **kwargs: Any) -> Any:
+    memory = _fjcore.Memory(width, **kwargs)
+    reader = Reader(fjm_path, keep_raw_data=True)
+    with open(fjm_path, 'rb') as fjm_file:
+        memory.map_fjm(fjm_file.fileno(), reader.raw_segments)
+    reader.release_raw_data()
+    return memory
+
+
+def _file_is_mapped(fjm_path: Path) -> bool:
+    with open('/proc/self/maps') as maps:
+        return any(line.rstrip().endswith(str(fjm_path)) for line in maps)
+
+
+@map_fjm_required
+@pytest.mark.parametrize('width', [16, 32, 64])
+@pytest.mark.parametrize('flat_max_words', [0, 1100])
+def test_map_fjm_matches_load_fjm(tmp_path: Path, width: int, flat_max_words: int) -> None:
+    # the first op flips bit 0 of word 1024 and loops; the table at 1024 is 2 pages at w=64
+    table = [(0x1234567890ABCDEF * i) & ((1 << width) - 1) for i in range(1024)]
+    fjm_path = tmp_path / 'mapped.fjm'
+    writer = Writer(fjm_path, width, FJMVersion.MappedVersion)
+    writer.add_segment(0, 8, writer.add_data([1024 * width, 0]), 2)
+    writer.add_segment(1024, 1026, writer.add_data(table), 1024)
+    writer.write_to_file()
+
+    memory = _map_fjm(fjm_path, width, flat_max_words=flat_max_words)
+    assert memory.storage_mode == ('hybrid' if flat_max_words else 'flat')
+    assert [memory.get_word(i) for i in range(1024, 2050)] == table + [0, 0]
+    if width == 64 and os.path.exists('/proc/self/maps'):
+        assert _file_is_mapped(fjm_path) == (flat_max_words == 0)
+
+    file_bytes = fjm_path.read_bytes()
+    _run_to_looping(memory)
+    assert memory.get_word(1024) == table[0] ^ 1
+    assert fjm_path.read_bytes() == file_bytes  # copy-on-write
+    assert _map_fjm(fjm_path, width).get_word(1024) == table[0]
+
+
+@map_fjm_required
+def test_map_fjm_rejects_a_bad_segment_table(tmp_path: Path) -> None:
+    fjm_path = tmp_path / 'mapped.fjm'
+    fjm_path.write_bytes(bytes(64))
+    with open(fjm_path, 'rb') as fjm_file:
+        with pytest.raises(ValueError):
+            _fjcore.Memory(16).map_fjm(fjm_file.fileno(), [(0, 4, 0, 3)])  # not whole ops
+        with pytest.raises(ValueError):
+            _fjcore.Memory(16).map_fjm(fjm_file.fileno(), [(0, 4, 60, 4)])  # beyond the file
+
+
+@pytest.mark.parametrize('storage_mode', ['flat', 'paged'])
+def test_program_image_clones_run_independently(monkeypatch: pytest.MonkeyPatch, storage_mode: str) -> None:
+    if storage_mode == 'paged':
+        monkeypatch.setenv('FLIPJUMP_NO_FLAT', '1')
+    image = _fjcore.ProgramImage(_three_op_memory())
+    assert image.storage_mode == storage_mode
+
+    first, second = image.new_memory(), image.new_memory()
+    cause, op_count, _, _, _ = first.run(_unexpected_io, _unexpected_io, IOReadOnEOF)
+    assert (cause, op_count) == (_fjcore.TERM_LOOPING, 3)
+    assert first.get_word(12) == 0b111
+    assert second.get_word(12) == 0  # the image (and the other clones) are untouched
+    assert image.new_memory().get_word(12) == 0
+
+
+def test_program_image_pages_are_copied_on_their_first_fetch(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv('FLIPJUMP_NO_FLAT', '1')
+    memory = _fjcore.Memory(32)
+    memory.add_segment(0, 1 << 20)
+    memory.set_words(0, [128, 0])
+    memory.set_word((1 << 20) - 1, 7)  # a second, far page - the run never touches it
+    image = _fjcore.ProgramImage(memory)
+
+    clone = image.new_memory()
+    clone_page_table_bytes = clone.allocated_bytes  # no pages of its own yet
+    _run_to_looping(clone)
+    assert clone.allocated_bytes == clone_page_table_bytes + (1 << 14) * 8  # one page copied
+    assert clone.get_word((1 << 20) - 1) == 7
+
+
+def test_program_image_freezes_its_memory() -> None:
+    memory = _three_op_memory()
+    image = _fjcore.ProgramImage(memory)
+    with pytest.raises(RuntimeError):
+        memory.set_word(12, 1)
+    with pytest.raises(RuntimeError):
+        memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF)
+    with pytest.raises(TypeError):
+        _fjcore.ProgramImage(image)
+
+    clone = image.new_memory()
+    del memory, image  # the clone keeps its image (and the shared pages) alive
+    assert clone.get_word(0) == 12 * 32
+
+
+@pytest.mark.parametrize('storage_mode', ['flat', 'paged'])
+def test_snapshot_restores_a_clone_to_the_saved_state(monkeypatch: pytest.MonkeyPatch, storage_mode: str) -> None:
+    if storage_mode == 'paged':
+        monkeypatch.setenv('FLIPJUMP_NO_FLAT', '1')
+    image = _fjcore.ProgramImage(_three_op_memory())
+    ran = image.new_memory()
+    ran.run(_unexpected_io, _unexpected_io, IOReadOnEOF)
+    snapshot = ran.snapshot(3)
+
+    restored = image.new_memory()
+    ip, op_count = restored.restore(snapshot)
+    assert op_count == 3
+    assert restored.get_word(12) == 0b111
+    assert restored.snapshot(op_count) == snapshot
+    assert ip == ran.restore(snapshot)[0]
+    # only the changed flat chunk (the whole 16-word flat array) / page (2^14 words) is saved, after its index
+    changed_words = 16 if storage_mode == 'flat' else 1 << 14
+    assert len(snapshot) == len(image.new_memory().snapshot()) + 8 + changed_words * 8
+
+
+def test_snapshot_of_an_untouched_clone_holds_no_pages(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv('FLIPJUMP_NO_FLAT', '1')
+    image = _fjcore.ProgramImage(_three_op_memory())
+    untouched = image.new_memory().snapshot()
+    ran = image.new_memory()
+    ran.run(_unexpected_io, _unexpected_io, IOReadOnEOF)
+    assert len(ran.snapshot()) == len(untouched) + 8 + (1 << 14) * 8  # one page: its index and words
+
+
+def test_restore_rejects_corrupt_or_mismatched_snapshots() -> None:
+    image = _fjcore.ProgramImage(_three_op_memory())
+    snapshot = image.new_memory().snapshot()
+    with pytest.raises(ValueError):
+        image.new_memory().restore(snapshot[:-1])
+    with pytest.raises(ValueError):
+        image.new_memory().restore(b'\0' + snapshot[1:])
+    with pytest.raises(ValueError):
+        _fjcore.Memory(64).restore(snapshot)
+
+
+@pytest.mark.parametrize('bad_page_index', [1 << 40, 1])  # beyond the memory, inside the flat window
+def test_restore_of_a_bad_page_index_changes_nothing(bad_page_index: int) -> None:
+    memory = _fjcore.Memory(32)
+    memory.add_segment(0, 1 << 15)  # a flat window of 2 pages' words
+    memory.add_segment(FAR, 8)
+    memory.set_words(0, [FAR * 32, 128])  # flip bit 0 of the far word (a page)
+    memory.set_words(4, [224, 128])  # flip bit 0 of word 7 (a flat chunk), loop
+    image = _fjcore.ProgramImage(memory)
+    ran = image.new_memory()
+    ran.run(_unexpected_io, _unexpected_io, IOReadOnEOF)
+    assert ran.storage_mode == 'hybrid'
+    snapshot = ran.snapshot(2)
+
+    # the snapshot ends with its single page (its index, then its words) - the flat chunk comes before it
+    page_index_offset = len(snapshot) - (1 + (1 << 14)) * 8
+    page_words_offset = page_index_offset + 8
+    bad_snapshot = snapshot[:page_index_offset] + bad_page_index.to_bytes(8, 'little') + snapshot[page_words_offset:]
+    restored = image.new_memory()
+    with pytest.raises(ValueError):
+        restored.restore(bad_snapshot)
+    assert (restored.get_word(7), restored.get_word(FAR)) == (0, 0)
+
+    restored.restore(snapshot)
+    assert (restored.get_word(7), restored.get_word(FAR)) == (1, 1)
+
+
+@pytest.mark.parametrize('featured', [False, True])
+@pytest.mark.parametrize('storage_mode', ['flat', 'paged'])
+def test_sampling_records_every_nth_op_across_resumed_runs(
+    monkeypatch: pytest.MonkeyPatch, storage_mode: str, featured: bool
+) -> None:
+    if storage_mode == 'paged':
+        monkeypatch.setenv('FLIPJUMP_NO_FLAT', '1')
+    memory = _cycling_memory()
+    memory.set_sampling(3)
+    memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF, max_ops=7, featured=featured)
+    assert memory.take_samples() == {4 * 32: 1, 6 * 32: 1}  # the 4th and 7th ops
+    assert memory.take_samples() == {}
+
+    memory = _cycling_memory()
+    memory.set_sampling(10)
+    for max_ops in (995, 3, 102):  # the countdown to the next sample carries over the pauses
+        memory.run(
+            _unexpected_io, _unexpected_io, IOReadOnEOF, start_ip=memory.last_run_ip, max_ops=max_ops, featured=featured
+        )
+    assert memory.take_samples() == {6 * 32: 109}  # the 11th, 21st, ..., 1091st ops - all at 6w
+
+
+def test_sampling_is_off_by_default_and_when_set_to_zero() -> None:
+    memory = _cycling_memory()
+    memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF, max_ops=100)
+    assert memory.take_samples() == {}
+    memory.set_sampling(1)
+    memory.set_sampling(0)
+    memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF, start_ip=memory.last_run_ip, max_ops=100)
+    assert memory.take_samples() == {}
+
+
+@pytest.mark.parametrize('featured', [False, True])
+@pytest.mark.parametrize('storage_mode', ['flat', 'paged'])
+def test_coverage_marks_the_executed_ops(monkeypatch: pytest.MonkeyPatch, storage_mode: str, featured: bool) -> None:
+    if storage_mode == 'paged':
+        monkeypatch.setenv('FLIPJUMP_NO_FLAT', '1')
+    memory = _three_op_memory()
+    memory.set_coverage(True)
+    memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF, max_ops=1, featured=featured)
+    memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF, start_ip=memory.last_run_ip, featured=featured)
+    bitmap, other_ips = memory.take_coverage()
+    assert bitmap == bytes([0b10101])  # the ops at 0, 4w, 8w (op indices 0, 2, 4) - marked across the two runs
+    assert other_ips == []
+    assert memory.take_coverage() == (bytes(1), [])
+
+
+def test_coverage_keeps_the_ops_above_its_bitmap_apart() -> None:
+    # the bitmap covers the ops below the flat-storage limit - rounded up to whole bytes (8 ops, 16 words)
+    memory = _fjcore.Memory(32, flat_max_words=8)
+    memory.add_segment(0, 32)
+    memory.set_words(0, [30 * 32, 16 * 32])
+    memory.set_words(16, [30 * 32 + 1, 16 * 32])
+    memory.set_coverage(True)
+    memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF)
+    assert memory.take_coverage() == (bytes([0b1]), [16 * 32])
+
+
+def test_coverage_is_off_by_default() -> None:
+    memory = _three_op_memory()
+    memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF)
+    assert memory.take_coverage() == (b'', [])
+
+
+RUN_LOOPS: Dict[str, Dict[str, Any]] = {'fast': {}, 'ring': {'last_ops_length': 4}, 'featured': {'featured': True}}
+
+
+@pytest.mark.parametrize('run_loop', list(RUN_LOOPS))
+@pytest.mark.parametrize('storage_mode', ['flat', 'paged'])
+def test_watchpoints_stop_the_run_after_the_watched_flip(
+    monkeypatch: pytest.MonkeyPatch, storage_mode: str, run_loop: str
+) -> None:
+    if storage_mode == 'paged':
+        monkeypatch.setenv('FLIPJUMP_NO_FLAT', '1')
+    memory = _three_op_memory()
+    memory.set_watchpoints([(12 * 32 + 1, 12 * 32 + 2)])
+    cause, op_count, _, _, _ = memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF, **RUN_LOOPS[run_loop])
+    assert cause == _fjcore.TERM_WATCH
+    assert op_count == 2
+    assert memory.last_run_ip == 8 * 32
+    assert memory.last_watch_hit == (4 * 32, 12 * 32 + 1, 12 * 32, 0b1, 0b11)
+
+    cause, op_count, _, _, _ = memory.run(
+        _unexpected_io, _unexpected_io, IOReadOnEOF, start_ip=memory.last_run_ip, **RUN_LOOPS[run_loop]
+    )
+    assert cause == _fjcore.TERM_LOOPING
+    assert op_count == 1
+    assert memory.last_watch_hit is None
+    assert memory.get_word(12) == 0b111
+
+
+def test_watchpoints_merge_report_the_terminating_op_and_clear() -> None:
+    memory = _three_op_memory()
+    memory.set_watchpoints([(12 * 32 + 4, 12 * 32 + 8), (5, 5), (12 * 32 + 2, 12 * 32 + 5)])
+    cause, op_count, _, _, _ = memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF)
+    assert cause == _fjcore.TERM_LOOPING  # the watched flip's op terminates the run - the termination wins
+    assert op_count == 3
+    assert memory.last_watch_hit == (8 * 32, 12 * 32 + 2, 12 * 32, 0b11, 0b111)
+
+    memory = _three_op_memory()
+    memory.set_watchpoints([(12 * 32, 12 * 32 + 3)])
+    memory.set_watchpoints([])
+    cause, op_count, _, _, _ = memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF)
+    assert (cause, op_count) == (_fjcore.TERM_LOOPING, 3)
+    assert memory.last_watch_hit is None
+
+
+def test_watchpoints_reject_a_bad_range() -> None:
+    memory = _three_op_memory()
+    with pytest.raises(TypeError):
+        memory.set_watchpoints([(1,)])
+
+
+def _traced_run(memory: Any, tmp_path: Path, **run_kwargs: Any) -> List[TraceRecord]:
+    trace_path = tmp_path / 'run.trace'
+    with open(trace_path, 'wb') as trace_file:
+        write_trace_header(trace_file, 32)
+        memory.set_trace(trace_file.write)
+        memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF, **run_kwargs)
+        memory.set_trace(None)
+    return list(read_trace(trace_path))
+
+
+@pytest.mark.parametrize('run_loop', list(RUN_LOOPS))
+@pytest.mark.parametrize('storage_mode', ['flat', 'paged'])
+def test_trace_records_every_op(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path, storage_mode: str, run_loop: str
+) -> None:
+    if storage_mode == 'paged':
+        monkeypatch.setenv('FLIPJUMP_NO_FLAT', '1')
+    assert _traced_run(_three_op_memory(), tmp_path, **RUN_LOOPS[run_loop]) == [
+        (0, 12 * 32, 4 * 32),
+        (4 * 32, 12 * 32 + 1, 8 * 32),
+        (8 * 32, 12 * 32 + 2, 8 * 32),
+    ]
+
+
+@pytest.mark.parametrize('featured', [False, True])
+def test_trace_hands_over_full_chunks_and_resumed_runs(tmp_path: Path, featured: bool) -> None:
+    memory = _cycling_memory()
+    records = _traced_run(memory, tmp_path, max_ops=500_000, featured=featured)  # 2.5 bytes per op: 2 chunks
+    assert len(records) == 500_000
+    assert records[:3] == [(0, 8 * 32, 4 * 32), (4 * 32, 8 * 32 + 1, 6 * 32), (6 * 32, 8 * 32 + 2, 4 * 32)]
+    assert records[-2:] == [(6 * 32, 8 * 32 + 2, 4 * 32), (4 * 32, 8 * 32 + 1, 6 * 32)]
+
+    resumed = _traced_run(memory, tmp_path, start_ip=memory.last_run_ip, max_ops=2, featured=featured)
+    assert resumed == [(6 * 32, 8 * 32 + 2, 4 * 32), (4 * 32, 8 * 32 + 1, 6 * 32)]
+
+
+def test_trace_write_errors_stop_the_run_and_it_cannot_change_while_running() -> None:
+    def failing_write(chunk: bytes) -> None:
+        raise OSError('disk full')
+
+    memory = _three_op_memory()
+    memory.set_trace(failing_write)
+    with pytest.raises(OSError):
+        memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF)
+
+    memory = _three_op_memory()
+    memory.set_trace(lambda chunk: memory.set_trace(None))
+    with pytest.raises(RuntimeError):
+        memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF)
+    with pytest.raises(TypeError):
+        memory.set_trace(5)
+
+
+def test_trace_is_off_by_default_and_after_set_trace_none() -> None:
+    chunks: List[bytes] = []
+    memory = _three_op_memory()
+    memory.set_trace(chunks.append)
+    memory.set_trace(None)
+    memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF)
+    assert chunks == []
+
+
+def test_progress_reports_the_running_run_from_its_signal_checks() -> None:
+    reports: List[Any] = []
+    memory = _cycling_memory()
+    memory.set_progress(lambda *report: reports.append(report), 1e-9)
+    cause, op_count = memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF, max_ops=1_000_000)[:2]
+    assert (cause, op_count) == (_fjcore.TERM_OP_BUDGET, 1_000_000)
+    report_ops = [ops for ops, _, _ in reports]
+    assert len(report_ops) >= 3 and report_ops == sorted(set(report_ops))  # a report per signal check (2^18 ops)
+    assert 0 < report_ops[0] <= 1 << 18 and report_ops[-1] <= 1_000_000
+    assert all(ip in (4 * 32, 6 * 32) and paused_seconds == 0 for _, ip, paused_seconds in reports)
+
+    memory.set_progress(None, 0)
+    memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF, start_ip=memory.last_run_ip, max_ops=1_000_000)
+    assert len(reports) == len(report_ops)
+
+
+def test_progress_callback_errors_stop_the_run_and_it_cannot_change_while_running() -> None:
+    def failing_report(ops: int, ip: int, paused_seconds: float) -> None:
+        raise ValueError('stop here')
+
+    memory = _cycling_memory()
+    memory.set_progress(failing_report, 1e-9)
+    with pytest.raises(ValueError):
+        memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF, max_ops=1_000_000)
+    assert 0 < memory.last_run_op_count <= 1 << 18  # the first check
+
+    memory = _cycling_memory()
+    memory.set_progress(lambda *report: memory.set_progress(None, 0), 1e-9)
+    with pytest.raises(RuntimeError):
+        memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF, max_ops=1_000_000)
+    with pytest.raises(TypeError):
+        memory.set_progress(5, 1.0)
+    with pytest.raises(ValueError):
+        memory.set_progress(print, 0)
+
+
+# --------------------------------------------------- the pre-decoding tier (set_predecode)
+
+
+def _rewriting_loop_memory(predecode: bool) -> Any:
+    """a w=32 program whose straight-line body A1-A3 runs twice; between the passes, op M rewrites
+    A3's jump word (a decoded op), so the second pass leaves to X. 9 ops; afterwards word 32 (the
+    data, bits 1024+) is 0b1000 | 1 << 16, and A3's jump word (word 9) is 448 = X.
+    flow: entry -> A1 -> A2 -> A3 -> M -> A1 -> A2 -> A3 -> X (loops).
+    """
+    memory = _fjcore.Memory(32)
+    memory.add_segment(0, 40)
+    memory.set_predecode(predecode)
+    #                      flip  jump
+    memory.set_words(0, [1040, 128])  # entry (ip=0)
+    memory.set_words(4, [1024, 192])  # A1    (ip=128)
+    memory.set_words(6, [1025, 256])  # A2    (ip=192)
+    memory.set_words(8, [1026, 320])  # A3    (ip=256): jumps to M, then (rewritten) to X
+    memory.set_words(10, [9 * 32 + 7, 128])  # M (ip=320): flips bit 7 of A3's jump word: 320 -> 448
+    memory.set_words(14, [1027, 448])  # X    (ip=448): loops
+    return memory
+
+
+def test_predecoded_blocks_are_dropped_when_the_program_rewrites_them() -> None:
+    memory = _rewriting_loop_memory(predecode=True)
+    cause, op_count, _, _, _ = memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF)
+    assert (cause, op_count) == (_fjcore.TERM_LOOPING, 9)
+    assert memory.get_word(32) == 0b1000 | 1 << 16
+    assert memory.get_word(9) == 448
+    stats = memory.predecode_stats
+    assert stats['flushes'] == 1  # M's write to A3's jump word - which is then speculated, not guarded
+    assert stats['decoded_ops'] == 4 + 3  # entry-A3, then A1-A3 (exiting to X, the jump word's value)
+    assert (stats['speculated_ops'], stats['misses']) == (1, 0)
+
+
+def test_a_speculated_op_whose_jump_changed_runs_on_the_normal_path() -> None:
+    results = []
+    for predecode in (False, True):
+        memory = _rewriting_loop_memory(predecode)
+        memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF)
+        memory.set_word(9, 320)  # A3 jumps to M again - its block still predicts X
+        cause, op_count, _, _, _ = memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF, start_ip=128)
+        results.append((cause, op_count, memory.get_word(32), memory.get_word(9)))
+    # A1-A2 (the block, up to the miss), A3 (the normal path), M-A3 (a block), X
+    assert results[0] == results[1] == (_fjcore.TERM_LOOPING, 8, 1 << 16, 448)
+    stats = memory.predecode_stats
+    assert (stats['flushes'], stats['misses']) == (1, 1)
+
+
+def test_predecode_is_off_by_default_and_set_by_the_env_var(monkeypatch: pytest.MonkeyPatch) -> None:
+    memory = _three_op_memory()
+    memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF)
+    assert memory.predecode_stats is None
+
+    monkeypatch.setenv('FLIPJUMP_PREDECODE', '1')
+    memory = _three_op_memory()
+    cause, op_count, _, _, _ = memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF)
+    assert (cause, op_count) == (_fjcore.TERM_LOOPING, 3)
+    assert memory.predecode_stats is not None
+
+
+def test_predecoded_blocks_are_redecoded_after_api_writes() -> None:
+    memory = _three_op_memory()
+    memory.set_predecode(True)
+    memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF)
+    assert memory.get_word(12) == 0b111
+
+    memory.set_word(4, 12 * 32 + 5)  # the second op flips bit 5 instead of bit 1
+    memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF)
+    assert memory.get_word(12) == 0b100010
+    assert memory.predecode_stats['flushes'] == 1
+
+
+@pytest.mark.parametrize('max_ops', [1, 3, 1_000_001])
+def test_predecoded_runs_keep_the_op_budget_and_the_samples(max_ops: int) -> None:
+    results = []
+    for predecode in (False, True):
+        memory = _cycling_memory()
+        memory.set_predecode(predecode)
+        memory.set_sampling(1000)
+        cause, op_count, _, _, _ = memory.run(_unexpected_io, _unexpected_io, IOReadOnEOF, max_ops=max_ops)
+        results.append((cause, op_count, memory.last_run_ip, memory.get_word(8), memory.take_samples()))
+    assert results[0] == results[1]
+    assert results[0][:2] == (_fjcore.TERM_OP_BUDGET, max_ops)
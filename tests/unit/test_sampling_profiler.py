@@ -0,0 +1,82 @@
+"""
+unit-tests for the sampling profiler's reports (flipjump/interpreter/debugging/sampling_profiler.py):
+splitting a label into its macro-call frames, attributing the sampled ips to their nearest
+labels, and the collapsed-stacks / top-N text outputs.
+"""
+
+from typing import Dict, List
+
+import pytest
+
+from flipjump.interpreter.debugging.sampling_profiler import (
+    UNLABELED_FRAME,
+    attribute_samples,
+    collapsed_stacks,
+    label_frames,
+    top_report,
+)
+
+LABELS: Dict[str, int] = {
+    'f1:l3:stl.startup---s1:l14:stl.startup(1)---:start:': 0,
+    'f1:l3:stl.startup---s1:l14:stl.startup(1)---code_start': 0x100,
+    'f1:l5:print(1)---s1:l166:rep0:stl.output_char(1)---:start:': 0x200,
+    'f1:l5:print(1)---:start:': 0x200,
+    ':wflips:12': 0x400,
+    'end': 0x500,
+}
+
+
+@pytest.mark.parametrize(
+    'label, frames',
+    [
+        ('f1:l5:print(1)---s1:l166:rep0:stl.output_char(1)---:start:', ['print(1)', 'stl.output_char(1)']),
+        ('f1:l3:stl.startup---s1:l14:stl.startup(1)---code_start', ['stl.startup', 'stl.startup(1)', 'code_start']),
+        (':wflips:12', [':wflips:']),
+        ('end', ['end']),
+    ],
+)
+def test_label_frames(label: str, frames: List[str]) -> None:
+    assert label_frames(label) == frames
+
+
+def test_attribute_samples_to_the_nearest_previous_label() -> None:
+    label_samples = attribute_samples({0x80: 1, 0x100: 2, 0x280: 3, 0x440: 4, 0x900: 5}, LABELS)
+    assert label_samples == {
+        'f1:l3:stl.startup---s1:l14:stl.startup(1)---:start:': 1,
+        'f1:l3:stl.startup---s1:l14:stl.startup(1)---code_start': 2,
+        'f1:l5:print(1)---s1:l166:rep0:stl.output_char(1)---:start:': 3,  # the most nested label on 0x200
+        ':wflips:12': 4,
+        'end': 5,
+    }
+
+
+def test_attribute_samples_without_labels() -> None:
+    assert attribute_samples({0x80: 1, 0x100: 2}, {}) == {UNLABELED_FRAME: 3}
+    assert attribute_samples({0x80: 1}, {'end': 0x500}) == {UNLABELED_FRAME: 1}
+
+
+def test_collapsed_stacks_merge_the_labels_of_a_stack() -> None:
+    label_samples = attribute_samples({0x80: 1, 0x100: 2, 0x280: 3, 0x440: 4}, LABELS)
+    label_samples['f1:l9:print(1)---s1:l166:rep3:stl.output_char(1)---:start:'] = 10  # another call, same stack
+    assert collapsed_stacks(label_samples) == [
+        ':wflips: 4',
+        'print(1);stl.output_char(1) 13',
+        'stl.startup;stl.startup(1) 1',
+        'stl.startup;stl.startup(1);code_start 2',
+    ]
+
+
+def test_top_report_lists_the_hottest_labels_and_macros() -> None:
+    report = top_report(attribute_samples({0x80: 1, 0x100: 1, 0x280: 6, 0x440: 2}, LABELS), top=2)
+    assert report.splitlines() == [
+        'The sampling profiler took 10 samples.',
+        '',
+        'The hottest code (by label):',
+        '   60.00%  print(1) -> stl.output_char(1)',
+        '   20.00%  :wflips:',
+        '',
+        'The hottest macros (including their nested macro calls):',
+        '   60.00%  print(1)',
+        '   60.00%  stl.output_char(1)',
+    ]
+    assert top_report({}) == 'The sampling profiler took no samples.'
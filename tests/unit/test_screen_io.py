@@ -196,6 +196,16 @@ def test_update_screen_raw_streams_pixels(tmp_path: Path) -> None:
     assert device.frame_hashes[0][1] == expected
 
 
+def test_update_screen_raw_through_write_bytes(tmp_path: Path) -> None:
+    device, memory = make_screen(tmp_path)
+    init_4x2(device, memory)
+
+    device.write_bytes(bytes([5, 0, 1, 0, 1, 1, 0, 1, 0]))  # the byte-level output of the same frame
+
+    assert device.frame_count == 1
+    assert device.last_frame_rgb[:2] == [(10, 20, 30), (200, 100, 0)]
+
+
 def test_update_screen_raw_masks_bpp4(tmp_path: Path) -> None:
     device, memory = make_screen(tmp_path)
     init_4x2(device, memory, bpp=4)
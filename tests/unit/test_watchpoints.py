@@ -0,0 +1,49 @@
+"""
+unit-tests for the write watchpoints (flipjump/interpreter/debugging/watchpoints.py): parsing the
+watchpoint specs (labels / addresses, and their :WORDS lengths) into bit-address ranges, and the
+text description of a hit.
+"""
+
+from typing import Dict, List, Tuple
+
+import pytest
+
+from flipjump.interpreter.debugging.breakpoints import BreakpointHandler
+from flipjump.interpreter.debugging.watchpoints import WatchHit, parse_watchpoints
+from flipjump.utils.exceptions import FlipJumpRuntimeException
+
+LABELS: Dict[str, int] = {
+    'counter': 0x400,
+    'f1:l5:print(1)---:start:': 0x800,
+}
+
+
+@pytest.mark.parametrize(
+    'watch_specs, watch_ranges',
+    [
+        (['counter'], [(0x400, 0x400 + 2 * 32)]),
+        (['counter:5'], [(0x400, 0x400 + 5 * 32)]),
+        (['0x100', '512:1'], [(0x100, 0x100 + 2 * 32), (512, 512 + 32)]),
+        (['f1:l5:print(1)---:start:'], [(0x800, 0x800 + 2 * 32)]),
+        (['f1:l5:print(1)---:start::3'], [(0x800, 0x800 + 3 * 32)]),
+    ],
+)
+def test_parse_watchpoints(watch_specs: List[str], watch_ranges: List[Tuple[int, int]]) -> None:
+    assert parse_watchpoints(watch_specs, LABELS, 32) == watch_ranges
+
+
+@pytest.mark.parametrize('watch_spec', ['missing', 'counter:0', 'counter:x', '0x100:'])
+def test_parse_watchpoints_rejects_bad_specs(watch_spec: str) -> None:
+    with pytest.raises(FlipJumpRuntimeException):
+        parse_watchpoints([watch_spec], LABELS, 32)
+
+
+def test_watch_hit_describe() -> None:
+    watch_hit = WatchHit(op_counter=1234, ip=0x800, bit_address=0x401, word_address=0x400, old_word=1, new_word=3)
+    assert watch_hit.describe().splitlines() == [
+        'Watchpoint hit after 1,234 ops: the op at 0x800',
+        'flipped bit 0x401 of the word at 0x400',
+        '  0x1 -> 0x3',
+    ]
+    labels_handler = BreakpointHandler({}, {address: label for label, address in LABELS.items()}, LABELS)
+    assert 'counter' in watch_hit.describe(labels_handler)